@@ -26,12 +26,14 @@ import warnings
 
 warnings.simplefilter("ignore", DeprecationWarning)
 warnings.simplefilter("ignore", FutureWarning)
+import numpy as np
 import pandas as pd
 from PKDevTools.classes.ColorText import colorText
 from PKDevTools.classes.PKDateUtilities import PKDateUtilities
 from PKDevTools.classes.log import default_logger
 from pkscreener.classes import Utility, ConsoleUtility
 from pkscreener.classes.ConfigManager import parser, tools
+from pkscreener.classes.PKResultAccumulator import PKResultAccumulator
 
 configManager = tools()
 configManager.getConfig(parser)
@@ -50,6 +52,7 @@ def backtest(
     sampleDays=configManager.backtestPeriod,
     backTestedData=None,
     sellSignal=False,
+    strategy=None,
 ):
     if stock == "" or data is None:
         default_logger().debug(f"No data/stock {(stock)} received for backtesting!")
@@ -117,7 +120,9 @@ def backtest(
         columns.append(f"{prd}-Pd")
         backTestedStock[f"{prd}-Pd"] = ""
     if backTestedData is None:
-        backTestedData = pd.DataFrame(columns=columns)
+        # Rows are collected as columns and turned into a dataframe once (see
+        # backtestDataFrame) instead of being concatenated one by one.
+        backTestedData = PKResultAccumulator(schema={column: backTestedStock[column] for column in columns})
     backTestedStock["Stock"] = stock
     backTestedStock["Date"] = saveDict["Date"]
     backTestedStock["Consol."] = screenedDict["Consol."]
@@ -131,13 +136,19 @@ def backtest(
     backTestedStock["Trend"] = screenedDict["Trend"]
     backTestedStock["Pattern"] = screenedDict["Pattern"]
     backTestedStock["CCI"] = screenedDict["CCI"]
+    if strategy is not None:
+        # Multi-strategy backtests tell the rows of each strategy apart
+        backTestedStock["Strategy"] = strategy
+    forwardReturns = forwardReturnsForPeriods(data, calcPeriods)
     for prd in calcPeriods:
         try:
             backTestedStock[f"{abs(prd)}-Pd"] = ""
             backTestedStock[f"LTP{prd}"] = ""
             backTestedStock[f"Growth{prd}"] = ""
-            rolling_pct = data["Close"].pct_change(periods=prd) * 100
-            pct_change = rolling_pct.iloc[prd]
+            # The return as a number, for the statistics (PKBacktestStatistics)
+            backTestedStock[f"Return{prd}"] = np.nan
+            pct_change = forwardReturns[prd]
+            backTestedStock[f"Return{prd}"] = float(pct_change)
             if not sellSignal:
                 colored_pct = colorText.GREEN if pct_change >= 0 else colorText.FAIL
             else:
@@ -160,6 +171,9 @@ def backtest(
         #     except Exception:
         #         continue
     allStockBacktestData.append(backTestedStock)
+    if isinstance(backTestedData, PKResultAccumulator):
+        backTestedData.append(backTestedStock)
+        return backTestedData
     df = pd.DataFrame(allStockBacktestData)  # , columns=backTestedData.columns)
     try:
         backTestedData = pd.concat([backTestedData, df])
@@ -167,6 +181,33 @@ def backtest(
         pass
     return backTestedData
 
+# Returns (in %) from the first candle of data to each of the given periods
+# later, like data["Close"].pct_change(periods=prd).iloc[prd] (with missing
+# closes padded) for each period, but for all of them at once. Periods that
+# are beyond the data are left out.
+def forwardReturnsForPeriods(data, periods):
+    closes = data["Close"].ffill().to_numpy(dtype=float)
+    periods = [prd for prd in periods if 0 <= prd < len(closes)]
+    if len(periods) == 0:
+        return {}
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = (closes[periods] / closes[0] - 1) * 100
+    return dict(zip(periods, returns))
+
+# The backtest results collected by backtest() as a dataframe
+def backtestDataFrame(backTestedData):
+    if not isinstance(backTestedData, PKResultAccumulator):
+        return backTestedData
+    df = backTestedData.toDataFrame()
+    # Every row used to be concatenated with its own (0) index
+    df.index = np.zeros(len(df), dtype=np.int64)
+    # The rows used to be concatenated to an empty frame of the first columns,
+    # which made the integer columns (like RSI and CCI) float
+    integerColumns = [column for column, dtype in df.dtypes.items() if pd.api.types.is_integer_dtype(dtype)]
+    if len(integerColumns) > 0:
+        df = df.astype({column: np.float64 for column in integerColumns})
+    return df
+
 # Prepares a backtest summary based on the color codes of individual days or stocks
 # Based on that it calculates an overall success rate of a given strategy for which
 # this backtest is run.
@@ -110,6 +110,25 @@ class PKConsoleMenuTools:
             default_logger().debug(e, exc_info=True)
             return 2
 
+    # Prompt for a custom scan expression
+    def promptScanExpression(scanExpression=None):
+        PKConsoleTools.clearScreen(forceTop=True)
+        if scanExpression is not None and len(str(scanExpression).strip()) > 0:
+            return str(scanExpression).strip()
+        OutputControls().printOutput(
+            colorText.WARN
+            + "\n  [+] Fields  : open, high, low, close, volume"
+            + "\n  [+] Functions: sma, ema, rsi, highest, lowest, prev (e.g. sma(50), sma(volume,20)), abs"
+            + "\n  [+] Operators: + - * / > >= < <= == != between and or not"
+            + "\n  [+] Example : rsi(14) between 55,68 and close > sma(50) and volume > 2.5*sma(volume,20)"
+            + colorText.END
+        )
+        return input(
+            colorText.WARN
+            + "\n  [+] Enter the scan expression: "
+            + colorText.END
+        ).strip()
+
     def promptMenus(menu):
         PKConsoleTools.clearScreen(forceTop=True)
         m = menus()
@@ -369,12 +369,13 @@ level2_X_MenuDict = {
     "41": "Pivot Points                             ",
     "42": "Super Gainers                            ",
     "43": "Super Losers                             ",
+    "44": "Custom Expression Scan                   ",
     "50": "Show Last Screened Results               ",
 
     "M": "Back to the Top/Main menu                 ",
     "Z": "Exit (Ctrl + C)                           ",
 }
-MAX_SUPPORTED_MENU_OPTION = 43
+MAX_SUPPORTED_MENU_OPTION = 44
 MAX_MENU_OPTION = 50
 
 level3_X_Reversal_MenuDict = {
@@ -633,8 +634,9 @@ class menus:
         # last screen results 
         scanOptionKeys = list(level2_X_MenuDict.keys()) #[1:-3]
         # These have to be ignored because these are irrelevant from 
-        # scan perspective
-        scanOptionsToIgnore = ["0","22","26","29",str(MAX_MENU_OPTION),"M","Z"]
+        # scan perspective. The custom expression scan (44) needs an
+        # expression that these generated options cannot provide.
+        scanOptionsToIgnore = ["0","22","26","29","44",str(MAX_MENU_OPTION),"M","Z"]
         from PKDevTools.classes.PKDateUtilities import PKDateUtilities
         isTrading = PKDateUtilities.isTradingTime()
         if isTrading:
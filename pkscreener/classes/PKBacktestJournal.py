@@ -0,0 +1,162 @@
+"""
+    The MIT License (MIT)
+
+    Copyright (c) 2023 pkjmesra
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+
+"""
+import glob
+import hashlib
+import os
+import pickle
+import socket
+import time
+
+from PKDevTools.classes import Archiver
+from PKDevTools.classes.log import default_logger
+from PKDevTools.classes.PKDateUtilities import PKDateUtilities
+from PKDevTools.classes.Singleton import SingletonType, SingletonMixin
+from pkscreener.classes.PKResultAccumulator import PKResultAccumulator
+from pkscreener.classes.PKScanResultCache import PKScanResultCache
+
+BACKTEST_JOURNAL_FOLDER = "backtest_journal"
+# The configuration that changes the backtest rows of a (stock, day) unit.
+# A journal is only resumed by a run with the same values for all of them.
+JOURNAL_CONFIG_FIELDS = [
+    "periodsRange", "daysToLookback", "backtestPeriodFactor", "maxBacktestWindow", "useEMA",
+    "stageTwo", "showunknowntrends", "consolidationPercentage", "volumeRatio", "minLTP", "maxLTP",
+    "minVolume", "minimumChangePercentage", "baseIndex", "calculatersiintraday",
+    "atrTrailingStopSensitivity", "atrTrailingStopPeriod", "atrTrailingStopEMAPeriod",
+    "vcpRangePercentageFromTop", "vcpLegsToCheckForConsolidation", "vcpVolumeContractionRatio",
+    "enableAdditionalVCPFilters", "enableAdditionalVCPEMAFilters", "superConfluenceEMAPeriods",
+    "superConfluenceMaxReviewDays", "superConfluenceEnforce200SMA", "anchoredAVWAPPercentage",
+]
+
+class PKBacktestJournal(SingletonMixin, metaclass=SingletonType):
+    """
+    Checkpoints of a backtest. Each (stock, day) unit that comes back from
+    the workers is appended, with the backtest rows it produced, to a journal
+    under the user data directory as soon as it is received. A run with the
+    same parameters on the same trading date (say, after a Ctrl+C, a timeout
+    or a preempted runner) skips the units that are in the journal and adds
+    their rows to its results.
+
+    Every run writes its own journal file ({key}.{host}.{pid}.pkl) and all
+    the files of a key are read when a run begins. The journals of a backtest
+    that was sharded across machines can therefore be merged by copying
+    them into the same folder. The journals of a key are removed once a run
+    of it completes.
+    """
+    def __init__(self):
+        super(PKBacktestJournal, self).__init__()
+        self.journalDir = os.path.join(Archiver.get_user_data_dir(), BACKTEST_JOURNAL_FOLDER)
+        self.key = None
+        self.journalFile = None
+        self.finishedUnits = {}
+        self.restoredUnits = {}
+
+    def journalKey(userArgs, selectedChoice, configManager, backtestPeriod):
+        optionKey = PKScanResultCache().normalizedOptionKey(userArgs, selectedChoice, configManager)
+        tradingDate = PKDateUtilities.tradingDate().strftime("%Y-%m-%d")
+        configKey = "|".join(f"{field}={getattr(configManager, field, None)}" for field in JOURNAL_CONFIG_FIELDS)
+        return hashlib.sha1(f"{optionKey}|{backtestPeriod}|{configKey}|{tradingDate}".encode("utf-8")).hexdigest()
+
+    def begin(self, key):
+        # Reads the units that all the journals of this key have finished
+        self.end()
+        self.key = key
+        self.evictStale()
+        for fileName in sorted(glob.glob(os.path.join(self.journalDir, f"{key}.*.pkl"))):
+            try:
+                with open(fileName, "rb") as f:
+                    while True:
+                        stock, days, rows = pickle.load(f)
+                        self.finishedUnits[(stock, days)] = rows
+            except EOFError:
+                pass
+            except Exception as e: # pragma: no cover
+                # The last unit of an interrupted run may have been written only partly
+                default_logger().debug(e, exc_info=True)
+
+    def pendingItems(self, items, stockIndex=13, daysIndex=19):
+        # The scan items whose (stock, day) unit isn't finished yet
+        if len(self.finishedUnits) == 0:
+            return items
+        pendingItems = []
+        for item in items:
+            unit = (item[stockIndex], item[daysIndex])
+            if unit in self.finishedUnits:
+                self.restoredUnits[unit] = self.finishedUnits[unit]
+            else:
+                pendingItems.append(item)
+        return pendingItems
+
+    def record(self, stock, days, rows):
+        if self.key is None:
+            return
+        try:
+            if self.journalFile is None:
+                os.makedirs(self.journalDir, exist_ok=True)
+                self.journalFile = open(os.path.join(self.journalDir, f"{self.key}.{socket.gethostname()}.{os.getpid()}.pkl"), "ab")
+            pickle.dump((stock, days, list(rows)), self.journalFile, protocol=pickle.HIGHEST_PROTOCOL)
+            self.journalFile.flush()
+        except Exception as e: # pragma: no cover
+            default_logger().debug(e, exc_info=True)
+
+    def mergeRestoredResults(self, backTestedData):
+        # Adds the backtest rows of the units that were skipped to the ones
+        # collected (by Backtest.backtest) in this run
+        if len(self.restoredUnits) == 0 or not (backTestedData is None or isinstance(backTestedData, PKResultAccumulator)):
+            return backTestedData
+        if backTestedData is None:
+            backTestedData = PKResultAccumulator()
+        for rows in self.restoredUnits.values():
+            for row in rows:
+                backTestedData.append(row)
+        return backTestedData
+
+    def end(self, completed=False):
+        # A completed run leaves nothing to resume, so its journals are removed
+        if self.journalFile is not None:
+            try:
+                self.journalFile.close()
+            except Exception as e: # pragma: no cover
+                default_logger().debug(e, exc_info=True)
+        if completed and self.key is not None:
+            for fileName in glob.glob(os.path.join(self.journalDir, f"{self.key}.*.pkl")):
+                try:
+                    os.remove(fileName)
+                except OSError as e: # pragma: no cover
+                    default_logger().debug(e, exc_info=True)
+        self.journalFile = None
+        self.key = None
+        self.finishedUnits = {}
+        self.restoredUnits = {}
+
+    def evictStale(self):
+        # Journals are keyed by trading date, so those older than a week are of no use
+        now = time.time()
+        for f in glob.glob("*.pkl", root_dir=self.journalDir):
+            filePath = os.path.join(self.journalDir, f)
+            try:
+                if os.path.getmtime(filePath) < now - 7*24*3600:
+                    os.remove(filePath)
+            except OSError: # pragma: no cover
+                pass
@@ -0,0 +1,195 @@
+"""
+    The MIT License (MIT)
+
+    Copyright (c) 2023 pkjmesra
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+
+"""
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from PKDevTools.classes import Archiver
+from PKDevTools.classes.log import default_logger
+from PKDevTools.classes.PKDateUtilities import PKDateUtilities
+from PKDevTools.classes.Singleton import SingletonType, SingletonMixin
+from pkscreener.classes import ImageUtility
+
+BACKTEST_STORE_FOLDER = "backtest_results_store"
+PUBLISHED_REPORTS_URL = "https://pkjmesra.github.io/PKScreener/Backtest-Reports/{0}"
+STORE_KEYS = ["ScanType", "Date", "Period"]
+
+class PKBacktestResultsStore(SingletonMixin, metaclass=SingletonType):
+    """
+    Persistent store of the backtest X-Ray insights, with one row per
+    (strategy, date, period) for each scanner (like B_1_12). Each scanner
+    is kept in its own file under the user data directory.
+
+    Every backtest run adds its insights to the store. The summary of a
+    scanner (the [SUM] rows of its insights report) is worked out from the
+    stored rows and kept until the scanner gets new rows, so summarising
+    all the strategies doesn't re-parse every report. The published report
+    of a scanner is read at most once a day to bring in the other runs.
+    """
+    def __init__(self):
+        super(PKBacktestResultsStore, self).__init__()
+        self.storeDir = os.path.join(Archiver.get_user_data_dir(), BACKTEST_STORE_FOLDER)
+        self.scanners = {}
+        self.summaries = {}
+
+    def publishedReportName(reportName):
+        return os.path.basename(reportName).replace("_X_", "_B_").replace("_G_", "_B_").replace("_S_", "_B_")
+
+    def scannerForReport(reportName):
+        # PKScreener_B_1_12_Insights_DateSorted.html -> B_1_12
+        scanner = PKBacktestResultsStore.publishedReportName(reportName).split("_Insights")[0]
+        return scanner[len("PKScreener_"):] if scanner.startswith("PKScreener_") else scanner
+
+    def scannerFilePath(self, scanner):
+        return os.path.join(self.storeDir, f"{scanner}.pkl")
+
+    def scannerResults(self, scanner):
+        results = self.scanners.get(scanner)
+        if results is None:
+            filePath = self.scannerFilePath(scanner)
+            if os.path.isfile(filePath):
+                try:
+                    with open(filePath, "rb") as f:
+                        results = pickle.load(f)
+                except Exception as e: # pragma: no cover
+                    default_logger().debug(e, exc_info=True)
+                    results = None
+            if results is None:
+                results = {"rows": pd.DataFrame(columns=STORE_KEYS + ["Pd-%", "Pd-10k"]), "refreshedOn": None}
+            self.scanners[scanner] = results
+        return results
+
+    def saveScannerResults(self, scanner):
+        try:
+            os.makedirs(self.storeDir, exist_ok=True)
+            filePath = self.scannerFilePath(scanner)
+            with open(f"{filePath}.tmp", "wb") as f:
+                pickle.dump(self.scanners[scanner], f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(f"{filePath}.tmp", filePath)
+        except Exception as e: # pragma: no cover
+            default_logger().debug(e, exc_info=True)
+
+    def insightValues(values):
+        # "12.5 %", "10250.0" (or the same with color styles) and "-" as floats
+        values = values.astype(str).apply(ImageUtility.PKImageTools.removeAllColorStyles)
+        values = values.str.replace("%", "", regex=False).str.strip()
+        return pd.to_numeric(values.where(~values.isin(["-", "", "nan"])), errors="coerce")
+
+    def insightRows(insights, periods):
+        # The (strategy, date, period) rows of an insights table, leaving out its [SUM] rows
+        insights = insights[~insights["ScanType"].astype(str).str.startswith("[SUM]")]
+        frames = []
+        for period in periods:
+            for percentColumn, growthColumn in [(f"{period}Pd-%", f"{period}Pd-10k"), (f"{period}D-%", f"{period}D-10k")]:
+                if percentColumn in insights.columns and growthColumn in insights.columns:
+                    frames.append(pd.DataFrame({
+                        "ScanType": insights["ScanType"].astype(str).to_numpy(),
+                        "Date": insights["Date"].astype(str).to_numpy(),
+                        "Period": period,
+                        "Pd-%": PKBacktestResultsStore.insightValues(insights[percentColumn]).to_numpy(),
+                        "Pd-10k": PKBacktestResultsStore.insightValues(insights[growthColumn]).to_numpy(),
+                    }))
+                    break
+        return pd.concat(frames, axis=0, ignore_index=True) if len(frames) > 0 else None
+
+    def addRows(self, scanner, rows, replaceExisting=True):
+        if rows is None or len(rows) == 0:
+            return
+        results = self.scannerResults(scanner)
+        storedRows = results["rows"]
+        # Rows of the same (strategy, date, period) replace the stored ones,
+        # unless the stored ones are to be kept
+        allRows = pd.concat([storedRows, rows] if replaceExisting else [rows, storedRows], axis=0, ignore_index=True) if len(storedRows) > 0 else rows
+        allRows = allRows.drop_duplicates(subset=STORE_KEYS, keep="last")
+        results["rows"] = allRows.sort_values(by=STORE_KEYS, kind="stable").reset_index(drop=True)
+        self.summaries.pop(scanner, None)
+
+    def addInsights(self, reportName, insights, periods):
+        # Called with the insights table of each backtest run
+        if insights is None or len(insights) == 0 or "ScanType" not in insights.columns or "Date" not in insights.columns:
+            return
+        scanner = PKBacktestResultsStore.scannerForReport(reportName)
+        self.addRows(scanner, PKBacktestResultsStore.insightRows(insights, periods))
+        self.saveScannerResults(scanner)
+
+    def refreshFromPublishedReport(self, reportName, periods):
+        scanner = PKBacktestResultsStore.scannerForReport(reportName)
+        results = self.scannerResults(scanner)
+        today = PKDateUtilities.currentDateTime().strftime("%Y-%m-%d")
+        if results["refreshedOn"] == today:
+            return
+        try:
+            dfs = pd.read_html(
+                PUBLISHED_REPORTS_URL.format(PKBacktestResultsStore.publishedReportName(reportName)),
+                encoding="UTF-8", attrs = {'id': 'resultsTable'}
+            )
+        except Exception as e: # pragma: no cover
+            default_logger().debug(e, exc_info=True)
+            return
+        if dfs is not None and len(dfs) > 0 and len(dfs[0]) > 0 and "ScanType" in dfs[0].columns and "Date" in dfs[0].columns:
+            # The rows of local runs are kept over the published ones
+            self.addRows(scanner, PKBacktestResultsStore.insightRows(dfs[0], periods), replaceExisting=False)
+        results["refreshedOn"] = today
+        self.saveScannerResults(scanner)
+
+    def summary(self, reportName, periods):
+        """
+        The [SUM] rows of the insights report of a scanner: for each strategy,
+        the average growth of 10k and the corresponding % return over all its
+        dates (like PortfolioXRay.xRaySummary), with the number of dates in
+        the ScanType. Returns that are not positive (or missing) are 0, as the
+        rankings have always read them from the published report.
+        """
+        scanner = PKBacktestResultsStore.scannerForReport(reportName)
+        summary = self.summaries.get(scanner)
+        if summary is None:
+            rows = self.scannerResults(scanner)["rows"]
+            if len(rows) == 0:
+                return None
+            summaryRows = []
+            for scanType, scanTypeRows in rows.groupby("ScanType"):
+                summaryRow = {
+                    "ScanType": f"[SUM]{scanType.replace('(','[').replace(')',']')} ({scanTypeRows['Date'].nunique()})",
+                    "Date": np.nan,
+                }
+                for period in periods:
+                    summaryRow[f"{period}Pd-%"] = 0.0
+                    summaryRow[f"{period}Pd-10k"] = np.nan
+                    periodRows = scanTypeRows[scanTypeRows["Period"] == period]
+                    # A date counts unless it has neither a growth of 10k nor a positive return
+                    periodRows = periodRows[periodRows["Pd-10k"].notna() | (periodRows["Pd-%"] > 0)]
+                    if len(periodRows) == 0:
+                        continue
+                    growth10k = periodRows["Pd-10k"].fillna(0.0).sum()
+                    gain = round((growth10k - 10000 * len(periodRows)) * 100 / (10000 * len(periodRows)), 2)
+                    average10k = round(growth10k / len(periodRows), 2)
+                    summaryRow[f"{period}Pd-%"] = gain if gain > 0 else 0.0
+                    summaryRow[f"{period}Pd-10k"] = average10k if average10k != 0 else np.nan
+                summaryRows.append(summaryRow)
+            summary = pd.DataFrame(summaryRows)
+            self.summaries[scanner] = summary
+        return summary.copy()
@@ -0,0 +1,173 @@
+"""
+    The MIT License (MIT)
+
+    Copyright (c) 2023 pkjmesra
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+
+"""
+import warnings
+
+import numpy as np
+import pandas as pd
+
+# Number of resamples for the bootstrapped confidence intervals and the
+# Monte-Carlo drawdowns, and the confidence level of the intervals
+BOOTSTRAP_SAMPLES = 1000
+CONFIDENCE_LEVEL = 0.95
+# Resamples drawn at a time, to keep the (resamples x signals) weights small
+BOOTSTRAP_CHUNK_SIZE = 100
+
+class PKBacktestStatistics:
+    """
+    Numeric summary of a backtest. The forward returns of all the signals
+    are taken into a (signals x periods) array once, and all the statistics
+    are computed on that array, for all the periods together: the hit rate
+    and average return with bootstrapped confidence intervals, and the max
+    drawdown of an equal-weight portfolio of each day's signals, with its
+    Monte-Carlo distribution over resampled days. Sell signals are counted
+    as short trades (a fall is a hit). The returns are the numeric
+    Return<n> columns that Backtest.backtest adds next to the formatted
+    "<n>-Pd" cells.
+    """
+    def returnColumns(periods):
+        return [f"Return{prd}" for prd in periods]
+
+    def returnsArray(backtest_df, periods):
+        # The forward returns (in %) of the backtest rows, as a (signals x
+        # periods) array. Missing returns are NaN.
+        returns = np.full((len(backtest_df), len(periods)), np.nan)
+        for index, column in enumerate(PKBacktestStatistics.returnColumns(periods)):
+            if column in backtest_df.columns:
+                returns[:, index] = pd.to_numeric(backtest_df[column], errors="coerce").to_numpy(dtype=float)
+        returns[~np.isfinite(returns)] = np.nan
+        return returns
+
+    def bootstrapWeights(numSignals, numSamples, rng):
+        # How many times each signal is drawn (with replacement) in each of
+        # the resamples, as a (resamples x signals) array
+        draws = rng.integers(0, numSignals, size=(numSamples, numSignals)) + (np.arange(numSamples) * numSignals)[:, None]
+        return np.bincount(draws.ravel(), minlength=numSamples * numSignals).reshape(numSamples, numSignals).astype(float)
+
+    def maxDrawdowns(dailyReturns):
+        # Max drawdown (in %) of compounding the returns along the last axis
+        equity = np.cumprod(1 + dailyReturns / 100, axis=-1)
+        peaks = np.maximum(np.maximum.accumulate(equity, axis=-1), 1)
+        return (equity / peaks - 1).min(axis=-1) * 100
+
+    def nonOverlappingDays(dayOffsets, period):
+        # The days (from the first one) that are at least period trading days
+        # after the previous one taken. The n-period returns of consecutive
+        # days overlap for n-1 days, and compounding them would count the
+        # same moves several times over.
+        days = []
+        nextOffset = None
+        for day, offset in enumerate(dayOffsets):
+            if nextOffset is None or offset >= nextOffset:
+                days.append(day)
+                nextOffset = offset + max(1, period)
+        return np.array(days, dtype=np.int64)
+
+    def summary(returns, dates=None, sellSignal=False, samples=BOOTSTRAP_SAMPLES, confidence=CONFIDENCE_LEVEL, seed=0, periods=None):
+        # Statistics (rows) for each period (columns) of a (signals x periods)
+        # returns array. Signals of the same date are one day of the equity
+        # curve. Without dates, every signal is a day of its own. The
+        # equity curve of a period only takes the days that are that period
+        # apart (with periods=None, every day is taken).
+        numSignals, numPeriods = returns.shape
+        valid = ~np.isnan(returns)
+        # A buy signal is a hit when the price doesn't fall, a sell signal
+        # when it does
+        with np.errstate(invalid="ignore"):
+            hits = (valid & ((returns < 0) if sellSignal else (returns >= 0))).astype(float)
+        tradeReturns = np.where(valid, -returns if sellSignal else returns, 0.0)
+        validCounts = valid.astype(float)
+        counts = validCounts.sum(axis=0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            hitRates = hits.sum(axis=0) * 100 / counts
+            averageReturns = tradeReturns.sum(axis=0) / counts
+        rng = np.random.default_rng(seed)
+        sampledHitRates = np.full((samples, numPeriods), np.nan)
+        sampledReturns = np.full((samples, numPeriods), np.nan)
+        if numSignals > 0:
+            for start in range(0, samples, BOOTSTRAP_CHUNK_SIZE):
+                weights = PKBacktestStatistics.bootstrapWeights(numSignals, min(BOOTSTRAP_CHUNK_SIZE, samples - start), rng)
+                sampledCounts = weights @ validCounts
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    sampledHitRates[start:start + len(weights)] = (weights @ hits) * 100 / sampledCounts
+                    sampledReturns[start:start + len(weights)] = (weights @ tradeReturns) / sampledCounts
+        # Equal-weight portfolio of the signals of each day, days in order
+        if dates is None:
+            dayCodes, dayOffsets = np.arange(numSignals), np.arange(numSignals)
+        else:
+            dayCodes, days = pd.factorize(dates, sort=True)
+            dayOffsets = PKBacktestStatistics.tradingDayOffsets(days)
+        numDays = len(dayOffsets)
+        daySums = np.zeros((numDays, numPeriods))
+        dayCounts = np.zeros((numDays, numPeriods))
+        np.add.at(daySums, dayCodes, tradeReturns)
+        np.add.at(dayCounts, dayCodes, validCounts)
+        dailyReturns = np.where(dayCounts > 0, daySums / np.maximum(dayCounts, 1), 0.0)
+        maxDrawdowns = np.full(numPeriods, np.nan)
+        sampledDrawdowns = np.full((samples, numPeriods), np.nan)
+        for index in range(numPeriods if numDays > 0 else 0):
+            takenDays = PKBacktestStatistics.nonOverlappingDays(dayOffsets, 1 if periods is None else periods[index])
+            periodReturns = dailyReturns[takenDays, index]
+            maxDrawdowns[index] = PKBacktestStatistics.maxDrawdowns(periodReturns)
+            sampledDrawdowns[:, index] = PKBacktestStatistics.maxDrawdowns(periodReturns[rng.integers(0, len(periodReturns), size=(samples, len(periodReturns)))])
+        lower, upper = (1 - confidence) * 50, 100 - (1 - confidence) * 50
+        with warnings.catch_warnings():
+            # Periods without any signal have all-NaN resamples
+            warnings.simplefilter("ignore", RuntimeWarning)
+            statistics = {
+                "Signals": counts,
+                "Hit%": hitRates,
+                "Hit% Low": np.nanpercentile(sampledHitRates, lower, axis=0),
+                "Hit% High": np.nanpercentile(sampledHitRates, upper, axis=0),
+                "Avg.Ret%": averageReturns,
+                "Avg.Ret% Low": np.nanpercentile(sampledReturns, lower, axis=0),
+                "Avg.Ret% High": np.nanpercentile(sampledReturns, upper, axis=0),
+                "MaxDD%": maxDrawdowns,
+                "MaxDD% Median": np.nanpercentile(sampledDrawdowns, 50, axis=0),
+                "MaxDD% Worst": np.nanpercentile(sampledDrawdowns, (1 - confidence) * 100, axis=0),
+            }
+        return pd.DataFrame(statistics).transpose().round(2)
+
+    def tradingDayOffsets(days):
+        # The trading days from the first of the (sorted) days to each of them.
+        # Days that aren't dates are taken to be consecutive trading days.
+        try:
+            days = pd.DatetimeIndex(days).tz_localize(None).to_numpy(dtype="datetime64[D]")
+            return np.busday_count(days[0], days)
+        except Exception:
+            return np.arange(len(days))
+
+    def forBacktest(backtest_df, periods, sellSignal=False, samples=BOOTSTRAP_SAMPLES, confidence=CONFIDENCE_LEVEL):
+        # The statistics of the backtest rows as a table for the reports: a
+        # row per statistic, a column per period
+        if backtest_df is None or len(backtest_df) == 0:
+            return None
+        dates = pd.to_datetime(backtest_df["Date"].astype(str).str.replace("/", "-"), errors="coerce") if "Date" in backtest_df.columns else None
+        if dates is not None and dates.isna().any():
+            dates = backtest_df["Date"].astype(str)
+        returns = PKBacktestStatistics.returnsArray(backtest_df, periods)
+        statistics = PKBacktestStatistics.summary(returns, dates=None if dates is None else dates.to_numpy(), sellSignal=sellSignal, samples=samples, confidence=confidence, periods=periods)
+        statistics.columns = [f"{prd}-Pd" for prd in periods]
+        statistics.index.name = "Statistic"
+        return statistics.reset_index()
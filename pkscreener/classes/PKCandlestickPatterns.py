@@ -0,0 +1,378 @@
+"""
+    The MIT License (MIT)
+
+    Copyright (c) 2023 pkjmesra
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+
+"""
+import numpy as np
+
+# Candle range types and TA-Lib's default candle settings:
+# (range type, number of previous candles to average, factor)
+REAL_BODY = 0
+HIGH_LOW = 1
+SHADOWS = 2
+CANDLE_SETTINGS = {
+    "BodyLong": (REAL_BODY, 10, 1.0),
+    "BodyShort": (REAL_BODY, 10, 1.0),
+    "BodyDoji": (HIGH_LOW, 10, 0.1),
+    "ShadowLong": (REAL_BODY, 0, 1.0),
+    "ShadowVeryShort": (HIGH_LOW, 10, 0.1),
+    "Near": (HIGH_LOW, 5, 0.2),
+    "Far": (HIGH_LOW, 5, 0.6),
+}
+# Penetration into the first candle's real body for the (doji) star patterns
+STAR_PENETRATION = 0.3
+
+# The label and trend (bullish or not) of each pattern bit, in the order in
+# which CandlePatterns reports them.
+CANDLESTICK_PATTERNS = [
+    ("Doji", True),
+    ("Morning Star", True),
+    ("Cup and Handle", True),
+    ("Morning Doji Star", True),
+    ("Evening Star", False),
+    ("Evening Doji Star", False),
+    ("Bullish Ladder Bottom", True),
+    ("3 Line Strike", True),
+    ("3 Line Strike", False),
+    ("3 Black Crows", False),
+    ("3 Inside Up", True),
+    ("3 Inside Down", False),
+    ("3 Outside Up", True),
+    ("3 Outside Down", False),
+    ("3 White Soldiers", True),
+    ("Bullish Harami", True),
+    ("Bearish Harami", False),
+    ("Bullish Harami Cross", True),
+    ("Bearish Harami Cross", False),
+    ("Bullish Marubozu", True),
+    ("Bearish Marubozu", False),
+    ("Hanging Man", False),
+    ("Hammer", True),
+    ("Inverted Hammer", True),
+    ("Shooting Star", False),
+    ("Dragonfly Doji", True),
+    ("Gravestone Doji", False),
+    ("Bullish Engulfing", True),
+    ("Bearish Engulfing", False),
+]
+# All the bits reported with each label
+PATTERN_BITS = {}
+for position, (label, _) in enumerate(CANDLESTICK_PATTERNS):
+    PATTERN_BITS[label] = PATTERN_BITS.get(label, 0) | (1 << position)
+
+class PKCandlestickPatterns:
+    """
+    Finds all the supported candlestick patterns in one vectorized pass over
+    oldest-first OHLC arrays of shape (symbols x time) (or a single series),
+    i.e. for one stock or for the whole universe at once.
+
+    The patterns follow TA-Lib's definitions (with its default candle settings
+    and the same running averages of the previous candles), so each of them
+    gives the same result as the corresponding TA-Lib CDL function. The result
+    is a bitmask per candle with one bit per entry of CANDLESTICK_PATTERNS.
+    """
+    def __init__(self, open, high, low, close):
+        self.open = np.atleast_2d(np.asarray(open, dtype=float))
+        self.high = np.atleast_2d(np.asarray(high, dtype=float))
+        self.low = np.atleast_2d(np.asarray(low, dtype=float))
+        self.close = np.atleast_2d(np.asarray(close, dtype=float))
+        self.numSymbols, self.numCandles = self.close.shape
+        self.columns = np.arange(self.numCandles)[None, :]
+        # Like TA-Lib, each symbol starts at its first candle without any NaN
+        hasNaN = np.isnan(self.open) | np.isnan(self.high) | np.isnan(self.low) | np.isnan(self.close)
+        self.begins = np.where(hasNaN.all(axis=1), self.numCandles - 1, np.argmin(hasNaN, axis=1))[:, None]
+        self.realBody = np.abs(self.close - self.open)
+        self.highLowRange = self.high - self.low
+        self.upperShadow = self.high - np.where(self.close >= self.open, self.close, self.open)
+        self.lowerShadow = np.where(self.close >= self.open, self.open, self.close) - self.low
+        self.color = np.where(self.close >= self.open, 1, -1)
+        self.bodyHigh = np.where(self.open > self.close, self.open, self.close)
+        self.bodyLow = np.where(self.open < self.close, self.open, self.close)
+        # Shifted series and candle averages are shared by several patterns
+        self.cache = {}
+
+    def fromDataFrame(df):
+        # df is newest-first (as the per-stock validators get it)
+        data = df[::-1]
+        return PKCandlestickPatterns(data["Open"].to_numpy(dtype=float), data["High"].to_numpy(dtype=float),
+                                     data["Low"].to_numpy(dtype=float), data["Close"].to_numpy(dtype=float))
+
+    def previous(values, bars):
+        # values[:, i - bars] at column i (NaN before the first column)
+        if bars == 0:
+            return values
+        shifted = np.full(values.shape, np.nan if values.dtype.kind == "f" else 0, dtype=values.dtype)
+        shifted[:, bars:] = values[:, :-bars]
+        return shifted
+
+    def candleRange(self, rangeType):
+        if rangeType == REAL_BODY:
+            return self.realBody
+        if rangeType == HIGH_LOW:
+            return self.highLowRange
+        return self.upperShadow + self.lowerShadow
+
+    def average(self, setting, barsAgo, lookback):
+        # TA_CANDLEAVERAGE of the candle barsAgo candles before each candle. Like
+        # TA-Lib, the total of the previous candles' ranges is kept as a running
+        # sum from the first output candle onwards (to get the same roundings).
+        key = ("average", setting, barsAgo, lookback)
+        if key not in self.cache:
+            rangeType, period, factor = CANDLE_SETTINGS[setting]
+            ranges = self.candleRange(rangeType)
+            if period == 0:
+                average = PKCandlestickPatterns.previous(ranges, barsAgo)
+            else:
+                start = self.begins + lookback
+                current = PKCandlestickPatterns.previous(ranges, barsAgo)
+                trailing = PKCandlestickPatterns.previous(ranges, barsAgo + period)
+                steps = np.where(self.columns >= start, current - trailing,
+                                 np.where(self.columns >= start - period, current, 0.0))
+                average = PKCandlestickPatterns.previous(np.cumsum(steps, axis=1), 1) / period
+            self.cache[key] = factor * average / (2.0 if rangeType == SHADOWS else 1.0)
+        return self.cache[key]
+
+    def outputs(self, values, lookback):
+        # Only candles with enough history (after the first valid candle) can have a pattern
+        return np.where(self.columns >= self.begins + lookback, values, 0)
+
+    def at(self, name, barsAgo):
+        # The named series (e.g. "close") barsAgo candles before each candle
+        key = (name, barsAgo)
+        if key not in self.cache:
+            self.cache[key] = PKCandlestickPatterns.previous(getattr(self, name), barsAgo)
+        return self.cache[key]
+
+    def doji(self):
+        return self.outputs(np.where(self.realBody <= self.average("BodyDoji", 0, 10), 100, 0), 10)
+
+    def dragonflyDoji(self):
+        veryShortShadow = self.average("ShadowVeryShort", 0, 10)
+        found = (self.realBody <= self.average("BodyDoji", 0, 10)) & (self.upperShadow < veryShortShadow) & (self.lowerShadow > veryShortShadow)
+        return self.outputs(np.where(found, 100, 0), 10)
+
+    def gravestoneDoji(self):
+        veryShortShadow = self.average("ShadowVeryShort", 0, 10)
+        found = (self.realBody <= self.average("BodyDoji", 0, 10)) & (self.lowerShadow < veryShortShadow) & (self.upperShadow > veryShortShadow)
+        return self.outputs(np.where(found, 100, 0), 10)
+
+    def hammerShape(self, lookback, longShadow, shortShadow):
+        return (self.realBody < self.average("BodyShort", 0, lookback)) & \
+            (longShadow > self.average("ShadowLong", 0, lookback)) & \
+            (shortShadow < self.average("ShadowVeryShort", 0, lookback))
+
+    def hammer(self):
+        found = self.hammerShape(11, self.lowerShadow, self.upperShadow) & \
+            (np.where(self.close < self.open, self.close, self.open) <= self.at("low", 1) + self.average("Near", 1, 11))
+        return self.outputs(np.where(found, 100, 0), 11)
+
+    def hangingMan(self):
+        found = self.hammerShape(11, self.lowerShadow, self.upperShadow) & \
+            (np.where(self.close < self.open, self.close, self.open) >= self.at("high", 1) - self.average("Near", 1, 11))
+        return self.outputs(np.where(found, -100, 0), 11)
+
+    def invertedHammer(self):
+        found = self.hammerShape(11, self.upperShadow, self.lowerShadow) & (self.bodyHigh < self.at("bodyLow", 1))
+        return self.outputs(np.where(found, 100, 0), 11)
+
+    def shootingStar(self):
+        found = self.hammerShape(11, self.upperShadow, self.lowerShadow) & (self.bodyLow > self.at("bodyHigh", 1))
+        return self.outputs(np.where(found, -100, 0), 11)
+
+    def marubozu(self):
+        veryShortShadow = self.average("ShadowVeryShort", 0, 10)
+        found = (self.realBody > self.average("BodyLong", 0, 10)) & (self.upperShadow < veryShortShadow) & (self.lowerShadow < veryShortShadow)
+        return self.outputs(np.where(found, self.color * 100, 0), 10)
+
+    def engulfing(self):
+        open, close = self.open, self.close
+        previousOpen, previousClose, previousColor = self.at("open", 1), self.at("close", 1), self.at("color", 1)
+        bullish = (self.color == 1) & (previousColor == -1) & \
+            (((close >= previousOpen) & (open < previousClose)) | ((close > previousOpen) & (open <= previousClose)))
+        bearish = (self.color == -1) & (previousColor == 1) & \
+            (((open >= previousClose) & (close < previousOpen)) | ((open > previousClose) & (close <= previousOpen)))
+        strength = np.where((open != previousClose) & (close != previousOpen), 100, 80)
+        return self.outputs(np.where(bullish | bearish, self.color * strength, 0), 2)
+
+    def haramiOutputs(self, smallBody, lookback):
+        previousBodyHigh, previousBodyLow = self.at("bodyHigh", 1), self.at("bodyLow", 1)
+        previousColor = self.at("color", 1)
+        found = (self.at("realBody", 1) > self.average("BodyLong", 1, lookback)) & smallBody
+        inside = (self.bodyHigh < previousBodyHigh) & (self.bodyLow > previousBodyLow)
+        touching = (self.bodyHigh <= previousBodyHigh) & (self.bodyLow >= previousBodyLow)
+        values = np.where(inside, -previousColor * 100, np.where(touching, -previousColor * 80, 0))
+        return self.outputs(np.where(found, values, 0), lookback)
+
+    def harami(self):
+        return self.haramiOutputs(self.realBody <= self.average("BodyShort", 0, 11), 11)
+
+    def haramiCross(self):
+        return self.haramiOutputs(self.realBody <= self.average("BodyDoji", 0, 11), 11)
+
+    def threeInside(self):
+        firstColor = self.at("color", 2)
+        firstOpen = self.at("open", 2)
+        found = (self.at("realBody", 2) > self.average("BodyLong", 2, 12)) & \
+            (self.at("realBody", 1) <= self.average("BodyShort", 1, 12)) & \
+            (self.at("bodyHigh", 1) < self.at("bodyHigh", 2)) & (self.at("bodyLow", 1) > self.at("bodyLow", 2)) & \
+            (((firstColor == 1) & (self.color == -1) & (self.close < firstOpen)) |
+             ((firstColor == -1) & (self.color == 1) & (self.close > firstOpen)))
+        return self.outputs(np.where(found, -firstColor * 100, 0), 12)
+
+    def threeOutside(self):
+        open, close = self.at("open", 1), self.at("close", 1)
+        firstOpen, firstClose = self.at("open", 2), self.at("close", 2)
+        secondColor, firstColor = self.at("color", 1), self.at("color", 2)
+        found = ((secondColor == 1) & (firstColor == -1) & (close > firstOpen) & (open < firstClose) & (self.close > close)) | \
+            ((secondColor == -1) & (firstColor == 1) & (open > firstClose) & (close < firstOpen) & (self.close < close))
+        return self.outputs(np.where(found, secondColor * 100, 0), 3)
+
+    def starOutputs(self, bullish, middleBody, lookback, value):
+        # (Doji) morning/evening stars: a long candle, a small (doji) one gapping
+        # away from it and a reversal candle closing well within the first one.
+        firstBody = self.at("realBody", 2)
+        firstClose = self.at("close", 2)
+        if bullish:
+            gap = self.at("bodyHigh", 1) < self.at("bodyLow", 2)
+            closesWithin = self.close > firstClose + firstBody * STAR_PENETRATION
+        else:
+            gap = self.at("bodyLow", 1) > self.at("bodyHigh", 2)
+            closesWithin = self.close < firstClose - firstBody * STAR_PENETRATION
+        found = (firstBody > self.average("BodyLong", 2, lookback)) & (self.at("color", 2) == (-1 if bullish else 1)) & \
+            middleBody & gap & (self.realBody > self.average("BodyShort", 0, lookback)) & \
+            (self.color == (1 if bullish else -1)) & closesWithin
+        return self.outputs(np.where(found, value, 0), lookback)
+
+    def morningStar(self):
+        return self.starOutputs(True, self.at("realBody", 1) <= self.average("BodyShort", 1, 12), 12, 100)
+
+    def eveningStar(self):
+        return self.starOutputs(False, self.at("realBody", 1) <= self.average("BodyShort", 1, 12), 12, -100)
+
+    def morningDojiStar(self):
+        return self.starOutputs(True, self.at("realBody", 1) <= self.average("BodyDoji", 1, 12), 12, 100)
+
+    def eveningDojiStar(self):
+        return self.starOutputs(False, self.at("realBody", 1) <= self.average("BodyDoji", 1, 12), 12, -100)
+
+    def threeBlackCrows(self):
+        open, close, color = self.open, self.close, self.color
+        found = (self.at("color", 3) == 1) & (self.at("color", 2) == -1) & (self.at("color", 1) == -1) & (color == -1)
+        for barsAgo in range(3):
+            found &= self.at("lowerShadow", barsAgo) < self.average("ShadowVeryShort", barsAgo, 13)
+        found &= (self.at("open", 1) < self.at("open", 2)) & (self.at("open", 1) > self.at("close", 2)) & \
+            (open < self.at("open", 1)) & (open > self.at("close", 1)) & (self.at("high", 3) > self.at("close", 2)) & \
+            (self.at("close", 2) > self.at("close", 1)) & (self.at("close", 1) > close)
+        return self.outputs(np.where(found, -100, 0), 13)
+
+    def threeWhiteSoldiers(self):
+        open, close, color = self.open, self.close, self.color
+        found = (self.at("color", 2) == 1) & (self.at("color", 1) == 1) & (color == 1)
+        for barsAgo in range(3):
+            found &= self.at("upperShadow", barsAgo) < self.average("ShadowVeryShort", barsAgo, 12)
+        found &= (close > self.at("close", 1)) & (self.at("close", 1) > self.at("close", 2)) & \
+            (self.at("open", 1) > self.at("open", 2)) & (self.at("open", 1) <= self.at("close", 2) + self.average("Near", 2, 12)) & \
+            (open > self.at("open", 1)) & (open <= self.at("close", 1) + self.average("Near", 1, 12)) & \
+            (self.at("realBody", 1) > self.at("realBody", 2) - self.average("Far", 2, 12)) & \
+            (self.realBody > self.at("realBody", 1) - self.average("Far", 1, 12)) & \
+            (self.realBody > self.average("BodyShort", 0, 12))
+        return self.outputs(np.where(found, 100, 0), 12)
+
+    def ladderBottom(self):
+        open, close, color = self.open, self.close, self.color
+        found = (self.at("color", 4) == -1) & (self.at("color", 3) == -1) & (self.at("color", 2) == -1) & \
+            (self.at("open", 4) > self.at("open", 3)) & (self.at("open", 3) > self.at("open", 2)) & \
+            (self.at("close", 4) > self.at("close", 3)) & (self.at("close", 3) > self.at("close", 2)) & \
+            (self.at("color", 1) == -1) & (self.at("upperShadow", 1) > self.average("ShadowVeryShort", 1, 14)) & \
+            (color == 1) & (open > self.at("open", 1)) & (close > self.at("high", 1))
+        return self.outputs(np.where(found, 100, 0), 14)
+
+    def threeLineStrike(self):
+        open, close = self.open, self.close
+        thirdColor = self.at("color", 1)
+        found = (self.at("color", 3) == self.at("color", 2)) & (self.at("color", 2) == thirdColor) & (self.color == -thirdColor)
+        for barsAgo in [3, 2]:
+            near = self.average("Near", barsAgo, 8)
+            nextOpen = self.at("open", barsAgo - 1)
+            found &= (nextOpen >= self.at("bodyLow", barsAgo) - near) & (nextOpen <= self.at("bodyHigh", barsAgo) + near)
+        found &= ((thirdColor == 1) & (self.at("close", 1) > self.at("close", 2)) & (self.at("close", 2) > self.at("close", 3)) &
+                  (open > self.at("close", 1)) & (close < self.at("open", 3))) | \
+            ((thirdColor == -1) & (self.at("close", 1) < self.at("close", 2)) & (self.at("close", 2) < self.at("close", 3)) &
+             (open < self.at("close", 1)) & (close > self.at("open", 3)))
+        return self.outputs(np.where(found, thirdColor * 100, 0), 8)
+
+    def cupAndHandle(self):
+        # pktalib.CDLCUPANDHANDLE over the latest 8 candles
+        high = [self.at("high", barsAgo) for barsAgo in range(8)]
+        found = (high[7] < high[6]) & (high[7] < high[5]) & (high[5] < high[4]) & \
+            (high[5] < high[3]) & (high[3] > high[2]) & (high[0] > high[6])
+        return self.outputs(np.where(found, 100, 0), 7)
+
+    def patternMasks(self):
+        # Bitmask of the patterns on every candle, with bit i set for CANDLESTICK_PATTERNS[i]
+        masks = np.zeros((self.numSymbols, self.numCandles), dtype=np.int64)
+        signals = [
+            (self.doji(), ["Doji", None]),
+            (self.morningStar(), ["Morning Star", None]),
+            (self.cupAndHandle(), ["Cup and Handle", None]),
+            (self.morningDojiStar(), ["Morning Doji Star", None]),
+            (self.eveningStar(), [None, "Evening Star"]),
+            (self.eveningDojiStar(), [None, "Evening Doji Star"]),
+            (self.ladderBottom(), ["Bullish Ladder Bottom", None]),
+            (self.threeLineStrike(), [CANDLESTICK_PATTERNS.index(("3 Line Strike", True)), CANDLESTICK_PATTERNS.index(("3 Line Strike", False))]),
+            (self.threeBlackCrows(), [None, "3 Black Crows"]),
+            (self.threeInside(), ["3 Inside Up", "3 Inside Down"]),
+            (self.threeOutside(), ["3 Outside Up", "3 Outside Down"]),
+            (self.threeWhiteSoldiers(), ["3 White Soldiers", None]),
+            (self.harami(), ["Bullish Harami", "Bearish Harami"]),
+            (self.haramiCross(), ["Bullish Harami Cross", "Bearish Harami Cross"]),
+            (self.marubozu(), ["Bullish Marubozu", "Bearish Marubozu"]),
+            (self.hangingMan(), [None, "Hanging Man"]),
+            (self.hammer(), ["Hammer", None]),
+            (self.invertedHammer(), ["Inverted Hammer", None]),
+            (self.shootingStar(), [None, "Shooting Star"]),
+            (self.dragonflyDoji(), ["Dragonfly Doji", None]),
+            (self.gravestoneDoji(), [None, "Gravestone Doji"]),
+            (self.engulfing(), ["Bullish Engulfing", "Bearish Engulfing"]),
+        ]
+        for values, (bullishPattern, bearishPattern) in signals:
+            # Patterns that only have one variant report it for any non-zero value
+            if bullishPattern is not None:
+                masks |= np.where(values > 0 if bearishPattern is not None else values != 0, PKCandlestickPatterns.bit(bullishPattern), 0)
+            if bearishPattern is not None:
+                masks |= np.where(values < 0 if bullishPattern is not None else values != 0, PKCandlestickPatterns.bit(bearishPattern), 0)
+        return masks
+
+    def latestPatterns(self):
+        # Bitmask of the patterns on the most recent candle of each symbol
+        return self.patternMasks()[:, -1]
+
+    def bit(pattern):
+        # Bit of a pattern (a position in CANDLESTICK_PATTERNS) or of all the
+        # bits reported with the given label.
+        if isinstance(pattern, int):
+            return 1 << pattern
+        return PATTERN_BITS.get(pattern, 0)
+
+    def patterns(mask):
+        # The (position, label, bullish) of each pattern in the given mask
+        return [(position, label, bullish) for position, (label, bullish) in enumerate(CANDLESTICK_PATTERNS) if int(mask) & (1 << position)]
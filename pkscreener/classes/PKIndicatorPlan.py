@@ -0,0 +1,85 @@
+"""
+    The MIT License (MIT)
+
+    Copyright (c) 2023 pkjmesra
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+
+"""
+
+# Indicator columns of the preprocessed data, in the order they are added
+INDICATORS = ("SMA", "LMA", "SSMA", "SSMA20", "Volatility", "VolMA", "RSI", "CCI", "FASTK", "FASTD")
+# Needed by every scan: the basic volume checks (validateVolume) use VolMA
+BASE_INDICATORS = frozenset({"VolMA"})
+# Needed for the stocks that pass a scan: the trend, MA-Signal, RSI and CCI
+# of the results (validateMovingAverages, validateRSI, validateCCI etc.)
+RESULT_INDICATORS = frozenset({"SMA", "LMA", "RSI", "CCI"})
+# Indicators that decide whether a stock passes a scan, by execute option,
+# or by (execute option, reversal option). Scans that are not listed here
+# (like the chart patterns, short term bullish or scan expressions) get all
+# of them.
+SCAN_INDICATORS = {
+    1: set(),
+    2: set(),
+    3: set(),
+    4: set(),
+    5: {"RSI"},
+    (6, 1): set(),
+    (6, 2): set(),
+    (6, 3): set(),
+    (6, 5): set(),
+    (6, 6): set(),
+    (6, 7): set(),
+    (6, 8): {"RSI"},
+    (6, 9): {"RSI"},
+    (6, 10): {"RSI"},
+    8: {"CCI"},
+    9: set(),
+    10: set(),
+    12: set(),
+    13: set(),
+    14: set(),
+    15: set(),
+    16: set(),
+    17: set(),
+    18: set(),
+    19: set(),
+    20: set(),
+    25: {"RSI"},
+    27: {"RSI"},
+    28: set(),
+    29: set(),
+    30: set(),
+    31: {"RSI"},
+    42: set(),
+    43: set(),
+}
+
+class PKIndicatorPlan:
+    """
+    Which indicator columns preprocessData needs to add for a scan. A scan
+    gets the indicators it screens with up front. The result indicators are
+    added (ScreeningStatistics.completeIndicators) only for the stocks that
+    pass it, so cheap price/volume scans don't pay for all of them.
+    """
+    def indicatorsForScan(executeOption, reversalOption=None):
+        needed = SCAN_INDICATORS.get((executeOption, reversalOption), SCAN_INDICATORS.get(executeOption))
+        if needed is None:
+            return frozenset(INDICATORS)
+        return frozenset(BASE_INDICATORS | needed)
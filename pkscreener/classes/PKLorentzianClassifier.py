@@ -0,0 +1,215 @@
+"""
+    The MIT License (MIT)
+
+    Copyright (c) 2023 pkjmesra
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+
+"""
+import sys
+
+import numpy as np
+import pandas as pd
+
+from pkscreener.classes.Pktalib import pktalib
+
+if sys.version_info >= (3, 11):
+    from advanced_ta.LorentzianClassification import MLExtensions as ml
+    from ta.trend import ema_indicator, sma_indicator
+
+# Labels of the training data (the same as advanced_ta's Direction)
+LONG = 1
+SHORT = -1
+NEUTRAL = 0
+# Number of bars whose distances are computed together
+PREDICTION_BLOCK_SIZE = 64
+
+class PKLorentzianClassifier:
+    """
+    The Lorentzian (approximate nearest neighbours) classification of
+    advanced_ta.LorentzianClassification, with the settings used by the
+    Lorentzian scans, producing the same predictions and new buy/sell signals.
+
+    Distances are computed for blocks of bars at a time and the neighbour search
+    jumps from one qualifying bar to the next with NumPy searches (instead of
+    visiting every historical bar in Python), keeping the bounded neighbour
+    buffer of the original. Every call classifies all the bars: the features
+    are min-max normalized over the whole history (as in advanced_ta), so
+    appending bars can change the features of all the earlier ones.
+    """
+    def __init__(self, neighborsCount=8, maxBarsBack=2000):
+        self.neighborsCount = neighborsCount
+        self.maxBarsBack = maxBarsBack
+
+    def featureSeries(data):
+        # data is oldest-first with lowercase open/high/low/close/volume columns.
+        # Returns the (features x bars) matrix and the prediction filter.
+        high, low, close = data['high'], data['low'], data['close']
+        hlc3 = (high + low + close) / 3
+        # WaveTrend Classic (advanced_ta's n_wt)
+        ema1 = ema_indicator(hlc3, 10)
+        ema2 = ema_indicator(abs(hlc3 - ema1), 10)
+        wt1 = ema_indicator((hlc3 - ema1) / (0.015 * ema2), 11)
+        wt2 = sma_indicator(wt1, 4)
+        cci = PKLorentzianClassifier.commodityChannelIndex(high, low, close, 20)
+        features = np.array([
+            ml.n_rsi(close, 14, 2),
+            PKLorentzianClassifier.normalize((wt1 - wt2).values),
+            PKLorentzianClassifier.normalize(ema_indicator(cci, 2).values),
+            ml.rescale(PKLorentzianClassifier.averageDirectionalIndex(high, low, close, 20), 0, 100),
+            ml.n_rsi(close, 9, 2),
+            np.asarray(pktalib.MFI(high, low, close, data['volume'], 14), dtype=float),
+        ], dtype=float)
+        ohlc4 = (data['open'] + high + low + close) / 4
+        # Volatility filter (recent ATR above the historical one) and regime filter.
+        # The ADX filter isn't used, so it lets everything through.
+        predictionFilter = (PKLorentzianClassifier.averageTrueRange(high, low, close, 1) > PKLorentzianClassifier.averageTrueRange(high, low, close, 10)) & \
+            ml.regime_filter(ohlc4, high, low, True, -0.1)
+        return features, np.asarray(predictionFilter, dtype=bool)
+
+    # The indicators below are those of the ta library (used by advanced_ta), with
+    # the same floating point operations, without its per-bar pandas indexing.
+    def normalize(values):
+        # MinMaxScaler(feature_range=(0, 1)).fit_transform() of a single series
+        if np.isinf(values).any():
+            raise ValueError("Input contains infinity")
+        dataMin = np.nanmin(values)
+        dataRange = np.nanmax(values) - dataMin
+        scale = 1.0 / (1.0 if dataRange < 10 * np.finfo(np.float64).eps else dataRange)
+        return values * scale + (0 - dataMin * scale)
+
+    def wilderSmoothing(initial, values, window, length):
+        smoothed = [0.0] * length
+        smoothed[0] = initial
+        for i in range(1, length - 1):
+            smoothed[i] = smoothed[i - 1] - (smoothed[i - 1] / float(window)) + values[window + i]
+        return np.array(smoothed)
+
+    def averageTrueRange(high, low, close, window):
+        closeShift = close.shift(1)
+        trueRange = pd.DataFrame(data={"tr1": high - low, "tr2": (high - closeShift).abs(), "tr3": (low - closeShift).abs()}).max(axis=1)
+        atr = [0.0] * len(close)
+        atr[window - 1] = trueRange[0:window].mean()
+        trueRanges = trueRange.tolist()
+        for i in range(window, len(atr)):
+            atr[i] = (atr[i - 1] * (window - 1) + trueRanges[i]) / float(window)
+        return np.array(atr)
+
+    def commodityChannelIndex(high, low, close, window):
+        typicalPrice = (high + low + close) / 3.0
+        windows = np.lib.stride_tricks.sliding_window_view(typicalPrice.to_numpy(dtype=float), window)
+        meanDeviation = np.full(len(typicalPrice), np.nan)
+        meanDeviation[window - 1:] = np.mean(np.abs(windows - np.mean(windows, axis=1, keepdims=True)), axis=1)
+        return (typicalPrice - typicalPrice.rolling(window, min_periods=window).mean()) / (0.015 * pd.Series(meanDeviation, index=typicalPrice.index))
+
+    def averageDirectionalIndex(high, low, close, window):
+        closeShift = close.shift(1)
+        directionalMovement = pd.Series(np.amax([np.array(high), np.array(closeShift)], axis=0) - np.amin([np.array(low), np.array(closeShift)], axis=0))
+        diffUp = high - high.shift(1)
+        diffDown = low.shift(1) - low
+        positive = abs(((diffUp > diffDown) & (diffUp > 0)) * diffUp)
+        negative = abs(((diffDown > diffUp) & (diffDown > 0)) * diffDown)
+        length = len(close) - (window - 1)
+        smoothed = [PKLorentzianClassifier.wilderSmoothing(series.dropna().iloc[0:window].sum(), series.tolist(), window, length)
+                    for series in [directionalMovement, positive, negative]]
+        trueRange, positiveMovement, negativeMovement = smoothed
+        with np.errstate(divide="ignore", invalid="ignore"):
+            positiveIndex = np.where(trueRange != 0, 100 * (positiveMovement / trueRange), 0)
+            negativeIndex = np.where(trueRange != 0, 100 * (negativeMovement / trueRange), 0)
+            indexSum = positiveIndex + negativeIndex
+            directionalIndex = np.where(indexSum != 0, 100 * np.abs((positiveIndex - negativeIndex) / indexSum), 0)
+        adx = [0.0] * length
+        adx[window] = directionalIndex[0:window].mean()
+        directionalIndices = directionalIndex.tolist()
+        for i in range(window + 1, length):
+            adx[i] = ((adx[i - 1] * (window - 1)) + directionalIndices[i - 1]) / float(window)
+        return np.concatenate((np.zeros(window - 1), adx))
+
+    def trainingLabels(close):
+        # Direction of the price 4 bars later, as labelled by advanced_ta
+        close = pd.Series(np.asarray(close, dtype=float))
+        return np.where(close.shift(4) < close, SHORT, np.where(close.shift(4) > close, LONG, NEUTRAL)).astype(np.int64)
+
+    def nearestNeighbourPredictions(features, labels, neighborsCount=8, maxBarsBack=2000):
+        # features: (features x bars) matrix, labels: the training label of each bar.
+        # Returns the predictions (sum of the neighbours' labels) for every bar.
+        numBars = features.shape[1]
+        # advanced_ta only classifies the last maxBarsBack bars (the rest predict 0),
+        # comparing them with the first maxBarsBack bars.
+        startBar = numBars - maxBarsBack if numBars >= maxBarsBack else 0
+        neighbourDistances, neighbourLabels = [], []
+        predictions = np.zeros(numBars, dtype=np.int64)
+        labels = np.asarray(labels).tolist()
+        overflowIndex = round(neighborsCount*3/4)
+        for blockStart in range(startBar, numBars, PREDICTION_BLOCK_SIZE):
+            blockBars = np.arange(blockStart, min(blockStart + PREDICTION_BLOCK_SIZE, numBars))
+            span = min(maxBarsBack, int(blockBars[-1]) + 1)
+            # Lorentzian distances of the block's bars from the first 'span' bars
+            distances = np.zeros((len(blockBars), span))
+            for feature in features:
+                distances += np.log(1 + np.abs(feature[blockBars, None] - feature[None, :span]))
+            # Every 4th bar is skipped for chronological spacing, NaN distances never
+            # qualify and each bar is compared with at most the bars up to itself.
+            distances[np.isnan(distances)] = -np.inf
+            distances[:, ::4] = -np.inf
+            distances[np.arange(span)[None, :] > blockBars[:, None]] = -np.inf
+            for row, bar in enumerate(blockBars):
+                rowDistances = distances[row]
+                lastDistance = -1.0
+                position = 0
+                while position < span:
+                    # The next bar that is at least as far as the last neighbour
+                    qualifies = rowDistances[position:] >= lastDistance
+                    offset = int(qualifies.argmax())
+                    if not qualifies[offset]:
+                        break
+                    position += offset
+                    lastDistance = rowDistances[position]
+                    neighbourDistances.append(lastDistance)
+                    neighbourLabels.append(labels[position])
+                    if len(neighbourLabels) > neighborsCount:
+                        # Drop the oldest neighbour and lower the bar for the next ones
+                        lastDistance = neighbourDistances[overflowIndex]
+                        neighbourDistances.pop(0)
+                        neighbourLabels.pop(0)
+                    position += 1
+                predictions[bar] = sum(neighbourLabels)
+        return predictions
+
+    def newSignals(predictions, predictionFilter):
+        # The filtered signal (carried forward while there's none) and whether it
+        # flipped to a new buy or sell on each bar.
+        signal = pd.Series(np.where((predictions > 0) & predictionFilter, LONG, np.where((predictions < 0) & predictionFilter, SHORT, np.nan)))
+        if np.isnan(signal.iloc[0]):
+            signal.iloc[0] = NEUTRAL
+        signal = signal.ffill().to_numpy()
+        isDifferentSignalType = np.concatenate([[False], signal[1:] != signal[:-1]])
+        return (signal == LONG) & isDifferentSignalType, (signal == SHORT) & isDifferentSignalType
+
+    def predict(self, data):
+        # The predictions and the prediction filter for every bar of data (oldest-first)
+        features, predictionFilter = PKLorentzianClassifier.featureSeries(data)
+        labels = PKLorentzianClassifier.trainingLabels(data['close'])
+        predictions = PKLorentzianClassifier.nearestNeighbourPredictions(features, labels, self.neighborsCount, self.maxBarsBack)
+        return predictions, predictionFilter
+
+    def classify(self, data):
+        # Returns the new buy and sell signals for every bar of data (oldest-first)
+        return PKLorentzianClassifier.newSignals(*self.predict(data))
+
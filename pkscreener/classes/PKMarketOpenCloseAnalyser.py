@@ -23,7 +23,6 @@
     SOFTWARE.
 
 """
-import copy
 import datetime
 import shutil
 import sys
@@ -81,8 +80,16 @@ class PKMarketOpenCloseAnalyser:
     updatedCandleData = None
     allDailyCandles = None
     allIntradayCandles = None
+    replaying = False
+    replaySessionDate = None
+    replayDailyCandles = None
+    replaySummaries = []
     
     def getStockDataForSimulation(sliceWindowDatetime=None,listStockCodes=[]):
+        if PKMarketOpenCloseAnalyser.replaying:
+            # The session being replayed has already been prepared by setReplaySession
+            AssetsManager.PKAssetsManager.saveStockData(PKMarketOpenCloseAnalyser.updatedCandleData,PKMarketOpenCloseAnalyser.configManager,1,False,False, True)
+            return PKMarketOpenCloseAnalyser.updatedCandleData, PKMarketOpenCloseAnalyser.allDailyCandles
         int_exists, int_cache_file, stockDictInt = PKMarketOpenCloseAnalyser.ensureIntradayStockDataExists(listStockCodes=listStockCodes)
         daily_exists, daily_cache_file, stockDict = PKMarketOpenCloseAnalyser.ensureDailyStockDataExists(listStockCodes=listStockCodes)
         updatedCandleData = PKMarketOpenCloseAnalyser.updatedCandleData
@@ -110,7 +117,11 @@ class PKMarketOpenCloseAnalyser:
                 save_df, screen_df = PKMarketOpenCloseAnalyser.diffMorningCandleDataWithLatestDailyCandleData(screen_df,save_df, updatedCandleData, allDailyCandles,runOptionName=runOptionName,filteredListOfStocks=filteredListOfStocks)
         except: # pragma: no cover
             pass
-        AssetsManager.PKAssetsManager.saveStockData(allDailyCandles,PKMarketOpenCloseAnalyser.configManager,1,False,False, True)
+        if PKMarketOpenCloseAnalyser.replaying:
+            # The end-of-day data is saved back only once, when the replay ends
+            PKMarketOpenCloseAnalyser.replaySummaries.append(PKMarketOpenCloseAnalyser.sessionSummary(PKMarketOpenCloseAnalyser.replaySessionDate, save_df))
+        else:
+            AssetsManager.PKAssetsManager.saveStockData(allDailyCandles,PKMarketOpenCloseAnalyser.configManager,1,False,False, True)
         return save_df, screen_df
 
     @Halo(text='  [+] Getting intraday data...', spinner='dots')
@@ -247,16 +258,18 @@ class PKMarketOpenCloseAnalyser:
         #         continue
         return allDailyCandles
     
+    def getIntradayCandleData(int_cache_file=None,stockDictInt=None):
+        if stockDictInt is not None and len(stockDictInt) > 0:
+            return stockDictInt
+        intradayDB = PKIntradayStockDataDB(fileName=int_cache_file)
+        return intradayDB.pickler.pickler.unpickle(fileName=intradayDB.pickler.fileName)
+
     @Halo(text='  [+] Simulating morning alert...', spinner='dots')
     def getIntradayCandleFromMorning(int_cache_file=None,candle1MinuteNumberSinceMarketStarted=0,sliceWindowDatetime=None,stockDictInt=None):
         if candle1MinuteNumberSinceMarketStarted <= 0:
             candle1MinuteNumberSinceMarketStarted = PKMarketOpenCloseAnalyser.configManager.morninganalysiscandlenumber
         morningIntradayCandle = None
-        if stockDictInt is not None and len(stockDictInt) > 0:
-            allDailyIntradayCandles = stockDictInt
-        else:
-            intradayDB = PKIntradayStockDataDB(fileName=int_cache_file)
-            allDailyIntradayCandles = intradayDB.pickler.pickler.unpickle(fileName=intradayDB.pickler.fileName)
+        allDailyIntradayCandles = PKMarketOpenCloseAnalyser.getIntradayCandleData(int_cache_file,stockDictInt)
         PKMarketOpenCloseAnalyser.allIntradayCandles = allDailyIntradayCandles
         morningIntradayCandle = {}
         stocks = list(allDailyIntradayCandles.keys())
@@ -332,7 +345,9 @@ class PKMarketOpenCloseAnalyser:
     
     @Halo(text='  [+] Updating candles...', spinner='dots')
     def combineDailyStockDataWithMorningSimulation(allDailyCandles,morningIntradayCandle):
-        mutableAllDailyCandles = copy.deepcopy(allDailyCandles)
+        # Only the data and index of a stock are replaced (by new lists), so a
+        # copy of the per-stock dictionaries is enough to leave allDailyCandles as is.
+        mutableAllDailyCandles = {stock: dict(candles) for stock, candles in allDailyCandles.items()}
         stocks = list(mutableAllDailyCandles.keys())
         intradayStocks = list(morningIntradayCandle.keys())
         priceDict = {}
@@ -370,6 +385,187 @@ class PKMarketOpenCloseAnalyser:
                 continue
         return mutableAllDailyCandles
 
+    def marketTimestamps(index):
+        # The candles are saved with naive UTC timestamps (or with their timezone).
+        # Bring them to the naive market time so that they can be sliced by session.
+        timestamps = pd.DatetimeIndex(pd.to_datetime(index))
+        if timestamps.tz is None:
+            timestamps = timestamps.tz_localize("UTC")
+        # The exchange's timezone, as PKDateUtilities keeps the market time in
+        return timestamps.tz_convert(PKDateUtilities.currentDateTime().tzinfo).tz_localize(None)
+
+    def morningCandlesForSessions(intradayCandles,sessionDates,numOfCandles,alertMinutes):
+        # Returns the morning candle of each of the sessionDates from the 1m candles of a stock
+        # as {sessionDate: (candle, candleTimestamp, sessionStart, sessionEnd)}, along with
+        # the (sorted) candle values and timestamps the session positions refer to.
+        rawIndex = pd.DatetimeIndex(pd.to_datetime(intradayCandles["index"]))
+        timestamps = PKMarketOpenCloseAnalyser.marketTimestamps(rawIndex).values
+        values = np.asarray(intradayCandles["data"], dtype=float)
+        if not (timestamps[1:] >= timestamps[:-1]).all():
+            order = np.argsort(timestamps, kind="stable")
+            timestamps, values, rawIndex = timestamps[order], values[order], rawIndex[order]
+        if rawIndex.tz is not None:
+            rawIndex = rawIndex.tz_localize(None)
+        columns = list(intradayCandles["columns"])
+        marketOpen = pd.Timedelta(hours=MarketHours().openHour, minutes=MarketHours().openMinute)
+        starts = np.searchsorted(timestamps, sessionDates.values)
+        ends = np.searchsorted(timestamps, (sessionDates + pd.Timedelta(days=1)).values)
+        cutoffs = np.searchsorted(timestamps, (sessionDates + marketOpen + pd.Timedelta(minutes=alertMinutes)).values, side="right")
+        cutoffs = np.minimum(cutoffs, starts + numOfCandles)
+        hasCandles = cutoffs > starts
+        if not hasCandles.any():
+            return {}, values, rawIndex
+        sessionDates, starts, ends, cutoffs = sessionDates[hasCandles], starts[hasCandles], ends[hasCandles], cutoffs[hasCandles]
+        # One extra row so that every session cutoff is a valid position for reduceat
+        padded = np.vstack([values, np.full((1, values.shape[1]), np.nan)])
+        positions = np.arange(len(padded))
+        bounds = np.column_stack([starts, cutoffs]).ravel()
+        highs = np.fmax.reduceat(padded[:, columns.index("High")], bounds)[::2]
+        lows = np.fmin.reduceat(padded[:, columns.index("Low")], bounds)[::2]
+        volumes = np.add.reduceat(np.nan_to_num(padded[:, columns.index("Volume")]), bounds)[::2]
+        # The first valid open and the last valid close of each session's morning
+        opens = padded[:, columns.index("Open")]
+        closes = padded[:, columns.index("Close")]
+        nextValidOpen = np.minimum.accumulate(np.where(np.isnan(opens), len(padded), positions)[::-1])[::-1]
+        prevValidClose = np.maximum.accumulate(np.where(np.isnan(closes), -1, positions))
+        openAt = nextValidOpen[starts]
+        closeAt = prevValidClose[cutoffs - 1]
+        adjCloses = padded[cutoffs - 1, columns.index("Adj Close")] if "Adj Close" in columns else closes[closeAt]
+        morningCandles = {}
+        for session in np.flatnonzero((openAt < cutoffs) & (closeAt >= starts)):
+            close = closes[closeAt[session]]
+            candle = {"Open":opens[openAt[session]], "High":highs[session],
+                      "Low":lows[session], "Close":close,
+                      "Adj Close":adjCloses[session] if not np.isnan(adjCloses[session]) else close,
+                      "Volume":volumes[session]}
+            morningCandles[sessionDates[session]] = (candle, rawIndex[closeAt[session]].to_pydatetime(), starts[session], ends[session])
+        return morningCandles, values, rawIndex
+
+    def getSessionsForReplay(numSessions=1,listStockCodes=[]):
+        # Yields (sessionDate, updatedCandleData, allDailyCandles, allIntradayCandles) for the
+        # last numSessions sessions in the 1m store, oldest first. Like getStockDataForSimulation,
+        # the updatedCandleData has the last daily candle (of that session) replaced by the
+        # morning candle. Each session only has new lists of daily rows, so there's no deep copy.
+        int_exists, int_cache_file, stockDictInt = PKMarketOpenCloseAnalyser.ensureIntradayStockDataExists(listStockCodes=listStockCodes)
+        daily_exists, daily_cache_file, stockDict = PKMarketOpenCloseAnalyser.ensureDailyStockDataExists(listStockCodes=listStockCodes)
+        if not ((int_exists or (stockDictInt is not None and len(stockDictInt) > 0)) and (daily_exists or (stockDict is not None and len(stockDict) > 0))):
+            return
+        allDailyCandles = PKMarketOpenCloseAnalyser.getLatestDailyCandleData(daily_cache_file,stockDict)
+        allIntradayCandles = PKMarketOpenCloseAnalyser.getIntradayCandleData(int_cache_file,stockDictInt)
+        PKMarketOpenCloseAnalyser.replayDailyCandles = allDailyCandles
+        stocks = [stock for stock in allIntradayCandles.keys() if stock in allDailyCandles.keys() and (len(listStockCodes) == 0 or stock in listStockCodes)]
+        numOfCandles = PKMarketOpenCloseAnalyser.configManager.morninganalysiscandlenumber
+        duration = PKMarketOpenCloseAnalyser.configManager.morninganalysiscandleduration
+        alertMinutes = numOfCandles
+        numOfCandles = numOfCandles * int(duration.replace("m",""))
+        sessionDates = set()
+        for stock in stocks:
+            try:
+                sessionDates.update(PKMarketOpenCloseAnalyser.marketTimestamps(allIntradayCandles[stock]["index"]).normalize().unique())
+            except Exception as e: # pragma: no cover
+                default_logger().debug(e, exc_info=True)
+                continue
+        sessionDates = pd.DatetimeIndex(sorted(sessionDates))[-numSessions:]
+        morningCandles = {}
+        for stock in stocks:
+            try:
+                candles, values, rawIndex = PKMarketOpenCloseAnalyser.morningCandlesForSessions(allIntradayCandles[stock],sessionDates,numOfCandles,alertMinutes)
+                dailyDates = PKMarketOpenCloseAnalyser.marketTimestamps(allDailyCandles[stock]["index"]).normalize().values
+                if len(candles) > 0:
+                    morningCandles[stock] = (candles, values, rawIndex, dailyDates)
+            except KeyboardInterrupt: # pragma: no cover
+                raise KeyboardInterrupt
+            except Exception as e: # pragma: no cover
+                default_logger().debug(e, exc_info=True)
+                continue
+        for sessionDate in sessionDates:
+            updatedCandleData = {}
+            sessionDailyCandles = {}
+            sessionIntradayCandles = {}
+            for stock, (candles, values, rawIndex, dailyDates) in morningCandles.items():
+                if sessionDate not in candles.keys():
+                    continue
+                dailyCandles = allDailyCandles[stock]
+                sessionAt = np.searchsorted(dailyDates, sessionDate.to_datetime64())
+                if sessionAt >= len(dailyDates) or dailyDates[sessionAt] != sessionDate.to_datetime64():
+                    continue
+                candle, candleTimestamp, start, end = candles[sessionDate]
+                dailyColumns = dailyCandles["columns"]
+                dailyData = list(dailyCandles["data"][:sessionAt])
+                dailyIndex = list(dailyCandles["index"][:sessionAt])
+                sessionDailyCandles[stock] = {"data": dailyData + [dailyCandles["data"][sessionAt]],
+                                              "index": dailyIndex + [dailyCandles["index"][sessionAt]],
+                                              "columns": dailyColumns}
+                updatedCandleData[stock] = {"data": dailyData + [[candle.get(column, np.nan) for column in dailyColumns]],
+                                            "index": dailyIndex + [candleTimestamp],
+                                            "columns": dailyColumns}
+                sessionIntradayCandles[stock] = {"data": values[start:end],
+                                                 "index": rawIndex[start:end],
+                                                 "columns": allIntradayCandles[stock]["columns"]}
+            if len(updatedCandleData) > 0:
+                yield sessionDate, updatedCandleData, sessionDailyCandles, sessionIntradayCandles
+
+    def setReplaySession(sessionDate,updatedCandleData,allDailyCandles,allIntradayCandles):
+        if not PKMarketOpenCloseAnalyser.replaying:
+            # The first session of a replay
+            PKMarketOpenCloseAnalyser.replaySummaries = []
+        PKMarketOpenCloseAnalyser.replaying = True
+        PKMarketOpenCloseAnalyser.replaySessionDate = sessionDate
+        PKMarketOpenCloseAnalyser.updatedCandleData = updatedCandleData
+        PKMarketOpenCloseAnalyser.allDailyCandles = allDailyCandles
+        PKMarketOpenCloseAnalyser.allIntradayCandles = allIntradayCandles
+
+    def endReplay():
+        # Returns the summaries of the sessions replayed
+        allDailyCandles = PKMarketOpenCloseAnalyser.replayDailyCandles
+        replaySummaries = PKMarketOpenCloseAnalyser.replaySummaries
+        PKMarketOpenCloseAnalyser.replaySummaries = []
+        PKMarketOpenCloseAnalyser.replaying = False
+        PKMarketOpenCloseAnalyser.replaySessionDate = None
+        PKMarketOpenCloseAnalyser.updatedCandleData = None
+        PKMarketOpenCloseAnalyser.allDailyCandles = None
+        PKMarketOpenCloseAnalyser.allIntradayCandles = None
+        PKMarketOpenCloseAnalyser.replayDailyCandles = None
+        if allDailyCandles is not None:
+            # Leave the saved daily data as it was before the replay
+            AssetsManager.PKAssetsManager.saveStockData(allDailyCandles,PKMarketOpenCloseAnalyser.configManager,1,False,False, True)
+        return replaySummaries
+
+    def sessionSummary(sessionDate,save_df):
+        # How the stocks alerted in the morning of a session did by the square-off,
+        # the day high and the end of the day
+        summary = {"Date": sessionDate.strftime("%Y-%m-%d") if sessionDate is not None else ""}
+        try:
+            stocks_df = save_df[save_df.index != "BASKET"]
+            alertLTPs = pd.to_numeric(stocks_df["LTP@Alert"], errors="coerce")
+            alertSum = alertLTPs[alertLTPs > 0].sum()
+            summary["Stocks"] = int((alertLTPs > 0).sum())
+            summary["LTP@Alert"] = round(alertSum,2)
+            for column in ["SqrOffDiff","DayHighDiff","EoDDiff"]:
+                diffs = pd.to_numeric(stocks_df[column], errors="coerce")[alertLTPs > 0]
+                summary[column] = round(diffs.sum(),2)
+                summary[f"{column}%"] = round(100*diffs.sum()/alertSum,2) if alertSum > 0 else 0
+            eodDiffs = pd.to_numeric(stocks_df["EoDDiff"], errors="coerce")[alertLTPs > 0]
+            summary["EoDHit%"] = round(100*(eodDiffs > 0).sum()/len(eodDiffs),2) if len(eodDiffs) > 0 else 0
+        except Exception as e: # pragma: no cover
+            default_logger().debug(e, exc_info=True)
+        return summary
+
+    def replaySummary(summaries):
+        # The session summaries along with an overall row across all the sessions
+        replay_df = pd.DataFrame(summaries)
+        if len(replay_df) == 0 or "Stocks" not in replay_df.columns:
+            return replay_df
+        replay_df = replay_df.fillna(0)
+        overall = {"Date": "OVERALL", "Stocks": int(replay_df["Stocks"].sum()), "LTP@Alert": round(replay_df["LTP@Alert"].sum(),2)}
+        alertSum = overall["LTP@Alert"]
+        for column in ["SqrOffDiff","DayHighDiff","EoDDiff"]:
+            overall[column] = round(replay_df[column].sum(),2)
+            overall[f"{column}%"] = round(100*overall[column]/alertSum,2) if alertSum > 0 else 0
+        hits = (replay_df["EoDHit%"]*replay_df["Stocks"]).sum()
+        overall["EoDHit%"] = round(hits/overall["Stocks"],2) if overall["Stocks"] > 0 else 0
+        return pd.concat([replay_df, pd.DataFrame([overall])], ignore_index=True)
+
     def runScanForStocksFromMorningTrade(stockListFromMorningTrade,dailyCandleData):
         latest_daily_df = None
         return latest_daily_df
@@ -530,7 +726,7 @@ class PKMarketOpenCloseAnalyser:
         screen_df.replace(np.nan, "", regex=True)
         save_df.replace(np.nan, "", regex=True)
         # Drop the unnecessary columns for this scanner type to make way for other columns to be fitted nicely on screen
-        columnsToBeDropped = ["Breakout(22Prds)","index","EoDLTP","RS_Rating^NSEI","RVM(15)"]
+        columnsToBeDropped = ["Breakout(22Prds)","index","EoDLTP","RS_Rating^NSEI","RS_Pctl^NSEI","RVM(15)"]
         for col in columnsToBeDropped:
             if col in save_df.columns:
                 save_df.drop(col, axis=1, inplace=True, errors="ignore")
@@ -0,0 +1,116 @@
+"""
+    The MIT License (MIT)
+
+    Copyright (c) 2023 pkjmesra
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+
+"""
+import pandas as pd
+
+from PKDevTools.classes.Singleton import SingletonType, SingletonMixin
+from pkscreener.classes.PKBacktestStatistics import PKBacktestStatistics
+
+class PKMultiStrategyBacktest(SingletonMixin, metaclass=SingletonType):
+    """
+    Backtests several strategies (scan options passed with
+    --backteststrategies) in one run. main() is run for each strategy only to
+    take its options and queue its work items. The items of all the
+    strategies are then screened together, stock after stock, by one set of
+    workers over the stock data loaded once, so all the strategies of a
+    stock are screened from the same full-history pass of its indicators
+    (PKWalkForwardEngine). The backtest rows are tagged with their strategy
+    so that each strategy gets its own summary, and the strategies can be
+    compared side by side.
+    """
+    def __init__(self):
+        super(PKMultiStrategyBacktest, self).__init__()
+        self.end()
+
+    def strategiesFromOptions(backtestStrategies):
+        # "B:30:12:9:2.5;B:30:12:10" -> ["B:30:12:9:2.5", "B:30:12:10"]
+        strategies = []
+        for strategy in str(backtestStrategies or "").replace("\"", "").replace("'", "").split(";"):
+            strategy = strategy.strip().replace("::", ":")
+            if strategy.upper().startswith("B:"):
+                strategies.append(f"B{strategy[1:]}")
+        return list(dict.fromkeys(strategies))
+
+    def strategyKey(runOption):
+        # The same as the runOptionKey that the workers send back with each result
+        return runOption.split("=>")[0].split(":D:")[0].strip().replace(":0:", ":12:")
+
+    def begin(self):
+        self.end()
+        self.collecting = True
+
+    def addStrategy(self, items, executeOption, backtestPeriod, sellSignal, choices, menuChoiceHierarchy):
+        if len(items) == 0:
+            return
+        strategy = PKMultiStrategyBacktest.strategyKey(items[0][0])
+        self.strategies[strategy] = {
+            "executeOption": executeOption,
+            "backtestPeriod": backtestPeriod,
+            "sellSignal": sellSignal,
+            "choices": choices,
+            "menuChoiceHierarchy": menuChoiceHierarchy,
+        }
+        self.items.extend(items)
+
+    def isRunning(self):
+        return not self.collecting and len(self.strategies) > 0
+
+    def strategyForResult(self, result):
+        strategy = result[5] if len(result) > 5 else None
+        return strategy if strategy in self.strategies else None
+
+    def resultsByStrategy(self, backtest_df):
+        # The backtest rows of each strategy (in the order the strategies were
+        # passed) without the strategy column
+        for strategy in self.strategies.keys():
+            strategy_df = backtest_df[backtest_df["Strategy"] == strategy]
+            if len(strategy_df) > 0:
+                yield strategy, strategy_df.drop(columns=["Strategy"])
+
+    def reportsByStrategy(self, backtest_df, periods):
+        # The backtest rows of each strategy for its reports, with the
+        # statistics of its own returns. The numeric returns are only for the
+        # statistics, so they are taken out of the rows (the reports have the
+        # "<n>-Pd" cells). Repeated rows count once, as in backtestSummary.
+        for strategy, strategy_df in self.resultsByStrategy(backtest_df):
+            strategy_df = strategy_df.drop_duplicates()
+            statistics_df = PKBacktestStatistics.forBacktest(strategy_df, periods, sellSignal=self.strategies[strategy]["sellSignal"])
+            strategy_df = strategy_df.drop(columns=PKBacktestStatistics.returnColumns(periods), errors="ignore")
+            yield strategy, strategy_df, statistics_df
+
+    def comparison(summaries):
+        # The overall (SUMMARY) row of the backtest summary of each strategy
+        rows = []
+        for strategy, summary_df in summaries.items():
+            if summary_df is None or len(summary_df) == 0:
+                continue
+            row = {"Strategy": strategy, "Stocks": len(summary_df) - 1}
+            row.update(summary_df.iloc[-1].drop("Stock").to_dict())
+            rows.append(row)
+        return pd.DataFrame(rows)
+
+    def end(self):
+        self.collecting = False
+        self.strategies = {}
+        self.items = []
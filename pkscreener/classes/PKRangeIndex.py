@@ -0,0 +1,99 @@
+"""
+    The MIT License (MIT)
+
+    Copyright (c) 2023 pkjmesra
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+
+"""
+import numpy as np
+
+class PKRangeIndex:
+    """
+    Answers range queries over a 1-D series in O(1) after an O(n log n) build:
+    the position of the (first) highest/lowest value between two positions
+    (sparse tables) and sums/counts/means over a range (prefix sums).
+    Positions are inclusive on both ends, like pandas label slicing.
+    """
+    def __init__(self, values):
+        self.values = np.asarray(values, dtype=float)
+        self.numValues = len(self.values)
+        self.valueList = self.values.tolist()
+        self.highTable = self.buildTable(highest=True)
+        self.lowTable = self.buildTable(highest=False)
+
+    def buildTable(self, highest=True):
+        # table[j][i] is the position of the first extreme value in [i, i + 2^j - 1]
+        values = self.values
+        level = np.arange(self.numValues)
+        table = [level.tolist()]
+        span = 1
+        while 2 * span <= self.numValues:
+            left = level[:-span] if span < len(level) else level[:0]
+            right = level[span:]
+            leftValues = values[left]
+            rightValues = values[right]
+            keepLeft = (leftValues >= rightValues) if highest else (leftValues <= rightValues)
+            level = np.where(keepLeft, left, right)
+            table.append(level.tolist())
+            span *= 2
+        return table
+
+    def extremeIndex(self, left, right, highest=True):
+        # Position of the first highest (or lowest) value in [left, right]
+        right = min(right, self.numValues - 1)
+        level = (right - left + 1).bit_length() - 1
+        table = self.highTable if highest else self.lowTable
+        first = table[level][left]
+        second = table[level][right - (1 << level) + 1]
+        firstValue = self.valueList[first]
+        secondValue = self.valueList[second]
+        if highest:
+            return first if firstValue >= secondValue else second
+        return first if firstValue <= secondValue else second
+
+    def highestIndex(self, left, right):
+        return self.extremeIndex(left, right, highest=True)
+
+    def lowestIndex(self, left, right):
+        return self.extremeIndex(left, right, highest=False)
+
+    def prefixSums(values, mask=None):
+        # Prefix sums and counts of the finite values (where mask is True),
+        # plus counts of +inf/-inf so that range means behave like pandas.
+        values = np.asarray(values, dtype=float)
+        mask = np.ones(len(values), dtype=bool) if mask is None else np.asarray(mask, dtype=bool)
+        finite = mask & np.isfinite(values)
+        sums = np.concatenate([[0.0], np.cumsum(np.where(finite, values, 0.0))]).tolist()
+        counts = np.concatenate([[0], np.cumsum(mask & ~np.isnan(values))]).tolist()
+        positiveInfinities = np.concatenate([[0], np.cumsum(mask & (values == np.inf))]).tolist()
+        negativeInfinities = np.concatenate([[0], np.cumsum(mask & (values == -np.inf))]).tolist()
+        return sums, counts, positiveInfinities, negativeInfinities
+
+    def rangeMean(prefixSums, left, right):
+        # Mean of the non-NaN values in [left, right] (NaN if there are none)
+        sums, counts, positiveInfinities, negativeInfinities = prefixSums
+        count = counts[right + 1] - counts[left]
+        if count == 0:
+            return np.nan
+        hasPositiveInfinity = positiveInfinities[right + 1] > positiveInfinities[left]
+        hasNegativeInfinity = negativeInfinities[right + 1] > negativeInfinities[left]
+        if hasPositiveInfinity or hasNegativeInfinity:
+            return np.nan if (hasPositiveInfinity and hasNegativeInfinity) else (np.inf if hasPositiveInfinity else -np.inf)
+        return (sums[right + 1] - sums[left]) / count
@@ -0,0 +1,102 @@
+"""
+    The MIT License (MIT)
+
+    Copyright (c) 2023 pkjmesra
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+
+"""
+import numpy as np
+import pandas as pd
+
+from PKDevTools.classes.log import default_logger
+from PKDevTools.classes.Singleton import SingletonType, SingletonMixin
+
+from pkscreener.classes.PKScanResultCache import PKScanResultCache
+from pkscreener.classes.PKUniverseData import PKUniverseData
+
+class PKRelativeStrength(SingletonMixin, metaclass=SingletonType):
+    """
+    Cross-sectional relative strength. The RS value (as in
+    ScreeningStatistics.calc_relative_strength) of every symbol in the scan
+    universe is computed in one array operation, rated against the base index
+    and ranked against the universe. Ratings are cached for the session by
+    the data snapshot, so repeat scans don't recompute them.
+    """
+    def __init__(self):
+        super(PKRelativeStrength, self).__init__()
+        self.ratingsCache = {}
+
+    def relativeStrength(closes, lengths):
+        # closes is the (symbols x time) oldest-first, left-padded close array.
+        # A candle counts as a gain (or loss) with its close (not the change),
+        # just like calc_relative_strength.
+        previous = np.full(closes.shape, np.nan)
+        previous[:, 1:] = closes[:, :-1]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            gains = np.where(closes >= previous, closes, 0.0).sum(axis=1)
+            losses = np.where(closes <= previous, closes, 0.0).sum(axis=1)
+            return (gains / lengths) / (losses / lengths)
+
+    def ratings(self, stockDict, stockCodes, indexRSValue):
+        # {stock: (lastCandle, numCandles, rsValue, rsRating, rsPercentile)}
+        try:
+            snapshotKey = f"{PKScanResultCache().snapshotFingerprint(stockCodes)}|{indexRSValue}"
+            if snapshotKey in self.ratingsCache.keys():
+                return self.ratingsCache[snapshotKey]
+            universe = PKUniverseData.fromStockDict(stockDict, stockCodes)
+            if universe.numSymbols == 0:
+                return None
+            rsValues = PKRelativeStrength.relativeStrength(universe.field("Close"), universe.lengths)
+            rsRatings = np.round(100 * rsValues / indexRSValue, 2)
+            percentiles = pd.Series(np.where(np.isfinite(rsValues), rsValues, np.nan)).rank(pct=True).mul(100).round(2).to_numpy()
+            table = {}
+            for i, stock in enumerate(universe.symbols):
+                table[stock] = (PKRelativeStrength.candleDate(universe.index[stock][-1]), int(universe.lengths[i]), rsValues[i], rsRatings[i], percentiles[i])
+            self.ratingsCache = {snapshotKey: table}
+            return table
+        except KeyboardInterrupt: # pragma: no cover
+            raise KeyboardInterrupt
+        except Exception as e: # pragma: no cover
+            default_logger().debug(e, exc_info=True)
+            return None
+
+    def candleDate(value):
+        # The date of a candle, whether the index holds timestamps (naive or
+        # not), date strings or epoch milliseconds (as in the cached data)
+        try:
+            if isinstance(value, (int, float, np.integer, np.floating)):
+                return pd.to_datetime(value, unit="ms").date()
+            return pd.Timestamp(value).date()
+        except Exception as e: # pragma: no cover
+            default_logger().debug(e, exc_info=True)
+            return None
+
+    def lookup(ratings, stock, df):
+        # The precomputed (rsValue, rsPercentile) for the stock, provided they
+        # were computed from the same candles as df (not for backtests etc.)
+        if ratings is None or df is None or len(df) == 0 or "Adj Close" in df.columns:
+            return None
+        rating = ratings.get(stock)
+        if rating is None:
+            return None
+        lastCandle, numCandles, rsValue, _, rsPercentile = rating
+        if numCandles != len(df) or lastCandle is None or lastCandle != PKRelativeStrength.candleDate(df.index.max()):
+            return None
+        return rsValue, rsPercentile
@@ -0,0 +1,133 @@
+"""
+    The MIT License (MIT)
+
+    Copyright (c) 2023 pkjmesra
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+
+"""
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+
+# Column dtypes from the narrowest to the widest. A column is widened (once)
+# when a value does not fit, like pd.DataFrame(listOfDicts) would infer it.
+COLUMN_DTYPES = [np.dtype(np.int64), np.dtype(np.float64), np.dtype(object)]
+MIN_CAPACITY = 64
+
+class PKResultAccumulator:
+    """
+    Collects the screening/save dictionaries of a scan and turns them into
+    columns. Appending only keeps a reference to the row. Rows are moved into
+    preallocated, typed NumPy columns, each of them once, when a snapshot is
+    asked for. Live displays therefore don't rebuild the frame from all the
+    rows received so far every time, and the final dataframe is built from
+    columns instead of from a list of dicts. Columns that show up later
+    (validators add their own) are back-filled with NaN, the same as
+    pd.DataFrame(listOfDicts).
+    """
+    def __init__(self, schema=None):
+        # The schema fixes the order of the (known) columns and, when it's a
+        # dict of default values, their initial dtypes. Like with
+        # pd.DataFrame(listOfDicts), a column is part of the result only once
+        # a row has a value for it.
+        schema = schema if isinstance(schema, dict) else dict.fromkeys(schema or [], 0)
+        self.capacity = 0
+        self.columns = {column: np.empty(0, dtype=PKResultAccumulator.dtypeOf([default])) for column, default in schema.items()}
+        self.filledColumns = set()
+        self.pendingRows = []
+        self.numRows = 0
+
+    def dtypeOf(values, dtype=COLUMN_DTYPES[0]):
+        # The narrowest of COLUMN_DTYPES (but at least dtype) that holds all the values
+        rank = COLUMN_DTYPES.index(dtype)
+        for value in values:
+            if isinstance(value, (bool, np.bool_)) or not isinstance(value, (int, float, np.integer, np.floating)):
+                return COLUMN_DTYPES[2]
+            if rank == 0 and isinstance(value, (float, np.floating)):
+                rank = 1
+        return COLUMN_DTYPES[rank]
+
+    def append(self, row):
+        self.pendingRows.append(row)
+        self.numRows += 1
+
+    def __len__(self):
+        return self.numRows
+
+    def reserve(self, numRows):
+        # Grows all the columns geometrically, so that appending stays linear
+        if numRows <= self.capacity:
+            return
+        capacity = max(numRows, 2 * self.capacity, MIN_CAPACITY)
+        for column, values in self.columns.items():
+            grown = np.empty(capacity, dtype=values.dtype)
+            grown[:len(values)] = values
+            self.columns[column] = grown
+        self.capacity = capacity
+
+    def columnize(self):
+        if len(self.pendingRows) == 0:
+            return
+        pendingRows = self.pendingRows
+        numColumnized = self.numRows - len(pendingRows)
+        for column in dict.fromkeys(chain.from_iterable(pendingRows)):
+            if column not in self.columns:
+                # Earlier rows don't have a value for it, so it's at least float
+                self.columns[column] = np.full(self.capacity, np.nan, dtype=COLUMN_DTYPES[1 if numColumnized > 0 else 0])
+            self.filledColumns.add(column)
+        self.reserve(self.numRows)
+        for column, values in self.columns.items():
+            pendingValues = [row.get(column, np.nan) for row in pendingRows]
+            dtype = PKResultAccumulator.dtypeOf(pendingValues, values.dtype)
+            if dtype != values.dtype:
+                values = values.astype(dtype)
+                self.columns[column] = values
+            try:
+                values[numColumnized:self.numRows] = pendingValues
+            except OverflowError: # pragma: no cover
+                # Integers beyond int64
+                values = values.astype(object)
+                values[numColumnized:self.numRows] = pendingValues
+                self.columns[column] = values
+        self.pendingRows = []
+
+    def rows(self, start=0):
+        # The rows from position start on, as dicts. Rows that have already
+        # been moved into columns come back with all the filled columns.
+        numColumnized = self.numRows - len(self.pendingRows)
+        if start >= numColumnized:
+            return self.pendingRows[start - numColumnized:]
+        columns = {column: self.columns[column][start:numColumnized].tolist() for column in self.columns.keys() if column in self.filledColumns}
+        columnizedRows = [{column: values[index] for column, values in columns.items()} for index in range(numColumnized - start)]
+        return columnizedRows + self.pendingRows
+
+    def snapshot(self, columns=None):
+        # A dataframe of what has been received so far. Pass only the columns
+        # that are needed for a live display to keep it cheap.
+        if self.numRows == 0:
+            return pd.DataFrame()
+        self.columnize()
+        df = pd.DataFrame({column: self.columns[column][:self.numRows] for column in (columns or self.columns.keys()) if column in self.filledColumns})
+        # Columns typed as object by their schema may only hold numbers
+        return df.infer_objects()
+
+    def toDataFrame(self):
+        return self.snapshot()
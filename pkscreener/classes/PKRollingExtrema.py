@@ -0,0 +1,171 @@
+"""
+    The MIT License (MIT)
+
+    Copyright (c) 2023 pkjmesra
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+
+"""
+from collections import OrderedDict
+
+import numpy as np
+
+from PKDevTools.classes.Singleton import SingletonType, SingletonMixin
+
+# Highest or lowest value is indexed for each of these fields
+EXTREMA_FIELDS = {"High": True, "Low": False, "Close": True}
+# Latest candles indexed per stock by default: enough for the 52 week (251
+# candles) and potential breakout (231 candles) windows.
+EXTREMA_WINDOW = 256
+# Candles that can be appended before the index is rebuilt over the window
+EXTREMA_SLACK = 64
+# Stocks whose index is kept per process (about 20KB each), enough for the
+# whole NSE universe being screened by a single worker. The least recently
+# screened stocks are dropped beyond this.
+EXTREMA_CACHE_SIZE = 2500
+
+class PKRollingExtrema:
+    """
+    Highest High/Close and lowest Low over the latest candles of a stock, like
+    df.head(n).tail(m)["High"].max() on the newest-first data with NaN/inf
+    taken as 0 (as the 52 week and breakout scans do), in O(1) with sparse
+    tables. When the index is updated with the stock's data again, only the
+    candles from the first one that changed (usually just the latest) are
+    re-indexed, in O(log n) per candle.
+    """
+    def __init__(self, df=None, window=None):
+        self.window = EXTREMA_WINDOW
+        self.numCandles = 0
+        # Data position (oldest-first) of the first indexed candle
+        self.start = 0
+        self.values = {field: np.empty(0) for field in EXTREMA_FIELDS}
+        self.tables = {field: [np.empty(0, dtype=np.int32)] for field in EXTREMA_FIELDS}
+        if df is not None:
+            self.update(df, window=(max(len(df), 1) if window is None else window))
+
+    def candles(df, field, count):
+        # The latest count candles, oldest-first
+        values = np.asarray(df[field].to_numpy()[:count][::-1], dtype=float)
+        return np.nan_to_num(values, nan=0.0, posinf=0.0, neginf=0.0)
+
+    def update(self, df, window=None):
+        # df is newest-first. At least the latest window candles get indexed.
+        window = self.window if window is None else max(window, 1)
+        numCandles = len(df)
+        numIndexed = len(self.values["High"])
+        numLatest = numCandles - self.start
+        if (window != self.window or numIndexed == 0 or numLatest < 0
+                or (self.start > 0 and numLatest < window)
+                or numLatest > window + EXTREMA_SLACK):
+            self.window = window
+            self.start = max(0, numCandles - window)
+            self.truncate(0)
+            self.append({field: PKRollingExtrema.candles(df, field, numCandles - self.start) for field in EXTREMA_FIELDS})
+        else:
+            latest = {field: PKRollingExtrema.candles(df, field, numLatest) for field in EXTREMA_FIELDS}
+            unchanged = min(numIndexed, numLatest)
+            for field in EXTREMA_FIELDS:
+                changed = np.flatnonzero(self.values[field][:unchanged] != latest[field][:unchanged])
+                if len(changed) > 0:
+                    unchanged = int(changed[0])
+            self.truncate(unchanged)
+            self.append({field: values[unchanged:] for field, values in latest.items()})
+        self.numCandles = numCandles
+        return self
+
+    def truncate(self, numValues):
+        for field in EXTREMA_FIELDS:
+            self.values[field] = self.values[field][:numValues]
+            table = self.tables[field]
+            levels = max(numValues, 1).bit_length()
+            self.tables[field] = [table[level][:numValues - (1 << level) + 1] for level in range(min(levels, len(table)))]
+
+    def append(self, newValues):
+        # table[j][i] is the position of an extreme value in [i, i + 2^j - 1]
+        for field, highest in EXTREMA_FIELDS.items():
+            values = np.concatenate([self.values[field], newValues[field]])
+            numValues = len(values)
+            positionType = np.int16 if numValues < np.iinfo(np.int16).max else np.int32
+            table = self.tables[field]
+            table[0] = np.arange(numValues, dtype=positionType)
+            level = 1
+            while (1 << level) <= numValues:
+                span = 1 << (level - 1)
+                previous = table[level - 1]
+                current = table[level] if level < len(table) else previous[:0]
+                left = previous[len(current):numValues - 2 * span + 1]
+                right = previous[len(current) + span:numValues - span + 1]
+                keepLeft = (values[left] >= values[right]) if highest else (values[left] <= values[right])
+                current = np.concatenate([current, np.where(keepLeft, left, right)]).astype(positionType, copy=False)
+                if level < len(table):
+                    table[level] = current
+                else:
+                    table.append(current)
+                level += 1
+            self.values[field] = values
+
+    def extreme(self, field, head, tail=None):
+        # Over the newest-first rows df.head(head).tail(tail); NaN if there are none
+        last = min(head, self.numCandles)
+        first = 0 if tail is None else last - min(max(tail, 0), last)
+        if first >= last:
+            return np.float64(np.nan)
+        # Oldest-first positions in the index (which covers the latest window candles)
+        left = max(self.numCandles - last - self.start, 0)
+        right = self.numCandles - 1 - first - self.start
+        level = (right - left + 1).bit_length() - 1
+        values = self.values[field]
+        table = self.tables[field][level]
+        firstValue = values[table[left]]
+        secondValue = values[table[right - (1 << level) + 1]]
+        if EXTREMA_FIELDS[field]:
+            return max(firstValue, secondValue)
+        return min(firstValue, secondValue)
+
+    def highestHigh(self, head, tail=None):
+        return self.extreme("High", head, tail)
+
+    def lowestLow(self, head, tail=None):
+        return self.extreme("Low", head, tail)
+
+    def highestClose(self, head, tail=None):
+        return self.extreme("Close", head, tail)
+
+    def latest(self, field):
+        values = self.values[field]
+        return values[-1] if len(values) > 0 else np.float64(np.nan)
+
+class PKRollingExtremaCache(SingletonMixin, metaclass=SingletonType):
+    """
+    Rolling extrema of the stocks screened in this process, kept across scans
+    so that a stock screened again only has its new or changed candles indexed.
+    """
+    def __init__(self):
+        super(PKRollingExtremaCache, self).__init__()
+        self.stocks = OrderedDict()
+
+    def forStock(self, stock, df, window=EXTREMA_WINDOW):
+        extrema = self.stocks.get(stock)
+        if extrema is None:
+            extrema = PKRollingExtrema()
+            self.stocks[stock] = extrema
+        self.stocks.move_to_end(stock)
+        while len(self.stocks) > EXTREMA_CACHE_SIZE:
+            self.stocks.popitem(last=False)
+        return extrema.update(df, window=window)
@@ -0,0 +1,317 @@
+"""
+    The MIT License (MIT)
+
+    Copyright (c) 2023 pkjmesra
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+
+"""
+import re
+
+import numpy as np
+
+from PKDevTools.classes.log import default_logger
+
+from pkscreener.classes.PKUniverseData import PKUniverseData
+
+# Identifiers that refer to the universe's price/volume fields
+EXPRESSION_FIELDS = {"open": "Open", "high": "High", "low": "Low", "close": "Close", "volume": "Volume"}
+# Indicator functions and their (min, max) argument count. The series argument
+# is optional and defaults to close, e.g. sma(50) == sma(close,50).
+EXPRESSION_FUNCTIONS = {
+    "sma": (1, 2),
+    "ema": (1, 2),
+    "rsi": (1, 2),
+    "highest": (1, 2),
+    "lowest": (1, 2),
+    "prev": (1, 2),
+    "abs": (1, 1),
+}
+COMPARISON_OPERATORS = [">=", "<=", "==", "!=", ">", "<"]
+# Nodes that evaluate to a boolean mask. Every other node is numeric.
+CONDITION_NODES = ["and", "or", "not", "compare", "between"]
+TOKEN_PATTERN = re.compile(r"\s*(?:(\d+\.?\d*|\.\d+)|([A-Za-z_][A-Za-z_0-9]*)|(>=|<=|==|!=|[><()+\-*/,]))")
+# A ">" pipes the results into the next scan only when it is followed by "|"
+# or ends the options, so that "close > sma(50)" stays in one piece.
+PIPE_SEPARATOR_PATTERN = re.compile(r">(?=\s*(?:\||$))")
+
+class PKScanExpression:
+    """
+    A small declarative language for custom scans, e.g.
+
+        rsi(14) between 55,68 and close > sma(50) and volume > 2.5*sma(volume,20)
+
+    The expression is parsed once into a tree of hashable tuples. Identical
+    sub-expressions therefore have identical keys and are evaluated only once
+    (common sub-expression elimination), and the whole tree is evaluated as
+    NumPy array operations over a PKUniverseData, i.e. for all stocks at once.
+    """
+    compiledExpressions = {}
+
+    def __init__(self, expression):
+        self.expression = str(expression or "").strip()
+        self.tokens = PKScanExpression.tokenize(self.expression)
+        self.position = 0
+        self.tree = self.parseOr()
+        if self.position < len(self.tokens):
+            raise ValueError(f"Unexpected '{self.tokens[self.position]}' in scan expression: {self.expression}")
+        self.expectCondition(self.tree)
+
+    def compile(expression):
+        # Parse once per process and reuse the tree for every evaluation
+        key = str(expression or "").strip().lower()
+        if key not in PKScanExpression.compiledExpressions:
+            PKScanExpression.compiledExpressions[key] = PKScanExpression(key)
+        return PKScanExpression.compiledExpressions[key]
+
+    def isValid(expression):
+        try:
+            PKScanExpression.compile(expression)
+            return True
+        except ValueError as e:
+            default_logger().debug(e, exc_info=True)
+            return False
+
+    def splitPipedOptions(options):
+        # "X:12:44:close > sma(50):>|X:0:31:" -> ["X:12:44:close > sma(50):", "|X:0:31:"]
+        return PIPE_SEPARATOR_PATTERN.split(str(options))
+
+    def tokenize(expression):
+        tokens = []
+        position = 0
+        expression = expression.lower()
+        while position < len(expression):
+            if expression[position:].strip() == "":
+                break
+            match = TOKEN_PATTERN.match(expression, position)
+            if match is None:
+                raise ValueError(f"Invalid character '{expression[position:].strip()[0]}' in scan expression: {expression}")
+            tokens.append(match.group(match.lastindex))
+            position = match.end()
+        if len(tokens) == 0:
+            raise ValueError("Scan expression is empty")
+        return tokens
+
+    def expectCondition(self, node):
+        # and/or/not and the scan itself need conditions, e.g. not (close > sma(50))
+        if node[0] not in CONDITION_NODES:
+            raise ValueError(f"Expected a condition (e.g. close > sma(50)) but found a number in scan expression: {self.expression}")
+        return node
+
+    def expectNumber(self, node):
+        # Comparisons, arithmetic and functions need numbers, e.g. not sma(close > 5, 10)
+        if node[0] in CONDITION_NODES:
+            raise ValueError(f"Expected a number but found a condition in scan expression: {self.expression}")
+        return node
+
+    def peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def advance(self, expected=None):
+        token = self.peek()
+        if token is None or (expected is not None and token != expected):
+            raise ValueError(f"Expected '{expected or 'more input'}' but found '{token or 'end of expression'}' in scan expression: {self.expression}")
+        self.position += 1
+        return token
+
+    def parseOr(self):
+        node = self.parseAnd()
+        while self.peek() == "or":
+            self.advance()
+            node = ("or", self.expectCondition(node), self.expectCondition(self.parseAnd()))
+        return node
+
+    def parseAnd(self):
+        node = self.parseNot()
+        while self.peek() == "and":
+            self.advance()
+            node = ("and", self.expectCondition(node), self.expectCondition(self.parseNot()))
+        return node
+
+    def parseNot(self):
+        if self.peek() == "not":
+            self.advance()
+            return ("not", self.expectCondition(self.parseNot()))
+        return self.parseComparison()
+
+    def parseComparison(self):
+        node = self.parseArithmetic()
+        token = self.peek()
+        if token in COMPARISON_OPERATORS:
+            self.advance()
+            return ("compare", token, self.expectNumber(node), self.expectNumber(self.parseArithmetic()))
+        if token == "between":
+            self.advance()
+            lower = self.expectNumber(self.parseArithmetic())
+            self.advance(",")
+            return ("between", self.expectNumber(node), lower, self.expectNumber(self.parseArithmetic()))
+        return node
+
+    def parseArithmetic(self):
+        node = self.parseTerm()
+        while self.peek() in ["+", "-"]:
+            node = ("arith", self.advance(), self.expectNumber(node), self.expectNumber(self.parseTerm()))
+        return node
+
+    def parseTerm(self):
+        node = self.parseFactor()
+        while self.peek() in ["*", "/"]:
+            node = ("arith", self.advance(), self.expectNumber(node), self.expectNumber(self.parseFactor()))
+        return node
+
+    def parseFactor(self):
+        token = self.advance()
+        if token == "-":
+            return ("arith", "*", ("number", -1.0), self.expectNumber(self.parseFactor()))
+        if token == "(":
+            node = self.parseOr()
+            self.advance(")")
+            return node
+        if re.fullmatch(r"\d+\.?\d*|\.\d+", token):
+            return ("number", float(token))
+        if token in EXPRESSION_FIELDS:
+            return ("field", EXPRESSION_FIELDS[token])
+        if token in EXPRESSION_FUNCTIONS:
+            return self.parseFunction(token)
+        raise ValueError(f"Unknown name '{token}' in scan expression: {self.expression}")
+
+    def parseFunction(self, name):
+        self.advance("(")
+        args = [self.expectNumber(self.parseArithmetic())]
+        while self.peek() == ",":
+            self.advance()
+            args.append(self.expectNumber(self.parseArithmetic()))
+        self.advance(")")
+        minArgs, maxArgs = EXPRESSION_FUNCTIONS[name]
+        if len(args) < minArgs or len(args) > maxArgs:
+            raise ValueError(f"{name}() takes {minArgs} to {maxArgs} arguments in scan expression: {self.expression}")
+        if name == "abs":
+            return ("abs", args[0])
+        if len(args) == 1:
+            args = [("field", "Close"), args[0]]
+        period = args[1]
+        if period[0] != "number" or period[1] < 0 or int(period[1]) != period[1]:
+            raise ValueError(f"{name}() needs a whole number period in scan expression: {self.expression}")
+        return (name, args[0], int(period[1]))
+
+    def evaluate(self, universe):
+        # Boolean mask (one per symbol) of the expression at the most recent candle
+        values = self.evaluateSeries(universe)
+        return universe.latest(values) if universe.numCandles > 0 else np.zeros(universe.numSymbols, dtype=bool)
+
+    def evaluateSeries(self, universe):
+        # The whole (symbols x time) series of the expression. Sub-expressions
+        # are memoised by their tree key for this universe.
+        memo = {}
+        result = self.evaluateNode(self.tree, universe, memo)
+        return np.broadcast_to(result, (universe.numSymbols, universe.numCandles))
+
+    def evaluateForStock(expression, fullData):
+        # fullData is the newest-first frame that the per-stock workers use
+        if fullData is None or len(fullData) == 0:
+            return False
+        universe = PKUniverseData.fromDataFrame(fullData[::-1])
+        if universe.numSymbols == 0:
+            return False
+        return bool(PKScanExpression.compile(expression).evaluate(universe)[0])
+
+    def evaluateNode(self, node, universe, memo):
+        if node in memo:
+            return memo[node]
+        kind = node[0]
+        if kind == "number":
+            result = np.float64(node[1])
+        elif kind == "field":
+            result = universe.field(node[1])
+        elif kind == "arith":
+            left = self.evaluateNode(node[2], universe, memo)
+            right = self.evaluateNode(node[3], universe, memo)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                if node[1] == "+":
+                    result = left + right
+                elif node[1] == "-":
+                    result = left - right
+                elif node[1] == "*":
+                    result = left * right
+                else:
+                    result = np.where(right != 0, left / np.where(right != 0, right, 1), np.nan)
+        elif kind == "abs":
+            result = np.abs(self.evaluateNode(node[1], universe, memo))
+        elif kind in ["sma", "ema", "rsi", "highest", "lowest", "prev"]:
+            result = self.evaluateIndicator(node, universe, memo)
+        elif kind == "compare":
+            left = self.evaluateNode(node[2], universe, memo)
+            right = self.evaluateNode(node[3], universe, memo)
+            # Comparisons with NaN (not enough history) are always False
+            with np.errstate(invalid="ignore"):
+                if node[1] == ">":
+                    result = left > right
+                elif node[1] == ">=":
+                    result = left >= right
+                elif node[1] == "<":
+                    result = left < right
+                elif node[1] == "<=":
+                    result = left <= right
+                elif node[1] == "==":
+                    result = left == right
+                else:
+                    result = (left != right) & ~np.isnan(left) & ~np.isnan(right)
+        elif kind == "between":
+            value = self.evaluateNode(node[1], universe, memo)
+            lower = self.evaluateNode(node[2], universe, memo)
+            upper = self.evaluateNode(node[3], universe, memo)
+            with np.errstate(invalid="ignore"):
+                result = (value >= lower) & (value <= upper)
+        elif kind == "and":
+            result = self.evaluateNode(node[1], universe, memo) & self.evaluateNode(node[2], universe, memo)
+        elif kind == "or":
+            result = self.evaluateNode(node[1], universe, memo) | self.evaluateNode(node[2], universe, memo)
+        elif kind == "not":
+            result = ~self.evaluateNode(node[1], universe, memo)
+        else: # pragma: no cover
+            raise ValueError(f"Unsupported node {kind} in scan expression: {self.expression}")
+        memo[node] = result
+        return result
+
+    def evaluateIndicator(self, node, universe, memo):
+        kind, source, period = node
+        if source[0] == "field":
+            # Indicators of raw fields are shared through the universe's cache
+            if kind == "sma":
+                return universe.sma(source[1], period)
+            if kind == "ema":
+                return universe.ema(source[1], period)
+            if kind == "rsi":
+                return universe.rsi(period, source[1])
+        values = self.evaluateNode(source, universe, memo)
+        if kind == "sma":
+            return PKUniverseData.rollingMean(values, period)
+        if kind == "ema":
+            return PKUniverseData.exponentialMean(values, PKUniverseData.firstValidIndex(values), period)
+        if kind == "rsi":
+            return PKUniverseData.wilderRSI(values, PKUniverseData.firstValidIndex(values), period)
+        if kind in ["highest", "lowest"]:
+            return PKUniverseData.rollingExtreme(values, period, highest=(kind == "highest"))
+        # prev(x, n): the value n candles ago
+        result = np.full(values.shape, np.nan)
+        if period == 0:
+            return values
+        if period < values.shape[1]:
+            result[:, period:] = values[:, :-period]
+        return result
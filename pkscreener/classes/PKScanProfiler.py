@@ -0,0 +1,216 @@
+"""
+    The MIT License (MIT)
+
+    Copyright (c) 2023 pkjmesra
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+
+"""
+import csv
+import functools
+import glob
+import json
+import os
+import pickle
+import time
+
+import pandas as pd
+
+from PKDevTools.classes import Archiver
+from PKDevTools.classes.ColorText import colorText
+from PKDevTools.classes.log import default_logger
+from PKDevTools.classes.OutputControls import OutputControls
+from PKDevTools.classes.Singleton import SingletonType, SingletonMixin
+
+PROFILE_FOLDER = "scan_profiles"
+# Stages that are recorded explicitly, as opposed to the instrumented methods
+STAGE_QUEUE_WAIT = "(queue wait)"
+STAGE_TASK = "(task compute)"
+STAGE_SERIALIZATION = "(result serialization)"
+
+class PKScanProfiler(SingletonMixin, metaclass=SingletonType):
+    """
+    Optional per-worker instrumentation of scans (enabled with --profilescan).
+    Every worker process records wall time and call counts for the data fetch,
+    each ScreeningStatistics/CandlePatterns method, result serialization and
+    the time it waited for its next task. Workers write their stats out after
+    every task, because they outlive the scan and another worker may take the
+    last task from the queue, and the main process aggregates them at the end
+    of the scan.
+
+    When profiling is disabled, nothing is instrumented, nothing is pickled or
+    written, and the only cost is one attribute lookup per task.
+    """
+    def __init__(self):
+        super(PKScanProfiler, self).__init__()
+        self.scanId = None
+        self.stats = {}
+        self.instrumented = set()
+        self.taskActive = False
+        self.lastTaskEnd = None
+        self.profileDir = os.path.join(Archiver.get_user_data_dir(), PROFILE_FOLDER)
+
+    def isEnabled(userArgs):
+        return userArgs is not None and getattr(userArgs, "profilescan", False) and getattr(userArgs, "profilescanid", None) is not None
+
+    def beginScan(self, userArgs):
+        # Called in the main process before the tasks are queued
+        if userArgs is None or not getattr(userArgs, "profilescan", False):
+            return
+        userArgs.profilescanid = str(time.time_ns())
+        os.makedirs(self.profileDir, exist_ok=True)
+        for fileName in glob.glob(os.path.join(self.profileDir, "*.json")):
+            try:
+                os.remove(fileName)
+            except Exception as e: # pragma: no cover
+                default_logger().debug(e, exc_info=True)
+
+    def record(self, stage, elapsed, calls=1):
+        stats = self.stats.get(stage)
+        if stats is None:
+            stats = [0, 0.0, 0.0]
+            self.stats[stage] = stats
+        stats[0] += calls
+        stats[1] += elapsed
+        stats[2] = max(stats[2], elapsed)
+
+    def timed(self, stage, method):
+        # Inclusive wall time, i.e. a method calling another instrumented
+        # method is charged for both.
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            if not self.taskActive:
+                return method(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.record(stage, time.perf_counter() - start)
+        return wrapper
+
+    def instrument(self, target, prefix, methodNames=None):
+        if target is None or id(target) in self.instrumented:
+            return
+        self.instrumented.add(id(target))
+        methodNames = methodNames if methodNames is not None else \
+            [name for name in dir(type(target)) if not name.startswith("_") and callable(getattr(type(target), name, None))]
+        for name in methodNames:
+            try:
+                setattr(target, name, self.timed(f"{prefix}.{name}", getattr(target, name)))
+            except Exception as e: # pragma: no cover
+                default_logger().debug(e, exc_info=True)
+
+    def profileTask(self, screenStocks, stockScreener, hostRef, userArgs, **taskArgs):
+        # Runs one screening task in a worker and records where its time went
+        if self.scanId != userArgs.profilescanid:
+            self.scanId = userArgs.profilescanid
+            self.stats = {}
+            self.lastTaskEnd = None
+        self.instrument(stockScreener, "StockScreener", methodNames=["getRelevantDataForStock"])
+        self.instrument(hostRef.screener, "ScreeningStatistics")
+        self.instrument(hostRef.candlePatterns, "CandlePatterns")
+        start = time.perf_counter()
+        if self.lastTaskEnd is not None:
+            self.record(STAGE_QUEUE_WAIT, start - self.lastTaskEnd)
+        self.taskActive = True
+        try:
+            result = screenStocks(hostRef=hostRef, userArgs=userArgs, **taskArgs)
+        finally:
+            self.taskActive = False
+        computeEnd = time.perf_counter()
+        self.record(STAGE_TASK, computeEnd - start)
+        try:
+            # The same pickling that happens when the result is queued back
+            pickle.dumps(result)
+        except Exception as e: # pragma: no cover
+            default_logger().debug(e, exc_info=True)
+        self.record(STAGE_SERIALIZATION, time.perf_counter() - computeEnd)
+        self.flush()
+        # Writing the profile is not charged to the wait for the next task
+        self.lastTaskEnd = time.perf_counter()
+        return result
+
+    def flush(self):
+        # Each worker keeps one file per scan that the main process aggregates
+        try:
+            os.makedirs(self.profileDir, exist_ok=True)
+            fileName = os.path.join(self.profileDir, f"{self.scanId}_{os.getpid()}.json")
+            with open(f"{fileName}.tmp", "w") as f:
+                json.dump(self.stats, f)
+            os.replace(f"{fileName}.tmp", fileName)
+        except Exception as e: # pragma: no cover
+            default_logger().debug(e, exc_info=True)
+
+    def summary(self, userArgs):
+        # Aggregates the stats of all workers for the scan into a dataframe
+        scanId = getattr(userArgs, "profilescanid", None)
+        rows = {}
+        workers = 0
+        for fileName in glob.glob(os.path.join(self.profileDir, f"{scanId}_*.json")):
+            try:
+                with open(fileName, "r") as f:
+                    workerStats = json.load(f)
+                workers += 1
+                for stage, (calls, total, maximum) in workerStats.items():
+                    row = rows.get(stage, [0, 0.0, 0.0])
+                    rows[stage] = [row[0] + calls, row[1] + total, max(row[2], maximum)]
+            except Exception as e: # pragma: no cover
+                default_logger().debug(e, exc_info=True)
+        if len(rows) == 0:
+            return None
+        df = pd.DataFrame(
+            [[stage, calls, round(total, 4), round(total * 1000 / calls, 3) if calls > 0 else 0, round(maximum * 1000, 3)] for stage, (calls, total, maximum) in rows.items()],
+            columns=["Stage", "Calls", "Total(s)", "Avg(ms)", "Max(ms)"])
+        computeTotal = rows.get(STAGE_TASK, [0, 0.0, 0.0])[1]
+        df["%Compute"] = round(df["Total(s)"] * 100 / computeTotal, 1) if computeTotal > 0 else 0
+        df = df.sort_values(by="Total(s)", ascending=False).reset_index(drop=True)
+        df.attrs["workers"] = workers
+        return df
+
+    def saveSummary(self, df, userArgs):
+        # Writes the aggregated stats as JSON and CSV and returns the file paths
+        scanId = getattr(userArgs, "profilescanid", None)
+        outputDir = Archiver.get_user_outputs_dir()
+        jsonPath = os.path.join(outputDir, f"PKScreener_Profile_{scanId}.json")
+        csvPath = os.path.join(outputDir, f"PKScreener_Profile_{scanId}.csv")
+        try:
+            with open(jsonPath, "w") as f:
+                json.dump({"scanId": scanId, "workers": df.attrs.get("workers", 0), "stages": df.to_dict("records")}, f, indent=2)
+            df.to_csv(csvPath, index=False, quoting=csv.QUOTE_MINIMAL)
+        except Exception as e: # pragma: no cover
+            default_logger().debug(e, exc_info=True)
+        return jsonPath, csvPath
+
+    def showSummary(self, userArgs):
+        # Called in the main process once all the results have been received
+        if not PKScanProfiler.isEnabled(userArgs):
+            return
+        df = self.summary(userArgs)
+        if df is None:
+            return
+        jsonPath, csvPath = self.saveSummary(df, userArgs)
+        OutputControls().printOutput(
+            colorText.miniTabulator().tabulate(
+                df,
+                headers="keys",
+                tablefmt=colorText.No_Pad_GridFormat,
+                showindex=False,
+            )
+            + f"\n{colorText.GREEN}  [+] Scan profile from {df.attrs.get('workers', 0)} worker(s) saved to:\n  [+] {jsonPath}\n  [+] {csvPath}{colorText.END}"
+        )
@@ -0,0 +1,186 @@
+"""
+    The MIT License (MIT)
+
+    Copyright (c) 2023 pkjmesra
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+
+"""
+import glob
+import hashlib
+import os
+import pickle
+import time
+
+from PKDevTools.classes import Archiver
+from PKDevTools.classes.log import default_logger
+from PKDevTools.classes.MarketHours import MarketHours
+from PKDevTools.classes.PKDateUtilities import PKDateUtilities
+from PKDevTools.classes.Singleton import SingletonType, SingletonMixin
+
+# Scan results are cached against (normalized scan options, data snapshot fingerprint).
+# The in-memory tier serves repeat scans within the same process (monitor, piped scans)
+# and the on-disk tier serves repeat scans across processes/restarts (telegram bot).
+SCAN_CACHE_FOLDER = "scan_results_cache"
+CANDLE_SECONDS = {"m": 60, "h": 3600}
+# While the market is open, the live (daily or higher) candle keeps changing
+# within its timestamp, so cached results are kept only until the next 1m candle.
+LIVE_CANDLE_SECONDS = 60
+# The configuration that changes the results of a scan. Cached results are
+# only served to a scan with the same values for all of them.
+SCAN_CONFIG_FIELDS = [
+    "minLTP", "maxLTP", "volumeRatio", "minVolume", "consolidationPercentage", "stageTwo",
+    "useEMA", "daysToLookback", "backtestPeriodFactor", "showunknowntrends",
+    "minimumChangePercentage", "baseIndex", "calculatersiintraday",
+    "atrTrailingStopSensitivity", "atrTrailingStopPeriod", "atrTrailingStopEMAPeriod",
+    "vcpRangePercentageFromTop", "vcpLegsToCheckForConsolidation", "vcpVolumeContractionRatio",
+    "enableAdditionalVCPFilters", "enableAdditionalVCPEMAFilters", "superConfluenceEMAPeriods",
+    "superConfluenceMaxReviewDays", "superConfluenceEnforce200SMA", "anchoredAVWAPPercentage",
+]
+
+class PKScanResultCache(SingletonMixin, metaclass=SingletonType):
+    def __init__(self):
+        super(PKScanResultCache, self).__init__()
+        self.memoryCache = {}
+        self.lastCandles = {}
+        self.cacheDir = os.path.join(Archiver.get_user_data_dir(), SCAN_CACHE_FOLDER)
+
+    def updateSnapshot(self, stockDict):
+        # Remember the last candle (timestamp and OHLCV) of every loaded symbol. The
+        # live candle keeps its timestamp while its prices and volume change during
+        # the session, so the timestamp alone can't tell two snapshots apart. This is
+        # done once per data load so that fingerprinting a scan does not need to
+        # touch the (potentially shared, multiprocessing) stock dictionary again.
+        self.lastCandles = {}
+        if stockDict is None:
+            return
+        for stock in list(stockDict.keys()):
+            try:
+                stockData = stockDict[stock]
+                index = stockData.get("index")
+                data = stockData.get("data")
+                lastIndex = str(index[-1]) if index is not None and len(index) > 0 else ""
+                lastRow = ",".join(str(value) for value in data[-1]) if data is not None and len(data) > 0 else ""
+                self.lastCandles[stock] = f"{lastIndex}@{lastRow}"
+            except Exception: # pragma: no cover
+                self.lastCandles[stock] = ""
+
+    def snapshotFingerprint(self, stockCodes):
+        hasher = hashlib.sha1()
+        for stock in sorted(set(stockCodes or [])):
+            hasher.update(f"{stock}={self.lastCandles.get(stock,'')};".encode("utf-8"))
+        return hasher.hexdigest()
+
+    def normalizedOptionKey(self, userArgs, selectedChoice, configManager):
+        # Unlike PKScanRunner.getFormattedChoices, decimal/list choices (like the
+        # volume ratio in X:12:9:2.5) change the results and must be part of the key.
+        choices = [str(selectedChoice[choice]).strip() for choice in selectedChoice if len(str(selectedChoice[choice]).strip()) > 0]
+        isIntraday = configManager.isIntradayConfig() or (userArgs is not None and userArgs.intraday is not None)
+        scanExpression = str(getattr(userArgs, "scanexpression", None) or "").strip().lower()
+        return f"{':'.join(choices)}{'_i' if isIntraday else ''}|{configManager.period}|{configManager.duration}|{scanExpression}|{self.configFingerprint(configManager)}"
+
+    def configFingerprint(self, configManager):
+        config = "|".join(f"{field}={getattr(configManager, field, None)}" for field in SCAN_CONFIG_FIELDS)
+        return hashlib.sha1(config.encode("utf-8")).hexdigest()
+
+    def cacheKey(self, userArgs, selectedChoice, configManager, stockCodes):
+        optionKey = self.normalizedOptionKey(userArgs, selectedChoice, configManager)
+        return hashlib.sha1(f"{optionKey}|{self.snapshotFingerprint(stockCodes)}".encode("utf-8")).hexdigest()
+
+    def candleAlignedExpiry(self, configManager):
+        # Cached results remain valid until the current candle closes. For intraday
+        # candles, that's the next candle boundary. For daily and higher candles,
+        # that's the next trading session open, or the next 1m candle boundary while
+        # the market is open and the live candle is still changing.
+        now = time.time()
+        frequency = configManager.candleDurationFrequency
+        if frequency in CANDLE_SECONDS.keys():
+            candleSeconds = int(configManager.candleDurationInt) * CANDLE_SECONDS[frequency]
+            return (int(now / candleSeconds) + 1) * candleSeconds
+        try:
+            if PKDateUtilities.isTradingTime() and not PKDateUtilities.isTodayHoliday()[0]:
+                return (int(now / LIVE_CANDLE_SECONDS) + 1) * LIVE_CANDLE_SECONDS
+            currentDateTime = PKDateUtilities.currentDateTime()
+            # nextTradingDate gives a date, so the open time (in the market's timezone) goes on the current datetime
+            nextSession = PKDateUtilities.nextTradingDate(currentDateTime)
+            nextOpen = currentDateTime.replace(year=nextSession.year, month=nextSession.month, day=nextSession.day, hour=MarketHours().openHour, minute=MarketHours().openMinute, second=0, microsecond=0)
+            return nextOpen.timestamp()
+        except Exception as e: # pragma: no cover
+            default_logger().debug(e, exc_info=True)
+            return now + 3600
+
+    def cacheFilePath(self, key):
+        return os.path.join(self.cacheDir, f"{key}.pkl")
+
+    def get(self, key):
+        cachedItem = self.memoryCache.get(key)
+        if cachedItem is None:
+            filePath = self.cacheFilePath(key)
+            if os.path.isfile(filePath):
+                try:
+                    with open(filePath, "rb") as f:
+                        cachedItem = pickle.load(f)
+                    self.memoryCache[key] = cachedItem
+                except Exception as e: # pragma: no cover
+                    default_logger().debug(e, exc_info=True)
+                    cachedItem = None
+        if cachedItem is None:
+            return None
+        if cachedItem["expiry"] <= time.time():
+            self.invalidate(key)
+            return None
+        return cachedItem["screenResults"].copy(), cachedItem["saveResults"].copy(), cachedItem["criteria_dateTime"]
+
+    def set(self, key, screenResults, saveResults, configManager, criteria_dateTime=None):
+        if screenResults is None or saveResults is None:
+            return
+        cachedItem = {
+            "expiry": self.candleAlignedExpiry(configManager),
+            "screenResults": screenResults.copy(),
+            "saveResults": saveResults.copy(),
+            "criteria_dateTime": criteria_dateTime,
+        }
+        self.memoryCache[key] = cachedItem
+        try:
+            os.makedirs(self.cacheDir, exist_ok=True)
+            with open(self.cacheFilePath(key), "wb") as f:
+                pickle.dump(cachedItem, f, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e: # pragma: no cover
+            default_logger().debug(e, exc_info=True)
+        self.evictExpired()
+
+    def invalidate(self, key):
+        self.memoryCache.pop(key, None)
+        try:
+            os.remove(self.cacheFilePath(key))
+        except OSError: # pragma: no cover
+            pass
+
+    def evictExpired(self):
+        now = time.time()
+        for key in [k for k, v in self.memoryCache.items() if v["expiry"] <= now]:
+            self.memoryCache.pop(key, None)
+        for f in glob.glob("*.pkl", root_dir=self.cacheDir):
+            filePath = os.path.join(self.cacheDir, f)
+            try:
+                # Any file older than a week is certainly expired, whatever its candle duration
+                if os.path.getmtime(filePath) < now - 7*24*3600:
+                    os.remove(filePath)
+            except OSError: # pragma: no cover
+                pass
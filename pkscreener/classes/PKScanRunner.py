@@ -42,6 +42,7 @@ from PKDevTools.classes.FunctionTimeouts import exit_after
 
 from pkscreener.classes.StockScreener import StockScreener
 from pkscreener.classes.CandlePatterns import CandlePatterns
+from pkscreener.classes.PKRelativeStrength import PKRelativeStrength
 from pkscreener.classes.ConfigManager import parser, tools
 from PKDevTools.classes.OutputControls import OutputControls
 from PKNSETools.PKIntraDay import Intra_Day
@@ -273,9 +274,11 @@ class PKScanRunner:
             userArgs.intraday is not None
         )
         choices = ""
+        scanExpression = getattr(userArgs, "scanexpression", None)
         for choice in selectedChoice:
             choiceOption = selectedChoice[choice]
-            if len(choiceOption) > 0 and ("," not in choiceOption and "." not in choiceOption):
+            # The scan expression of option 44 is not usable in file names
+            if len(choiceOption) > 0 and ("," not in choiceOption and "." not in choiceOption) and choiceOption != scanExpression:
                 if len(choices) > 0:
                     choices = f"{choices}_"
                 choices = f"{choices}{choiceOption}"
@@ -347,6 +350,12 @@ class PKScanRunner:
                 worker._clear()
         return screenResults, saveResults,backtest_df,tasks_queue, results_queue, consumers, logging_queue
 
+    def needsRSRatings(executeOption, items, userPassedArgs):
+        # RS ratings are reported for the VCP chart patterns (7:4 and 7:8) and VCP piped scans
+        if userPassedArgs is not None and userPassedArgs.usertag is not None and "VCP" in userPassedArgs.usertag:
+            return True
+        return executeOption == 7 and len(items) > 0 and items[0][9] in [4, 8]
+
     @exit_after(180) # Should not remain stuck starting the multiprocessing clients beyond this time
     @Halo(text='  [+] Creating multiple processes for faster processing...', spinner='dots')
     def prepareToRunScan(menuOption,keyboardInterruptEvent, screenCounter, screenResultsCounter, stockDictPrimary,stockDictSecondary, items, executeOption,userPassedArgs):
@@ -394,8 +403,13 @@ class PKScanRunner:
             intradayFetcher = Intra_Day("SBINEQN") # This will initialise the cookies etc.
         except: # pragma: no cover
             pass
+        rsRatings = None
+        if rs_score_index > 0 and menuOption not in ["C"] and PKScanRunner.needsRSRatings(executeOption, items, userPassedArgs):
+            # Rate and rank the whole universe once, instead of per stock in the workers
+            rsRatings = PKRelativeStrength().ratings(stockDictPrimary, list(dict.fromkeys([item[13] for item in items])), rs_score_index)
         for consumer in consumers:
             consumer.intradayNSEFetcher = intradayFetcher
+            consumer.rsRatings = rsRatings
         PKScanRunner.startWorkers(consumers)
         return tasks_queue,results_queue,consumers,logging_queue
 
@@ -0,0 +1,69 @@
+"""
+    The MIT License (MIT)
+
+    Copyright (c) 2023 pkjmesra
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+
+"""
+import numpy as np
+import pandas as pd
+
+class PKStockView:
+    """
+    A stock's screening data (the newest-first frame from preprocessData) as
+    read-only, oldest-first arrays with NaN/inf taken as 0, the way the
+    validators clean it. Each column is converted once and then shared by all
+    the validators screening the stock, instead of every one of them copying,
+    cleaning and reversing the whole frame. Newest-first access is by index
+    arithmetic: at("Close") is the latest close, at("Close", 1) the one before.
+    """
+    def __init__(self, df):
+        self.df = df
+        self.numCandles = 0 if df is None else len(df)
+        self.columns = {}
+
+    def column(self, name):
+        values = self.columns.get(name)
+        if values is None:
+            values = np.asarray(self.df[name].to_numpy()[::-1], dtype=float)
+            values = np.ascontiguousarray(np.nan_to_num(values, nan=0.0, posinf=0.0, neginf=0.0))
+            values.flags.writeable = False
+            self.columns[name] = values
+        return values
+
+    def at(self, name, barsAgo=0):
+        if barsAgo < 0 or barsAgo >= self.numCandles:
+            raise IndexError(f"No candle {barsAgo} bars ago in {self.numCandles} candles")
+        return self.column(name)[self.numCandles - 1 - barsAgo]
+
+    def latest(self, name, count):
+        # The latest count values, oldest-first
+        return self.column(name)[max(self.numCandles - count, 0):]
+
+    def series(self, name):
+        # Oldest-first, for pktalib (which may be backed by pandas_ta)
+        return pd.Series(self.column(name), index=self.df.index[::-1], name=name)
+
+    def hasColumn(self, name):
+        return self.df is not None and name in self.df.columns
+
+    def isBullishCandle(self):
+        # Like ScreeningStatistics.getCandleType on the latest candle
+        return bool(self.at("Close") >= self.at("Open"))
@@ -0,0 +1,293 @@
+"""
+    The MIT License (MIT)
+
+    Copyright (c) 2023 pkjmesra
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+
+"""
+import heapq
+
+import numpy as np
+import pandas as pd
+
+from PKDevTools.classes.log import default_logger
+
+# Default trade settings (in %, except the holding period in candles): the
+# stop-loss and target from the entry fill, how long a trade is held at most,
+# the slippage on every fill and the brokerage (with taxes) on every side.
+DEFAULT_STOP_LOSS = 5
+DEFAULT_TARGET = 10
+DEFAULT_HOLDING_PERIOD = 10
+DEFAULT_SLIPPAGE = 0.1
+DEFAULT_BROKERAGE = 0.05
+# Starting capital of the equity curve and the money put in each trade. The
+# capital only pays for so many positions at a time, and the signals that
+# come when all of them are taken are skipped.
+DEFAULT_CAPITAL = 100000
+DEFAULT_POSITION_SIZE = 10000
+SETTING_KEYS = ["stopLoss", "target", "holdingPeriod", "slippage", "brokerage"]
+# Day numbers are below this for every date up to the year 2243, so the
+# (stock, day) pairs can be looked up as a single sorted key
+DAYS_PER_STOCK_KEY = 100000
+# The day of the padding candles after the candles of a stock
+PADDING_DAY = DAYS_PER_STOCK_KEY - 1
+
+class PKTradeSimulator:
+    """
+    Simulates trading the scan signals (the rows of a backtest, or the
+    results of a scan run some days ago) on the saved daily candles. A
+    trade is entered at the open of the candle after its signal and exits
+    at the stop-loss, the target or, failing both, at the close of the last
+    candle of its holding period. Every fill pays the slippage, and both
+    sides pay the brokerage. When the open gaps past the stop-loss, the
+    trade is filled at the open. When the open is already past the target,
+    the target is hit first. When the open is between the two and both are
+    hit in the same candle, the stop-loss is taken to have been hit first.
+    A trade whose holding period runs past the saved candles without either
+    being hit is still open. It is marked to the last close, and isn't part
+    of the realized P&L and the trade statistics.
+
+    The capital is put in positionSize at a time, so only so many trades
+    can be held together. The equity curve marks the held trades to market
+    at every close.
+
+    The candles of all the signalled stocks are put together in one set of
+    arrays, so that all the trades are found, filled and booked together,
+    without a loop over the signals (other than to take the positions).
+    """
+    def settingsFromOptions(simulateTrades):
+        # "5:10:10:0.1:0.05" -> stop-loss 5%, target 10%, held for at most
+        # 10 candles, 0.1% slippage and 0.05% brokerage. Left out (or empty)
+        # settings take their defaults. A stop-loss/target of 0 is not used.
+        settings = dict(zip(SETTING_KEYS, [DEFAULT_STOP_LOSS, DEFAULT_TARGET, DEFAULT_HOLDING_PERIOD, DEFAULT_SLIPPAGE, DEFAULT_BROKERAGE]))
+        values = str(simulateTrades or "").replace("\"", "").replace("'", "").split(":")
+        for key, value in zip(SETTING_KEYS, values):
+            try:
+                if len(value.strip()) > 0:
+                    settings[key] = max(0, float(value))
+            except ValueError:
+                default_logger().debug(f"Ignoring the trade simulation setting {key}={value}")
+        settings["holdingPeriod"] = max(1, int(settings["holdingPeriod"]))
+        return settings
+
+    def signalsFromResults(results_df):
+        # The (Stock, signal date) pairs of backtest rows or scan results,
+        # with the stock either as a column or as the index
+        if results_df is None or len(results_df) == 0 or "Date" not in results_df.columns:
+            return pd.DataFrame(columns=["Stock", "Date"])
+        stocks = results_df["Stock"] if "Stock" in results_df.columns else pd.Series(results_df.index, index=results_df.index)
+        dates = pd.to_datetime(results_df["Date"].astype(str).str.replace("/", "-"), errors="coerce")
+        signals = pd.DataFrame({"Stock": stocks.astype(str).to_numpy(), "Date": dates.to_numpy()})
+        return signals.dropna().reset_index(drop=True)
+
+    def tradingDays(index):
+        # Day numbers (days since 1970) of the candle timestamps, which are
+        # saved as datetimes, date strings or epoch seconds
+        if len(index) > 0 and isinstance(index[0], (int, float, np.number)):
+            timestamps = pd.DatetimeIndex(pd.to_datetime(np.asarray(index, dtype=float), unit="s"))
+        else:
+            timestamps = pd.DatetimeIndex(index)
+        if timestamps.tz is not None:
+            timestamps = timestamps.tz_localize(None)
+        return timestamps.values.astype("datetime64[D]").astype(np.int64)
+
+    def candleArrays(stockDict, stocks, padding):
+        # The days and OHLC of the stocks, one after another (oldest first), each
+        # followed by 'padding' NaN candles so that a holding period never runs
+        # into the next stock. Also the sorted (stock, day) keys of the candles.
+        codes, days, prices = [], [], []
+        for code, stock in enumerate(stocks):
+            try:
+                hostData = stockDict.get(stock)
+                if hostData is None or len(hostData.get("data", [])) == 0:
+                    continue
+                columns = list(hostData["columns"])
+                values = np.asarray(hostData["data"], dtype=float)[:, [columns.index(field) for field in ["Open", "High", "Low", "Close"]]]
+                stockDays = PKTradeSimulator.tradingDays(hostData["index"])
+                order = np.argsort(stockDays, kind="stable")
+                codes.append(np.full(len(order) + padding, code))
+                days.append(np.concatenate([stockDays[order], np.full(padding, PADDING_DAY)]))
+                prices.append(np.vstack([values[order], np.full((padding, 4), np.nan)]))
+            except KeyboardInterrupt: # pragma: no cover
+                raise KeyboardInterrupt
+            except Exception as e: # pragma: no cover
+                default_logger().debug(f"{stock}: {e}", exc_info=True)
+                continue
+        if len(prices) == 0:
+            return None, None, None
+        days = np.concatenate(days)
+        keys = np.concatenate(codes) * DAYS_PER_STOCK_KEY + days
+        return keys, days, np.vstack(prices)
+
+    def takenPositions(entryDays, exitDays, maxPositions):
+        # Whether each trade (in the order of their entry days) gets one of
+        # the maxPositions positions. A position is free again the day after
+        # its trade exits. Open trades (exit day None) hold theirs.
+        taken = np.zeros(len(entryDays), dtype=bool)
+        heldUntil = []
+        for trade in np.argsort(entryDays, kind="stable"):
+            while len(heldUntil) > 0 and heldUntil[0] < entryDays[trade]:
+                heapq.heappop(heldUntil)
+            if len(heldUntil) < maxPositions:
+                taken[trade] = True
+                heapq.heappush(heldUntil, np.inf if exitDays[trade] is None else exitDays[trade])
+        return taken
+
+    def simulate(signals, stockDict, settings, sellSignal=False, positionSize=DEFAULT_POSITION_SIZE, capital=DEFAULT_CAPITAL):
+        # One row per trade taken: its entry and exit (or the last close, for
+        # open trades), why it exited and its return after the costs. Also
+        # the daily equity curve and how many signals were skipped for want
+        # of a free position.
+        if signals is None or len(signals) == 0 or stockDict is None:
+            return None, None, 0
+        holdingPeriod = settings["holdingPeriod"]
+        stocks = list(dict.fromkeys(signals["Stock"]))
+        keys, days, prices = PKTradeSimulator.candleArrays(stockDict, stocks, holdingPeriod)
+        if keys is None:
+            return None, None, 0
+        stockCodes = pd.Index(stocks).get_indexer(signals["Stock"])
+        signalDays = signals["Date"].to_numpy().astype("datetime64[D]").astype(np.int64)
+        # The entry is the first candle of the stock after the signal day
+        entries = np.searchsorted(keys, stockCodes * DAYS_PER_STOCK_KEY + signalDays, side="right")
+        entries = np.minimum(entries, len(keys) - 1)
+        hasEntry = (keys[entries] // DAYS_PER_STOCK_KEY == stockCodes) & ~np.isnan(prices[entries, 0])
+        signals, entries = signals[hasEntry].reset_index(drop=True), entries[hasEntry]
+        if len(signals) == 0:
+            return None, None, 0
+        # (trades x holding period) candles of every trade
+        window = entries[:, None] + np.arange(holdingPeriod)
+        opens, highs, lows, closes = (prices[window, field] for field in range(4))
+        direction = -1 if sellSignal else 1
+        slippage, brokerage = settings["slippage"] / 100, settings["brokerage"] / 100
+        entryPrices = opens[:, 0] * (1 + direction * slippage)
+        stopPrices = entryPrices * (1 - direction * settings["stopLoss"] / 100)
+        targetPrices = entryPrices * (1 + direction * settings["target"] / 100)
+        with np.errstate(invalid="ignore"):
+            adverse, favourable = (lows, highs) if direction > 0 else (highs, lows)
+            stopHits = (direction * (adverse - stopPrices[:, None]) <= 0) if settings["stopLoss"] > 0 else np.zeros(window.shape, dtype=bool)
+            targetHits = (direction * (favourable - targetPrices[:, None]) >= 0) if settings["target"] > 0 else np.zeros(window.shape, dtype=bool)
+            # A candle that opens past the target has hit it before anything else
+            targetFirst = targetHits & (direction * (opens - targetPrices[:, None]) >= 0)
+        exitHits = stopHits | targetHits
+        hasHit = exitHits.any(axis=1)
+        # Without a hit, the trade exits at the last close it has in its
+        # holding period
+        finiteCloses = np.isfinite(closes)
+        lastCandles = np.where(finiteCloses.any(axis=1), holdingPeriod - 1 - finiteCloses[:, ::-1].argmax(axis=1), 0)
+        exitCandles = np.where(hasHit, exitHits.argmax(axis=1), lastCandles)
+        rows = np.arange(len(signals))
+        stopped = hasHit & stopHits[rows, exitCandles] & ~targetFirst[rows, exitCandles]
+        targeted = hasHit & ~stopped
+        # The holding period runs past the saved candles, so it's not over yet
+        isOpen = ~hasHit & (days[window[:, -1]] == PADDING_DAY)
+        exitOpens = opens[rows, exitCandles]
+        lastCloses = closes[rows, exitCandles]
+        # A gap past the stop-loss fills at the open
+        exitPrices = np.where(stopped, np.where(direction * (exitOpens - stopPrices) < 0, exitOpens, stopPrices),
+                              np.where(targeted, targetPrices, lastCloses))
+        # Open trades are marked to the last close, with only the entry costs
+        exitPrices = np.where(isOpen, lastCloses, exitPrices * (1 - direction * slippage))
+        costs = brokerage * (entryPrices + np.where(isOpen, 0, exitPrices))
+        returns = (direction * (exitPrices - entryPrices) - costs) * 100 / entryPrices
+        entryDays, exitDays = days[entries], days[entries + exitCandles]
+        taken = PKTradeSimulator.takenPositions(entryDays, [None if tradeIsOpen else day for tradeIsOpen, day in zip(isOpen, exitDays)], max(1, int(capital // positionSize)))
+        trades = pd.DataFrame({
+            "Stock": signals["Stock"].to_numpy(),
+            "Date": signals["Date"].dt.strftime("%Y-%m-%d").to_numpy(),
+            "Entry Date": entryDays.astype("datetime64[D]").astype(str),
+            "Entry": entryPrices.round(2),
+            "Exit Date": exitDays.astype("datetime64[D]").astype(str),
+            "Exit": exitPrices.round(2),
+            "Exit Reason": np.where(isOpen, "Open", np.where(stopped, "Stop-Loss", np.where(targeted, "Target", "Time"))),
+            "Candles": exitCandles + 1,
+            "Net%": returns.round(2),
+            "P&L": (positionSize * returns / 100).round(2),
+        })[taken].reset_index(drop=True)
+        # The P&L of each trade at every close it's held for (the closes
+        # carried over missing candles), and the realized P&L at its exit
+        takenRows = np.arange(len(trades))
+        shares = positionSize / entryPrices[taken]
+        candleIndices = np.where(finiteCloses[taken], np.arange(holdingPeriod), 0)
+        heldCloses = closes[taken][takenRows[:, None], np.maximum.accumulate(candleIndices, axis=1)]
+        pnlPath = direction * shares[:, None] * (heldCloses - entryPrices[taken, None]) - brokerage * positionSize
+        exitCandles = exitCandles[taken]
+        pnlPath[takenRows, exitCandles] = trades["P&L"].to_numpy()
+        held = np.arange(holdingPeriod) <= exitCandles[:, None]
+        pnlChanges = np.diff(np.where(np.isfinite(pnlPath), pnlPath, 0), axis=1, prepend=0)
+        curve = PKTradeSimulator.equityCurve(days[window[taken]][held], pnlChanges[held], capital=capital)
+        return trades, curve, int(len(taken) - taken.sum())
+
+    def equityCurve(heldDays, pnlChanges, capital=DEFAULT_CAPITAL):
+        # The capital with the trades marked to market at every close (from
+        # the change in the P&L of each trade on each day it's held), the
+        # positions held and the drawdown from the highest it has been
+        if len(heldDays) == 0:
+            return None
+        held = pd.DataFrame({"Date": heldDays, "P&L": pnlChanges}).groupby("Date", sort=True)
+        dailyPnL = held["P&L"].sum()
+        equity = capital + dailyPnL.cumsum()
+        peaks = np.maximum(equity.cummax(), capital)
+        curve = pd.DataFrame({
+            "Date": dailyPnL.index.to_numpy().astype("datetime64[D]").astype(str),
+            "Positions": held.size().to_numpy(),
+            "P&L": dailyPnL.round(2).to_numpy(),
+            "Equity": equity.round(2).to_numpy(),
+            "Drawdown%": ((equity / peaks - 1) * 100).round(2).to_numpy(),
+        })
+        return curve
+
+    def summary(trades, curve, capital=DEFAULT_CAPITAL, skipped=0):
+        # A row per statistic of the simulated trades. The trade statistics
+        # are of the closed trades, the equity ones include the open trades
+        # at their last close.
+        if trades is None or len(trades) == 0:
+            return None
+        openTrades = trades[trades["Exit Reason"] == "Open"]
+        trades = trades[trades["Exit Reason"] != "Open"]
+        returns = trades["Net%"].to_numpy()
+        profits, losses = trades.loc[trades["P&L"] > 0, "P&L"].sum(), -trades.loc[trades["P&L"] < 0, "P&L"].sum()
+        exitReasons = trades["Exit Reason"].value_counts()
+        statistics = {
+            "Trades": len(trades),
+            "Win%": (returns > 0).mean() * 100 if len(returns) > 0 else np.nan,
+            "Avg.Net%": returns.mean() if len(returns) > 0 else np.nan,
+            "Avg.Win%": returns[returns > 0].mean() if (returns > 0).any() else 0,
+            "Avg.Loss%": returns[returns <= 0].mean() if (returns <= 0).any() else 0,
+            "Profit Factor": profits / losses if losses > 0 else np.inf,
+            "Avg.Candles": trades["Candles"].mean() if len(trades) > 0 else np.nan,
+            "Stop-Loss Exits": exitReasons.get("Stop-Loss", 0),
+            "Target Exits": exitReasons.get("Target", 0),
+            "Time Exits": exitReasons.get("Time", 0),
+            "Net P&L": trades["P&L"].sum(),
+            "Open Trades": len(openTrades),
+            "Open P&L": openTrades["P&L"].sum(),
+            "Skipped Signals": skipped,
+            "Final Equity": curve["Equity"].iloc[-1],
+            "Return%": (curve["Equity"].iloc[-1] / capital - 1) * 100,
+            "MaxDD%": curve["Drawdown%"].min(),
+        }
+        return pd.DataFrame({"Statistic": list(statistics.keys()), "Value": np.round(np.asarray(list(statistics.values()), dtype=float), 2)})
+
+    def forResults(results_df, stockDict, simulateTrades, sellSignal=False):
+        # The trades, the equity curve and the summary of simulating the
+        # signals of backtest rows or scan results with the given settings
+        settings = PKTradeSimulator.settingsFromOptions(simulateTrades)
+        trades, curve, skipped = PKTradeSimulator.simulate(PKTradeSimulator.signalsFromResults(results_df), stockDict, settings, sellSignal=sellSignal)
+        return trades, curve, PKTradeSimulator.summary(trades, curve, skipped=skipped)
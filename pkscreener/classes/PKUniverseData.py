@@ -0,0 +1,220 @@
+"""
+    The MIT License (MIT)
+
+    Copyright (c) 2023 pkjmesra
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+
+"""
+import numpy as np
+import pandas as pd
+
+from PKDevTools.classes.log import default_logger
+
+# Price/volume fields that every scan needs. Additional fields are left
+# in the per-stock data and are not part of the universe arrays.
+UNIVERSE_FIELDS = ["Open", "High", "Low", "Close", "Volume"]
+
+class PKUniverseData:
+    """
+    Holds the whole scan universe as aligned NumPy arrays of shape (symbols x time)
+    per field, i.e. a (symbols x time x fields) tensor. Each symbol's candles are
+    right-aligned so that the most recent candle of every symbol is in the last
+    column and the time axis is oldest-first (as indicators need). Symbols with a
+    shorter history are NaN-padded on the left.
+
+    Indicators are computed for all symbols at once and cached, so that every
+    consumer (vectorized scans, expression scans etc.) shares the same values.
+    """
+    def __init__(self, symbols, fields, lengths, index=None):
+        self.symbols = list(symbols)
+        self.fields = fields
+        self.lengths = np.asarray(lengths, dtype=np.int64)
+        self.index = index if index is not None else {}
+        self.numSymbols = len(self.symbols)
+        self.numCandles = 0 if len(fields) == 0 else next(iter(fields.values())).shape[1]
+        # First valid (non-padded) column for each symbol
+        self.starts = self.numCandles - self.lengths
+        self.indicatorCache = {}
+
+    def fromStockDict(stockDict, stockCodes=None, maxCandles=None):
+        # stockDict holds the data for each stock in the pandas "split" format.
+        symbols = []
+        arrays = []
+        indices = {}
+        stockCodes = list(stockDict.keys()) if stockCodes is None else stockCodes
+        for stock in stockCodes:
+            try:
+                hostData = stockDict.get(stock)
+                if hostData is None or "data" not in hostData.keys() or len(hostData["data"]) == 0:
+                    continue
+                df = pd.DataFrame(hostData["data"], columns=hostData["columns"], index=hostData["index"])
+                if any(field not in df.columns for field in UNIVERSE_FIELDS):
+                    continue
+                df = df[UNIVERSE_FIELDS].astype(float).replace([np.inf, -np.inf], np.nan).dropna(how="all")
+                if df.empty:
+                    continue
+                if maxCandles is not None:
+                    df = df.tail(maxCandles)
+                symbols.append(stock)
+                arrays.append(df.to_numpy())
+                indices[stock] = df.index
+            except KeyboardInterrupt: # pragma: no cover
+                raise KeyboardInterrupt
+            except Exception as e: # pragma: no cover
+                default_logger().debug(f"{stock}: {e}", exc_info=True)
+                continue
+        lengths = [len(arr) for arr in arrays]
+        numCandles = max(lengths) if len(lengths) > 0 else 0
+        tensor = np.full((len(symbols), numCandles, len(UNIVERSE_FIELDS)), np.nan)
+        for i, arr in enumerate(arrays):
+            tensor[i, numCandles - len(arr):, :] = arr
+        fields = {field: tensor[:, :, j] for j, field in enumerate(UNIVERSE_FIELDS)}
+        return PKUniverseData(symbols, fields, lengths, index=indices)
+
+    def fromDataFrame(df, symbol="Stock"):
+        # A single-stock universe from an oldest-first OHLCV frame, so that the
+        # same vectorized code can also be evaluated inside the per-stock workers.
+        return PKUniverseData.fromStockDict({symbol: df.to_dict("split")}, stockCodes=[symbol])
+
+    def field(self, name):
+        return self.fields[name]
+
+    def validMask(self):
+        columns = np.arange(self.numCandles)
+        return columns[None, :] >= self.starts[:, None]
+
+    def sanitized(self, name):
+        # The same as the per-stock validators' fillna(0), but only within each
+        # symbol's own history. Padding stays NaN.
+        key = ("sanitized", name)
+        if key not in self.indicatorCache:
+            values = np.nan_to_num(self.fields[name], nan=0.0, posinf=0.0, neginf=0.0)
+            values[~self.validMask()] = np.nan
+            self.indicatorCache[key] = values
+        return self.indicatorCache[key]
+
+    def latest(self, values, barsAgo=0):
+        # Value at barsAgo candles before the most recent one, for all symbols
+        if barsAgo >= self.numCandles:
+            return np.full(self.numSymbols, np.nan)
+        return values[:, self.numCandles - 1 - barsAgo]
+
+    def recentWindow(self, values, bars, skipRecent=0):
+        # The most recent 'bars' candles (after skipping 'skipRecent' candles)
+        end = self.numCandles - skipRecent
+        start = max(0, end - bars)
+        return values[:, start:end]
+
+    def sma(self, name, period):
+        key = ("sma", name, period)
+        if key not in self.indicatorCache:
+            self.indicatorCache[key] = PKUniverseData.rollingMean(self.fields[name], period)
+        return self.indicatorCache[key]
+
+    def rsi(self, period=14, name="Close"):
+        key = ("rsi", name, period)
+        if key not in self.indicatorCache:
+            self.indicatorCache[key] = PKUniverseData.wilderRSI(self.fields[name], self.starts, period)
+        return self.indicatorCache[key]
+
+    def ema(self, name, period):
+        key = ("ema", name, period)
+        if key not in self.indicatorCache:
+            self.indicatorCache[key] = PKUniverseData.exponentialMean(self.fields[name], self.starts, period)
+        return self.indicatorCache[key]
+
+    def firstValidIndex(values):
+        # Column of the first non-NaN value in each row (numCandles if none)
+        isValid = ~np.isnan(values)
+        return np.where(isValid.any(axis=1), isValid.argmax(axis=1), values.shape[1])
+
+    def rollingMean(values, period):
+        # Simple moving average along the time axis. Any window touching a NaN
+        # (including the left padding) is NaN, which is what TA-Lib does for the
+        # first (period-1) candles of every series.
+        result = np.full(values.shape, np.nan)
+        if period <= 0 or values.shape[1] < period:
+            return result
+        isNan = np.isnan(values)
+        cumsum = np.cumsum(np.where(isNan, 0.0, values), axis=1)
+        cumNan = np.cumsum(isNan, axis=1)
+        windowSum = cumsum[:, period - 1:].copy()
+        windowSum[:, 1:] -= cumsum[:, :-period]
+        windowNan = cumNan[:, period - 1:].copy()
+        windowNan[:, 1:] -= cumNan[:, :-period]
+        result[:, period - 1:] = np.where(windowNan == 0, windowSum / period, np.nan)
+        return result
+
+    def wilderRSI(values, starts, period=14):
+        # Wilder's RSI, seeded (like TA-Lib) with the simple average of the first
+        # 'period' gains/losses of each series and smoothed thereafter. The time
+        # axis is walked once while all symbols are updated together.
+        numSymbols, numCandles = values.shape
+        result = np.full(values.shape, np.nan)
+        if numCandles <= period:
+            return result
+        change = np.diff(values, axis=1, prepend=np.nan)
+        gains = np.where(change > 0, change, 0.0)
+        losses = np.where(change < 0, -change, 0.0)
+        avgGain = np.zeros(numSymbols)
+        avgLoss = np.zeros(numSymbols)
+        seedSumGain = np.zeros(numSymbols)
+        seedSumLoss = np.zeros(numSymbols)
+        for t in range(1, numCandles):
+            elapsed = t - starts
+            seeding = (elapsed >= 1) & (elapsed <= period)
+            seedSumGain = np.where(seeding, seedSumGain + gains[:, t], seedSumGain)
+            seedSumLoss = np.where(seeding, seedSumLoss + losses[:, t], seedSumLoss)
+            seeded = elapsed == period
+            avgGain = np.where(seeded, seedSumGain / period, avgGain)
+            avgLoss = np.where(seeded, seedSumLoss / period, avgLoss)
+            smoothing = elapsed > period
+            avgGain = np.where(smoothing, (avgGain * (period - 1) + gains[:, t]) / period, avgGain)
+            avgLoss = np.where(smoothing, (avgLoss * (period - 1) + losses[:, t]) / period, avgLoss)
+            total = avgGain + avgLoss
+            with np.errstate(divide="ignore", invalid="ignore"):
+                current = np.where(total > 0, 100 * avgGain / total, 0.0)
+            result[:, t] = np.where(elapsed >= period, current, np.nan)
+        return result
+
+    def exponentialMean(values, starts, period):
+        # EMA seeded (like TA-Lib) with the simple average of the first 'period'
+        # values of each series.
+        numSymbols, numCandles = values.shape
+        result = np.full(values.shape, np.nan)
+        if period <= 0 or numCandles < period:
+            return result
+        alpha = 2.0 / (period + 1)
+        seed = PKUniverseData.rollingMean(values, period)
+        current = np.full(numSymbols, np.nan)
+        for t in range(numCandles):
+            elapsed = t - starts
+            current = np.where(elapsed == period - 1, seed[:, t], current + alpha * (values[:, t] - current))
+            result[:, t] = np.where(elapsed >= period - 1, current, np.nan)
+        return result
+
+    def rollingExtreme(values, period, highest=True):
+        # Rolling max/min along the time axis. Windows touching a NaN are NaN.
+        result = np.full(values.shape, np.nan)
+        if period <= 0 or values.shape[1] < period:
+            return result
+        windows = np.lib.stride_tricks.sliding_window_view(values, period, axis=1)
+        result[:, period - 1:] = windows.max(axis=2) if highest else windows.min(axis=2)
+        return result
@@ -0,0 +1,227 @@
+"""
+    The MIT License (MIT)
+
+    Copyright (c) 2023 pkjmesra
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+
+"""
+import numpy as np
+
+from PKDevTools.classes.log import default_logger
+
+from pkscreener.classes.PKScanExpression import PKScanExpression
+from pkscreener.classes.PKUniverseData import PKUniverseData
+
+# Scan (execute) options whose primary condition is a plain array predicate.
+# For these options, the whole universe is evaluated at once and only the
+# matching stocks are sent to the (per-stock) StockScreener, which then fills
+# in all the other display columns. All other options fall back to the
+# per-stock path for every stock.
+VECTORIZED_EXECUTE_OPTIONS = [2, 5, 7, 9, 14, 15, 16, 17, 44]
+# Chart patterns (execute option 7) that are pre-filtered for the whole universe
+# with the necessary conditions of their per-stock validators (4: VCP, 8: VCP as
+# per Mark Minervini). The per-stock path still decides on the pattern itself.
+VECTORIZED_CHART_PATTERNS = [4, 8]
+# The per-stock path evaluates values rounded/truncated for display. The
+# vectorized predicates are therefore kept marginally permissive so that
+# floating point noise never drops a stock the per-stock path would accept.
+PREDICATE_TOLERANCE = 1e-6
+
+class PKVectorScanEngine:
+    def __init__(self, configManager):
+        self.configManager = configManager
+
+    def canVectorize(self, menuOption, executeOption, userArgs=None, newlyListedOnly=False, respChartPattern=None):
+        configManager = self.configManager
+        if menuOption not in ["X"] or newlyListedOnly:
+            return False
+        if executeOption not in VECTORIZED_EXECUTE_OPTIONS:
+            return False
+        if userArgs is not None and (userArgs.backtestdaysago is not None or userArgs.runintradayanalysis):
+            return False
+        # Candles other than daily ones are resampled in the per-stock path
+        if configManager.candleDurationFrequency != "d" or configManager.isIntradayConfig():
+            return False
+        if executeOption == 7 and respChartPattern not in VECTORIZED_CHART_PATTERNS:
+            return False
+        if executeOption == 44 and not PKScanExpression.isValid(getattr(userArgs, "scanexpression", None)):
+            return False
+        if executeOption == 5 and configManager.calculatersiintraday:
+            # Intraday RSI also qualifies a stock for the RSI scan
+            return False
+        return True
+
+    def screen(self, universe, executeOption, volumeRatio=0, minRSI=0, maxRSI=100, exchangeName="INDIA", scanExpression=None, respChartPattern=None):
+        # Returns a boolean mask over universe.symbols
+        if universe.numSymbols == 0:
+            return np.zeros(0, dtype=bool)
+        volumeRatio = self.configManager.volumeRatio if volumeRatio <= 0 else volumeRatio
+        mask = self.basicChecks(universe, executeOption, exchangeName)
+        if executeOption == 2:
+            mask &= self.hasVolumeRatio(universe, volumeRatio) & self.hasBrokenOut(universe)
+        elif executeOption == 5:
+            mask &= self.hasRSIInRange(universe, minRSI, maxRSI)
+        elif executeOption == 9:
+            mask &= self.hasVolumeRatio(universe, volumeRatio)
+        elif executeOption == 14:
+            mask &= self.isNR4Day(universe)
+        elif executeOption == 15:
+            mask &= self.is52WeekLowBreakout(universe)
+        elif executeOption == 16:
+            mask &= self.is10DaysLowBreakout(universe)
+        elif executeOption == 17:
+            mask &= self.is52WeekHighBreakout(universe)
+        elif executeOption == 44:
+            mask &= PKScanExpression.compile(scanExpression).evaluate(universe)
+        elif executeOption == 7:
+            mask &= self.mayFormVCP(universe) if respChartPattern == 4 else self.mayFormMinerviniVCP(universe)
+        return mask
+
+    def filterItems(self, items, stockDict, executeOption, volumeRatio=0, minRSI=0, maxRSI=100, exchangeName="INDIA", scanExpression=None, respChartPattern=None):
+        # items are the task tuples prepared by PKScanRunner.addStocksToItemList
+        # with the stock code at position 13.
+        try:
+            stockCodes = list(dict.fromkeys([item[13] for item in items]))
+            universe = PKUniverseData.fromStockDict(stockDict, stockCodes)
+            mask = self.screen(universe, executeOption, volumeRatio=volumeRatio, minRSI=minRSI, maxRSI=maxRSI, exchangeName=exchangeName, scanExpression=scanExpression, respChartPattern=respChartPattern)
+            eligible = set(np.asarray(universe.symbols)[mask])
+            # Stocks that could not be loaded into the universe still go through the per-stock path
+            eligible.update(set(stockCodes) - set(universe.symbols))
+            return [item for item in items if item[13] in eligible]
+        except KeyboardInterrupt: # pragma: no cover
+            raise KeyboardInterrupt
+        except Exception as e: # pragma: no cover
+            default_logger().debug(e, exc_info=True)
+            return items
+
+    def basicChecks(self, universe, executeOption, exchangeName="INDIA"):
+        # Mirrors StockScreener.performBasicLTPChecks and performBasicVolumeChecks
+        configManager = self.configManager
+        close = universe.sanitized("Close")
+        ltp = np.round(universe.latest(close), 2)
+        minLTP = configManager.minLTP if exchangeName == "INDIA" else configManager.minLTP/80
+        mask = (ltp >= minLTP - PREDICATE_TOLERANCE) & (ltp <= configManager.maxLTP + PREDICATE_TOLERANCE)
+        if configManager.minimumChangePercentage != 0:
+            previousClose = universe.latest(close, 1)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                pctChange = np.where(previousClose != 0, (universe.latest(close) - previousClose) * 100 / previousClose, 0)
+            mask &= np.round(pctChange, 1) >= configManager.minimumChangePercentage - PREDICATE_TOLERANCE
+        if configManager.stageTwo and executeOption > 0:
+            yearlyCloses = universe.recentWindow(close, 250)
+            yearlyLow = np.nanmin(yearlyCloses, axis=1)
+            yearlyHigh = np.nanmax(yearlyCloses, axis=1)
+            notStageTwo = (universe.lengths > 250) & (ltp < 2 * yearlyLow - PREDICATE_TOLERANCE) & (ltp < 0.75 * yearlyHigh - PREDICATE_TOLERANCE)
+            mask &= ~notStageTwo
+        if executeOption > 0:
+            minVolume = configManager.minVolume / (100 if configManager.isIntradayConfig() else 1)
+            volume = universe.latest(universe.sanitized("Volume"))
+            volMA = np.nan_to_num(universe.latest(universe.sma("Volume", 20)))
+            mask &= (volMA >= minVolume - PREDICATE_TOLERANCE) | (volume >= minVolume - PREDICATE_TOLERANCE)
+        return mask
+
+    def hasVolumeRatio(self, universe, volumeRatio):
+        # Mirrors ScreeningStatistics.validateVolume
+        volume = universe.latest(universe.sanitized("Volume"))
+        volMA = np.nan_to_num(universe.latest(universe.sma("Volume", 20)))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = np.where(volMA != 0, volume / volMA, 0)
+        return (volMA != 0) & np.isfinite(ratio) & (np.round(ratio, 2) >= volumeRatio - PREDICATE_TOLERANCE)
+
+    def hasRSIInRange(self, universe, minRSI, maxRSI):
+        # Mirrors ScreeningStatistics.validateRSI when there's no intraday RSI
+        rsi = np.trunc(np.nan_to_num(universe.latest(universe.rsi(14))))
+        return (rsi > 0) & (rsi >= minRSI) & (rsi <= maxRSI)
+
+    def hasBrokenOut(self, universe):
+        # Mirrors ScreeningStatistics.findBreakoutValue(alreadyBrokenout=True)
+        # over the trimmed (daysToLookback) data.
+        daysToLookback = self.configManager.effectiveDaysToLookback
+        high = universe.recentWindow(universe.sanitized("High"), daysToLookback - 1, skipRecent=1)
+        close = universe.recentWindow(universe.sanitized("Close"), daysToLookback - 1, skipRecent=1)
+        with np.errstate(invalid="ignore"):
+            maxHigh = np.round(np.nanmax(high, axis=1), 2)
+            maxClose = np.round(np.nanmax(close, axis=1), 2)
+            recentClose = np.round(universe.latest(universe.sanitized("Close")), 2)
+            recentOpen = universe.latest(universe.sanitized("Open"))
+            higherShadows = np.sum(high > maxClose[:, None], axis=1)
+            nearResistance = (maxHigh - maxClose) <= (maxHigh * 2 / 100)
+            withShadows = np.where(higherShadows > 0, daysToLookback / np.maximum(higherShadows, 1) <= 3, False)
+            breakoutLevel = np.where((maxHigh > maxClose) & ~nearResistance & withShadows, maxHigh, maxClose)
+            brokenOut = recentClose >= breakoutLevel - PREDICATE_TOLERANCE
+        return ~np.isnan(maxHigh) & ~np.isnan(maxClose) & brokenOut & (universe.latest(universe.sanitized("Close")) >= recentOpen)
+
+    def is52WeekHighBreakout(self, universe):
+        # Mirrors ScreeningStatistics.find52WeekHighBreakout
+        high = universe.sanitized("High")
+        return universe.latest(high) >= np.nanmax(universe.recentWindow(high, 250), axis=1) - PREDICATE_TOLERANCE
+
+    def is52WeekLowBreakout(self, universe):
+        # Mirrors ScreeningStatistics.find52WeekLowBreakout
+        low = universe.sanitized("Low")
+        return universe.latest(low) <= np.nanmin(universe.recentWindow(low, 250), axis=1) + PREDICATE_TOLERANCE
+
+    def is10DaysLowBreakout(self, universe):
+        # Mirrors ScreeningStatistics.find10DaysLowBreakout
+        low = universe.sanitized("Low")
+        last1WeekLow = np.nanmin(universe.recentWindow(low, 5), axis=1)
+        previousWeekLow = np.nanmin(universe.recentWindow(low, 5, skipRecent=5), axis=1)
+        return (universe.latest(low) <= np.minimum(previousWeekLow, last1WeekLow) + PREDICATE_TOLERANCE) & \
+            (last1WeekLow <= previousWeekLow + PREDICATE_TOLERANCE)
+
+    def isNR4Day(self, universe):
+        # Mirrors ScreeningStatistics.findNR4Day, including its check on the
+        # volume of the oldest candle (df.tail(1) of the newest-first data).
+        volume = universe.field("Volume")
+        oldestVolume = volume[np.arange(universe.numSymbols), np.minimum(universe.starts, universe.numCandles - 1)]
+        high = universe.sanitized("High")
+        low = universe.sanitized("Low")
+        candleRange = high - low
+        recentRange = universe.latest(candleRange)
+        mask = np.nan_to_num(oldestVolume) > 50000
+        for barsAgo in range(1, 5):
+            mask &= recentRange < universe.latest(candleRange, barsAgo) + PREDICATE_TOLERANCE
+        sma10 = universe.latest(PKUniverseData.rollingMean(universe.sanitized("Close"), 10))
+        sma50 = universe.latest(PKUniverseData.rollingMean(universe.sanitized("Close"), 50))
+        sma200 = universe.latest(PKUniverseData.rollingMean(universe.sanitized("Close"), 200))
+        mask &= (sma10 > sma50 - PREDICATE_TOLERANCE) & (sma50 > sma200 - PREDICATE_TOLERANCE)
+        return mask
+
+    def mayFormVCP(self, universe):
+        # Necessary conditions of ScreeningStatistics.validateVCP: the latest close
+        # must be below the highest recent top (which can't be above the all time
+        # high) and, depending on the config, near the all time high and above
+        # the 20/50 EMAs. Stocks without enough data to tell are kept.
+        configManager = self.configManager
+        close = universe.latest(universe.sanitized("Close"))
+        allTimeHigh = np.nanmax(universe.sanitized("High"), axis=1)
+        mask = close < np.round(allTimeHigh, 1) + PREDICATE_TOLERANCE
+        if configManager.enableAdditionalVCPFilters:
+            mask &= close >= allTimeHigh - allTimeHigh * float(configManager.vcpRangePercentageFromTop)/100 - PREDICATE_TOLERANCE
+        if configManager.enableAdditionalVCPEMAFilters:
+            recentClose = universe.latest(universe.field("Close"))
+            for period in [20, 50]:
+                mask &= ~(recentClose < universe.latest(universe.ema("Close", period)) - PREDICATE_TOLERANCE)
+        return mask
+
+    def mayFormMinerviniVCP(self, universe):
+        # Necessary (daily candle) conditions of ScreeningStatistics.validateVCPMarkMinervini
+        recentClose = universe.latest(universe.field("Close"))
+        sma50 = universe.latest(universe.sma("Close", 50))
+        return ~(recentClose <= 10 + PREDICATE_TOLERANCE) & ~(recentClose <= sma50 - PREDICATE_TOLERANCE)
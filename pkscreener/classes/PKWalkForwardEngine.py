@@ -0,0 +1,107 @@
+"""
+    The MIT License (MIT)
+
+    Copyright (c) 2023 pkjmesra
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+
+"""
+from collections import OrderedDict
+
+import numpy as np
+
+from PKDevTools.classes.Singleton import SingletonType, SingletonMixin
+
+from pkscreener.classes.PKIndicatorPlan import INDICATORS, RESULT_INDICATORS
+
+# Stocks whose full-history pass is kept per process. The backtest items are
+# queued stock after stock, so only the few stocks being screened at a time
+# need to be kept.
+WALK_FORWARD_CACHE_SIZE = 16
+
+class PKWalkForwardPass:
+    """
+    The indicators of a stock computed once over its full history. All the
+    indicators are causal (a value depends only on the candles up to it), so
+    the preprocessed data as of n candles ago is just the full-history
+    result without its latest n candles.
+    """
+    def __init__(self, screener, data, indicators=None):
+        self.indicators = indicators
+        raw = data.replace([np.inf, -np.inf], np.nan)
+        # Number of candles left after preprocessData's dropna(how="all") for
+        # each number of (oldest-first) candles of the data
+        self.keptCounts = np.cumsum(~raw.isna().all(axis=1).to_numpy())
+        self.numCandles = len(data)
+        self.fullData, _ = screener.preprocessData(data, daysToLookback=1, indicators=indicators)
+
+    def dataForDay(self, backtestDuration, daysToLookback):
+        # The same as preprocessData(data.head(len(data) - backtestDuration))
+        numCandles = self.numCandles - backtestDuration
+        kept = int(self.keptCounts[numCandles - 1]) if numCandles > 0 else 0
+        fullData = self.fullData.iloc[len(self.fullData) - kept:].copy()
+        return fullData, fullData.head(daysToLookback)
+
+class PKWalkForwardEngine(SingletonMixin, metaclass=SingletonType):
+    """
+    Backtests screen a stock once for every day in the past. Instead of
+    preprocessing the data as of each of those days, the indicators are
+    computed once over the full history (per stock, per process) and every
+    day in the past gets a slice of them. The scan itself then runs on each
+    day's slice exactly as it did before.
+    """
+    def __init__(self):
+        super(PKWalkForwardEngine, self).__init__()
+        self.passes = OrderedDict()
+
+    def fingerprint(data, useEMA):
+        if len(data) == 0:
+            return None
+        return (len(data), str(data.index[0]), str(data.index[-1]), tuple(data.columns), float(data["Close"].iloc[-1]), useEMA)
+
+    def forStock(self, stock, screener, data, indicators=None):
+        # Backtests complete the result indicators for almost every stock
+        # anyway, so the single pass computes them up front.
+        indicators = frozenset(INDICATORS if indicators is None else indicators) | RESULT_INDICATORS
+        key = PKWalkForwardEngine.fingerprint(data, screener.configManager.useEMA)
+        walkForwardPass = self.passes.get(stock)
+        if walkForwardPass is None or walkForwardPass[0] != key:
+            walkForwardPass = (key, PKWalkForwardPass(screener, data, indicators=indicators))
+        elif not indicators.issubset(walkForwardPass[1].indicators):
+            # A pass with more indicators also serves the scans that need
+            # fewer of them (like the other strategies of a multi-strategy
+            # backtest), so the pass grows to have both.
+            walkForwardPass = (key, PKWalkForwardPass(screener, data, indicators=indicators | walkForwardPass[1].indicators))
+        self.passes[stock] = walkForwardPass
+        self.passes.move_to_end(stock)
+        while len(self.passes) > WALK_FORWARD_CACHE_SIZE:
+            self.passes.popitem(last=False)
+        return walkForwardPass[1]
+
+    def preprocessedDataForDay(self, stock, screener, data, backtestDuration, daysToLookback, indicators=None):
+        return self.forStock(stock, screener, data, indicators=indicators).dataForDay(backtestDuration, daysToLookback)
+
+    def orderByStock(items, stockIndex=13):
+        # Queues all the days of a stock one after another (keeping the order
+        # of the stocks and of the days for each stock), so that the workers
+        # can screen them from the same full-history pass.
+        positions = {}
+        for item in items:
+            positions.setdefault(item[stockIndex], len(positions))
+        return sorted(items, key=lambda item: positions[item[stockIndex]])
@@ -306,6 +306,56 @@ class pktalib:
     def lowest(self, df,columnName, timeperiod):
         return df.rolling(timeperiod, min_periods=1)[columnName].min()
     
+    @classmethod
+    def ATRTrailingStop(self, close, nLoss, initialStop=0.0):
+        # The ATR trailing stop recurrence (UT Bot). Each stop depends on the
+        # previous one, so the series is walked once over plain floats instead
+        # of reading/writing the dataframe cell by cell.
+        close = np.asarray(close, dtype=float).tolist()
+        nLoss = np.asarray(nLoss, dtype=float).tolist()
+        if len(close) == 0:
+            return np.array([], dtype=float)
+        stops = [initialStop] * len(close)
+        prevStop = initialStop
+        prevClose = close[0]
+        for i in range(1, len(close)):
+            currentClose = close[i]
+            if currentClose > prevStop and prevClose > prevStop:
+                prevStop = max(prevStop, currentClose - nLoss[i])
+            elif currentClose < prevStop and prevClose < prevStop:
+                prevStop = min(prevStop, currentClose + nLoss[i])
+            elif currentClose > prevStop:
+                prevStop = currentClose - nLoss[i]
+            else:
+                prevStop = currentClose + nLoss[i]
+            stops[i] = prevStop
+            prevClose = currentClose
+        return np.array(stops)
+
+    @classmethod
+    def crossedAbove(self, first, second):
+        # True where 'first' moves above 'second' after having been below it,
+        # the same as vectorbt's crossed_above. Equal values in between do
+        # not break a cross, NaN values do.
+        first = np.asarray(first, dtype=float)
+        second = np.asarray(second, dtype=float)
+        with np.errstate(invalid="ignore"):
+            above = first > second
+            below = first < second
+        if len(first) == 0:
+            return above
+        isNan = np.isnan(first) | np.isnan(second)
+        # Index of the latest bar that was either below or NaN
+        lastEvent = np.maximum.accumulate(np.where(below | isNan, np.arange(len(first)), -1))
+        wasBelow = (lastEvent >= 0) & below[np.maximum(lastEvent, 0)]
+        crossed = np.zeros(len(first), dtype=bool)
+        crossed[1:] = above[1:] & ~above[:-1] & wasBelow[:-1]
+        return crossed
+
+    @classmethod
+    def crossedBelow(self, first, second):
+        return pktalib.crossedAbove(-np.asarray(first, dtype=float), -np.asarray(second, dtype=float))
+
     @classmethod
     def RVM(self, high, low, close, timeperiod):
         # Aligning the series
@@ -22,6 +22,8 @@
     SOFTWARE.
 
 """
+import datetime
+
 import pandas as pd
 import numpy as np
 from PKDevTools.classes.PKDateUtilities import PKDateUtilities
@@ -53,6 +55,34 @@ class PortfolioSecurity:
                 "Action": self.action, "Investment": self.investment, "RunningTotal": 0, 
                 "Growth": self.growth, "Profits" : 0}
 
+class PortfolioTradingCalendar(SingletonMixin, metaclass=SingletonType):
+    """
+    The trading dates n trading days after a date, as PKDateUtilities.nextTradingDate
+    gives them, looked up from a table. Each trading day is stepped over
+    (with the holiday/weekday checks) only once, however many securities and
+    periods fall on or after it.
+    """
+    def __init__(self):
+        super(PortfolioTradingCalendar, self).__init__()
+        # date -> the next trading date after it
+        self.nextTradingDates = {}
+        # (date, days) -> the trading date (string) that many trading days later
+        self.offsets = {}
+
+    def nextTradingDate(self, date, days=1):
+        key = (date, days)
+        if key not in self.offsets:
+            if days < 1:
+                raise ValueError(f"No trading date {days} days after {date}")
+            day = PKDateUtilities.dateFromYmdString(date) if isinstance(date, str) else date
+            day = day.date() if isinstance(day, datetime.datetime) else day
+            for _ in range(days):
+                if day not in self.nextTradingDates:
+                    self.nextTradingDates[day] = PKDateUtilities.nextTradingDate(day, days=1)
+                day = self.nextTradingDates[day]
+            self.offsets[key] = day.strftime("%Y-%m-%d")
+        return self.offsets[key]
+
 class Portfolio(PKScheduledTaskProgress):
     def __init__(self, name):
         super(Portfolio, self).__init__()
@@ -82,30 +112,46 @@ class Portfolio(PKScheduledTaskProgress):
             taskId = task.taskId
             if taskId > 0:
                 self.tasksDict[taskId] = task
-        xray_df = df.copy()
-        df_grouped = xray_df.groupby("Stock")
+        # Only the first row of each stock is traded. Its prices for all the
+        # periods are looked up once, as arrays over the stocks (in the order
+        # of groupby("Stock")), and only the trades go through the ledger.
+        stockGroups = df.groupby("Stock")
+        groupCodes = stockGroups.ngroup().to_numpy()
+        groupedRows = np.flatnonzero(groupCodes >= 0)
+        _, firstIndices = np.unique(groupCodes[groupedRows], return_index=True)
+        firstRows = groupedRows[firstIndices]
+        stocks = df["Stock"].to_numpy()[firstRows]
+        dates = df["Date"].to_numpy()[firstRows]
+        ltp = df["LTP"].astype(float).fillna(0).to_numpy()[firstRows]
+        tradingCalendar = PortfolioTradingCalendar()
         periodCounter = -1
         task.progress = 0
         for period in periods:
             periodCounter += 1
-            if f"LTP{period}" not in xray_df.columns:
+            if f"LTP{period}" not in df.columns:
                 continue
-            for stock, df_group in df_grouped:
-                df_group["LTP"] = df_group["LTP"].astype(float).fillna(0)
-                df_group[f"LTP{period}"] = df_group[f"LTP{period}"].astype(float).fillna(0)
-                df_group[f"Growth{period}"] = df_group[f"Growth{period}"].astype(float).fillna(0)
-                if df_group.iloc[0][f"LTP{period}"] == 0 or df_group.iloc[0][f"LTP"] == 0:
-                    continue
-                task.total = len(periods) * len(df_grouped)
-                task.progress += 1
-                self.updateProgress(task.taskId)
+            ltpForPeriod = df[f"LTP{period}"].astype(float).fillna(0).to_numpy()[firstRows]
+            tradedStocks = np.flatnonzero((ltpForPeriod != 0) & (ltp != 0))
+            if len(tradedStocks) == 0:
+                continue
+            task.total = len(periods) * len(stocks)
+            task.progress += len(tradedStocks)
+            self.updateProgress(task.taskId)
+            previousPeriod = periods[periodCounter-1]
+            if periodCounter == 0:
+                previousLTP = ltp
+            elif f"LTP{previousPeriod}" in df.columns:
+                previousLTP = df[f"LTP{previousPeriod}"].to_numpy()[firstRows].astype(float)
+            else:
+                continue
+            priceRises = np.round(ltpForPeriod - previousLTP, 2)
+            for index in tradedStocks:
+                stock = stocks[index]
                 security = PortfolioSecurity(stock)
-                security.ltp = df_group.iloc[0]["LTP"] if not self.hasSecurity(stock) else df_group.iloc[0][f"LTP{period}"]
-                previousPeriod = periods[periodCounter-1]
+                security.ltp = ltp[index] if not self.hasSecurity(stock) else ltpForPeriod[index]
+                priceRise = priceRises[index]
                 try:
-                    priceRise = round(df_group.iloc[0][f"LTP{period}"] - df_group.iloc[0]["LTP" if periodCounter == 0 else f"LTP{previousPeriod}"],2)
-                    growth = df_group.iloc[0][f"Growth{period}"]
-                    security.date = df_group.iloc[0]["Date"] if periodCounter == 0 else PKDateUtilities.nextTradingDate(df_group.iloc[0]["Date"], days=period).strftime("%Y-%m-%d")
+                    security.date = dates[index] if periodCounter == 0 else tradingCalendar.nextTradingDate(dates[index], days=period)
                     if self.hasSecurity(stock):
                         # This security was already added earlier and exists in the portfolio
                         security.quantity = 1 if priceRise >= 0 else -1
@@ -115,19 +161,19 @@ class Portfolio(PKScheduledTaskProgress):
                         else:
                             security.quantity = 0 # This is not an actual buy
                             security.growth = priceRise
-                            security.ltp = df_group.iloc[0][f"LTP{period}"]
+                            security.ltp = ltpForPeriod[index]
                             self.addSecurity(security=security)
                     else:
                         # This security was never added earlier. The very fact it exists under this
                         # outcome dataframe, we need to take losses and then remove it from portfolio
                         security.quantity = 1
                         security.growth = 0 # First day of trade
-                        security.date = df_group.iloc[0]["Date"]
-                        security.ltp = df_group.iloc[0]["LTP"]
+                        security.date = dates[index]
+                        security.ltp = ltp[index]
                         self.addSecurity(security=security)
                         if priceRise < 0:
-                            security.date = PKDateUtilities.nextTradingDate(df_group.iloc[0]["Date"], days=period).strftime("%Y-%m-%d")
-                            security.ltp = df_group.iloc[0][f"LTP{period}"]
+                            security.date = tradingCalendar.nextTradingDate(dates[index], days=period)
+                            security.ltp = ltpForPeriod[index]
                             security.quantity = -1
                             security.growth = priceRise * abs(security.quantity)
                             self.removeSecurity(security=security)
@@ -22,6 +22,7 @@
     SOFTWARE.
 
 """
+import functools
 import os
 import sys
 import numpy as np
@@ -33,6 +34,7 @@ from pkscreener.classes import Utility, ImageUtility
 from PKDevTools.classes.log import default_logger
 from pkscreener.classes.ConfigManager import parser, tools
 from pkscreener.classes.Portfolio import Portfolio, PortfolioCollection
+from pkscreener.classes.PKBacktestResultsStore import PKBacktestResultsStore
 from pkscreener.classes.PKTask import PKTask
 from pkscreener.classes.PKScheduler import PKScheduler
 from PKDevTools.classes.OutputControls import OutputControls
@@ -101,48 +103,23 @@ def bestStrategiesFromSummaryForReport(reportName: None, summary=False,includeLa
             return None
     if not configManager.showPastStrategyData:
         return None
-    try:
-        dfs = pd.read_html(
-            "https://pkjmesra.github.io/PKScreener/Backtest-Reports/{0}".format(
-                reportName.replace("_X_", "_B_").replace("_G_", "_B_").replace("_S_", "_B_")
-            ),encoding="UTF-8", attrs = {'id': 'resultsTable'}
-        )
-    except Exception as e: # pragma: no cover
-        pass
-    if dfs is not None and len(dfs) > 0:
-        df = dfs[0]
-        if len(df) > 0:
-            periods = configManager.periodsRange
-            insights = cleanupInsightsSummary(df, periods)
-            # insights = insights.replace('', np.nan, regex=True)
-            # insights = insights.replace('-', np.nan, regex=True)
-            dfs = []
-            max_best_df = insights.copy()
-            max_datasets_df = insights.copy()
-            if includeLargestDatasets:
-                addLargeDatasetInsights(dfs, max_datasets_df)
-            
-            insights_list = []
-            dfs.append(max_best_df)
-            getMaxBestInsight(summary, dfs, periods, insights_list)
-            insights = pd.DataFrame(insights_list).drop_duplicates(ignore_index=True)
-            insights.dropna(axis=0, how="all", inplace=True)
-            insights = insights.replace(np.nan, "-", regex=True)
-    return insights
-
-def cleanupInsightsSummary(df, periods):
-    df = df.replace(" %", "", regex=True)
-    df = df.replace("-", np.nan, regex=True)
-    for period in periods:
-        df.rename(
-                    columns={
-                        f"{period}D-%": f"{period}Pd-%",
-                        f"{period}D-10k": f"{period}Pd-10k",
-                    },
-                    inplace=True,
-                )
-        castToFloat(df, period)
-    insights = df[df["ScanType"].astype(str).str.startswith("[SUM]")]
+    periods = configManager.periodsRange
+    resultsStore = PKBacktestResultsStore()
+    resultsStore.refreshFromPublishedReport(reportName, periods)
+    insights = resultsStore.summary(reportName, periods)
+    if insights is not None and len(insights) > 0:
+        dfs = []
+        max_best_df = insights.copy()
+        max_datasets_df = insights.copy()
+        if includeLargestDatasets:
+            addLargeDatasetInsights(dfs, max_datasets_df)
+
+        insights_list = []
+        dfs.append(max_best_df)
+        getMaxBestInsight(summary, dfs, periods, insights_list)
+        insights = pd.DataFrame(insights_list).drop_duplicates(ignore_index=True)
+        insights.dropna(axis=0, how="all", inplace=True)
+        insights = insights.replace(np.nan, "-", regex=True)
     return insights
 
 def getMaxBestInsight(summary, dfs, periods, insights_list):
@@ -208,11 +185,6 @@ def addLargeDatasetInsights(dfs, max_datasets_df):
     for i in range(0, len(max_datasets_df)):
         dfs.append(max_datasets_df.iloc[i])
 
-def castToFloat(df, prd):
-    if f"{prd}Pd-%" in df.columns:
-        df[f"{prd}Pd-%"] = (df[f"{prd}Pd-%"].astype(float).fillna(0.0))
-
-
 def xRaySummary(savedResults=None):
     if savedResults is None or not isinstance(savedResults, pd.DataFrame) or savedResults.empty:
         return savedResults
@@ -358,46 +330,6 @@ def getBacktestDataFromCleanedData(args, saveResults, df, periods,progressLabel:
         df = pd.concat([df, df_target], axis=1)
     return df
 
-def statScanCalculationForNoFilter(*args, **kwargs):
-    task = None
-    if isinstance(args[0], PKTask):
-        task = args[0]
-        userArgs, saveResults, period, scanResults = task.long_running_fn_args
-    else:
-        userArgs, saveResults, period, scanResults = args[0],args[1],args[2],args[3]
-    scanResults.append(
-                getCalculatedValues(saveResults, period, "NoFilter", userArgs,task)
-            )
-    if task is not None:
-        if task.taskId > 0:
-            task.resultsDict[task.taskId] = scanResults
-            task.progressStatusDict[task.taskId] = {'progress': 1, 'total': 1}
-        else:
-            task.result = scanResults
-    return scanResults
-
-def statScanCalculationForPatterns(*args, **kwargs):
-    task = None
-    if isinstance(args[0], PKTask):
-        task = args[0]
-        userArgs, saveResults, period, scanResults = task.long_running_fn_args
-    else:
-        userArgs, saveResults, period, scanResults = args[0],args[1],args[2],args[3]
-    df_grouped = saveResults.groupby("Pattern")
-    for pattern, df_group in df_grouped:
-        if pattern is None or len(pattern) == 0:
-            pattern = "No Pattern"
-        scanResults.append(
-                    getCalculatedValues(df_group, period, f"[P]{pattern}", userArgs,task)
-                )
-    if task is not None:
-        if task.taskId > 0:
-            task.resultsDict[task.taskId] = scanResults
-            task.progressStatusDict[task.taskId] = {'progress': 1, 'total': 1}
-        else:
-            task.result = scanResults
-    return scanResults
-
 def ensureColumnsExist(saveResults):
     columns = ['Stock', 'Date', 'Volume', 'Trend', 'MA-Signal', 'LTP', '52Wk-H',
                '52Wk-L', '1-Pd', '2-Pd', '3-Pd', '4-Pd', '5-Pd', '10-Pd', '15-Pd',
@@ -476,356 +408,174 @@ def getbacktestPeriod(args):
             pass
     return backtestPeriods
 
-def statScanCalculations(userArgs, saveResults, periods,progressLabel:str=None):
-    scanResults = []
-    tasksList = []
-    if saveResults is not None and len(saveResults) >= 1:
-        task1 = PKTask(f"[{len(saveResults)}] RSI Stats",long_running_fn=statScanCalculationForRSI)
-        task2 = PKTask(f"[{len(saveResults)}] Trend Stats",long_running_fn=statScanCalculationForTrend)
-        task3 = PKTask(f"[{len(saveResults)}] MA Stats",long_running_fn=statScanCalculationForMA)
-        task4 = PKTask(f"[{len(saveResults)}] Volume Stats",long_running_fn=statScanCalculationForVol)
-        task5 = PKTask(f"[{len(saveResults)}] Consolidation Stats",long_running_fn=statScanCalculationForConsol)
-        task6 = PKTask(f"[{len(saveResults)}] Breakout Stats",long_running_fn=statScanCalculationForBO)
-        task7 = PKTask(f"[{len(saveResults)}] 52Week Stats",long_running_fn=statScanCalculationFor52Wk)
-        task8 = PKTask(f"[{len(saveResults)}] CCI Stats",long_running_fn=statScanCalculationForCCI)
-        task9 = PKTask(f"[{len(saveResults)}] CCI Stats",long_running_fn=statScanCalculationForPatterns)
-        task10 = PKTask(f"[{len(saveResults)}] NoFilter Stats",long_running_fn=statScanCalculationForNoFilter)
-        tasksList=[task1,task2,task3,task4,task5,task6,task7,task8,task9,task10]
-        for task in tasksList:
-            task.long_running_fn_args = (userArgs, saveResults, periods, scanResults)
-        if configManager.enablePortfolioCalculations:
-            PKScheduler.scheduleTasks(tasksList,label=progressLabel,showProgressBars=True,timeout=600)
-        else:
-            for task in tasksList:
-                task.long_running_fn(*(task,))
-        for task in tasksList:
-            if task.result is not None and len(task.result) > 0:
-                scanResults.extend(task.result)
-    return scanResults
-
-def statScanCalculationForCCI(*args, **kwargs):
-    task = None
-    if isinstance(args[0], PKTask):
-        task = args[0]
-        userArgs, saveResults, period, scanResults = task.long_running_fn_args
-    else:
-        userArgs, saveResults, period, scanResults = args[0],args[1],args[2],args[3]
-    scanResults.append(
-                getCalculatedValues(
-                    filterCCIBelowMinus100(saveResults), period, "[CCI]<=-100", userArgs,task
-                )
-            )
-    scanResults.append(
-                getCalculatedValues(
-                    filterCCIBelow0(saveResults), period, "[CCI]-100<C<0", userArgs,task
-                )
-            )
-    scanResults.append(
-                getCalculatedValues(
-                    filterCCI0To100(saveResults), period, "[CCI]0<=C<=100", userArgs,task
-                )
-            )
-    scanResults.append(
-                getCalculatedValues(
-                    filterCCI100To200(saveResults), period, "[CCI]100<C<=200", userArgs,task
-                )
-            )
-    scanResults.append(
-                getCalculatedValues(
-                    filterCCIAbove200(saveResults), period, "[CCI]>200", userArgs,task
-                )
-            )
-    if task is not None:
-        if task.taskId > 0:
-            task.resultsDict[task.taskId] = scanResults
-            task.progressStatusDict[task.taskId] = {'progress': 1, 'total': 1}
-        else:
-            task.result = scanResults
-    return scanResults
-
-def statScanCalculationFor52Wk(*args, **kwargs):
-    task = None
-    if isinstance(args[0], PKTask):
-        task = args[0]
-        userArgs, saveResults, period, scanResults = task.long_running_fn_args
-    else:
-        userArgs, saveResults, period, scanResults = args[0],args[1],args[2],args[3]
-    scanResults.append(
-                getCalculatedValues(
-                    filterLTPMoreOREqual52WkH(saveResults), period, "[52Wk]LTP>=H", userArgs,task
-                )
-            )
-    scanResults.append(
-                getCalculatedValues(
-                    filterLTPWithin90Percent52WkH(saveResults),
-                    period,
-                    "[52Wk]LTP>=.9*H",
-                    userArgs,
-                    task
-                )
-            )
-    scanResults.append(
-                getCalculatedValues(
-                    filterLTPLess90Percent52WkH(saveResults),
-                    period,
-                    "[52Wk]LTP<.9*H",
-                    userArgs,
-                    task
-                )
-            )
-    scanResults.append(
-                getCalculatedValues(
-                    filterLTPMore52WkL(saveResults), period, "[52Wk]LTP>L", userArgs,task
-                )
-            )
-    scanResults.append(
-                getCalculatedValues(
-                    filterLTPWithin90Percent52WkL(saveResults),
-                    period,
-                    "[52Wk]LTP>=1.1*L",
-                    userArgs,
-                    task
-                )
-            )
-    scanResults.append(
-                getCalculatedValues(
-                    filterLTPLess52WkL(saveResults), period, "[52Wk]LTP<=L", userArgs,task
-                )
-            )
-    if task is not None:
-        if task.taskId > 0:
-            task.resultsDict[task.taskId] = scanResults
-            task.progressStatusDict[task.taskId] = {'progress': 1, 'total': 1}
-        else:
-            task.result = scanResults
-    return scanResults
-
-def statScanCalculationForBO(*args, **kwargs):
-    task = None
-    if isinstance(args[0], PKTask):
-        task = args[0]
-        userArgs, saveResults, period, scanResults = task.long_running_fn_args
-    else:
-        userArgs, saveResults, period, scanResults = args[0],args[1],args[2],args[3]
-    scanResults.append(
-                getCalculatedValues(
-                    filterLTPLessThanBreakout(saveResults), period, "[BO]LTP<BO", userArgs,task
-                )
-            )
-    scanResults.append(
-                getCalculatedValues(
-                    filterLTPMoreOREqualBreakout(saveResults),
-                    period,
-                    "[BO]LTP>=BO",
-                    userArgs,
-                    task
-                )
-            )
-    scanResults.append(
-                getCalculatedValues(
-                    filterLTPLessThanResistance(saveResults), period, "[BO]LTP<R", userArgs,task
-                )
-            )
-    scanResults.append(
-                getCalculatedValues(
-                    filterLTPMoreOREqualResistance(saveResults),
-                    period,
-                    "[BO]LTP>=R",
-                    userArgs,
-                    task
-                )
-            )
-    if task is not None:
-        if task.taskId > 0:
-            task.resultsDict[task.taskId] = scanResults
-            task.progressStatusDict[task.taskId] = {'progress': 1, 'total': 1}
-        else:
-            task.result = scanResults
-    return scanResults
+def strategyPredicates():
+    """
+    The row predicate (df -> boolean mask) of every X-Ray category other than
+    the patterns, by group, in the order of the insights table. The insights
+    (statScanBins) and the strategy filters (strategyDictionary) are both
+    built from these.
+    """
+    trendColumn = f"Trend({configManager.daysToLookback}Prds)"
+    return {
+        "RSI": {
+            "[RSI]>=50": lambda df: df["RSI"] > 50,
+            "[RSI]50<=RSI<=67": lambda df: (df["RSI"] >= 50) & (df["RSI"] <= 67),
+            "[RSI]>=68": lambda df: df["RSI"] >= 68,
+        },
+        "Trend": {
+            "[T]StrongUp": lambda df: df[trendColumn] == "Strong Up",
+            "[T]WeakUp": lambda df: df[trendColumn] == "Weak Up",
+            "[T]TrendUp": lambda df: df[trendColumn].astype(str).str.endswith("Up"),
+            "[T]StrongDown": lambda df: df[trendColumn] == "Strong Down",
+            "[T]WeakDown": lambda df: df[trendColumn] == "Weak Down",
+            "[T]Sideways": lambda df: df[trendColumn] == "Sideways",
+            "[T]TrendDown": lambda df: df[trendColumn].astype(str).str.endswith("Down"),
+        },
+        "MA": {
+            "[MA]Bull": lambda df: df["MA-Signal"] == "Bullish",
+            "[MA]Bear": lambda df: df["MA-Signal"] == "Bearish",
+            "[MA]Neutral": lambda df: df["MA-Signal"] == "Neutral",
+            "[MA]BullCross": lambda df: df["MA-Signal"].astype(str).str.startswith("BullCross"),
+            "[MA]BearCross": lambda df: df["MA-Signal"].astype(str).str.startswith("BearCross"),
+            "[MA]Support": lambda df: df["MA-Signal"].astype(str).str.endswith("Support"),
+            "[MA]Resist": lambda df: df["MA-Signal"].astype(str).str.endswith("Resist"),
+        },
+        "Volume": {
+            "Vol<2.5": lambda df: df["Volume"] < 2.5,
+            "Vol>=2.5": lambda df: df["Volume"] >= 2.5,
+        },
+        "Consolidation": {
+            "Cons.<=10": lambda df: df["Consol."] <= 10,
+            "Cons.>10": lambda df: df["Consol."] > 10,
+        },
+        "Breakout": {
+            "[BO]LTP<BO": lambda df: df["LTP"] < df["Breakout"],
+            "[BO]LTP>=BO": lambda df: (df["Breakout"] > 0) & (df["LTP"] >= df["Breakout"]),
+            "[BO]LTP<R": lambda df: df["LTP"] < df["Resistance"],
+            "[BO]LTP>=R": lambda df: (df["Resistance"] > 0) & (df["LTP"] >= df["Resistance"]),
+        },
+        "52Week": {
+            "[52Wk]LTP>=H": lambda df: df["LTP"] >= df["52Wk-H"],
+            "[52Wk]LTP>=.9*H": lambda df: (df["LTP"] >= 0.9 * df["52Wk-H"]) & (df["LTP"] < df["52Wk-H"]),
+            "[52Wk]LTP<.9*H": lambda df: df["LTP"] < 0.9 * df["52Wk-H"],
+            "[52Wk]LTP>L": lambda df: (df["LTP"] > df["52Wk-L"]) & (df["LTP"] < 1.1 * df["52Wk-L"]),
+            "[52Wk]LTP>=1.1*L": lambda df: (df["LTP"] >= 1.1 * df["52Wk-L"]) & (df["LTP"] > df["52Wk-L"]),
+            "[52Wk]LTP<=L": lambda df: df["LTP"] <= df["52Wk-L"],
+        },
+        "CCI": {
+            "[CCI]<=-100": lambda df: df["CCI"] <= -100,
+            "[CCI]-100<C<0": lambda df: (df["CCI"] > -100) & (df["CCI"] < 0),
+            "[CCI]0<=C<=100": lambda df: (df["CCI"] >= 0) & (df["CCI"] <= 100),
+            "[CCI]100<C<=200": lambda df: (df["CCI"] > 100) & (df["CCI"] <= 200),
+            "[CCI]>200": lambda df: df["CCI"] > 200,
+        },
+    }
+
+def foundPatterns(df):
+    # The pattern of each row, with "No Pattern" for rows without one
+    return df["Pattern"].replace("", "No Pattern")
+
+def patternPredicates(saveResults):
+    # One category per pattern, in the (sorted) order of a groupby on it
+    _, patterns = pd.factorize(saveResults["Pattern"], sort=True)
+    predicates = {}
+    for pattern in patterns:
+        if pattern is None or len(pattern) == 0:
+            pattern = "No Pattern"
+        predicates[f"[P]{pattern}"] = lambda df, pattern=pattern: foundPatterns(df) == pattern
+    return predicates
 
-def statScanCalculationForConsol(*args, **kwargs):
-    task = None
-    if isinstance(args[0], PKTask):
-        task = args[0]
-        userArgs, saveResults, period, scanResults = task.long_running_fn_args
-    else:
-        userArgs, saveResults, period, scanResults = args[0],args[1],args[2],args[3]
-    scanResults.append(
-                getCalculatedValues(
-                    filterConsolidating10Percent(saveResults), period, "Cons.<=10", userArgs,task
-                )
-            )
-    scanResults.append(
-                getCalculatedValues(
-                    filterConsolidatingMore10Percent(saveResults),
-                    period,
-                    "Cons.>10",
-                    userArgs,
-                    task
-                )
-            )
-    if task is not None:
-        if task.taskId > 0:
-            task.resultsDict[task.taskId] = scanResults
-            task.progressStatusDict[task.taskId] = {'progress': 1, 'total': 1}
-        else:
-            task.result = scanResults
-    return scanResults
+def statScanBins(saveResults):
+    """
+    Every (group, ScanType, row mask) of the X-Ray insights, in the order of
+    the insights table, and the groups of categories that were left out
+    because their columns are missing in the saved results.
+    """
+    groups = list(strategyPredicates().items())
+    groups.append(("Pattern", patternPredicates))
+    groups.append(("NoFilter", {"NoFilter": lambda df: np.ones(len(df), dtype=bool)}))
+    bins = []
+    skippedGroups = {}
+    for group, predicates in groups:
+        try:
+            if callable(predicates):
+                predicates = predicates(saveResults)
+            bins.extend([(group, key, np.asarray(predicate(saveResults), dtype=bool)) for key, predicate in predicates.items()])
+        except Exception as e:# pragma: no cover
+            default_logger().debug(f"X-Ray insights for {group} skipped: {e}", exc_info=True)
+            skippedGroups[group] = e
+    return bins, skippedGroups
 
-def statScanCalculationForVol(*args, **kwargs):
-    task = None
-    if isinstance(args[0], PKTask):
-        task = args[0]
-        userArgs, saveResults, period, scanResults = task.long_running_fn_args
-    else:
-        userArgs, saveResults, period, scanResults = args[0],args[1],args[2],args[3]
-    scanResults.append(
-                getCalculatedValues(
-                    filterVolumeLessThan25(saveResults), period, "Vol<2.5", userArgs,task
-                )
-            )
-    scanResults.append(
-                getCalculatedValues(
-                    filterVolumeMoreThan25(saveResults), period, "Vol>=2.5", userArgs,task
-                )
-            )
-    if task is not None:
-        if task.taskId > 0:
-            task.resultsDict[task.taskId] = scanResults
-            task.progressStatusDict[task.taskId] = {'progress': 1, 'total': 1}
-        else:
-            task.result = scanResults
-    return scanResults
+def showSkippedGroups(skippedGroups):
+    for group, e in skippedGroups.items():
+        OutputControls().printOutput(f"{colorText.WARN}  [+] X-Ray insights for {group} were skipped: {type(e).__name__}: {e}{colorText.END}")
 
-def statScanCalculationForMA(*args, **kwargs):
-    task = None
-    if isinstance(args[0], PKTask):
-        task = args[0]
-        userArgs, saveResults, period, scanResults = task.long_running_fn_args
-    else:
-        userArgs, saveResults, period, scanResults = args[0],args[1],args[2],args[3]
-    scanResults.append(
-                getCalculatedValues(
-                    filterMASignalBullish(saveResults), period, "[MA]Bull", userArgs,task
-                )
-            )
-    scanResults.append(
-                getCalculatedValues(
-                    filterMASignalBearish(saveResults), period, "[MA]Bear", userArgs,task
-                )
-            )
-    scanResults.append(
-                getCalculatedValues(
-                    filterMASignalNeutral(saveResults), period, "[MA]Neutral", userArgs,task
-                )
-            )
-    scanResults.append(
-                getCalculatedValues(
-                    filterMASignalBullCross(saveResults), period, "[MA]BullCross", userArgs,task
-                )
-            )
-    scanResults.append(
-                getCalculatedValues(
-                    filterMASignalBearCross(saveResults), period, "[MA]BearCross", userArgs,task
-                )
-            )
-    scanResults.append(
-                getCalculatedValues(
-                    filterMASignalSupport(saveResults), period, "[MA]Support", userArgs,task
-                )
-            )
-    scanResults.append(
-                getCalculatedValues(
-                    filterMASignalResist(saveResults), period, "[MA]Resist", userArgs,task
-                )
-            )
-    if task is not None:
-        if task.taskId > 0:
-            task.resultsDict[task.taskId] = scanResults
-            task.progressStatusDict[task.taskId] = {'progress': 1, 'total': 1}
-        else:
-            task.result = scanResults
+def statScanCalculations(userArgs, saveResults, periods,progressLabel:str=None):
+    """
+    The insights of all the X-Ray categories at once. Each row is assigned
+    to all its categories in a (category x row) membership matrix, so the
+    LTP, LTP{period} and Growth{period} sums of every category come out of
+    one matrix product instead of a filtered copy of the results per
+    category.
+    """
+    scanResults = []
+    if saveResults is None or len(saveResults) < 1:
+        return scanResults
+    bins, skippedGroups = statScanBins(saveResults)
+    showSkippedGroups(skippedGroups)
+    if len(bins) == 0:
+        return scanResults
+    membership = np.vstack([mask for _, _, mask in bins])
+    columns = ["LTP"] + [f"LTP{period}" for period in periods] + [f"Growth{period}" for period in periods]
+    sums = membership.astype(float) @ saveResults[columns].to_numpy(dtype=float)
+    for (_, key, _), binSums in zip(bins, sums):
+        scanResults.append(
+            calculatedValues(key, periods, binSums[0], binSums[1:len(periods)+1], binSums[len(periods)+1:])
+        )
+    if configManager.enablePortfolioCalculations and userArgs.options.startswith("B"):
+        calculatePortfolios(saveResults, bins, progressLabel)
     return scanResults
 
-def statScanCalculationForTrend(*args, **kwargs):
-    task = None
-    if isinstance(args[0], PKTask):
-        task = args[0]
-        userArgs, saveResults, period, scanResults = task.long_running_fn_args
-    else:
-        userArgs, saveResults, period, scanResults = args[0],args[1],args[2],args[3]
-    scanResults.append(
-                getCalculatedValues(
-                    filterTrendStrongUp(saveResults), period, "[T]StrongUp", userArgs,task
-                )
-            )
-    scanResults.append(
-                getCalculatedValues(
-                    filterTrendWeakUp(saveResults), period, "[T]WeakUp", userArgs,task
-                )
-            )
-    scanResults.append(
-                getCalculatedValues(
-                    filterTrendUp(saveResults), period, "[T]TrendUp", userArgs,task
-                )
-            )
-    scanResults.append(
-                getCalculatedValues(
-                    filterTrendStrongDown(saveResults), period, "[T]StrongDown", userArgs,task
-                )
-            )
-    scanResults.append(
-                getCalculatedValues(
-                    filterTrendWeakDown(saveResults), period, "[T]WeakDown", userArgs,task
-                )
-            )
-    scanResults.append(
-                getCalculatedValues(
-                    filterTrendSideways(saveResults), period, "[T]Sideways", userArgs,task
-                )
-            )
-    scanResults.append(
-                getCalculatedValues(
-                    filterTrendDown(saveResults), period, "[T]TrendDown", userArgs,task
-                )
-            )
-    if task is not None:
-        if task.taskId > 0:
-            task.resultsDict[task.taskId] = scanResults
-            task.progressStatusDict[task.taskId] = {'progress': 1, 'total': 1}
-        else:
-            task.result = scanResults
-    return scanResults
+def calculatePortfolios(saveResults, bins, progressLabel:str=None):
+    # The portfolio simulation of every category, one task per group of
+    # categories, with progress bars.
+    groups = {}
+    for group, key, rowMask in bins:
+        groups.setdefault(group, []).append((key, saveResults[rowMask].fillna(0.0)))
+    tasksList = []
+    for group, categories in groups.items():
+        task = PKTask(f"[{len(saveResults)}] {group} Stats",long_running_fn=portfoliosForBins)
+        task.long_running_fn_args = (categories,)
+        tasksList.append(task)
+    try:
+        PKScheduler.scheduleTasks(tasksList,label=progressLabel,showProgressBars=True,timeout=600)
+    except Exception as e:# pragma: no cover
+        default_logger().debug(e, exc_info=True)
+    for task in tasksList:
+        if task.result is None:
+            # The scheduler did not hand this group back (or could not run
+            # at all), so it is simulated here instead.
+            task.taskId = 0
+            portfoliosForBins(task)
+        for portfolio in task.result:
+            PortfolioCollection().addPortfolio(portfolio)
 
-def statScanCalculationForRSI(*args, **kwargs):
-    task = None
-    if isinstance(args[0], PKTask):
-        task = args[0]
-        userArgs, saveResults, period, scanResults = task.long_running_fn_args
+def portfoliosForBins(*args, **kwargs):
+    task = args[0]
+    categories = task.long_running_fn_args[0]
+    portfolios = []
+    for key, df in categories:
+        portfolio = Portfolio(name=key)
+        portfolio.updatePortfolioFromXRayDataFrame(df,configManager.periodsRange,task)
+        # Only the results go back to the main process
+        portfolio.tasksDict = {}
+        portfolios.append(portfolio)
+    if task.taskId > 0:
+        task.resultsDict[task.taskId] = portfolios
+        task.progressStatusDict[task.taskId] = {'progress': 1, 'total': 1}
     else:
-        userArgs, saveResults, period, scanResults = args[0],args[1],args[2],args[3]
-    scanResults.append(
-                getCalculatedValues(
-                    filterRSIAbove50(saveResults), period, "[RSI]>=50", userArgs, task
-                )
-            )
-    scanResults.append(
-                getCalculatedValues(
-                    filterRSI50To67(saveResults), period, "[RSI]50<=RSI<=67", userArgs,task
-                )
-            )
-    scanResults.append(
-                getCalculatedValues(
-                    filterRSI68OrAbove(saveResults), period, "[RSI]>=68", userArgs,task
-                )
-            )
-    if task is not None:
-        if task.taskId > 0:
-            task.resultsDict[task.taskId] = scanResults
-            task.progressStatusDict[task.taskId] = {'progress': 1, 'total': 1}
-        else:
-            task.result = scanResults
-    return scanResults
+        task.result = portfolios
+    return portfolios
 
 
 def formatGridOutput(df,replacenan=True):
@@ -898,259 +648,41 @@ def formatGridOutput(df,replacenan=True):
 
 
 def getCalculatedValues(df, periods, key, userArgs=None, task=None):
-    collated_df = None
-    for period in periods:
-        ltpSum1ShareEach = round(df["LTP"].sum(), 2)
-        tdySum1ShareEach = round(df[f"LTP{period}"].sum(), 2)
-        growthSum1ShareEach = round(df[f"Growth{period}"].sum(), 2)
+    if configManager.enablePortfolioCalculations and userArgs.options.startswith("B"): # backtests
+        # The portfolio goes through all the periods, so it's simulated only once
+        portfolio = Portfolio(name=key)
+        portfolio.updatePortfolioFromXRayDataFrame(df,configManager.periodsRange,task)
+        PortfolioCollection().addPortfolio(portfolio)
+    return calculatedValues(key, periods, df["LTP"].sum(),
+                            [df[f"LTP{period}"].sum() for period in periods],
+                            [df[f"Growth{period}"].sum() for period in periods]) if len(periods) > 0 else None
+
+
+def calculatedValues(key, periods, ltpSum, tdySums, growthSums):
+    # The insights row of a category, from the LTP sum of its stocks (1 share
+    # each) and their LTP and growth sums for each of the periods
+    collated_df = {"ScanType": key}
+    ltpSum1ShareEach = round(ltpSum, 2)
+    for period, tdySum, growthSum in zip(periods, tdySums, growthSums):
+        tdySum1ShareEach = round(tdySum, 2)
+        growthSum1ShareEach = round(growthSum, 2)
         percentGrowth = 0
         if ltpSum1ShareEach > 0:
             percentGrowth = round(100 * growthSum1ShareEach / ltpSum1ShareEach, 2)
         growth10k = round(10000 * (1 + 0.01 * percentGrowth), 2)
-        if configManager.enablePortfolioCalculations and userArgs.options.startswith("B"): # backtests
-            portfolio = Portfolio(name=key)
-            portfolio.updatePortfolioFromXRayDataFrame(df,configManager.periodsRange,task)
-            PortfolioCollection().addPortfolio(portfolio)
-        result_df = {
-            "ScanType": key, #if tdySum1ShareEach != 0 else 999999999,
-            f"{period}Pd-PFV": tdySum1ShareEach,
-            f"{period}Pd-%": percentGrowth if tdySum1ShareEach != 0 else 999999999,
-            f"{period}Pd-10k": growth10k if tdySum1ShareEach != 0 else 999999999,
-        }
-        if collated_df is None:
-            collated_df = result_df
-        collated_df = collated_df | result_df
-    # percentGrowth = colorText.GREEN if percentGrowth >=0 else colorText.FAIL + percentGrowth + colorText.END
-    # growth10k = colorText.GREEN if percentGrowth >=0 else colorText.FAIL + growth10k + colorText.END
-    # df_col = {'ScanType':key,
-    #     f'{period}Pd-PFV':tdySum1ShareEach,
-    #     f'{period}Pd-PFG':percentGrowth if tdySum1ShareEach != 0 else '-',
-    #     f'{period}Pd-Go10k':growth10k if tdySum1ShareEach != 0 else '-',
-    #     }
-
-    return collated_df  # , df_col
-
-
-def filterRSIAbove50(df):
-    if df is None:
-        return None
-    return df[df["RSI"] > 50].fillna(0.0)
-
-
-def filterRSI50To67(df):
-    if df is None:
-        return None
-    return df[(df["RSI"] >= 50) & (df["RSI"] <= 67)].fillna(0.0)
-
-
-def filterRSI68OrAbove(df):
-    if df is None:
-        return None
-    return df[df["RSI"] >= 68].fillna(0.0)
-
-
-def filterTrendStrongUp(df):
-    if df is None:
-        return None
-    return df[df[f"Trend({configManager.daysToLookback}Prds)"] == "Strong Up"].fillna(0.0)
-
-
-def filterTrendWeakUp(df):
-    if df is None:
-        return None
-    return df[df[f"Trend({configManager.daysToLookback}Prds)"] == "Weak Up"].fillna(0.0)
-
-
-def filterTrendWeakDown(df):
-    if df is None:
-        return None
-    return df[df[f"Trend({configManager.daysToLookback}Prds)"] == "Weak Down"].fillna(0.0)
-
-
-def filterTrendStrongDown(df):
-    if df is None:
-        return None
-    return df[df[f"Trend({configManager.daysToLookback}Prds)"] == "Strong Down"].fillna(0.0)
-
-
-def filterTrendUp(df):
-    if df is None:
-        return None
-    return df[df[f"Trend({configManager.daysToLookback}Prds)"].astype(str).str.endswith("Up")].fillna(0.0)
-
-
-def filterTrendSideways(df):
-    if df is None:
-        return None
-    return df[df[f"Trend({configManager.daysToLookback}Prds)"] == "Sideways"].fillna(0.0)
-
-
-def filterTrendDown(df):
-    if df is None:
-        return None
-    return df[df[f"Trend({configManager.daysToLookback}Prds)"].astype(str).str.endswith("Down")].fillna(0.0)
-
-
-def filterMASignalBullish(df):
-    if df is None:
-        return None
-    return df[df["MA-Signal"] == "Bullish"].fillna(0.0)
-
-
-def filterMASignalBearish(df):
-    if df is None:
-        return None
-    return df[df["MA-Signal"] == "Bearish"].fillna(0.0)
-
-
-def filterMASignalNeutral(df):
-    if df is None:
-        return None
-    return df[df["MA-Signal"] == "Neutral"].fillna(0.0)
-
-
-def filterMASignalBullCross(df):
-    if df is None:
-        return None
-    return df[df["MA-Signal"].astype(str).str.startswith("BullCross")].fillna(0.0)
-
-
-def filterMASignalBearCross(df):
-    if df is None:
-        return None
-    return df[df["MA-Signal"].astype(str).str.startswith("BearCross")].fillna(0.0)
-
-
-def filterMASignalSupport(df):
-    if df is None:
-        return None
-    return df[df["MA-Signal"].astype(str).str.endswith("Support")].fillna(0.0)
-
-
-def filterMASignalResist(df):
-    if df is None:
-        return None
-    return df[df["MA-Signal"].astype(str).str.endswith("Resist")].fillna(0.0)
-
-
-def filterVolumeLessThan25(df):
-    if df is None:
-        return None
-    return df[df["Volume"] < 2.5].fillna(0.0)
-
-
-def filterVolumeMoreThan25(df):
-    if df is None:
-        return None
-    return df[df["Volume"] >= 2.5].fillna(0.0)
+        collated_df[f"{period}Pd-PFV"] = tdySum1ShareEach
+        collated_df[f"{period}Pd-%"] = percentGrowth if tdySum1ShareEach != 0 else 999999999
+        collated_df[f"{period}Pd-10k"] = growth10k if tdySum1ShareEach != 0 else 999999999
+    return collated_df
 
 
-def filterConsolidating10Percent(df):
-    if df is None:
-        return None
-    return df[df[f"Consol."] <= 10].fillna(0.0)
-
-
-def filterConsolidatingMore10Percent(df):
-    if df is None:
-        return None
-    return df[df[f"Consol."] > 10].fillna(0.0)
-
-
-def filterLTPLessThanBreakout(df):
-    if df is None:
-        return None
-    return df[df["LTP"] < df["Breakout"]].fillna(0.0)
-
-
-def filterLTPMoreOREqualBreakout(df):
-    if df is None:
-        return None
-    return df[((df["Breakout"] > 0) & (df["LTP"] >= df["Breakout"]))].fillna(0.0)
-
-
-def filterLTPLessThanResistance(df):
-    if df is None:
-        return None
-    return df[df["LTP"] < df["Resistance"]].fillna(0.0)
-
-
-def filterLTPMoreOREqualResistance(df):
-    if df is None:
-        return None
-    return df[((df["Resistance"] > 0) & (df["LTP"] >= df["Resistance"]))].fillna(0.0)
-
-
-def filterLTPMoreOREqual52WkH(df):
-    if df is None:
-        return None
-    return df[df["LTP"] >= df["52Wk-H"]].fillna(0.0)
-
-
-def filterLTPWithin90Percent52WkH(df):
-    if df is None:
-        return None
-    return df[(df["LTP"] >= 0.9 * df["52Wk-H"]) & (df["LTP"] < df["52Wk-H"])].fillna(
-        0.0
-    )
-
-
-def filterLTPLess90Percent52WkH(df):
-    if df is None:
-        return None
-    return df[df["LTP"] < 0.9 * df["52Wk-H"]].fillna(0.0)
-
-
-def filterLTPMore52WkL(df):
-    if df is None:
-        return None
-    return df[((df["LTP"] > df["52Wk-L"]) & (df["LTP"] < 1.1 * df["52Wk-L"]))].fillna(
-        0.0
-    )
-
-
-def filterLTPWithin90Percent52WkL(df):
-    if df is None:
-        return None
-    return df[(df["LTP"] >= (1.1 * df["52Wk-L"])) & (df["LTP"] > df["52Wk-L"])].fillna(
-        0.0
-    )
-
-
-def filterLTPLess52WkL(df):
-    if df is None:
-        return None
-    return df[df["LTP"] <= df["52Wk-L"]].fillna(0.0)
-
-
-def filterCCIBelowMinus100(df):
-    if df is None:
-        return None
-    return df[df["CCI"] <= -100].fillna(0.0)
-
-
-def filterCCIBelow0(df):
-    if df is None:
-        return None
-    return df[(df["CCI"] > -100) & (df["CCI"] < 0)].fillna(0.0)
-
-
-def filterCCI0To100(df):
-    if df is None:
-        return None
-    return df[(df["CCI"] >= 0) & (df["CCI"] <= 100)].fillna(0.0)
-
-
-def filterCCI100To200(df):
-    if df is None:
-        return None
-    return df[(df["CCI"] > 100) & (df["CCI"] <= 200)].fillna(0.0)
-
-
-def filterCCIAbove200(df):
-    if df is None:
-        return None
-    return df[(df["CCI"] > 200)].fillna(0.0)
+def filterFor(predicate):
+    # The strategy filter of a category: its rows, with NaNs as 0
+    def strategyFilter(df):
+        if df is None:
+            return None
+        return df[predicate(df)].fillna(0.0)
+    return strategyFilter
 
 def returnNoFilter(df):
     return df
@@ -1158,15 +690,10 @@ def returnNoFilter(df):
 def filterPattern(df, pattern="[P]No Pattern"):
     if df is None:
         return None
-    match_df = None
-    df_grouped = df.groupby("Pattern")
-    for foundPattern, df_group in df_grouped:
-        if foundPattern is None or len(foundPattern) == 0:
-            foundPattern = "No Pattern"
-        if f"[P]{foundPattern}" == pattern:
-            match_df = df_group
-            break
-    return match_df
+    # Rows whose (complete) pattern is the given one, in one comparison
+    patterns = foundPatterns(df)
+    match_df = df[patterns.notna() & ("[P]" + patterns.astype(str) == pattern)]
+    return match_df if len(match_df) > 0 else None
 
 def strategyDictionary():
     """
@@ -1213,50 +740,10 @@ def strategyDictionary():
     `[P]{patern_name}`. For example, `[P]No Pattern`
     """
     strategies = {}
-    # RSI
-    strategies["[RSI]>=50"] = filterRSIAbove50
-    strategies["[RSI]50<=RSI<=67"] = filterRSI50To67
-    strategies["[RSI]>=68"] = filterRSI68OrAbove
-    # CCI
-    strategies["[CCI]<=-100"] = filterCCIBelowMinus100
-    strategies["[CCI]-100<C<0"] = filterCCIBelow0
-    strategies["[CCI]0<=C<=100"] = filterCCI0To100
-    strategies["[CCI]100<C<=200"] = filterCCI100To200
-    strategies["[CCI]>200"] = filterCCIAbove200
-    # 52Wk-H/L
-    strategies["[52Wk]LTP>=H"] = filterLTPMoreOREqual52WkH
-    strategies["[52Wk]LTP>=.9*H"] = filterLTPWithin90Percent52WkH
-    strategies["[52Wk]LTP<.9*H"] = filterLTPLess90Percent52WkH
-    strategies["[52Wk]LTP>L"] = filterLTPMore52WkL
-    strategies["[52Wk]LTP>=1.1*L"] = filterLTPWithin90Percent52WkL
-    strategies["[52Wk]LTP<=L"] = filterLTPLess52WkL
-    # Breakout
-    strategies["[BO]LTP<BO"] = filterLTPLessThanBreakout
-    strategies["[BO]LTP>=BO"] = filterLTPMoreOREqualBreakout
-    strategies["[BO]LTP<R"] = filterLTPLessThanResistance
-    strategies["[BO]LTP>=R"] = filterLTPMoreOREqualResistance
-    # Consolidation
-    strategies["Cons.<=10"] = filterConsolidating10Percent
-    strategies["Cons.>10"] = filterConsolidatingMore10Percent
-    # Volume
-    strategies["Vol<2.5"] = filterVolumeLessThan25
-    strategies["Vol>=2.5"] = filterVolumeMoreThan25
-    # MA
-    strategies["[MA]Bull"] = filterMASignalBullish
-    strategies["[MA]Bear"] = filterMASignalBearish
-    strategies["[MA]Neutral"] = filterMASignalNeutral
-    strategies["[MA]BullCross"] = filterMASignalBullCross
-    strategies["[MA]BearCross"] = filterMASignalBearCross
-    strategies["[MA]Support"] = filterMASignalSupport
-    strategies["[MA]Resist"] = filterMASignalResist
-    # Trends
-    strategies["[T]StrongUp"] = filterTrendStrongUp
-    strategies["[T]WeakUp"] = filterTrendWeakUp
-    strategies["[T]TrendUp"] = filterTrendUp
-    strategies["[T]StrongDown"] = filterTrendStrongDown
-    strategies["[T]WeakDown"] = filterTrendWeakDown
-    strategies["[T]Sideways"] = filterTrendSideways
-    strategies["[T]TrendDown"] = filterTrendDown
+    predicates = strategyPredicates()
+    for group in ["RSI", "CCI", "52Week", "Breakout", "Consolidation", "Volume", "MA", "Trend"]:
+        for key, predicate in predicates[group].items():
+            strategies[key] = filterFor(predicate)
     # NoFilter
     strategies["NoFilter"] = returnNoFilter
     # Pattern
@@ -1268,7 +755,7 @@ def strategyForKey(key:str):
     if key in strategies.keys():
         return strategies[key]
     elif key.startswith("[P]"):
-        return strategies["[P]"]
+        return functools.partial(strategies["[P]"], pattern=key)
 
 def strategyNames():
     return strategyDictionary().keys()
\ No newline at end of file
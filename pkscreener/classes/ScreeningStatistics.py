@@ -37,13 +37,15 @@ from sys import float_info as sflt
 import pkscreener.classes.Utility as Utility
 from pkscreener.Imports import Imports
 from pkscreener.classes.Pktalib import pktalib
+from pkscreener.classes.PKIndicatorPlan import INDICATORS, RESULT_INDICATORS
+from pkscreener.classes.PKRangeIndex import PKRangeIndex
+from pkscreener.classes.PKRollingExtrema import PKRollingExtrema
+from pkscreener.classes.PKStockView import PKStockView
+from pkscreener.classes.PKLorentzianClassifier import PKLorentzianClassifier
 from PKDevTools.classes.OutputControls import OutputControls
 from PKDevTools.classes import Archiver
 from PKNSETools.morningstartools import Stock
 
-if sys.version_info >= (3, 11):
-    import advanced_ta as ata
-
 # from sklearn.preprocessing import StandardScaler
 if Imports["scipy"]:
     from scipy.stats import linregress
@@ -103,8 +105,11 @@ class ScreeningStatistics:
             ## relative gain and losses
             df['close_shift'] = df[closeColumn].shift(1)
             ## Gains (true) and Losses (False)
-            df['gains'] = df.apply(lambda x: x[closeColumn] if x[closeColumn] >= x['close_shift'] else 0, axis=1)
-            df['loss'] = df.apply(lambda x: x[closeColumn] if x[closeColumn] <= x['close_shift'] else 0, axis=1)
+            closes = df[closeColumn].to_numpy(dtype=float)
+            previousCloses = df['close_shift'].to_numpy(dtype=float)
+            with np.errstate(invalid="ignore"):
+                df['gains'] = np.where(closes >= previousCloses, closes, 0.0)
+                df['loss'] = np.where(closes <= previousCloses, closes, 0.0)
 
         avg_gain = df['gains'].mean()
         avg_losses = df['loss'].mean()
@@ -112,65 +117,15 @@ class ScreeningStatistics:
         return avg_gain / avg_losses
 
     #Calculating signals
-    def computeBuySellSignals(self,df,ema_period=200,retry=True):
-        try:
-            df["Above"] = False
-            df["Below"] = False
-            if Imports["vectorbt"]:
-                from vectorbt.indicators import MA as vbt
-                if df is not None:
-                    ema = vbt.run(df["Close"], 1, short_name='EMA', ewm=True)
-                    df["Above"] = ema.ma_crossed_above(df["ATRTrailingStop"])
-                    df["Below"] = ema.ma_crossed_below(df["ATRTrailingStop"])
-            else:
-                OutputControls().printOutput(f"{colorText.FAIL}The main module needed for best Buy/Sell result calculation is missing. Falling back on an alternative, but it is not very reliable.{colorText.END}")
-                if df is not None:
-                    ema = pktalib.EMA(df["Close"], ema_period) if ema_period > 1 else df["Close"]#short_name='EMA', ewm=True)        
-                    df["Above"] = ema > df["ATRTrailingStop"]
-                    df["Below"] = ema < df["ATRTrailingStop"]
-        except (OSError,FileNotFoundError) as e: # pragma: no cover
-            msg = f"{colorText.FAIL}Some dependencies are missing. Try and run this option again.{colorText.END}"
-            if 'unittest' in sys.modules or any("pytest" in arg for arg in sys.argv):
-                print(msg)
-            else:
-                OutputControls().printOutput(msg)
-            # OSError:RALLIS: [Errno 2] No such file or directory: '/tmp/_MEIzoTV6A/vectorbt/templates/light.json'
-            # if "No such file or directory" in str(e):
-            try:
-                import os
-                outputFolder = None
-                try:
-                    outputFolder = os.sep.join(e.filename.split(os.sep)[:-1])
-                except KeyboardInterrupt: # pragma: no cover
-                    raise KeyboardInterrupt
-                except Exception as e: # pragma: no cover
-                    outputFolder = os.sep.join(str(e).split("\n")[0].split(": ")[1].replace("'","").split(os.sep)[:-1])
-            except KeyboardInterrupt: # pragma: no cover
-                raise KeyboardInterrupt
-            except Exception as e: # pragma: no cover
-                pass
-            self.downloadSaveTemplateJsons(outputFolder)
-            if retry:
-                return self.computeBuySellSignals(df,ema_period=ema_period,retry=False)
-            return None
-        except ImportError as e: # pragma: no cover
-            msg = f"{colorText.FAIL}The main module needed for best Buy/Sell result calculation is missing. Falling back on an alternative, but it is not very reliable.{colorText.END}"
-            if 'unittest' in sys.modules or any("pytest" in arg for arg in sys.argv):
-                print(msg)
-            else:
-                OutputControls().printOutput(msg)
-            if df is not None:
-                ema = pktalib.EMA(df["Close"], ema_period) if ema_period > 1 else df["Close"]#short_name='EMA', ewm=True)        
-                df["Above"] = ema > df["ATRTrailingStop"]
-                df["Below"] = ema < df["ATRTrailingStop"]
-        except KeyboardInterrupt: # pragma: no cover
-            raise KeyboardInterrupt
-        except Exception as e: # pragma: no cover
-            pass
-                
-        if df is not None:
-            df["Buy"] = (df["Close"] > df["ATRTrailingStop"]) & (df["Above"]==True)
-            df["Sell"] = (df["Close"] < df["ATRTrailingStop"]) & (df["Below"]==True)
+    def computeBuySellSignals(self,df):
+        # Close crossing the trailing stop (an EMA of period 1 over the close,
+        # as the UT Bot uses it) marks the Buy/Sell candles.
+        if df is None:
+            return df
+        df["Above"] = pktalib.crossedAbove(df["Close"], df["ATRTrailingStop"])
+        df["Below"] = pktalib.crossedBelow(df["Close"], df["ATRTrailingStop"])
+        df["Buy"] = (df["Close"] > df["ATRTrailingStop"]) & (df["Above"]==True)
+        df["Sell"] = (df["Close"] < df["ATRTrailingStop"]) & (df["Below"]==True)
 
         return df
 
@@ -187,74 +142,31 @@ class ScreeningStatistics:
         
         return dataframe
 
-    def downloadSaveTemplateJsons(self, outputFolderPath=None):
-        from PKDevTools.classes.Fetcher import fetcher
-        import os
-        if outputFolderPath is None:
-            dirName = 'templates'
-            outputFolder = os.path.join(os.getcwd(),dirName)
-        else:
-            outputFolder = outputFolderPath
-        outputFolder = f"{outputFolder}{os.sep}" if not outputFolder.endswith(f"{os.sep}") else outputFolder
-        if not os.path.isdir(outputFolder):
-            os.makedirs(outputFolder, exist_ok=True)
-        json1 = "https://raw.githubusercontent.com/polakowo/vectorbt/master/vectorbt/templates/dark.json"
-        json2 = "https://raw.githubusercontent.com/polakowo/vectorbt/master/vectorbt/templates/light.json"
-        json3 = "https://raw.githubusercontent.com/polakowo/vectorbt/master/vectorbt/templates/seaborn.json"
-        fileURLs = [json1,json2,json3]
-        fileFetcher = fetcher()
-        from PKDevTools.classes.Utils import random_user_agent
-        for url in fileURLs:
-            try:
-                path = os.path.join(outputFolder,url.split("/")[-1])
-                if not os.path.exists(path):
-                    # if self.shouldLog:
-                    #     self.default_logger.debug(f"Fetching {url} to keep at {path}")
-                    resp = fileFetcher.fetchURL(url=url,trial=3,timeout=5,headers={'user-agent': f'{random_user_agent()}'})
-                    if resp is not None and resp.status_code == 200:
-                        with open(path, "w") as f:
-                            f.write(resp.text)
-                # else:
-                #     if self.shouldLog:
-                #         self.default_logger.debug(f"Already exists: {path}")
-            except KeyboardInterrupt: # pragma: no cover
-                raise KeyboardInterrupt
-            except Exception as e: # pragma: no cover
-                # if self.shouldLog:
-                #     self.default_logger.debug(e, exc_info=True)
-                continue
-
     # Find stocks that have broken through 52 week high.
-    def find52WeekHighBreakout(self, df):
+    def find52WeekHighBreakout(self, df, extrema=None):
         # https://chartink.com/screener/52-week-low-breakout
         if df is None or len(df) == 0:
             return False
-        data = df.copy()
-        data = data.fillna(0)
-        data = data.replace([np.inf, -np.inf], 0)
+        extrema = PKRollingExtrema(df) if extrema is None else extrema
         one_week = 5
-        recent = data.head(1)["High"].iloc[0]
-        full52Week = data.head(50 * one_week)
-        full52WeekHigh = full52Week["High"].max()
+        recent = extrema.latest("High")
+        full52WeekHigh = extrema.highestHigh(50 * one_week)
         # if self.shouldLog:
         #     self.default_logger.debug(data.head(10))
         return recent >= full52WeekHigh
 
     #@measure_time
     # Find stocks' 52 week high/low.
-    def find52WeekHighLow(self, df, saveDict, screenDict):
+    def find52WeekHighLow(self, df, saveDict, screenDict, extrema=None):
         if df is None or len(df) == 0:
             return False
-        data = df.copy()
-        data = data.fillna(0)
-        data = data.replace([np.inf, -np.inf], 0)
+        extrema = PKRollingExtrema(df) if extrema is None else extrema
         one_week = 5
         week_52 = one_week * 50  # Considering holidays etc as well of 10 days
-        full52Week = data.head(week_52 + 1).tail(week_52+1)
-        recentHigh = data.head(1)["High"].iloc[0]
-        recentLow = data.head(1)["Low"].iloc[0]
-        full52WeekHigh = full52Week["High"].max()
-        full52WeekLow = full52Week["Low"].min()
+        recentHigh = extrema.latest("High")
+        recentLow = extrema.latest("Low")
+        full52WeekHigh = extrema.highestHigh(week_52 + 1)
+        full52WeekLow = extrema.lowestLow(week_52 + 1)
 
         saveDict["52Wk-H"] = "{:.2f}".format(full52WeekHigh)
         saveDict["52Wk-L"] = "{:.2f}".format(full52WeekLow)
@@ -280,19 +192,14 @@ class ScreeningStatistics:
         #     self.default_logger.debug(data.head(10))
 
     # Find stocks that have broken through 10 days low.
-    def find10DaysLowBreakout(self, df):
+    def find10DaysLowBreakout(self, df, extrema=None):
         if df is None or len(df) == 0:
             return False
-        data = df.copy()
-        data = data.fillna(0)
-        data = data.replace([np.inf, -np.inf], 0)
+        extrema = PKRollingExtrema(df) if extrema is None else extrema
         one_week = 5
-        recent = data.head(1)["Low"].iloc[0]
-        last1Week = data.head(one_week)
-        last2Week = data.head(2 * one_week)
-        previousWeek = last2Week.tail(one_week)
-        last1WeekLow = last1Week["Low"].min()
-        previousWeekLow = previousWeek["Low"].min()
+        recent = extrema.latest("Low")
+        last1WeekLow = extrema.lowestLow(one_week)
+        previousWeekLow = extrema.lowestLow(2 * one_week, one_week)
         # if self.shouldLog:
         #     self.default_logger.debug(data.head(10))
         return (recent <= min(previousWeekLow, last1WeekLow)) and (
@@ -300,22 +207,14 @@ class ScreeningStatistics:
         )
 
     # Find stocks that have broken through 52 week low.
-    def find52WeekLowBreakout(self, df):
+    def find52WeekLowBreakout(self, df, extrema=None):
         if df is None or len(df) == 0:
             return False
         # https://chartink.com/screener/52-week-low-breakout
-        data = df.copy()
-        data = data.fillna(0)
-        data = data.replace([np.inf, -np.inf], 0)
+        extrema = PKRollingExtrema(df) if extrema is None else extrema
         one_week = 5
-        recent = data.head(1)["Low"].iloc[0]
-        # last1Week = data.head(one_week)
-        # last2Week = data.head(2 * one_week)
-        # previousWeek = last2Week.tail(one_week)
-        full52Week = data.head(50 * one_week)
-        # last1WeekLow = last1Week["Low"].min()
-        # previousWeekLow = previousWeek["Low"].min()
-        full52WeekLow = full52Week["Low"].min()
+        recent = extrema.latest("Low")
+        full52WeekLow = extrema.lowestLow(50 * one_week)
         # if self.shouldLog:
         #     self.default_logger.debug(data.head(10))
         return recent <= full52WeekLow
@@ -376,16 +275,8 @@ class ScreeningStatistics:
         data = data.dropna()
         data = data.reset_index()
         # Filling ATRTrailingStop Variable
-        data["ATRTrailingStop"] = [0.0] + [np.nan for i in range(len(data) - 1)]
-        
-        for i in range(1, len(data)):
-            data.loc[i, "ATRTrailingStop"] = self.xATRTrailingStop_func(
-                data.loc[i, "Close"],
-                data.loc[i - 1, "Close"],
-                data.loc[i - 1, "ATRTrailingStop"],
-                data.loc[i, "nLoss"],
-            )
-        data = self.computeBuySellSignals(data,ema_period=ema_period)
+        data["ATRTrailingStop"] = pktalib.ATRTrailingStop(data["Close"], data["nLoss"], initialStop=0.0)
+        data = self.computeBuySellSignals(data)
         if data is None:
             return False
         recent = data.tail(1)
@@ -915,18 +806,16 @@ class ScreeningStatistics:
     #@measure_time
     # Find accurate breakout value
     def findBreakoutValue(
-        self, df, screenDict, saveDict, daysToLookback, alreadyBrokenout=False
+        self, df, screenDict, saveDict, daysToLookback, alreadyBrokenout=False, extrema=None
     ):
         if df is None or len(df) == 0:
             return False
-        data = df.copy()
-        data = data.fillna(0)
-        data = data.replace([np.inf, -np.inf], 0)
-        recent = data.head(1)
-        data = data[1:]
-        maxHigh = round(data.describe()["High"]["max"], 2)
-        maxClose = round(data.describe()["Close"]["max"], 2)
-        recentClose = round(recent["Close"].iloc[0], 2)
+        # extrema may also be that of the full data that df has the latest candles of
+        extrema = PKRollingExtrema(df) if extrema is None else extrema
+        recent = df.head(1).fillna(0).replace([np.inf, -np.inf], 0)
+        maxHigh = round(extrema.highestHigh(len(df), len(df) - 1), 2)
+        maxClose = round(extrema.highestClose(len(df), len(df) - 1), 2)
+        recentClose = round(extrema.latest("Close"), 2)
         if np.isnan(maxClose) or np.isnan(maxHigh):
             saveDict["Breakout"] = "BO: 0 R: 0"
             screenDict["Breakout"] = (
@@ -968,7 +857,7 @@ class ScreeningStatistics:
                     + colorText.END
                 )
                 return not alreadyBrokenout
-            noOfHigherShadows = len(data[data.High > maxClose])
+            noOfHigherShadows = np.count_nonzero(PKRollingExtrema.candles(df, "High", len(df))[:-1] > maxClose)
             if daysToLookback / noOfHigherShadows <= 3:
                 saveDict["Breakout"] = "BO: " + str(maxHigh) + " R: 0"
                 if recentClose >= maxHigh:
@@ -1126,27 +1015,24 @@ class ScreeningStatistics:
         # Calculate ATR and xATRTrailingStop
         xATR = np.array(pktalib.ATR(data['High'], data['Low'], data['Close'], timeperiod=atr_period))
         nLoss = key_value * xATR
-        src = data['Close']
-        # Initialize arrays
-        xATRTrailingStop = np.zeros(len(data))
-        xATRTrailingStop[0] = src[0] - nLoss[0]
-
-        # Calculate xATRTrailingStop using vectorized operations
-        mask_1 = (src > np.roll(xATRTrailingStop, 1)) & (np.roll(src, 1) > np.roll(xATRTrailingStop, 1))
-        mask_2 = (src < np.roll(xATRTrailingStop, 1)) & (np.roll(src, 1) < np.roll(xATRTrailingStop, 1))
-        mask_3 = src > np.roll(xATRTrailingStop, 1)
-
-        xATRTrailingStop = np.where(mask_1, np.maximum(np.roll(xATRTrailingStop, 1), src - nLoss), xATRTrailingStop)
-        xATRTrailingStop = np.where(mask_2, np.minimum(np.roll(xATRTrailingStop, 1), src + nLoss), xATRTrailingStop)
-        xATRTrailingStop = np.where(mask_3, src - nLoss, xATRTrailingStop)
-
-        mask_buy = (np.roll(src, 1) < xATRTrailingStop) & (src > np.roll(xATRTrailingStop, 1))
-        mask_sell = (np.roll(src, 1) > xATRTrailingStop) & (src < np.roll(xATRTrailingStop, 1))
+        src = np.array(data['Close'], dtype=float)
+        xATRTrailingStop = np.full(len(data), np.nan)
+        # The stop starts from the first candle that has an ATR value
+        validATR = np.flatnonzero(~np.isnan(nLoss))
+        if len(validATR) > 0:
+            first = validATR[0]
+            xATRTrailingStop[first:] = pktalib.ATRTrailingStop(src[first:], nLoss[first:], initialStop=src[first] - nLoss[first])
+
+        prevSrc = np.roll(src, 1)
+        prevStop = np.roll(xATRTrailingStop, 1)
+        prevSrc[0] = np.nan
+        prevStop[0] = np.nan
+        mask_buy = (prevSrc < xATRTrailingStop) & (src > prevStop)
+        mask_sell = (prevSrc > xATRTrailingStop) & (src < prevStop)
 
         pos = np.zeros(len(data))
         pos = np.where(mask_buy, 1, pos)
         pos = np.where(mask_sell, -1, pos)
-        pos[~((pos == 1) | (pos == -1))] = 0
 
         ema = np.array(pktalib.EMA(data['Close'], timeperiod=ema_period))
 
@@ -1157,7 +1043,8 @@ class ScreeningStatistics:
         trend = np.where(buy_condition_utbot, 1, np.where(sell_condition_utbot, -1, 0))
         trend_arr = np.array(trend)
         data.insert(len(data.columns), "trend", trend_arr)
-        trend = trend[0]
+        # data is oldest-first, so the most recent candle is the last one
+        trend = trend[-1]
         saveDict["B/S"] = "Buy" if trend == 1 else ("Sell" if trend == -1 else "NA")
         screenDict["B/S"] = (colorText.GREEN + "Buy") if trend == 1 else ((colorText.FAIL+ "Sell") if trend == -1 else (colorText.WARN + "NA")) + colorText.END
         return buySellAll == trend
@@ -1210,102 +1097,96 @@ class ScreeningStatistics:
         data = data.replace([np.inf, -np.inf], 0)
         data = data[::-1]  # Reverse the dataframe so that its the oldest date first
 
-        df_point = pd.DataFrame(columns=['StockName', 'DateK', 'DateA', 'DateB', 'DateC', 'DateD', 'Gamma'])
-
+        pointColumns = ['StockName', 'DateK', 'DateA', 'DateB', 'DateC', 'DateD', 'Gamma']
         data = data.reset_index()
-        data['Date'] = data['Date'].apply(lambda x : x.strftime('%Y-%m-%d'))
-        data['Close_ch'] = data['Close'].shift(+1)
-        data['rpv'] = ((data['Close'] / data['Close_ch']) - 1) * data['Volume']
-        data['SMA50_Volume'] = data.Volume.rolling(50).mean()
-        data['SMA50_rpv'] = data.rpv.rolling(50).mean()
-
-        T = 0
-        i = 1
+        dates = data['Date'].apply(lambda x : x.strftime('%Y-%m-%d')).tolist()
+        close = data['Close'].astype(float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rpv = (((close / close.shift(+1)) - 1) * data['Volume']).to_numpy(dtype=float)
+        sma50Rpv = pd.Series(rpv).rolling(50).mean().to_numpy()
+        avg_ma_vol = data.Volume.rolling(50).mean().mean()
+        # Every window below is a contiguous range of candles, so the extrema come
+        # from sparse tables and the (up/down) rpv and volume means from prefix sums.
+        closes = PKRangeIndex(close)
+        Close = closes.valueList
+        upRpv = PKRangeIndex.prefixSums(rpv, rpv > 0)
+        downRpv = PKRangeIndex.prefixSums(rpv, rpv <= 0)
+        volumes = PKRangeIndex.prefixSums(data['Volume'].to_numpy(dtype=float))
+        lastIndex = len(data) - 1
+
+        def rpvRatio(upMean, left, right):
+            downMean = abs(PKRangeIndex.rangeMean(downRpv, left, right))
+            if downMean == 0:
+                downMean = np.nanmean(sma50Rpv[left:right + 1]) if not np.isnan(sma50Rpv[left:right + 1]).all() else np.nan
+            return np.float64(upMean) / downMean
+
+        def searchCupAndHandle(Da_index):
+            # The cup (B, C) and handle (D) search only depends on the peak A, so
+            # it is run once per distinct peak however many setups lead to it.
+            if Da_index in cupSearches:
+                return cupSearches[Da_index]
+            cupSearches[Da_index] = None
+            Pa_value = Close[Da_index]
+            a = 40
+            while a > 10:
+                endB = min(Da_index + a, lastIndex)
+                Db_index = closes.lowestIndex(Da_index, endB)
+                Pb_value = Close[Db_index]
+                avg_vol = PKRangeIndex.rangeMean(volumes, Da_index, endB)
+                if (Pb_value < Pa_value) and (avg_vol < avg_ma_vol):
+                    b = a
+                    while b > round(a/3):
+                        endC = min(Db_index + b + 1, lastIndex)
+                        Dc_index = closes.highestIndex(Db_index, endC)
+                        Pc_value = Close[Dc_index]
+                        uprv2 = abs(PKRangeIndex.rangeMean(upRpv, Db_index, endC))
+                        alpha2 = rpvRatio(uprv2, Db_index, endC)
+                        if (Pc_value > Pb_value) and (alpha2 > 1):
+                            # search for region C to D
+                            c = b/2
+                            while c > round(b/4):
+                                endD = min(int(math.floor(Dc_index + c + 1)), lastIndex)
+                                Dd_index = closes.lowestIndex(Dc_index, endD)
+                                Pd_value = Close[Dd_index]
+                                beta = rpvRatio(uprv2, Dc_index, endD)
+                                if (Pd_value <= Pc_value) and (Pd_value > 0.8 * Pc_value + 0.2 * Pb_value) and (beta > 1):
+                                    if (Pc_value <= Pa_value) and (Pd_value > Pb_value):
+                                        cupSearches[Da_index] = (Db_index, Dc_index, Dd_index, math.log(alpha2) + math.log(beta))
+                                        return cupSearches[Da_index]
+                                c = c-1
+                        b = b-1
+                a = a-1
+            return None
+
+        cupSearches = {}
+        pointRows = []
         t = 51
         foundStockWithCupNHandle = False
-        while t < len(data)-T:
-            dat = data.loc[t:]
-            Dk = dat.loc[t]['Date']
-            Pk = dat.loc[t]['Close']   
-            # search for region K to A
-            k = 25
-            while k > 15:
-                #print('Searching SETUP with width = ', k)
-                datA = dat.loc[:t+k] # Dk = t
-                # first find absolute maxima point A
-                Da_index = datA[datA['Close'] == max(datA['Close'])]['Date'].index[0]
-                Da_value = datA[datA['Close'] == max(datA['Close'])]['Date'].values[0]
-                Pa_index = datA[datA['Close'] == max(datA['Close'])]['Close'].index[0]
-                Pa_value = datA[datA['Close'] == max(datA['Close'])]['Close'].values[0]
-                uprv1 = abs(datA.loc[t:Da_index].loc[datA['rpv'] > 0, :]['rpv'].mean())
-                dprv1 = abs(datA.loc[t:Da_index].loc[datA['rpv'] <= 0, :]['rpv'].mean())
-                if (dprv1 == 'NaN') | (dprv1 == 0):
-                    dprv1 = datA['SMA50_rpv'].mean()   
-                alpha1 = uprv1/dprv1
-                #delta = Pa_index/t 
-                delta = Pa_value/Pk
-                if (delta > 1) & (alpha1 > 1):
-                    #print('Okay good setup! Lets move on now')
-                    a = 40
-                    while a > 10:
-                        #print('Lets search for LEFT SIDE CUP with width = ', a)
-                        datB = dat.loc[Da_index:Da_index+a]
-                        Db_index = datB[datB['Close'] == min(datB['Close'])]['Date'].index[0]
-                        Db_value = datB[datB['Close'] == min(datB['Close'])]['Date'].values[0]
-                        Pb_index = datB[datB['Close'] == min(datB['Close'])]['Close'].index[0]
-                        Pb_value = datB[datB['Close'] == min(datB['Close'])]['Close'].values[0]
-                        avg_vol = datB['Volume'].mean()
-                        avg_ma_vol = data['SMA50_Volume'].mean()
-                        if (Pb_value < Pa_value) & (avg_vol < avg_ma_vol):
-                            #print("Voila! You found the bottom, it's all uphill from here")
-                            b = a
-                            while b > round(a/3):
-                                #print("Let's search for RIGHT SIDE CUP with width = ", b)
-                                datC = dat.loc[Db_index:Db_index+b+1]
-                                Dc_index = datC[datC['Close'] == max(datC['Close'])]['Date'].index[0]
-                                Dc_value = datC[datC['Close'] == max(datC['Close'])]['Date'].values[0]
-                                Pc_index = datC[datC['Close'] == max(datC['Close'])]['Close'].index[0]
-                                Pc_value = datC[datC['Close'] == max(datC['Close'])]['Close'].values[0]
-                                uprv2 = abs(datC.loc[datC['rpv'] > 0, :]['rpv'].mean())
-                                dprv2 = abs(datC.loc[datC['rpv'] <= 0, :]['rpv'].mean())
-                                if (dprv2 == 'NaN') | (dprv2 == 0):
-                                    dprv2 = datC['SMA50_rpv'].mean()      
-                                alpha2 = uprv2/dprv2
-                                if (Pc_value > Pb_value) & (alpha2 > 1):
-                                    #print("Almost there... be patient now! :D")
-                                    # search for region C to D
-                                    c = b/2
-                                    while c > round(b/4):
-                                        #print("Let's search for the handle now with width = ", c)
-                                        #print(t, " ", k, " ", a, " ", b, " ", c)
-                                        datD = dat.loc[Dc_index:Dc_index+c+1]
-                                        Dd_index = datD[datD['Close'] == min(datD['Close'])]['Date'].index[0]
-                                        Dd_value = datD[datD['Close'] == min(datD['Close'])]['Date'].values[0]
-                                        Pd_index = datD[datD['Close'] == min(datD['Close'])]['Close'].index[0]
-                                        Pd_value = datD[datD['Close'] == min(datD['Close'])]['Close'].values[0]
-                                        uprv3 = abs(datD.loc[datD['rpv'] > 0, :]['rpv'].mean())
-                                        dprv3 = abs(datD.loc[datD['rpv'] <= 0, :]['rpv'].mean())
-                                        if (dprv3 == 'NaN') | (dprv3 == 0):
-                                            dprv3 = datD['SMA50_rpv'].mean()      
-                                        beta = uprv2/dprv3
-                                        if (Pd_value <= Pc_value) & (Pd_value > 0.8 * Pc_value + 0.2 * Pb_value) & (beta > 1):
-                                            if (Pc_value <= Pa_value) & (Pd_value > Pb_value):
-                                                foundStockWithCupNHandle = True
-                                                gamma = math.log(alpha2) + math.log(beta) + delta
-                                                df_point.loc[len(df_point)] = [stockName, Dk, Da_value, Db_value, Dc_value, Dd_value, gamma]
-                                                #print("Hurrah! Got "+str(i)+" hits!")
-                                                k = 15
-                                                a = 10
-                                                b = round(a/3)
-                                                c = round(b/4)
-                                                i = i+1
-                                                t = t+15
-                                                break
-                                        c = c-1
-                                b = b-1
-                        a = a-1
-                k = k-1
-            t = t + 1
+        with np.errstate(divide="ignore", invalid="ignore"):
+            while t <= lastIndex:
+                Pk = np.float64(Close[t])
+                # search for region K to A
+                k = 25
+                while k > 15:
+                    endA = min(t + k, lastIndex)
+                    Da_index = closes.highestIndex(t, endA)
+                    uprv1 = abs(PKRangeIndex.rangeMean(upRpv, t, Da_index))
+                    dprv1 = abs(PKRangeIndex.rangeMean(downRpv, t, Da_index))
+                    if dprv1 == 0:
+                        dprv1 = np.nanmean(sma50Rpv[t:endA + 1]) if not np.isnan(sma50Rpv[t:endA + 1]).all() else np.nan
+                    alpha1 = np.float64(uprv1) / dprv1
+                    delta = Close[Da_index] / Pk
+                    if (delta > 1) and (alpha1 > 1):
+                        cupAndHandle = searchCupAndHandle(Da_index)
+                        if cupAndHandle is not None:
+                            foundStockWithCupNHandle = True
+                            Db_index, Dc_index, Dd_index, gamma = cupAndHandle
+                            pointRows.append([stockName, dates[t], dates[Da_index], dates[Db_index], dates[Dc_index], dates[Dd_index], gamma + delta])
+                            t = t+15
+                            break
+                    k = k-1
+                t = t + 1
+        df_point = pd.DataFrame(pointRows, columns=pointColumns) if len(pointRows) > 0 else pd.DataFrame(columns=pointColumns)
         return foundStockWithCupNHandle, df_point
 
     def validate_cup(self,df, cup_start, cup_bottom, cup_end):
@@ -1414,28 +1295,18 @@ class ScreeningStatistics:
         existingSave = f"{existingSave}, " if (existingSave is not None and len(existingSave) > 0) else ""
         return existingScreen, existingSave
 
-    def findHigherBullishOpens(self, df):
-        if df is None or len(df) == 0:
-            return False
-        data = df.copy()
-        data = data.fillna(0)
-        data = data.replace([np.inf, -np.inf], 0)
-        recent = data.head(2)
-        if len(recent) < 2:
+    def findHigherBullishOpens(self, df, view=None):
+        if df is None or len(df) < 2:
             return False
-        return recent["Open"].iloc[0] > recent["High"].iloc[1]
+        view = PKStockView(df) if view is None else view
+        return view.at("Open") > view.at("High", 1)
 
     # Find stocks that opened higher than the previous high
-    def findHigherOpens(self, df):
-        if df is None or len(df) == 0:
-            return False
-        data = df.copy()
-        data = data.fillna(0)
-        data = data.replace([np.inf, -np.inf], 0)
-        recent = data.head(2)
-        if len(recent) < 2:
+    def findHigherOpens(self, df, view=None):
+        if df is None or len(df) < 2:
             return False
-        return recent["Open"].iloc[0] > recent["Close"].iloc[1]
+        view = PKStockView(df) if view is None else view
+        return view.at("Open") > view.at("Close", 1)
 
     # Find DEEL Momentum
     def findHighMomentum(self, df, strict=False):
@@ -1621,35 +1492,26 @@ class ScreeningStatistics:
         ts = diff_df.tail(len(diff_df)-index +1).head(1).index[-1]
         return ts, data[data.index == ts] #df.head(len(df) -index +1).tail(1)
 
-    def findNR4Day(self, df):
+    def findNR4Day(self, df, view=None):
         if df is None or len(df) == 0:
             return False
-        data = df.copy()
         # https://chartink.com/screener/nr4-daily-today
-        if data.tail(1)["Volume"].iloc[0] <= 50000:
-            return False
-        data = data.fillna(0)
-        data = data.replace([np.inf, -np.inf], 0)
-        data = data[::-1]  # Reverse the dataframe so that its the oldest date first
-        data["SMA10"] = pktalib.SMA(data["Close"], 10)
-        data["SMA50"] = pktalib.SMA(data["Close"], 50)
-        data["SMA200"] = pktalib.SMA(data["Close"], 200)
-        recent = data.tail(5)
-        recent = recent[::-1]
-        cond1 = (recent["High"].iloc[0] - recent["Low"].iloc[0]) < (
-            recent["High"].iloc[1] - recent["Low"].iloc[1]
-        )
-        cond2 = cond1 and (recent["High"].iloc[0] - recent["Low"].iloc[0]) < (
-            recent["High"].iloc[2] - recent["Low"].iloc[2]
-        )
-        cond3 = cond2 and (recent["High"].iloc[0] - recent["Low"].iloc[0]) < (
-            recent["High"].iloc[3] - recent["Low"].iloc[3]
-        )
-        cond4 = cond3 and (recent["High"].iloc[0] - recent["Low"].iloc[0]) < (
-            recent["High"].iloc[4] - recent["Low"].iloc[4]
-        )
-        cond5 = cond4 and (recent["SMA10"].iloc[0] > recent["SMA50"].iloc[0])
-        cond6 = cond5 and (recent["SMA50"].iloc[0] > recent["SMA200"].iloc[0])
+        if df.tail(1)["Volume"].iloc[0] <= 50000:
+            return False
+        view = PKStockView(df) if view is None else view
+        ranges = [view.at("High", barsAgo) - view.at("Low", barsAgo) for barsAgo in range(5)]
+        cond1 = ranges[0] < ranges[1]
+        cond2 = cond1 and ranges[0] < ranges[2]
+        cond3 = cond2 and ranges[0] < ranges[3]
+        cond4 = cond3 and ranges[0] < ranges[4]
+        if not cond4:
+            return cond4
+        close = view.series("Close")
+        sma10 = pktalib.SMA(close, 10).iloc[-1]
+        sma50 = pktalib.SMA(close, 50).iloc[-1]
+        sma200 = pktalib.SMA(close, 200).iloc[-1]
+        cond5 = cond4 and (sma10 > sma50)
+        cond6 = cond5 and (sma50 > sma200)
         return cond6
 
     def findPerfectShortSellsFutures(self, df):
@@ -1683,29 +1545,20 @@ class ScreeningStatistics:
     # in the previous 30 candles is lower than the highest high made in the
     # previous 200 candles, starting from the previous 30th candle. At the
     # same time the current candle volume is higher than 200 SMA of volume.
-    def findPotentialBreakout(self, df, screenDict, saveDict, daysToLookback):
+    def findPotentialBreakout(self, df, screenDict, saveDict, daysToLookback, extrema=None):
         if df is None or len(df) == 0:
             return False
-        data = df.copy()
-        data = data.fillna(0)
-        data = data.replace([np.inf, -np.inf], 0)
-        data = data.head(231)
-        recent = data.head(1)
-        recentVolume = recent["Volume"].iloc[0]
-        recentClose = round(recent["Close"].iloc[0] * 1.05, 2)
-        highestHigh200 = round(data.head(201).tail(200).describe()["High"]["max"], 2)
-        highestHigh30 = round(data.head(31).tail(30).describe()["High"]["max"], 2)
-        highestHigh200From30 = round(data.tail(200).describe()["High"]["max"], 2)
-        highestHigh8From30 = round(data.head(39).tail(8).describe()["High"]["max"], 2)
-        data = data.head(200)
-        data = data[::-1]  # Reverse the dataframe so that its the oldest date first
-        vol200 = pktalib.SMA(data["Volume"],timeperiod=200)
-        data["SMA200V"] = vol200
-        vol50 = pktalib.SMA(data["Volume"],timeperiod=50)
-        data["SMA50V"] = vol50
-        recent = data.tail(1)
-        sma200v = recent["SMA200V"].iloc[0]
-        sma50v = recent["SMA50V"].iloc[0]
+        extrema = PKRollingExtrema(df.head(231)) if extrema is None else extrema
+        recentClose = round(extrema.latest("Close") * 1.05, 2)
+        highestHigh200 = round(extrema.highestHigh(201, 200), 2)
+        highestHigh30 = round(extrema.highestHigh(31, 30), 2)
+        highestHigh200From30 = round(extrema.highestHigh(231, 200), 2)
+        highestHigh8From30 = round(extrema.highestHigh(39, 8), 2)
+        # Oldest date first
+        volume = pd.Series(PKRollingExtrema.candles(df, "Volume", 200))
+        recentVolume = volume.iloc[-1]
+        sma200v = pktalib.SMA(volume,timeperiod=200).iloc[-1]
+        sma50v = pktalib.SMA(volume,timeperiod=50).iloc[-1]
         if (
             np.isnan(recentClose)
             or np.isnan(highestHigh200)
@@ -1893,12 +1746,24 @@ class ScreeningStatistics:
             return True if (rsiKey == "RSIi") else (self.findRSICrossingMA(df, screenDict, saveDict,lookFor=lookFor, maLength=maLength, rsiKey="RSIi") or True)
         return False if (rsiKey == "RSIi") else (self.findRSICrossingMA(df, screenDict, saveDict,lookFor=lookFor, maLength=maLength, rsiKey="RSIi"))
     
-    def findRSRating(self, stock_rs_value=-1, index_rs_value=-1,df=None,screenDict={}, saveDict={}):
+    def findRSRating(self, stock_rs_value=-1, index_rs_value=-1,df=None,screenDict={}, saveDict={},precomputed=None):
+        # precomputed is the (rsValue, rsPercentile) from PKRelativeStrength
+        # for the whole scan universe, if available.
+        rs_percentile = None
+        if precomputed is not None:
+            stock_rs_value, rs_percentile = precomputed
+            if df is not None:
+                # Keep the ascending order calc_relative_strength leaves behind.
+                # findRVM (called right after) relies on it.
+                df.sort_index(inplace=True)
         if stock_rs_value <= 0:
             stock_rs_value = self.calc_relative_strength(df=df)
         rs_rating = round(100 * ( stock_rs_value / index_rs_value ),2)
         screenDict[f"RS_Rating{self.configManager.baseIndex}"] = rs_rating
         saveDict[f"RS_Rating{self.configManager.baseIndex}"] = rs_rating
+        if rs_percentile is not None and not np.isnan(rs_percentile):
+            screenDict[f"RS_Pctl{self.configManager.baseIndex}"] = rs_percentile
+            saveDict[f"RS_Pctl{self.configManager.baseIndex}"] = rs_percentile
         return rs_rating
     
     # Relative volatality measure
@@ -1934,15 +1799,11 @@ class ScreeningStatistics:
         cond5 = cond4 and (recent["Volume"].iloc[0] > recent["SMAV10"].iloc[0] * 0.75)
         return cond5
     
-    def findSuperGainersLosers(self, df, percentChangeRequired=15, gainer=True):
+    def findSuperGainersLosers(self, df, percentChangeRequired=15, gainer=True, view=None):
         if df is None or len(df) < 2:
             return False
-        data = df.copy()
-        data = data.fillna(0)
-        data = data.replace([np.inf, -np.inf], 0)
-        data = data[::-1]  # Reverse the dataframe so that its the oldest date first
-        recent = data.tail(2)
-        percentChange = round((recent["Close"].iloc[1] - recent["Close"].iloc[0]) *100/recent["Close"].iloc[0],1)
+        view = PKStockView(df) if view is None else view
+        percentChange = round((view.at("Close") - view.at("Close", 1)) *100/view.at("Close", 1),1)
         return percentChange >= percentChangeRequired if gainer else percentChange <= percentChangeRequired
 
     #@measure_time
@@ -2739,54 +2600,26 @@ class ScreeningStatistics:
         return dataframe
     
     # Preprocess the acquired data
-    def preprocessData(self, df, daysToLookback=None):
+    def preprocessData(self, df, daysToLookback=None, indicators=None):
+        # indicators: the indicator columns to add (all of them if None),
+        # see PKIndicatorPlan. Columns that df already has are kept as is.
         assert isinstance(df, pd.DataFrame)
         data = df.copy()
         try:
-            data = data.replace(np.inf, np.nan).replace(-np.inf, np.nan).dropna(how="all")
+            data = data.replace([np.inf, -np.inf], np.nan).dropna(how="all")
             if data.empty:
                 return (data,data)
             # self.default_logger.info(f"Preprocessing data:\n{data.head(1)}\n")
             if daysToLookback is None:
                 daysToLookback = self.configManager.daysToLookback
-            volatility = df['Close'].rolling(window=20).std()
-            if self.configManager.useEMA:
-                sma = pktalib.EMA(data["Close"], timeperiod=50)
-                lma = pktalib.EMA(data["Close"], timeperiod=200)
-                ssma = pktalib.EMA(data["Close"], timeperiod=9)
-                ssma20 = pktalib.EMA(data["Close"], timeperiod=20)
-                data.insert(len(data.columns), "SMA", sma)
-                data.insert(len(data.columns), "LMA", lma)
-                data.insert(len(data.columns), "SSMA", ssma)
-                data.insert(len(data.columns), "SSMA20", ssma20)
-                data.insert(len(data.columns), "Volatility", volatility)
-            else:
-                sma = pktalib.SMA(data["Close"], timeperiod=50)
-                lma = pktalib.SMA(data["Close"], timeperiod=200)
-                ssma = pktalib.SMA(data["Close"], timeperiod=9)
-                ssma20 = pktalib.SMA(data["Close"], timeperiod=20)
-                data.insert(len(data.columns), "SMA", sma)
-                data.insert(len(data.columns), "LMA", lma)
-                data.insert(len(data.columns), "SSMA", ssma)
-                data.insert(len(data.columns), "SSMA20", ssma20)
-                data.insert(len(data.columns), "Volatility", volatility)
-            vol = pktalib.SMA(data["Volume"], timeperiod=20)
-            rsi = pktalib.RSI(data["Close"], timeperiod=14)
-            data.insert(len(data.columns), "VolMA", vol)
-            data.insert(len(data.columns), "RSI", rsi)
-            cci = pktalib.CCI(data["High"], data["Low"], data["Close"], timeperiod=14)
-            data.insert(len(data.columns), "CCI", cci)
+            indicators = INDICATORS if indicators is None else indicators
+            columns = {}
             try:
-                fastk, fastd = pktalib.STOCHRSI(
-                    data["Close"], timeperiod=14, fastk_period=5, fastd_period=3, fastd_matype=0
-                )
-                data.insert(len(data.columns), "FASTK", fastk)
-                data.insert(len(data.columns), "FASTD", fastd)
-            except KeyboardInterrupt: # pragma: no cover
-                raise KeyboardInterrupt
-            except Exception as e: # pragma: no cover
-                self.default_logger.debug(e, exc_info=True)
-                pass
+                self.computeIndicators(data, [column for column in INDICATORS if column in indicators and column not in data.columns], columns, volatilityClose=df["Close"])
+            finally:
+                # Add them all at once (and whatever got computed if one of them failed)
+                if len(columns) > 0:
+                    data = pd.concat([data, pd.DataFrame(columns, index=data.index)], axis=1)
         except KeyboardInterrupt: # pragma: no cover
             raise KeyboardInterrupt
         except Exception as e: # pragma: no cover
@@ -2798,6 +2631,60 @@ class ScreeningStatistics:
         fullData = data
         trimmedData = data.head(daysToLookback)
         return (fullData, trimmedData)
+
+    def computeIndicators(self, data, indicators, columns, volatilityClose=None):
+        # Adds the requested indicators of the (oldest-first) data to columns
+        if self.configManager.useEMA:
+            movingAverage = pktalib.EMA
+        else:
+            movingAverage = pktalib.SMA
+        for column, timeperiod in [("SMA", 50), ("LMA", 200), ("SSMA", 9), ("SSMA20", 20)]:
+            if column in indicators:
+                columns[column] = movingAverage(data["Close"], timeperiod=timeperiod)
+        if "Volatility" in indicators:
+            close = data["Close"] if volatilityClose is None else volatilityClose
+            columns["Volatility"] = close.rolling(window=20).std()
+        if "VolMA" in indicators:
+            columns["VolMA"] = pktalib.SMA(data["Volume"], timeperiod=20)
+        if "RSI" in indicators:
+            columns["RSI"] = pktalib.RSI(data["Close"], timeperiod=14)
+        if "CCI" in indicators:
+            columns["CCI"] = pktalib.CCI(data["High"], data["Low"], data["Close"], timeperiod=14)
+        if "FASTK" in indicators or "FASTD" in indicators:
+            try:
+                fastk, fastd = pktalib.STOCHRSI(
+                    data["Close"], timeperiod=14, fastk_period=5, fastd_period=3, fastd_matype=0
+                )
+                columns["FASTK"] = fastk
+                columns["FASTD"] = fastd
+            except KeyboardInterrupt: # pragma: no cover
+                raise KeyboardInterrupt
+            except Exception as e: # pragma: no cover
+                self.default_logger.debug(e, exc_info=True)
+                pass
+        return columns
+
+    def completeIndicators(self, fullData, processedData, indicators=RESULT_INDICATORS):
+        # Adds the indicators that preprocessData was not asked for (to both
+        # frames, in place), for the stocks that passed a scan.
+        if fullData is None or fullData.empty:
+            return
+        missing = [column for column in INDICATORS if column in indicators and column not in fullData.columns]
+        if len(missing) == 0:
+            return
+        columns = {}
+        try:
+            self.computeIndicators(fullData[::-1], missing, columns)
+        except KeyboardInterrupt: # pragma: no cover
+            raise KeyboardInterrupt
+        except Exception as e: # pragma: no cover
+            self.default_logger.debug(e, exc_info=True)
+            pass
+        for column, values in columns.items():
+            values = np.asarray(values)[::-1]
+            fullData.insert(len(fullData.columns), column, values)
+            if processedData is not None and column not in processedData.columns:
+                processedData.insert(len(processedData.columns), column, values[:len(processedData)])
     
     # Validate if the stock is bullish in the short term
     def validate15MinutePriceVolumeBreakout(self, df):
@@ -2861,13 +2748,11 @@ class ScreeningStatistics:
 
     #@measure_time
     # validate if CCI is within given range
-    def validateCCI(self, df, screenDict, saveDict, minCCI, maxCCI):
+    def validateCCI(self, df, screenDict, saveDict, minCCI, maxCCI, view=None):
         if df is None or len(df) == 0:
             return False
-        data = df.copy()
-        data = data.fillna(0)
-        data = data.replace([np.inf, -np.inf], 0)
-        cci = int(data.head(1)["CCI"].iloc[0])
+        view = PKStockView(df) if view is None else view
+        cci = int(view.at("CCI"))
         saveDict["CCI"] = cci
         if (cci >= minCCI and cci <= maxCCI) and "Trend" in saveDict.keys():
             if ("Up" in saveDict["Trend"]):
@@ -2883,6 +2768,38 @@ class ScreeningStatistics:
         return False
 
     # Find Conflucence
+    def findSuperConfluenceDays(self, emaValues, sma200, maxRecentDays, percentage=0.1, enforce200SMA=True):
+        # emaValues is a list of up to 3 (symbols x time) oldest-first EMA arrays
+        # (8, 21, 55 by default) and sma200 the matching 200 SMA array. Day k
+        # (1 = the latest candle) is checked against day k+1, for k = 1..maxRecentDays.
+        # Crossovers and the EMA55 / SMA200 separation count from the day they
+        # happen onwards. Returns, per symbol, the first day of a super-golden
+        # confluence and the last day of a silver-cross confluence (0 if none),
+        # along with the (symbols x days) values on each review day.
+        numSymbols, numCandles = sma200.shape
+        days = np.arange(1, maxRecentDays + 1)
+        current = np.maximum(numCandles - days, 0)
+        previous = np.maximum(numCandles - days - 1, 0)
+        zeros = np.zeros((numSymbols, len(days)))
+        emaToday = [emaValue[:, current] for emaValue in emaValues] + [zeros] * (3 - len(emaValues))
+        emaPrevious = [emaValue[:, previous] for emaValue in emaValues] + [zeros] * (3 - len(emaValues))
+        ema_8, ema_21, ema_55 = emaToday
+        ema_8_prev, ema_21_prev, ema_55_prev = emaPrevious
+        sma_200 = sma200[:, current]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            ema8CrossedEMA21 = np.logical_or.accumulate((ema_8 >= ema_21) & (ema_8_prev <= ema_21_prev), axis=1)
+            ema8CrossedEMA55 = np.logical_or.accumulate((ema_8 >= ema_55) & (ema_8_prev <= ema_55_prev), axis=1)
+            ema21CrossedEMA55 = np.logical_or.accumulate((ema_21 >= ema_55) & (ema_21_prev <= ema_55_prev), axis=1)
+            ema55_percentage = np.abs(ema_55 - sma_200) / ema_55
+            emasCrossedSMA200 = np.logical_or.accumulate(ema55_percentage <= percentage, axis=1)
+        if not enforce200SMA:
+            emasCrossedSMA200 = np.ones(emasCrossedSMA200.shape, dtype=bool)
+        superbConfluence = ema8CrossedEMA21 & emasCrossedSMA200
+        silverCross = ema8CrossedEMA21 & ema8CrossedEMA55 & ema21CrossedEMA55 & ~superbConfluence
+        superDays = np.where(superbConfluence.any(axis=1), superbConfluence.argmax(axis=1) + 1, 0)
+        silverDays = np.where(silverCross.any(axis=1), len(days) - silverCross[:, ::-1].argmax(axis=1), 0)
+        return superDays, silverDays, (ema_8, ema_21, ema_55, sma_200, ema55_percentage, emasCrossedSMA200)
+
     def validateConfluence(self, stock, df, full_df, screenDict, saveDict, percentage=0.1,confFilter=3):
         if df is None or len(df) == 0:
             return False
@@ -2896,50 +2813,24 @@ class ScreeningStatistics:
         key4 = "200DMA"
         saved = self.findCurrentSavedValue(screenDict,saveDict,"MA-Signal")
         if confFilter == 4:
-            maxRecentDays = int(self.configManager.superConfluenceMaxReviewDays)
-            recentCurrentDay = 1
-            isSuperConfluence = False
-            ema_8 = 0
-            ema_21 = 0
-            ema_55 = 0
+            maxRecentDays = min(int(self.configManager.superConfluenceMaxReviewDays), len(data))
             reversedData = data[::-1]  # Reverse the dataframe so that it's oldest data first
             emas = self.configManager.superConfluenceEMAPeriods.split(",")
             if len(emas) < 2:
                 emas = [8,21,]
-            ema8CrossedEMA21 = False
-            ema8CrossedEMA55 = False
-            ema21CrossedEMA55 = False
-            emasCrossedSMA200 = False
-            silverCross = False
-            while recentCurrentDay <= maxRecentDays:
-                # 8 ema>21 ema > 55 ema >200 sma each OF THE ema AND THE 200 sma SEPARATED BY LESS THAN 1%(ideally 0.1% TO 0.5%) DURING CONFLUENCE
-                if len(emas) >= 1:
-                    ema_8 = pktalib.EMA(reversedData["Close"],int(emas[0])).tail(recentCurrentDay).head(1).iloc[0]
-                    ema_8_prev = pktalib.EMA(reversedData["Close"],int(emas[0])).tail(recentCurrentDay+1).head(1).iloc[0]
-                if len(emas) >= 2:
-                    ema_21 = pktalib.EMA(reversedData["Close"],int(emas[1])).tail(recentCurrentDay).head(1).iloc[0]
-                    ema_21_prev = pktalib.EMA(reversedData["Close"],int(emas[1])).tail(recentCurrentDay+1).head(1).iloc[0]
-                if len(emas) >= 3:
-                    ema_55 = pktalib.EMA(reversedData["Close"],int(emas[2])).tail(recentCurrentDay).head(1).iloc[0]
-                    ema_55_prev = pktalib.EMA(reversedData["Close"],int(emas[2])).tail(recentCurrentDay+1).head(1).iloc[0]
-                
-                ema8CrossedEMA21 = (ema_8 >= ema_21 and ema_8_prev <= ema_21_prev) or ema8CrossedEMA21
-                ema8CrossedEMA55 = (ema_8 >= ema_55 and ema_8_prev <= ema_55_prev) or ema8CrossedEMA55
-                ema21CrossedEMA55 = (ema_21 >= ema_55 and ema_21_prev <= ema_55_prev) or ema21CrossedEMA55
-                
-                sma_200 = pktalib.SMA(reversedData["Close"],200).tail(recentCurrentDay).head(1).iloc[0]
-                # ema9 = pktalib.EMA(reversedData["Close"],9).tail(recentCurrentDay).head(1).iloc[0]
-                # smaRange = sma_200 * percentage
-                superConfluenceEnforce200SMA = self.configManager.superConfluenceEnforce200SMA
-                # ema_min = min(ema_8, ema_21, ema_55)
-                ema55_percentage = abs(ema_55 - sma_200) / ema_55
-                emasCrossedSMA200 = ((ema55_percentage <= percentage)) or emasCrossedSMA200 # (sma_200 <= ema_min and sma_200 <= ema_55)
-                if not superConfluenceEnforce200SMA:
-                    emasCrossedSMA200 = True
-                superbConfluence = sum([ema8CrossedEMA21, emasCrossedSMA200]) >= 2 # ema8CrossedEMA55, ema21CrossedEMA55
-                if superbConfluence:
-                    indexDate = PKDateUtilities.dateFromYmdString(str(data.index[recentCurrentDay-1]).split(" ")[0])
-                    dayDate = f"{indexDate.day}/{indexDate.month}"
+            # Each EMA and the 200 SMA are computed once over the whole series
+            # and all the review days are then checked together.
+            emaValues = [np.array(pktalib.EMA(reversedData["Close"],int(period)), dtype=float) for period in emas[:3]]
+            sma200 = np.array(pktalib.SMA(reversedData["Close"],200), dtype=float)
+            superDays, silverDays, dayValues = self.findSuperConfluenceDays(
+                [emaValue[None, :] for emaValue in emaValues], sma200[None, :], maxRecentDays, percentage,
+                enforce200SMA=self.configManager.superConfluenceEnforce200SMA)
+            confluenceDay = superDays[0] if superDays[0] > 0 else silverDays[0]
+            if confluenceDay > 0:
+                ema_8, ema_21, ema_55, sma_200, ema55_percentage, emasCrossedSMA200 = [values[0, confluenceDay-1] for values in dayValues]
+                indexDate = PKDateUtilities.dateFromYmdString(str(data.index[confluenceDay-1]).split(" ")[0])
+                dayDate = f"{indexDate.day}/{indexDate.month}"
+                if superDays[0] > 0:
                     screenDict["MA-Signal"] = (
                         saved[0] 
                         + (colorText.GREEN)
@@ -2947,14 +2838,7 @@ class ScreeningStatistics:
                         + colorText.END
                     )
                     saveDict["MA-Signal"] = saved[1] + f"SuperGoldenConf(-{dayDate})"
-                    screenDict[f"Latest EMA-{self.configManager.superConfluenceEMAPeriods}, SMA-200 (EMA55 %)"] = f"{colorText.GREEN if (ema_8>=ema_21 and ema_8>=ema_55) else (colorText.WARN if (ema_8>=ema_21 or ema_8>=ema_55) else colorText.FAIL)}{round(ema_8,1)}{colorText.END},{colorText.GREEN if ema_21>=ema_55 else colorText.FAIL}{round(ema_21,1)}{colorText.END},{round(ema_55,1)}, {colorText.GREEN if sma_200<= ema_55 and emasCrossedSMA200 else (colorText.WARN if sma_200<= ema_55 else colorText.FAIL)}{round(sma_200,1)} ({round(ema55_percentage*100,1)}%){colorText.END}"
-                    saveDict[f"Latest EMA-{self.configManager.superConfluenceEMAPeriods}, SMA-200 (EMA55 %)"] = f"{round(ema_8,1)},{round(ema_21,1)},{round(ema_55,1)}, {round(sma_200,1)} ({round(ema55_percentage*100,1)}%)"
-                    saveDict[f"SuperConfSort"] = int(f"{indexDate.year:04}{indexDate.month:02}{indexDate.day:02}") #0 if ema_8>=ema_21 and ema_8>=ema_55 and ema_21>=ema_55 and sma_200<=ema_55 else (1 if (ema_8>=ema_21 or ema_8>=ema_55) else (2 if sma_200<=ema_55 else 3))
-                    screenDict[f"SuperConfSort"] = saveDict[f"SuperConfSort"]
-                    return superbConfluence
-                elif ema8CrossedEMA21 and ema8CrossedEMA55 and ema21CrossedEMA55:
-                    indexDate = PKDateUtilities.dateFromYmdString(str(data.index[recentCurrentDay-1]).split(" ")[0])
-                    dayDate = f"{indexDate.day}/{indexDate.month}"
+                else:
                     screenDict["MA-Signal"] = (
                         saved[0] 
                         + (colorText.WHITE)
@@ -2962,15 +2846,10 @@ class ScreeningStatistics:
                         + colorText.END
                     )
                     saveDict["MA-Signal"] = saved[1] + f"SilverCrossConf.({dayDate})"
-                    screenDict[f"Latest EMA-{self.configManager.superConfluenceEMAPeriods}, SMA-200 (EMA55 %)"] = f"{colorText.GREEN if (ema_8>=ema_21 and ema_8>=ema_55) else (colorText.WARN if (ema_8>=ema_21 or ema_8>=ema_55) else colorText.FAIL)}{round(ema_8,1)}{colorText.END},{colorText.GREEN if ema_21>=ema_55 else colorText.FAIL}{round(ema_21,1)}{colorText.END},{round(ema_55,1)}, {colorText.GREEN if sma_200<= ema_55 and emasCrossedSMA200 else (colorText.WARN if sma_200<= ema_55 else colorText.FAIL)}{round(sma_200,1)} ({round(ema55_percentage*100,1)}%){colorText.END}"
-                    saveDict[f"Latest EMA-{self.configManager.superConfluenceEMAPeriods}, SMA-200 (EMA55 %)"] = f"{round(ema_8,1)},{round(ema_21,1)},{round(ema_55,1)}, {round(sma_200,1)} ({round(ema55_percentage*100,1)}%)"
-                    saveDict[f"SuperConfSort"] = int(f"{indexDate.year:04}{indexDate.month:02}{indexDate.day:02}") #0 if ema_8>=ema_21 and ema_8>=ema_55 and ema_21>=ema_55 and sma_200<=ema_55 else (1 if (ema_8>=ema_21 or ema_8>=ema_55) else (2 if sma_200<=ema_55 else 3))
-                    screenDict[f"SuperConfSort"] = saveDict[f"SuperConfSort"]
-                    silverCross = True
-                
-                recentCurrentDay += 1
-            
-            if silverCross:
+                screenDict[f"Latest EMA-{self.configManager.superConfluenceEMAPeriods}, SMA-200 (EMA55 %)"] = f"{colorText.GREEN if (ema_8>=ema_21 and ema_8>=ema_55) else (colorText.WARN if (ema_8>=ema_21 or ema_8>=ema_55) else colorText.FAIL)}{round(ema_8,1)}{colorText.END},{colorText.GREEN if ema_21>=ema_55 else colorText.FAIL}{round(ema_21,1)}{colorText.END},{round(ema_55,1)}, {colorText.GREEN if sma_200<= ema_55 and emasCrossedSMA200 else (colorText.WARN if sma_200<= ema_55 else colorText.FAIL)}{round(sma_200,1)} ({round(ema55_percentage*100,1)}%){colorText.END}"
+                saveDict[f"Latest EMA-{self.configManager.superConfluenceEMAPeriods}, SMA-200 (EMA55 %)"] = f"{round(ema_8,1)},{round(ema_21,1)},{round(ema_55,1)}, {round(sma_200,1)} ({round(ema55_percentage*100,1)}%)"
+                saveDict[f"SuperConfSort"] = int(f"{indexDate.year:04}{indexDate.month:02}{indexDate.day:02}")
+                screenDict[f"SuperConfSort"] = saveDict[f"SuperConfSort"]
                 return True
         is20DMACrossover50DMA = (recent["SSMA20"].iloc[0] >= recent["SMA"].iloc[0]) and \
                             (recent["SSMA20"].iloc[1] <= recent["SMA"].iloc[1])
@@ -3135,14 +3014,12 @@ class ScreeningStatistics:
 
     #@measure_time
     # Validate if share prices are consolidating
-    def validateConsolidation(self, df, screenDict, saveDict, percentage=10):
+    def validateConsolidation(self, df, screenDict, saveDict, percentage=10, view=None):
         if df is None or len(df) == 0:
             return False
-        data = df.copy()
-        data = data.fillna(0)
-        data = data.replace([np.inf, -np.inf], 0)
-        hc = data.describe()["Close"]["max"]
-        lc = data.describe()["Close"]["min"]
+        view = PKStockView(df) if view is None else view
+        hc = view.column("Close").max()
+        lc = view.column("Close").min()
         if (hc - lc) <= (hc * percentage / 100) and (hc - lc != 0):
             screenDict["Consol."] = (
                 colorText.GREEN
@@ -3165,58 +3042,39 @@ class ScreeningStatistics:
     def validateConsolidationContraction(self, df,legsToCheck=2,stockName=None):
         if df is None or len(df) == 0:
             return False,[],0
-        data = df.copy()
-        # We can use window =3 because we need at least 3 candles to get the next top or bottom
-        # but to better identify the pattern, we'd use window = 5
-        tops, bots = self.getTopsAndBottoms(df=data,window=5,numTopsBottoms=3*(legsToCheck if legsToCheck > 0 else 3))
-        # bots = bots.tail(3*legsToCheck-1)
-        consolidationPercentages = []
-        # dfc.assign(topbots=dfc["tops","bots"].sum(1)).drop("tops","bots", 1)
-        dfc = pd.concat([tops,bots],axis=0)
-        dfc.sort_index(inplace=True)
-        dfc = dfc.assign(topbots=dfc[["tops","bots"]].sum(1))
-        if np.isnan(dfc["tops"].iloc[0]): # For a leg to form, we need two tops and one bottom \_/\_/\_/
-            dfc = dfc.tail(len(dfc)-1)
-        indexLength = len(dfc)
-        toBeDroppedIndices = []
-        index = 0
-        while index < indexLength-1:
-            top = dfc["tops"].iloc[index]
-            top_next = dfc["tops"].iloc[index+1]
-            bot = dfc["bots"].iloc[index]
-            bot_next = dfc["bots"].iloc[index+1]
-            if not np.isnan(top) and not np.isnan(top_next):
-                if top >= top_next:
-                    indexVal = dfc[(dfc.Date == dfc["Date"].iloc[index+1])].index
-                else:
-                    indexVal = dfc[(dfc.Date == dfc["Date"].iloc[index])].index
-                toBeDroppedIndices.append(indexVal)
-            if not np.isnan(bot) and not np.isnan(bot_next):
-                if bot <= bot_next:
-                    indexVal = dfc[(dfc.Date == dfc["Date"].iloc[index+1])].index
-                else:
-                    indexVal = dfc[(dfc.Date == dfc["Date"].iloc[index])].index
-                toBeDroppedIndices.append(indexVal)
-            index += 1
-
-        for indexVal in toBeDroppedIndices:
-            dfc.drop(indexVal,axis=0, inplace=True, errors="ignore")
-        index = 0
-        indexLength = len(dfc)
+        # Same tops and bottoms as getTopsAndBottoms(window=5), kept as positions
+        # into the (newest first) candles instead of frames.
+        high = np.nan_to_num(df["High"].to_numpy(dtype=float), nan=0.0, posinf=0.0, neginf=0.0)
+        low = np.nan_to_num(df["Low"].to_numpy(dtype=float), nan=0.0, posinf=0.0, neginf=0.0)
+        positions = np.flatnonzero((high > 0) & (low > 0))
+        high, low = high[positions], low[positions]
+        numTopsBottoms = 3*(legsToCheck if legsToCheck > 0 else 3)
+        topIndices = np.array(list(pktalib.argrelextrema(high, np.greater_equal, order=5)[0])[:numTopsBottoms], dtype=int)
+        botIndices = np.array(list(pktalib.argrelextrema(low, np.less_equal, order=5)[0])[:numTopsBottoms], dtype=int)
+        # A candle can be both a top and a bottom, in which case it's listed twice
+        candleIndices = np.sort(np.concatenate([topIndices, botIndices]), kind="stable")
+        tops = np.where(np.isin(candleIndices, topIndices), high[candleIndices], np.nan)
+        bots = np.where(np.isin(candleIndices, botIndices), low[candleIndices], np.nan)
+        if np.isnan(tops[0]): # For a leg to form, we need two tops and one bottom \_/\_/\_/
+            candleIndices, tops, bots = candleIndices[1:], tops[1:], bots[1:]
+        # Of two successive tops, keep the higher one; of two successive bottoms, the lower one.
+        nextTops, nextBots = tops[1:], bots[1:]
+        topPairs = ~np.isnan(tops[:-1]) & ~np.isnan(nextTops)
+        botPairs = ~np.isnan(bots[:-1]) & ~np.isnan(nextBots)
+        droppedCandles = np.concatenate([
+            np.where(tops[:-1] >= nextTops, candleIndices[1:], candleIndices[:-1])[topPairs],
+            np.where(bots[:-1] <= nextBots, candleIndices[1:], candleIndices[:-1])[botPairs]])
+        kept = ~np.isin(candleIndices, droppedCandles)
+        tops, bots = tops[kept], bots[kept]
         relativeLegsTocheck = (legsToCheck if legsToCheck >= 3 else 3)
-        while index < indexLength-3:
-            top1 = dfc["tops"].iloc[index]
-            top2 = dfc["tops"].iloc[index+2]
-            top = max(top1,top2)
-            bot = dfc["bots"].iloc[index+1]
-            if bot != 0 and not np.isnan(top) and not np.isnan(bot):
-                legConsolidation = int(round((top-bot)*100/bot,0))
-            else:
-                legConsolidation = 0
-            consolidationPercentages.append(legConsolidation)
-            if len(consolidationPercentages) >= relativeLegsTocheck:
-                break
-            index += 2
+        # Each leg spans top(i) -> bottom(i+1) -> top(i+2), from the most recent one
+        legStarts = np.arange(0, len(tops)-3, 2)[:relativeLegsTocheck]
+        legTops = np.where(tops[legStarts+2] > tops[legStarts], tops[legStarts+2], tops[legStarts])
+        legBots = bots[legStarts+1]
+        hasLeg = (legBots != 0) & ~np.isnan(legTops) & ~np.isnan(legBots)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            legConsolidations = np.where(hasLeg, np.round((legTops-legBots)*100/legBots, 0), 0)
+        consolidationPercentages = [int(x) for x in legConsolidations]
         # Check for consolidation/tightening.
         # Every next leg should be tighter than the previous one
         consolidationPercentages = list(reversed(consolidationPercentages))
@@ -3393,47 +3251,16 @@ class ScreeningStatistics:
         )
         try:
             with SuppressOutput(suppress_stdout=True, suppress_stderr=True):
-                lc = ata.LorentzianClassification(data=data,
-                features=[
-                    ata.LorentzianClassification.Feature("RSI", 14, 2),  # f1
-                    ata.LorentzianClassification.Feature("WT", 10, 11),  # f2
-                    ata.LorentzianClassification.Feature("CCI", 20, 2),  # f3
-                    ata.LorentzianClassification.Feature("ADX", 20, 2),  # f4
-                    ata.LorentzianClassification.Feature("RSI", 9, 2),   # f5
-                    pktalib.MFI(data['high'], data['low'], data['close'], data['volume'], 14) #f6
-                ],
-                settings=ata.LorentzianClassification.Settings(
-                    source=data['close'],
-                    neighborsCount=8,
-                    maxBarsBack=2000,
-                    useDynamicExits=False
-                ),
-                filterSettings=ata.LorentzianClassification.FilterSettings(
-                    useVolatilityFilter=True,
-                    useRegimeFilter=True,
-                    useAdxFilter=False,
-                    regimeThreshold=-0.1,
-                    adxThreshold=20,
-                    kernelFilter = ata.LorentzianClassification.KernelFilter(
-                        useKernelSmoothing = False,
-                        lookbackWindow = 8,
-                        relativeWeight = 8.0,
-                        regressionLevel = 25,
-                        crossoverLag = 2,
-                    )
-                ))
-            # if stock is not None:
-            #     lc.dump(f'{stock}_result.csv')
-            #     lc.plot(f'{stock}_result.jpg')
+                isNewBuySignal, isNewSellSignal = PKLorentzianClassifier().classify(data)
             saved = self.findCurrentSavedValue(screenDict, saveDict, "Pattern")
-            if lc.df.iloc[-1]["isNewBuySignal"]:
+            if isNewBuySignal[-1]:
                 screenDict["Pattern"] = (
                     saved[0] + colorText.GREEN + "Lorentzian-Buy" + colorText.END
                 )
                 saveDict["Pattern"] = saved[1] + "Lorentzian-Buy"
                 if lookFor != 2: # Not Sell
                     return True
-            elif lc.df.iloc[-1]["isNewSellSignal"]:
+            elif isNewSellSignal[-1]:
                 screenDict["Pattern"] = (
                     saved[0] + colorText.FAIL + "Lorentzian-Sell" + colorText.END
                 )
@@ -3483,39 +3310,29 @@ class ScreeningStatistics:
         return lowerHighs and lowerLows and higherRSI
 
     # Validate if recent volume is lowest of last 'N' Days
-    def validateLowestVolume(self, df, daysForLowestVolume):
+    def validateLowestVolume(self, df, daysForLowestVolume, view=None):
         if df is None or len(df) == 0:
             return False
-        data = df.copy()
-        data = data.fillna(0)
-        data = data.replace([np.inf, -np.inf], 0)
         if daysForLowestVolume is None:
             daysForLowestVolume = 30
-        if len(data) < daysForLowestVolume:
-            return False
-        data = data.head(daysForLowestVolume)
-        recent = data.head(1)
-        if len(recent) < 1:
+        if len(df) < daysForLowestVolume or daysForLowestVolume < 1:
             return False
-        if (recent["Volume"].iloc[0] <= data.describe()["Volume"]["min"]) and recent[
-            "Volume"
-        ][0] != np.nan:
-            return True
-        return False
+        view = PKStockView(df) if view is None else view
+        volumes = view.latest("Volume", daysForLowestVolume)
+        return bool(volumes[-1] <= volumes.min())
 
     # Validate LTP within limits
-    def validateLTP(self, df, screenDict, saveDict, minLTP=None, maxLTP=None,minChange=0):
-        data = df.copy()
+    def validateLTP(self, df, screenDict, saveDict, minLTP=None, maxLTP=None,minChange=0,view=None):
+        view = PKStockView(df) if view is None else view
         ltpValid = False
         if minLTP is None:
             minLTP = self.configManager.minLTP
         if maxLTP is None:
             maxLTP = self.configManager.maxLTP
-        data = data.fillna(0)
-        data = data.replace([np.inf, -np.inf], 0)
-        recent = data.head(1)
-
-        pct_change = (data[::-1]["Close"].pct_change() * 100).iloc[-1]
+        pct_change = np.nan
+        if view.numCandles > 1:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                pct_change = (view.at("Close") / view.at("Close", 1) - 1) * 100
         if pct_change == np.inf or pct_change == -np.inf:
             pct_change = 0
         pct_save = "%.1f%%" % pct_change
@@ -3527,11 +3344,11 @@ class ScreeningStatistics:
             pct_change = colorText.WARN + ("%.1f%%" % pct_change) + colorText.END
         saveDict["%Chng"] = pct_save
         screenDict["%Chng"] = pct_change
-        ltp = round(recent["Close"].iloc[0], 2)
+        ltp = round(view.at("Close"), 2)
         verifyStageTwo = True
-        if len(data) > 250:
-            yearlyLow = data.head(250)["Close"].min()
-            yearlyHigh = data.head(250)["Close"].max()
+        if view.numCandles > 250:
+            yearlyLow = view.latest("Close", 250).min()
+            yearlyHigh = view.latest("Close", 250).max()
             if ltp < (2 * yearlyLow) and ltp < (0.75 * yearlyHigh):
                 verifyStageTwo = False
                 screenDict["Stock"] = colorText.FAIL + saveDict["Stock"] + colorText.END
@@ -3543,16 +3360,16 @@ class ScreeningStatistics:
             saveDict["LTP"] = round(ltp, 2)
             screenDict["LTP"] = (colorText.GREEN if ltpValid else colorText.FAIL) + ("%.2f" % ltp) + colorText.END
             try:
-                dateTimePart = str(recent.index[0]).split(" ")
+                dateTimePart = str(df.index[0]).split(" ")
                 if len(dateTimePart) == 1:
                     indexDate = PKDateUtilities.dateFromYmdString(dateTimePart[0])
                     dayDate = f"{indexDate.day}/{indexDate.month}"
                 elif len(dateTimePart) == 2:
                     today = PKDateUtilities.currentDateTime()
                     try:
-                        indexDate = datetime.datetime.strptime(str(recent.index[0]),"%Y-%m-%d %H:%M:%S").replace(tzinfo=today.tzinfo)
+                        indexDate = datetime.datetime.strptime(str(df.index[0]),"%Y-%m-%d %H:%M:%S").replace(tzinfo=today.tzinfo)
                     except: # pragma: no cover
-                        indexDate = datetime.datetime.strptime(str(recent.index[0]),"%Y-%m-%d %H:%M:%S%z").replace(tzinfo=today.tzinfo)
+                        indexDate = datetime.datetime.strptime(str(df.index[0]),"%Y-%m-%d %H:%M:%S%z").replace(tzinfo=today.tzinfo)
                         pass
                     dayDate = f"{indexDate.day}/{indexDate.month} {indexDate.hour}:{indexDate.minute}" if indexDate.hour > 0 else f"{indexDate.day}/{indexDate.month} {today.hour}:{today.minute}"
                     screenDict["Time"] = f"{colorText.WHITE}{dayDate}{colorText.END}"
@@ -3622,14 +3439,11 @@ class ScreeningStatistics:
                 saveDict["Date"] = calc_date
 
     # Find stocks that are bearish intraday: Macd Histogram negative
-    def validateMACDHistogramBelow0(self, df):
+    def validateMACDHistogramBelow0(self, df, view=None):
         if df is None or len(df) == 0:
             return False
-        data = df.copy()
-        data = data.fillna(0)
-        data = data.replace([np.inf, -np.inf], 0)
-        data = data[::-1]  # Reverse the dataframe so that its the oldest date first
-        macd = pktalib.MACD(data["Close"], 12, 26, 9)[2].tail(1)
+        view = PKStockView(df) if view is None else view
+        macd = pktalib.MACD(view.series("Close"), 12, 26, 9)[2].tail(1)
         return macd.iloc[:1][0] < 0
 
     #@measure_time
@@ -3696,30 +3510,35 @@ class ScreeningStatistics:
 
     #@measure_time
     # Validate Moving averages and look for buy/sell signals
-    def validateMovingAverages(self, df, screenDict, saveDict, maRange=2.5,maLength=0,filters={}):
-        data = df.copy()
-        data = data.fillna(0)
-        data = data.replace([np.inf, -np.inf], 0)
-        recent = data.head(1)
+    def validateMovingAverages(self, df, screenDict, saveDict, maRange=2.5,maLength=0,filters={},view=None):
+        view = PKStockView(df) if view is None else view
+        open, high, low, close, sma, lma = (
+            view.at("Open"),
+            view.at("High"),
+            view.at("Low"),
+            view.at("Close"),
+            view.at("SMA"),
+            view.at("LMA"),
+        )
         maSignals = []
         if str(maLength) in ["0","2","3"]:
             saved = self.findCurrentSavedValue(screenDict,saveDict,"MA-Signal")
             if (
-                recent["SMA"].iloc[0] > recent["LMA"].iloc[0]
-                and recent["Close"].iloc[0] > recent["SMA"].iloc[0]
+                sma > lma
+                and close > sma
             ):
                 screenDict["MA-Signal"] = (
                     saved[0] + colorText.GREEN + "Bullish" + colorText.END
                 )
                 saveDict["MA-Signal"] = saved[1] + "Bullish"
                 maSignals.append("3")
-            elif recent["SMA"].iloc[0] < recent["LMA"].iloc[0]:
+            elif sma < lma:
                 screenDict["MA-Signal"] = (
                     saved[0] + colorText.FAIL + "Bearish" + colorText.END
                 )
                 saveDict["MA-Signal"] = saved[1] + "Bearish"
                 maSignals.append("2")
-            elif recent["SMA"].iloc[0] == 0:
+            elif sma == 0:
                 screenDict["MA-Signal"] = (
                     saved[0] + colorText.WARN + "Unknown" + colorText.END
                 )
@@ -3729,27 +3548,18 @@ class ScreeningStatistics:
                     saved[0] + colorText.WARN + "Neutral" + colorText.END
                 )
                 saveDict["MA-Signal"] = saved[1] + "Neutral"
-        reversedData = data[::-1]  # Reverse the dataframe
-        ema_20 = pktalib.EMA(reversedData["Close"],20).tail(1).iloc[0]
-        vwap = pktalib.VWAP(reversedData["High"],reversedData["Low"],reversedData["Close"],reversedData["Volume"]).tail(1).iloc[0]
-        smaDev = data["SMA"].iloc[0] * maRange / 100
-        lmaDev = data["LMA"].iloc[0] * maRange / 100
+        ema_20 = pktalib.EMA(view.series("Close"),20).tail(1).iloc[0]
+        vwap = pktalib.VWAP(view.series("High"),view.series("Low"),view.series("Close"),view.series("Volume")).tail(1).iloc[0]
+        smaDev = sma * maRange / 100
+        lmaDev = lma * maRange / 100
         emaDev = ema_20 * maRange / 100
         vwapDev = vwap * maRange / 100
-        open, high, low, close, sma, lma = (
-            data["Open"].iloc[0],
-            data["High"].iloc[0],
-            data["Low"].iloc[0],
-            data["Close"].iloc[0],
-            data["SMA"].iloc[0],
-            data["LMA"].iloc[0],
-        )
         mas = [sma,lma,ema_20,vwap] #if maLength==0 else [sma,lma,ema_20]
         maDevs = [smaDev, lmaDev, emaDev, vwapDev] #if maLength==0 else [smaDev, lmaDev, emaDev]
         maTexts = ["50MA","200MA","20EMA","VWAP"] #if maLength==0 else ["50MA","200MA","20EMA"]
         maReversal = 0
         index = 0
-        bullishCandle = self.getCandleType(data)
+        bullishCandle = view.isBullishCandle()
         if str(maLength) not in ["2","3"]:
             for ma in mas:
                 saved = self.findCurrentSavedValue(screenDict,saveDict,"MA-Signal")
@@ -3909,19 +3719,14 @@ class ScreeningStatistics:
         return hasPriceCross
 
     # Validate if the stock prices are at least rising by 2% for the last 3 sessions
-    def validatePriceRisingByAtLeast2Percent(self, df, screenDict, saveDict):
-        if df is None or len(df) == 0:
-            return False
-        data = df.copy()
-        data = data.fillna(0)
-        data = data.replace([np.inf, -np.inf], 0)
-        data = data.head(4)
-        if len(data) < 4:
-            return False
-        day0 = data.iloc[0]["Close"].item()
-        dayMinus1 = data.iloc[1]["Close"].item()
-        dayMinus2 = data.iloc[2]["Close"].item()
-        dayMinus3 = data.iloc[3]["Close"].item()
+    def validatePriceRisingByAtLeast2Percent(self, df, screenDict, saveDict, view=None):
+        if df is None or len(df) < 4:
+            return False
+        view = PKStockView(df) if view is None else view
+        day0 = view.at("Close").item()
+        dayMinus1 = view.at("Close", 1).item()
+        dayMinus2 = view.at("Close", 2).item()
+        dayMinus3 = view.at("Close", 3).item()
         percent3 = round((dayMinus2 - dayMinus3) * 100 / dayMinus3, 2)
         percent2 = round((dayMinus1 - dayMinus2) * 100 / dayMinus2, 2)
         percent1 = round((day0 - dayMinus1) * 100 / dayMinus1, 2)
@@ -3934,30 +3739,28 @@ class ScreeningStatistics:
             )
             saveDict["%Chng"] = pct_change_text
             screenDict["%Chng"] = colorText.GREEN + pct_change_text + colorText.END
-            return True and self.getCandleType(data.head(1))
+            return True and view.isBullishCandle()
         return False
 
     #@measure_time
     # validate if RSI is within given range
-    def validateRSI(self, df, screenDict, saveDict, minRSI, maxRSI,rsiKey="RSI"):
+    def validateRSI(self, df, screenDict, saveDict, minRSI, maxRSI,rsiKey="RSI",view=None):
         if df is None or len(df) == 0:
             return False
         if rsiKey not in df.columns:
             return False
-        data = df.copy()
-        data = data.fillna(0)
-        data = data.replace([np.inf, -np.inf], 0)
-        rsi = int(data.head(1)[rsiKey].iloc[0])
+        view = PKStockView(df) if view is None else view
+        rsi = int(view.at(rsiKey))
         saveDict[rsiKey] = rsi
         # https://chartink.com/screener/rsi-screening
         if rsi> 0 and rsi >= minRSI and rsi <= maxRSI:  # or (rsi <= 71 and rsi >= 67):
             screenDict[rsiKey] = (
                 colorText.GREEN + str(rsi) + colorText.END
             )
-            return True if (rsiKey == "RSIi") else (self.validateRSI(df, screenDict, saveDict, minRSI, maxRSI,rsiKey="RSIi") or True)
+            return True if (rsiKey == "RSIi") else (self.validateRSI(df, screenDict, saveDict, minRSI, maxRSI,rsiKey="RSIi",view=view) or True)
         screenDict[rsiKey] = colorText.FAIL + str(rsi) + colorText.END
         # If either daily or intraday RSI comes within range?
-        return False if (rsiKey == "RSIi") else (self.validateRSI(df, screenDict, saveDict, minRSI, maxRSI,rsiKey="RSIi"))
+        return False if (rsiKey == "RSIi") else (self.validateRSI(df, screenDict, saveDict, minRSI, maxRSI,rsiKey="RSIi",view=view))
 
     # Validate if the stock is bullish in the short term
     def validateShortTermBullish(self, df, screenDict, saveDict):
@@ -4046,43 +3849,31 @@ class ScreeningStatistics:
                 if not (data["Close"].iloc[0] >= ema.tail(1).iloc[0] and data["Close"].iloc[0] >= sema20.tail(1).iloc[0]):
                     return False
             percentageFromTop /= 100
-            data.reset_index(inplace=True)
-            data.rename(columns={"index": "Date"}, inplace=True)
-            data["tops"] = (data["High"].iloc[list(pktalib.argrelextrema(np.array(data["High"]), np.greater_equal, order=window)[0])].head(4))
-            data["bots"] = (data["Low"].iloc[list(pktalib.argrelextrema(np.array(data["Low"]), np.less_equal, order=window)[0])].head(4))
-            data = data.fillna(0)
-            data = data.replace([np.inf, -np.inf], 0)
-            tops = data[data.tops > 0]
-            # bots = data[data.bots > 0]
-            highestTop = round(tops.describe()["High"]["max"], 1)
-            allTimeHigh = max(data["High"])
-            withinATHRange = data["Close"].iloc[0] >= (allTimeHigh-allTimeHigh * float(self.configManager.vcpRangePercentageFromTop)/100)
+            # Positions (newest first) of the most recent 4 tops
+            topIndices = list(pktalib.argrelextrema(np.array(data["High"]), np.greater_equal, order=window)[0])[:4]
+            high = np.nan_to_num(data["High"].to_numpy(dtype=float), nan=0.0, posinf=0.0, neginf=0.0)
+            low = np.nan_to_num(data["Low"].to_numpy(dtype=float), nan=0.0, posinf=0.0, neginf=0.0)
+            close = np.nan_to_num(data["Close"].to_numpy(dtype=float), nan=0.0, posinf=0.0, neginf=0.0)
+            topIndices = np.array([index for index in topIndices if high[index] > 0], dtype=int)
+            if len(topIndices) == 0:
+                return False
+            topHighs = high[topIndices]
+            highestTop = round(topHighs.max(), 1)
+            allTimeHigh = high.max()
+            withinATHRange = close[0] >= (allTimeHigh-allTimeHigh * float(self.configManager.vcpRangePercentageFromTop)/100)
             if not withinATHRange and self.configManager.enableAdditionalVCPFilters:
                 # Last close is not within all time high range
                 return False
-            filteredTops = tops[
-                tops.tops > (highestTop - (highestTop * percentageFromTop))
-            ]
-            if filteredTops.equals(tops):  # Tops are in the range
-                lowPoints = []
-                for i in range(len(tops) - 1):
-                    endDate = tops.iloc[i]["Date"]
-                    startDate = tops.iloc[i + 1]["Date"]
-                    lowPoints.append(
-                        data[
-                            (data.Date >= startDate) & (data.Date <= endDate)
-                        ].describe()["Low"]["min"]
-                    )
-                lowPointsOrg = lowPoints
-                lowPoints.sort(reverse=True)
-                lowPointsSorted = lowPoints
-                if data.empty or len(lowPoints) < 1:
+            if (topHighs > (highestTop - (highestTop * percentageFromTop))).all():  # Tops are in the range
+                # Lowest low between each pair of successive tops (both tops included)
+                segmentLows = np.minimum.reduceat(low, topIndices)[:-1]
+                lowPoints = np.minimum(segmentLows, low[topIndices[1:]]).tolist()
+                if len(lowPoints) < 1:
                     return False
-                ltp = data.head(1)["Close"].iloc[0]
+                ltp = close[0]
                 if (
-                    lowPointsOrg == lowPointsSorted
-                    and ltp < highestTop
-                    and ltp > lowPoints[0]
+                    ltp < highestTop
+                    and ltp > max(lowPoints)
                 ):
                     saved = self.findCurrentSavedValue(screenDict, saveDict, "Pattern")
                     isTightening, consolidations, deviationScore = self.validateConsolidationContraction(df=df.copy(),legsToCheck=(int(self.configManager.vcpLegsToCheckForConsolidation) if self.configManager.enableAdditionalVCPFilters else 0),stockName=stockName)
@@ -4176,24 +3967,23 @@ class ScreeningStatistics:
 
     # Validate if volume of last day is higher than avg
     def validateVolume(
-        self, df, screenDict, saveDict, volumeRatio=2.5, minVolume=100
+        self, df, screenDict, saveDict, volumeRatio=2.5, minVolume=100, view=None
     ):
         if df is None or len(df) == 0:
             return False, False
-        data = df.copy()
-        data = data.fillna(0)
-        data = data.replace([np.inf, -np.inf], 0)
-        recent = data.head(1)
+        view = PKStockView(df) if view is None else view
+        volume = view.at("Volume")
+        volumeMA = view.at("VolMA")
         # Either the rolling volume of past 20 sessions or today's volume should be > min volume
         hasMinimumVolume = (
-            recent["VolMA"].iloc[0] >= minVolume
-            or recent["Volume"].iloc[0] >= minVolume
+            volumeMA >= minVolume
+            or volume >= minVolume
         )
-        if recent["VolMA"].iloc[0] == 0:  # Handles Divide by 0 warning
+        if volumeMA == 0:  # Handles Divide by 0 warning
             saveDict["Volume"] = 0  # "Unknown"
             screenDict["Volume"] = 0
             return False, hasMinimumVolume
-        ratio = round(recent["Volume"].iloc[0] / recent["VolMA"].iloc[0], 2)
+        ratio = round(volume / volumeMA, 2)
         saveDict["Volume"] = ratio
         if ratio >= volumeRatio and ratio != np.nan and (not math.isinf(ratio)):
             screenDict["Volume"] = ratio
@@ -4264,14 +4054,3 @@ class ScreeningStatistics:
         except Exception as e:  # pragma: no cover
             self.default_logger.debug(e, exc_info=True)
             return False
-
-    # Function to compute ATRTrailingStop
-    def xATRTrailingStop_func(self,close, prev_close, prev_atr, nloss):
-        if close > prev_atr and prev_close > prev_atr:
-            return max(prev_atr, close - nloss)
-        elif close < prev_atr and prev_close < prev_atr:
-            return min(prev_atr, close + nloss)
-        elif close > prev_atr:
-            return close - nloss
-        else:
-            return close + nloss
@@ -44,6 +44,13 @@ from PKDevTools.classes.PKDateUtilities import PKDateUtilities
 import pkscreener.classes.ScreeningStatistics as ScreeningStatistics
 from pkscreener.Imports import Imports
 from pkscreener.classes.CandlePatterns import CandlePatterns
+from pkscreener.classes.PKIndicatorPlan import PKIndicatorPlan
+from pkscreener.classes.PKRelativeStrength import PKRelativeStrength
+from pkscreener.classes.PKRollingExtrema import EXTREMA_WINDOW, PKRollingExtremaCache
+from pkscreener.classes.PKStockView import PKStockView
+from pkscreener.classes.PKWalkForwardEngine import PKWalkForwardEngine
+from pkscreener.classes.PKScanExpression import PKScanExpression
+from pkscreener.classes.PKScanProfiler import PKScanProfiler
 from PKDevTools.classes.OutputControls import OutputControls
 
 class StockScreener:
@@ -80,6 +87,10 @@ class StockScreener:
         testData = None,
         hostRef=None,
     ):
+        if PKScanProfiler.isEnabled(userArgs) and not PKScanProfiler().taskActive:
+            taskArgs = dict(locals())
+            taskArgs.pop("self")
+            return PKScanProfiler().profileTask(self.screenStocks, self, **taskArgs)
         assert (
             hostRef is not None
         ), "hostRef argument must not be None. It should be an instance of PKMultiProcessorClient"
@@ -202,7 +213,8 @@ class StockScreener:
                 else:
                     raise ScreeningStatistics.EligibilityConditionNotMet("Bid/Ask Eligibility Not met.")
             # hostRef.default_logger.info(f"Will pre-process data:\n{data.tail(10)}")
-            fullData, processedData, data = self.getCleanedDataForDuration(backtestDuration, portfolio, screeningDictionary, saveDictionary, configManager, screener, data)
+            indicators = PKIndicatorPlan.indicatorsForScan(executeOption, reversalOption)
+            fullData, processedData, data = self.getCleanedDataForDuration(backtestDuration, portfolio, screeningDictionary, saveDictionary, configManager, screener, data, indicators=indicators, stock=stock)
             if "RUNNER" not in os.environ.keys() and backtestDuration == 0 and configManager.calculatersiintraday:
                 if (intraday_data is not None and not intraday_data.empty):
                     intraday_fullData, intraday_processedData = screener.preprocessData(
@@ -230,13 +242,16 @@ class StockScreener:
                         if "RSIi" not in processedData.columns:
                             processedData.insert(len(processedData.columns), "RSIi", np.array(np.nan))
                             fullData.insert(len(fullData.columns), "RSIi", np.array(np.nan))
+            extrema = PKRollingExtremaCache().forStock(stock, fullData, window=max(EXTREMA_WINDOW, len(processedData)))
+            fullView, processedView = PKStockView(fullData), PKStockView(processedData)
 
             def returnLegibleData(exceptionMessage=None):
                 if backtestDuration == 0 or menuOption not in ["B"]:
                     raise ScreeningStatistics.EligibilityConditionNotMet(exceptionMessage)
                 elif (backtestDuration > 0 and backtestDuration <= configManager.maxBacktestWindow):
+                    screener.completeIndicators(fullData, processedData)
                     screener.validateMovingAverages(
-                        processedData, screeningDictionary, saveDictionary, maRange=1.25
+                        processedData, screeningDictionary, saveDictionary, maRange=1.25, view=processedView
                     )
                     screener.findTrend(
                         processedData,
@@ -246,7 +261,7 @@ class StockScreener:
                         stockName=stock,
                     )
                     screener.find52WeekHighLow(
-                            fullData, saveDictionary, screeningDictionary
+                            fullData, saveDictionary, screeningDictionary, extrema=extrema
                         )
                     return (
                             screeningDictionary,
@@ -267,8 +282,8 @@ class StockScreener:
             with SuppressOutput(suppress_stderr=suppressError, suppress_stdout=suppressOut):
                 self.updateStock(stock, screeningDictionary, saveDictionary, executeOption, exchangeName,userArgs)
                 
-                self.performBasicLTPChecks(executeOption, screeningDictionary, saveDictionary, fullData, configManager, screener, exchangeName)
-                hasMinVolumeRatio = self.performBasicVolumeChecks(executeOption, volumeRatio, screeningDictionary, saveDictionary, processedData, configManager, screener)
+                self.performBasicLTPChecks(executeOption, screeningDictionary, saveDictionary, fullData, configManager, screener, exchangeName, view=fullView)
+                hasMinVolumeRatio = self.performBasicVolumeChecks(executeOption, volumeRatio, screeningDictionary, saveDictionary, processedData, configManager, screener, view=processedView)
                 if bidGreaterThanAsk:
                     if not hasMinVolumeRatio or bidAskRatio < 2:
                         raise ScreeningStatistics.EligibilityConditionNotMet("Bid/Ask Eligibility Not met.")
@@ -302,7 +317,7 @@ class StockScreener:
                 hasMASignalFilter = False
                 priceCrossed = False
 
-                isValidityCheckMet = self.performValidityCheckForExecuteOptions(executeOption,screener,fullData,screeningDictionary,saveDictionary,processedData,configManager,maLength,intraday_data)
+                isValidityCheckMet = self.performValidityCheckForExecuteOptions(executeOption,screener,fullData,screeningDictionary,saveDictionary,processedData,configManager,maLength,intraday_data,scanExpression=getattr(userArgs, "scanexpression", None),extrema=extrema,fullView=fullView,processedView=processedView)
                 if not isValidityCheckMet:
                     return returnLegibleData("Validity Check not met!")
                 isShortTermBullish = (executeOption == 11 and isValidityCheckMet)
@@ -317,6 +332,7 @@ class StockScreener:
                         saveDictionary,
                         daysToLookback=configManager.daysToLookback,
                         alreadyBrokenout=(executeOption == 2),
+                        extrema=extrema,
                     )
                     if executeOption == 1:
                         isPotentialBreaking = screener.findPotentialBreakout(
@@ -324,6 +340,7 @@ class StockScreener:
                             screeningDictionary,
                             saveDictionary,
                             daysToLookback=configManager.daysToLookback,
+                            extrema=extrema,
                         )
                         if not (isBreaking or isPotentialBreaking) or not hasMinVolumeRatio:
                             return returnLegibleData(f"isBreaking:{isBreaking},isPotentialBreaking:{isPotentialBreaking},hasMinVolumeRatio:{hasMinVolumeRatio}")
@@ -336,18 +353,19 @@ class StockScreener:
                         screeningDictionary,
                         saveDictionary,
                         percentage=configManager.consolidationPercentage,
+                        view=processedView,
                     )
                     if ((consolidationValue == 0 or consolidationValue > configManager.consolidationPercentage)):
                         return returnLegibleData(f"consolidationValue:{consolidationValue}")
                 elif executeOption == 4:
                     isLowestVolume = screener.validateLowestVolume(
-                        processedData, daysForLowestVolume
+                        processedData, daysForLowestVolume, view=processedView
                     )
                     if not isLowestVolume:
                         return returnLegibleData(f"isLowestVolume:{isLowestVolume}")
                 elif executeOption == 5:
                     isValidRsi = screener.validateRSI(
-                        processedData, screeningDictionary, saveDictionary, minRSI, maxRSI
+                        processedData, screeningDictionary, saveDictionary, minRSI, maxRSI, view=processedView
                     )
                     if not isValidRsi:
                         return returnLegibleData(f"isValidRsi:{isValidRsi}")
@@ -425,7 +443,7 @@ class StockScreener:
                             return returnLegibleData(f"isVCP:{isVCP}")
                         else:
                             if hostRef.rs_strange_index > 0:
-                                screener.findRSRating(index_rs_value=hostRef.rs_strange_index,df=fullData,screenDict=screeningDictionary, saveDict=saveDictionary)
+                                screener.findRSRating(index_rs_value=hostRef.rs_strange_index,df=fullData,screenDict=screeningDictionary, saveDict=saveDictionary,precomputed=PKRelativeStrength.lookup(getattr(hostRef,"rsRatings",None),stock,fullData))
                             screener.findRVM(df=fullData,screenDict=screeningDictionary, saveDict=saveDictionary)
                     elif respChartPattern == 5:
                         if Imports["scipy"]:
@@ -461,23 +479,24 @@ class StockScreener:
                             return returnLegibleData(f"isMinerviniVCP:{isMinerviniVCP}")
                         else:
                             if hostRef.rs_strange_index > 0:
-                                screener.findRSRating(index_rs_value=hostRef.rs_strange_index,df=fullData,screenDict=screeningDictionary, saveDict=saveDictionary)
+                                screener.findRSRating(index_rs_value=hostRef.rs_strange_index,df=fullData,screenDict=screeningDictionary, saveDict=saveDictionary,precomputed=PKRelativeStrength.lookup(getattr(hostRef,"rsRatings",None),stock,fullData))
                             screener.findRVM(df=fullData,screenDict=screeningDictionary, saveDict=saveDictionary)
                     elif respChartPattern == 9:
                         hasMASignalFilter,_, _ = screener.validateMovingAverages(
-                            fullData, screeningDictionary, saveDictionary,maRange=1.25,maLength=maLength
+                            fullData, screeningDictionary, saveDictionary,maRange=1.25,maLength=maLength,view=fullView
                         )
                         if not hasMASignalFilter:
                             return returnLegibleData(f"hasMASignalFilter:{hasMASignalFilter}")
                 elif executeOption == 10:
                     isPriceRisingByAtLeast2Percent = (
                         screener.validatePriceRisingByAtLeast2Percent(
-                            processedData, screeningDictionary, saveDictionary
+                            processedData, screeningDictionary, saveDictionary, view=processedView
                         )
                     )
                     if not isPriceRisingByAtLeast2Percent:
                         return returnLegibleData(f"isPriceRisingByAtLeast2Percent:{isPriceRisingByAtLeast2Percent}")
                 # Must-run, but only at the end
+                screener.completeIndicators(fullData, processedData)
                 try:
                     if executeOption != 7 or (executeOption == 7 and respChartPattern != 7):
                     # Only 'doji' and 'inside' is internally implemented by pandas_ta.
@@ -527,14 +546,14 @@ class StockScreener:
                 # So it must only be called after findTrend
                 if executeOption == 8:
                     isValidCci = screener.validateCCI(
-                        processedData, screeningDictionary, saveDictionary, minRSI, maxRSI
+                        processedData, screeningDictionary, saveDictionary, minRSI, maxRSI, view=processedView
                     )
                     if not isValidCci:
                         return returnLegibleData(f"isValidCci:{isValidCci}")
 
                 if not (isConfluence or isShortTermBullish or hasMASignalFilter):
                     isMaReversal,bullishCount, bearishCount = screener.validateMovingAverages(
-                        processedData, screeningDictionary, saveDictionary, maRange=1.25
+                        processedData, screeningDictionary, saveDictionary, maRange=1.25, view=processedView
                     )
                 if executeOption == 6:
                     if reversalOption == 1 and not (str(saveDictionary["Pattern"]).split(",")[0]
@@ -612,7 +631,7 @@ class StockScreener:
                                                                 or ((
                                                                     reversalOption == 5
                                                                     and isVSA
-                                                                    and saveDictionary["Pattern"]
+                                                                    and str(saveDictionary["Pattern"]).split(",")[0]
                                                                     in CandlePatterns.reversalPatternsBullish
                                                                 ))
                                                                 or (reversalOption == 6 and isNR)
@@ -634,7 +653,7 @@ class StockScreener:
                         or (executeOption == 9 and hasMinVolumeRatio)
                         or (executeOption == 10 and isPriceRisingByAtLeast2Percent)
                         or (executeOption == 11 and isShortTermBullish)
-                        or (executeOption in [12,13,14,15,16,17,18,19,20,23,24,25,27,28,30,31,32,33,34,35,36,37,38,39,42,43] and isValidityCheckMet)
+                        or (executeOption in [12,13,14,15,16,17,18,19,20,23,24,25,27,28,30,31,32,33,34,35,36,37,38,39,42,43,44] and isValidityCheckMet)
                         or (executeOption == 21 and (mfiStake > 0 and reversalOption in [3,5]))
                         or (executeOption == 21 and (mfiStake < 0 and reversalOption in [6,7]))
                         or (executeOption == 21 and (fairValueDiff > 0 and reversalOption in [8]))
@@ -663,6 +682,7 @@ class StockScreener:
                                 saveDictionary,
                                 daysToLookback=configManager.daysToLookback,
                                 alreadyBrokenout=(executeOption == 2),
+                                extrema=extrema,
                             )
                         if (isNotMonitoringDashboard and executeOption != 3) or (self.configManager.alwaysExportToExcel):
                             screener.validateConsolidation(
@@ -670,17 +690,18 @@ class StockScreener:
                                 screeningDictionary,
                                 saveDictionary,
                                 percentage=configManager.consolidationPercentage,
+                                view=processedView,
                             )
                         if executeOption != 5:
                             screener.validateRSI(
-                                processedData, screeningDictionary, saveDictionary, minRSI, maxRSI
+                                processedData, screeningDictionary, saveDictionary, minRSI, maxRSI, view=processedView
                             )
                         screener.find52WeekHighLow(
-                            fullData, saveDictionary, screeningDictionary
+                            fullData, saveDictionary, screeningDictionary, extrema=extrema
                         )
                         if isNotMonitoringDashboard and executeOption != 8:
                             screener.validateCCI(
-                                processedData, screeningDictionary, saveDictionary, minRSI, maxRSI
+                                processedData, screeningDictionary, saveDictionary, minRSI, maxRSI, view=processedView
                             )
                         if isNotMonitoringDashboard and executeOption != 21 and backtestDuration == 0:
                             # We don't need to have MFI or fair value data for backtesting because those
@@ -702,7 +723,7 @@ class StockScreener:
                         if userArgs is not None and userArgs.usertag is not None and "VCP" in userArgs.usertag:
                             if hostRef.rs_strange_index > 0:
                                 if f"RS_Rating{self.configManager.baseIndex}" not in saveDictionary.keys():
-                                    screener.findRSRating(index_rs_value=hostRef.rs_strange_index,df=fullData,screenDict=screeningDictionary, saveDict=saveDictionary)
+                                    screener.findRSRating(index_rs_value=hostRef.rs_strange_index,df=fullData,screenDict=screeningDictionary, saveDict=saveDictionary,precomputed=PKRelativeStrength.lookup(getattr(hostRef,"rsRatings",None),stock,fullData))
                             if "RVM" not in saveDictionary.keys():
                                 screener.findRVM(df=fullData,screenDict=screeningDictionary, saveDict=saveDictionary)
                         hostRef.processingResultsCounter.value += 1
@@ -790,9 +811,9 @@ class StockScreener:
                 )
         return None
 
-    def performValidityCheckForExecuteOptions(self,executeOption,screener,fullData,screeningDictionary,saveDictionary,processedData,configManager,subMenuOption=3,intraday_data=None):
+    def performValidityCheckForExecuteOptions(self,executeOption,screener,fullData,screeningDictionary,saveDictionary,processedData,configManager,subMenuOption=3,intraday_data=None,scanExpression=None,extrema=None,fullView=None,processedView=None):
         isValid = True
-        if executeOption not in [11,12,13,14,15,16,17,18,19,20,23,24,25,27,28,30,31,32,33,34,35,36,37,38,39,42,43]:
+        if executeOption not in [11,12,13,14,15,16,17,18,19,20,23,24,25,27,28,30,31,32,33,34,35,36,37,38,39,42,43,44]:
             return True
         if executeOption == 11:
             isValid = screener.validateShortTermBullish(
@@ -807,17 +828,17 @@ class StockScreener:
                 fullData
             )
         elif executeOption == 14:
-            isValid = screener.findNR4Day(fullData)
+            isValid = screener.findNR4Day(fullData, view=fullView)
         elif executeOption == 15:
-            isValid = screener.find52WeekLowBreakout(fullData)
+            isValid = screener.find52WeekLowBreakout(fullData, extrema=extrema)
         elif executeOption == 16:
-            isValid = screener.find10DaysLowBreakout(fullData)
+            isValid = screener.find10DaysLowBreakout(fullData, extrema=extrema)
         elif executeOption == 17:
-            isValid = screener.find52WeekHighBreakout(fullData)
+            isValid = screener.find52WeekHighBreakout(fullData, extrema=extrema)
         elif executeOption == 18:
             isValid = screener.findAroonBullishCrossover(fullData)
         elif executeOption == 19:
-            isValid = screener.validateMACDHistogramBelow0(fullData)
+            isValid = screener.validateMACDHistogramBelow0(fullData, view=fullView)
         elif executeOption == 20:
             isValid = screener.validateBullishForTomorrow(fullData)
         elif executeOption == 23:
@@ -831,7 +852,7 @@ class StockScreener:
         elif executeOption == 27:
             isValid = screener.findATRCross(processedData,saveDictionary, screeningDictionary)
         elif executeOption == 28:
-            isValid = screener.findHigherBullishOpens(processedData)
+            isValid = screener.findHigherBullishOpens(processedData, view=processedView)
         elif executeOption == 30: # findBuySellSignalsFromATRTrailing # findATRTrailingStops
             isValid = screener.findATRTrailingStops(fullData,sensitivity=configManager.atrTrailingStopSensitivity, atr_period=configManager.atrTrailingStopPeriod,ema_period=configManager.atrTrailingStopEMAPeriod,buySellAll=subMenuOption,saveDict=saveDictionary,screenDict=screeningDictionary)
         elif executeOption == 31: # findBuySellSignalsFromATRTrailing # findATRTrailingStops
@@ -858,12 +879,14 @@ class StockScreener:
         elif executeOption == 39: # findIPOLifetimeFirstDayBullishBreak
             isValid = screener.findIPOLifetimeFirstDayBullishBreak(fullData)
         elif executeOption == 42:
-            isValid = screener.findSuperGainersLosers(fullData,subMenuOption)
+            isValid = screener.findSuperGainersLosers(fullData,subMenuOption,view=fullView)
         elif executeOption == 43:
-            isValid = screener.findSuperGainersLosers(fullData,subMenuOption,gainer=False)
+            isValid = screener.findSuperGainersLosers(fullData,subMenuOption,gainer=False,view=fullView)
+        elif executeOption == 44:
+            isValid = scanExpression is not None and PKScanExpression.evaluateForStock(scanExpression, fullData)
         return isValid        
                     
-    def performBasicVolumeChecks(self, executeOption, volumeRatio, screeningDictionary, saveDictionary, processedData, configManager, screener):
+    def performBasicVolumeChecks(self, executeOption, volumeRatio, screeningDictionary, saveDictionary, processedData, configManager, screener, view=None):
         minVolume = configManager.minVolume / (
                     100 if configManager.isIntradayConfig() else 1
                 )
@@ -873,19 +896,21 @@ class StockScreener:
                     saveDictionary,
                     volumeRatio=volumeRatio,
                     minVolume=minVolume,
+                    view=view,
                 )
         if (not hasMinVolQty and executeOption > 0) or (executeOption == 9 and not hasMinVolumeRatio):
             raise ScreeningStatistics.NotEnoughVolumeAsPerConfig(f"hasMinVolQty:{hasMinVolQty},executeOption:{executeOption},hasMinVolumeRatio:{hasMinVolumeRatio}")
         return hasMinVolumeRatio
 
-    def performBasicLTPChecks(self, executeOption, screeningDictionary, saveDictionary, fullData, configManager, screener,exchangeName):
+    def performBasicLTPChecks(self, executeOption, screeningDictionary, saveDictionary, fullData, configManager, screener,exchangeName,view=None):
         isLtpValid, verifyStageTwo = screener.validateLTP(
                     fullData,
                     screeningDictionary,
                     saveDictionary,
                     minLTP=configManager.minLTP if exchangeName == "INDIA" else configManager.minLTP/80,
                     maxLTP=configManager.maxLTP,
-                    minChange=configManager.minimumChangePercentage
+                    minChange=configManager.minimumChangePercentage,
+                    view=view,
                 )
         if not isLtpValid:
             raise ScreeningStatistics.LTPNotInConfiguredRange
@@ -901,7 +926,7 @@ class StockScreener:
                 ) if not doNotAnchorText else stock
         saveDictionary["Stock"] = stock
 
-    def getCleanedDataForDuration(self, backtestDuration, portfolio, screeningDictionary, saveDictionary, configManager, screener, data):
+    def getCleanedDataForDuration(self, backtestDuration, portfolio, screeningDictionary, saveDictionary, configManager, screener, data, indicators=None, stock=None):
         fullData = None
         processedData = None
         ohlc_dict = {
@@ -920,7 +945,7 @@ class StockScreener:
             data = data[data["High"]>0] # resampling can introduce 0 value rows for non-market hours
         if backtestDuration == 0:
             fullData, processedData = screener.preprocessData(
-                    data, daysToLookback=configManager.effectiveDaysToLookback
+                    data, daysToLookback=configManager.effectiveDaysToLookback, indicators=indicators
                 )
             if processedData.empty:
                 raise StockDataEmptyException(f"Empty processedData with data length ({len(data)})")
@@ -936,6 +961,7 @@ class StockScreener:
                     # data will have the oldest date at the top and the most recent
                     # date will be at the bottom
                     # We want to have the nth day treated as today when pre-processing where n = backtestDuration row from the bottom
+                allData = data
                 inputData = data.head(len(data) - backtestDuration)
                     # imputData will have the last row as the date for which the entire calculation
                     # and prediction is being done
@@ -948,9 +974,15 @@ class StockScreener:
                             data, screeningDictionary, saveDictionary,requestedPeriod=backtestDuration
                         )
                     # data has the last row from inputData at the top.
-                fullData, processedData = screener.preprocessData(
-                        inputData, daysToLookback=configManager.daysToLookback
-                    )
+                if stock is None:
+                    fullData, processedData = screener.preprocessData(
+                            inputData, daysToLookback=configManager.daysToLookback, indicators=indicators
+                        )
+                else:
+                    # Sliced from the indicators computed once over the full history
+                    fullData, processedData = PKWalkForwardEngine().preprocessedDataForDay(
+                            stock, screener, allData, backtestDuration, configManager.daysToLookback, indicators=indicators
+                        )
                 
         return fullData,processedData,data
 
@@ -1120,8 +1152,14 @@ class StockScreener:
         screener.default_logger = hostRef.default_logger
         screener.shouldLog = userArgsLog
 
-    def initResultDictionaries(self):
-        periods = self.configManager.periodsRange
+    def resultSchemas(self, configManager):
+        # Column order and default values (hence initial dtypes) of the
+        # screening and save results
+        screeningDictionary, saveDictionary = self.initResultDictionaries(configManager)
+        return screeningDictionary, saveDictionary
+
+    def initResultDictionaries(self, configManager=None):
+        periods = (configManager or self.configManager).periodsRange
         columns = [
             "Stock",
             "LTP",
@@ -69,7 +69,7 @@ import pkscreener.classes.ScreeningStatistics as ScreeningStatistics
 from pkscreener.classes import Utility,ConsoleUtility, ConsoleMenuUtility, ImageUtility
 from pkscreener.classes.Utility import STD_ENCODING
 from pkscreener.classes import VERSION, PortfolioXRay
-from pkscreener.classes.Backtest import backtest, backtestSummary
+from pkscreener.classes.Backtest import backtest, backtestDataFrame, backtestSummary
 from pkscreener.classes.PKSpreadsheets import PKSpreadsheets
 from PKDevTools.classes.OutputControls import OutputControls
 from PKDevTools.classes.Environment import PKEnvironment
@@ -108,6 +108,18 @@ from pkscreener.classes.Portfolio import PortfolioCollection
 from pkscreener.classes.PKTask import PKTask
 from pkscreener.classes.PKScheduler import PKScheduler
 from pkscreener.classes.PKScanRunner import PKScanRunner
+from pkscreener.classes.StockScreener import StockScreener
+from pkscreener.classes.PKScanExpression import PKScanExpression
+from pkscreener.classes.PKResultAccumulator import PKResultAccumulator
+from pkscreener.classes.PKScanProfiler import PKScanProfiler
+from pkscreener.classes.PKScanResultCache import PKScanResultCache
+from pkscreener.classes.PKBacktestResultsStore import PKBacktestResultsStore
+from pkscreener.classes.PKBacktestJournal import PKBacktestJournal
+from pkscreener.classes.PKBacktestStatistics import PKBacktestStatistics
+from pkscreener.classes.PKMultiStrategyBacktest import PKMultiStrategyBacktest
+from pkscreener.classes.PKTradeSimulator import PKTradeSimulator
+from pkscreener.classes.PKVectorScanEngine import PKVectorScanEngine
+from pkscreener.classes.PKWalkForwardEngine import PKWalkForwardEngine
 from pkscreener.classes.PKMarketOpenCloseAnalyser import PKMarketOpenCloseAnalyser
 from pkscreener.classes.PKPremiumHandler import PKPremiumHandler
 from pkscreener.classes.AssetsManager import PKAssetsManager
@@ -1550,6 +1562,31 @@ def main(userArgs=None,optionalFinalOutcome_df=None):
         configManager.toggleConfig(candleDuration=candleDuration)
         global nValueForMenu 
         nValueForMenu = candleDuration
+    if executeOption == 44:
+        scanExpression = getattr(userPassedArgs, "scanexpression", None)
+        if len(options) >= 4 and len(str(options[3]).strip()) > 0 and str(options[3]).upper() != "D":
+            # X:12:44:<expression>, e.g. as saved for replays
+            scanExpression = PKScanExpression.splitPipedOptions(options[3])[0]
+        scanExpression = ConsoleMenuUtility.PKConsoleMenuTools.promptScanExpression(
+            scanExpression=scanExpression)
+        try:
+            PKScanExpression.compile(scanExpression)
+        except ValueError as e:
+            default_logger().debug(e, exc_info=True)
+            OutputControls().printOutput(
+                colorText.FAIL
+                + f"\n  [+] Error: {e}"
+                + colorText.END
+            )
+            OutputControls().takeUserInput("Press <Enter> to continue...")
+            return None, None
+        # Keep the expression in the options so that replays and cached
+        # results of option 44 run with the same expression.
+        selectedChoice["3"] = scanExpression
+        if userPassedArgs is not None:
+            userPassedArgs.scanexpression = scanExpression
+            if userPassedArgs.options is not None and len(options) >= 3 and "|" not in userPassedArgs.options:
+                userPassedArgs.options = ":".join(options[:3] + [scanExpression])
     if executeOption == 21:
         selectedMenu = m2.find(str(executeOption))
         if len(options) >= 4:
@@ -1665,9 +1702,7 @@ def main(userArgs=None,optionalFinalOutcome_df=None):
             atrEma = input(colorText.WARN + f"Enter the ATR EMA period ({colorText.GREEN}Optimal:200{colorText.END}, Current={configManager.atrTrailingStopEMAPeriod}):") or configManager.atrTrailingStopEMAPeriod
             configManager.atrTrailingStopEMAPeriod = atrEma
             configManager.setConfig(ConfigManager.parser,default=True,showFileCreatedText=False)
-        # Ensure we have the template JSONs from vectorBt
         screener.shouldLog = userPassedArgs.log
-        screener.computeBuySellSignals(None)
     if executeOption == 31: # DEEL Momentum
         maLength = 0
         if userPassedArgs.options is None:
@@ -1989,9 +2024,43 @@ def main(userArgs=None,optionalFinalOutcome_df=None):
                 if actualHistoricalDuration >= 0:
                     progressbar()
         OutputControls().moveCursorUpLines(1 if userPassedArgs.monitor else 2)    #sys.stdout.write(f"\x1b[1A") # Replace the download progress bar and start writing on the same line
+        if menuOption in ["B"] and PKMultiStrategyBacktest().collecting:
+            # The strategies of a multi-strategy backtest are screened together (runMultiStrategyBacktest)
+            PKMultiStrategyBacktest().addStrategy(items, executeOption, backtestPeriod, isBacktestSellSignal(), PKScanRunner.getFormattedChoices(userPassedArgs,selectedChoice), menuChoiceHierarchy)
+            return None, None
+        if menuOption in ["B"]:
+            # Screen all the days of a stock together, from one pass over its history
+            items = PKWalkForwardEngine.orderByStock(items)
+            if not testing:
+                # Skip the (stock, day) units that an earlier run of the same backtest finished
+                backtestJournal = PKBacktestJournal()
+                backtestJournal.begin(PKBacktestJournal.journalKey(userPassedArgs, selectedChoice, configManager, backtestPeriod))
+                totalItems = len(items)
+                items = backtestJournal.pendingItems(items)
+                if len(items) < totalItems:
+                    OutputControls().printOutput(f"{colorText.GREEN}  [+] Resuming the backtest: {totalItems - len(items)} of {totalItems} (stock, day) units were finished earlier.{colorText.END}")
         if not keyboardInterruptEventFired:
             global tasks_queue, results_queue, consumers, logging_queue
-            screenResults, saveResults, backtest_df, tasks_queue, results_queue, consumers,logging_queue = PKScanRunner.runScanWithParams(userPassedArgs,keyboardInterruptEvent,screenCounter,screenResultsCounter,stockDictPrimary,stockDictSecondary,testing, backtestPeriod, menuOption,executeOption, samplingDuration, items,screenResults, saveResults, backtest_df,scanningCb=runScanners,tasks_queue=tasks_queue, results_queue=results_queue, consumers=consumers,logging_queue=logging_queue)
+            scanResultCacheKey = None
+            cachedScanResults = None
+            if isScanResultCacheable(menuOption, executeOption, downloadOnly, testing):
+                scanResultCacheKey = PKScanResultCache().cacheKey(userPassedArgs, selectedChoice, configManager, listStockCodes)
+                cachedScanResults = PKScanResultCache().get(scanResultCacheKey)
+            if cachedScanResults is not None:
+                screenResults, saveResults, cachedCriteriaDateTime = cachedScanResults
+                criteria_dateTime = cachedCriteriaDateTime if criteria_dateTime is None else criteria_dateTime
+                OutputControls().printOutput(f"{colorText.GREEN}  [+] Using cached results for the same scan on the same data snapshot.{colorText.END}")
+            else:
+                PKScanProfiler().beginScan(userPassedArgs)
+                vectorScanEngine = PKVectorScanEngine(configManager)
+                if not downloadOnly and vectorScanEngine.canVectorize(menuOption, executeOption, userArgs=userPassedArgs, newlyListedOnly=newlyListedOnly, respChartPattern=respChartPattern):
+                    # Evaluate the scan for the whole universe at once and let only the
+                    # matching stocks go through the per-stock screening.
+                    items = vectorScanEngine.filterItems(items, stockDictPrimary, executeOption, volumeRatio=volumeRatio, minRSI=minRSI, maxRSI=maxRSI, exchangeName=exchangeName, scanExpression=getattr(userPassedArgs, "scanexpression", None), respChartPattern=respChartPattern)
+                screenResults, saveResults, backtest_df, tasks_queue, results_queue, consumers,logging_queue = PKScanRunner.runScanWithParams(userPassedArgs,keyboardInterruptEvent,screenCounter,screenResultsCounter,stockDictPrimary,stockDictSecondary,testing, backtestPeriod, menuOption,executeOption, samplingDuration, items,screenResults, saveResults, backtest_df,scanningCb=runScanners,tasks_queue=tasks_queue, results_queue=results_queue, consumers=consumers,logging_queue=logging_queue)
+                PKScanProfiler().showSummary(userPassedArgs)
+                if scanResultCacheKey is not None and not keyboardInterruptEventFired:
+                    PKScanResultCache().set(scanResultCacheKey, screenResults, saveResults, configManager, criteria_dateTime=criteria_dateTime)
             if userPassedArgs is not None and not userPassedArgs.testalloptions and (userPassedArgs.monitor is None and "|" not in userPassedArgs.options and not userPassedArgs.options.upper().startswith("C")):
                 tasks_queue = None
                 results_queue = None
@@ -2433,10 +2502,24 @@ def loadDatabaseOrFetch(downloadOnly, listStockCodes, menuOption, indexOption):
         configManager.duration = prevDuration
         configManager.period = prevPeriod
         configManager.setConfig(ConfigManager.parser,default=True,showFileCreatedText=False)
+    if menuOption not in ["C"]:
+        PKScanResultCache().updateSnapshot(stockDictPrimary)
     loadedStockData = True
     Utility.tools.loadLargeDeals()
     return stockDictPrimary, stockDictSecondary
 
+def isScanResultCacheable(menuOption, executeOption, downloadOnly, testing):
+    # Only plain scans are cached. Backtests, downloads, intraday analysis and
+    # the scans that pull live data (like Bid/Ask) must always run afresh.
+    return configManager.cacheEnabled and \
+        menuOption in ["X"] and \
+        not downloadOnly and \
+        not testing and \
+        executeOption not in [29] and \
+        userPassedArgs is not None and \
+        userPassedArgs.backtestdaysago is None and \
+        not userPassedArgs.runintradayanalysis
+
 def getLatestTradeDateTime(stockDictPrimary):
     stocks = list(stockDictPrimary.keys())
     stock = stocks[0]
@@ -2459,12 +2542,19 @@ def getLatestTradeDateTime(stockDictPrimary):
 def FinishBacktestDataCleanup(backtest_df, df_xray):
     if df_xray is not None and len(df_xray) > 10:
         showBacktestResults(df_xray, sortKey="Date", optionalName="Insights")
+        _, reportNameInsights = getBacktestReportFilename(sortKey="Date", optionalName="Insights")
+        PKBacktestResultsStore().addInsights(reportNameInsights, df_xray, configManager.periodsRange)
     summary_df = backtestSummary(backtest_df)
+    statistics_df = PKBacktestStatistics.forBacktest(backtest_df, configManager.periodsRange, sellSignal=isBacktestSellSignal())
+    # The numeric returns are only for the statistics, the report has the "<n>-Pd" cells
+    backtest_df.drop(columns=PKBacktestStatistics.returnColumns(configManager.periodsRange), inplace=True, errors="ignore")
     backtest_df.loc[:, "Date"] = backtest_df.loc[:, "Date"].apply(
                 lambda x: x.replace("-", "/")
             )
     showBacktestResults(backtest_df)
     showBacktestResults(summary_df, optionalName="Summary")
+    showBacktestResults(statistics_df, sortKey=None, optionalName="Statistics")
+    showTradeSimulationResults(backtest_df, sellSignal=isBacktestSellSignal())
     sorting = False if defaultAnswer is not None else True
     tasksList = []
     sortKeys = {
@@ -2764,14 +2854,17 @@ def handleRequestForSpecificStocks(options, indexOption):
     listStockCodes = [] if listStockCodes is None or len(listStockCodes) ==0 else listStockCodes
     strOptions = ""
     if isinstance(options, list):
-        strOptions = ":".join(options).split(">")[0]
+        strOptions = PKScanExpression.splitPipedOptions(":".join(options))[0]
     else:
-        strOptions = options.split(">")[0]
+        strOptions = PKScanExpression.splitPipedOptions(options)[0]
     
     if indexOption == 0:
         if len(strOptions) >= 4:
-            strOptions = strOptions.replace(":D:",":").replace(">","")
+            strOptions = strOptions.replace(":D:",":")
             providedOptions = strOptions.split(":")
+            if len(providedOptions) > 3 and providedOptions[2] == "44":
+                # X:0:44:<expression>:<stocks>. The expression is not a stock list.
+                providedOptions.pop(3)
             for option in providedOptions:
                 if not "".join(str(option).split(".")).isdecimal() and len(option.strip()) > 1:
                     listStockCodes = str(option.strip()).split(",")
@@ -3096,6 +3189,9 @@ def printNotifySaveScreenedResults(
     pngExtension = ".png"
     eligible = is_token_telegram_configured()
     targetDateG10k = prepareGrowthOf10kResults(saveResults, selectedChoice, menuChoiceHierarchy, testing, user, pngName, pngExtension, eligible)
+    if userPassedArgs.backtestdaysago is not None and int(userPassedArgs.backtestdaysago) > 0:
+        # The scan results of a past day are signals that can be traded on the days since
+        showTradeSimulationResults(saveResults, sellSignal=isBacktestSellSignal())
     if saveResults is not None and "Date" in saveResults.columns and len(saveResults) > 0:
         recordDate = saveResults["Date"].iloc[0].replace("/","-")
     summaryReturns = removedUnusedColumns(screenResults, saveResults, ["Date","Breakout","Resistance"],userArgs=userPassedArgs)
@@ -3666,6 +3762,11 @@ def runScanners(
     backtest_df = None
     reviewDate = getReviewDate(userPassedArgs) if criteria_dateTime is None else criteria_dateTime
     max_allowed = getMaxAllowedResultsCount(iterations, testing)
+    backtestCompleted = False
+    if menuOption == "B":
+        # The units resumed from the backtest journal count as results received
+        max_allowed -= len(PKBacktestJournal().restoredUnits)
+        max_allowed *= max(1, len(PKMultiStrategyBacktest().strategies))
     try:
         originalNumberOfStocks = numStocks
         iterations, numStocksPerIteration = getIterationsAndStockCounts(numStocks, iterations)
@@ -3690,8 +3791,9 @@ def runScanners(
         bar, spinner = Utility.tools.getProgressbarStyle()
         # OutputControls().moveCursorUpLines(1)
         with alive_bar(numStocks, bar=bar, spinner=spinner) as progressbar:
-            lstscreen = []
-            lstsave = []
+            screeningSchema, saveSchema = StockScreener().resultSchemas(configManager)
+            lstscreen = PKResultAccumulator(schema=screeningSchema)
+            lstsave = PKResultAccumulator(schema=saveSchema)
             result = None
             backtest_df = None
             start_time = time.time() if not scanCycleRunning else start_time
@@ -3710,10 +3812,11 @@ def runScanners(
                 )
                 if result is not None:
                     if not userPassedArgs.monitor and len(lstscreen) > 0 and userPassedArgs is not None and userPassedArgs.options.split(":")[2] in ["29"]:
-                        scr_df = pd.DataFrame(lstscreen)
                         existingColumns = ["Stock","%Chng","LTP","Volume"]
                         newColumns = ["BidQty","AskQty","LwrCP","UprCP","VWAP","DayVola","Del(%)"]
                         existingColumns.extend(newColumns)
+                        # Only the displayed columns are materialised for every result received
+                        scr_df = lstscreen.snapshot(columns=existingColumns)
                         scr_df = scr_df[existingColumns]
                         scr_df.sort_values(by=["Volume","BidQty"], ascending=False, inplace=True)
                         tabulated_results = colorText.miniTabulator().tb.tabulate(
@@ -3733,6 +3836,10 @@ def runScanners(
                 return not ((testing and len(lstscreen) >= 1) or len(lstscreen) >= max_allowed), backtest_df
             otherArgs = (menuOption, backtestPeriod, result, lstscreen, lstsave)
             backtest_df, result =PKScanRunner.runScan(userPassedArgs,testing,numStocks,iterations,items,numStocksPerIteration,tasks_queue,results_queue,originalNumberOfStocks,backtest_df,*otherArgs,resultsReceivedCb=processResultsCallback)
+            if menuOption == "B":
+                backtest_df = PKBacktestJournal().mergeRestoredResults(backtest_df)
+                backtestCompleted = keyboardInterruptEvent is None or not keyboardInterruptEvent.is_set()
+            backtest_df = backtestDataFrame(backtest_df)
 
         # OutputControls().printOutput(f"\x1b[{3 if OutputControls().enableMultipleLineOutput else 1}A")
         # if len(lstscreen) == 0 and userPassedArgs is not None and userPassedArgs.monitor is None:
@@ -3741,8 +3848,8 @@ def runScanners(
         elapsed_time = time.time() - start_time
         if menuOption in ["X", "G", "C", "F"]:
             # create extension
-            screenResults = pd.DataFrame(lstscreen)
-            saveResults = pd.DataFrame(lstsave)
+            screenResults = lstscreen.toDataFrame()
+            saveResults = lstsave.toDataFrame()
 
     except KeyboardInterrupt: # pragma: no cover
         try:
@@ -3767,6 +3874,8 @@ def runScanners(
         )
         PKScanRunner.terminateAllWorkers(userPassedArgs=userPassedArgs,consumers=consumers, tasks_queue=tasks_queue,testing=testing)
         logging.shutdown()
+    # Whatever was received so far is in the journal, unless the backtest completed
+    PKBacktestJournal().end(completed=backtestCompleted)
 
     if result is not None and len(result) >=1 and criteria_dateTime is None:
         if userPassedArgs is not None and userPassedArgs.backtestdaysago is not None:
@@ -3797,6 +3906,7 @@ def processResults(menuOption, backtestPeriod, result, lstscreen, lstsave, backt
         lstsave.append(result[1])
         sampleDays = result[4]
         if menuOption == "B":
+            rowsBefore = len(backtest_df) if isinstance(backtest_df, PKResultAccumulator) else 0
             backtest_df = updateBacktestResults(
                             backtestPeriod,
                             start_time,
@@ -3804,6 +3914,7 @@ def processResults(menuOption, backtestPeriod, result, lstscreen, lstsave, backt
                             sampleDays,
                             backtest_df,
                         )
+            PKBacktestJournal().record(result[3], sampleDays, backtest_df.rows(rowsBefore) if isinstance(backtest_df, PKResultAccumulator) else [])
             
     return backtest_df
 
@@ -3838,9 +3949,9 @@ def updateBacktestResults(
     backtestPeriod, start_time, result, sampleDays, backtest_df
 ):
     global elapsed_time
-    sellSignal = (
-        str(selectedChoice["2"]) in ["6", "7"] and str(selectedChoice["3"]) in ["2"]
-    ) or selectedChoice["2"] in ["15", "16", "19", "25"]
+    multiStrategyBacktest = PKMultiStrategyBacktest()
+    strategy = multiStrategyBacktest.strategyForResult(result) if multiStrategyBacktest.isRunning() else None
+    sellSignal = isBacktestSellSignal() if strategy is None else multiStrategyBacktest.strategies[strategy]["sellSignal"]
     backtest_df = backtest(
         result[3],
         result[2],
@@ -3850,10 +3961,130 @@ def updateBacktestResults(
         sampleDays,
         backtest_df,
         sellSignal,
+        strategy=strategy,
     )
     elapsed_time = time.time() - start_time
     return backtest_df
 
+def isBacktestSellSignal():
+    return (
+        str(selectedChoice["2"]) in ["6", "7"] and str(selectedChoice["3"]) in ["2"]
+    ) or selectedChoice["2"] in ["15", "16", "19", "25"]
+
+def runMultiStrategyBacktest(userArgs=None):
+    global tasks_queue, results_queue, consumers, logging_queue
+    strategies = PKMultiStrategyBacktest.strategiesFromOptions(userArgs.backteststrategies)
+    if len(strategies) == 0:
+        OutputControls().printOutput(f"{colorText.FAIL}  [+] Please pass the strategies to backtest as B:<period>:<index>:<scanner>... options, separated by ;{colorText.END}")
+        return None
+    multiStrategyBacktest = PKMultiStrategyBacktest()
+    multiStrategyBacktest.begin()
+    try:
+        # Take the options and the work items of each strategy. The stock data
+        # is loaded only for the first of them.
+        for strategy in strategies:
+            userArgs.options = strategy
+            main(userArgs=userArgs)
+            if keyboardInterruptEventFired:
+                break
+    finally:
+        multiStrategyBacktest.collecting = False
+    backtest_df = None
+    try:
+        if keyboardInterruptEventFired or len(multiStrategyBacktest.items) == 0:
+            return None
+        testing = userArgs.testbuild and userArgs.prodbuild
+        samplingDuration, _, _ = PKScanRunner.getScanDurationParameters(testing, "B")
+        firstStrategy = next(iter(multiStrategyBacktest.strategies.values()))
+        # Screen all the strategies and days of a stock together, from one pass over its history
+        items = PKWalkForwardEngine.orderByStock(multiStrategyBacktest.items)
+        OutputControls().printOutput(f"{colorText.GREEN}  [+] Backtesting {len(multiStrategyBacktest.strategies)} strategies together: {', '.join(multiStrategyBacktest.strategies.keys())}{colorText.END}")
+        screenResults, saveResults = PKScanRunner.initDataframes()
+        _, _, backtest_df, tasks_queue, results_queue, consumers,logging_queue = PKScanRunner.runScanWithParams(userArgs,keyboardInterruptEvent,screenCounter,screenResultsCounter,stockDictPrimary,stockDictSecondary,testing, firstStrategy["backtestPeriod"], "B",firstStrategy["executeOption"], samplingDuration, items,screenResults, saveResults, None,scanningCb=runScanners,tasks_queue=tasks_queue, results_queue=results_queue, consumers=consumers,logging_queue=logging_queue)
+        showMultiStrategyBacktestResults(backtest_df)
+    finally:
+        multiStrategyBacktest.end()
+    return backtest_df
+
+def showMultiStrategyBacktestResults(backtest_df):
+    global menuChoiceHierarchy
+    if backtest_df is None or len(backtest_df) == 0 or "Strategy" not in backtest_df.columns:
+        OutputControls().printOutput("Finished backtesting with no results to show!")
+        return
+    ConsoleUtility.PKConsoleTools.clearScreen(forceTop=True)
+    multiStrategyBacktest = PKMultiStrategyBacktest()
+    summaries = {}
+    for strategy, strategy_df, statistics_df in multiStrategyBacktest.reportsByStrategy(backtest_df, configManager.periodsRange):
+        strategyDetails = multiStrategyBacktest.strategies[strategy]
+        menuChoiceHierarchy = strategyDetails["menuChoiceHierarchy"]
+        summaries[strategy] = backtestSummary(strategy_df)
+        strategy_df.loc[:, "Date"] = strategy_df.loc[:, "Date"].apply(
+                    lambda x: x.replace("-", "/")
+                )
+        showBacktestResults(strategy_df, choices=strategyDetails["choices"])
+        showBacktestResults(summaries[strategy], optionalName="Summary", choices=strategyDetails["choices"])
+        showBacktestResults(statistics_df, sortKey=None, optionalName="Statistics", choices=strategyDetails["choices"])
+        showTradeSimulationResults(strategy_df, sellSignal=strategyDetails["sellSignal"], choices=strategyDetails["choices"])
+    comparison_df = PKMultiStrategyBacktest.comparison(summaries)
+    if len(comparison_df) > 0:
+        menuChoiceHierarchy = f"Backtests > Comparison of strategies: {', '.join(summaries.keys())}"
+        choices = "_vs_".join([multiStrategyBacktest.strategies[strategy]["choices"] for strategy in summaries.keys()])
+        showBacktestResults(comparison_df, sortKey=None, optionalName="Strategies_Comparison", choices=choices)
+    if defaultAnswer is None:
+        OutputControls().takeUserInput("Press <Enter> to continue...")
+
+
+def showTradeSimulationResults(results_df, sellSignal=False, choices=None):
+    # Only when asked for with --simulatetrades
+    simulateTrades = getattr(userPassedArgs, "simulatetrades", None)
+    if simulateTrades is None or stockDictPrimary is None:
+        return None
+    trades_df, equity_df, tradeSummary_df = PKTradeSimulator.forResults(results_df, stockDictPrimary, simulateTrades, sellSignal=sellSignal)
+    if trades_df is None or len(trades_df) == 0:
+        OutputControls().printOutput("No trades could be simulated! The signals need the candles after their dates in the saved stock data.")
+        return None
+    showBacktestResults(trades_df, sortKey="Date", optionalName="Trades", choices=choices)
+    showBacktestResults(equity_df, sortKey=None, optionalName="Equity_Curve", choices=choices)
+    showBacktestResults(tradeSummary_df, sortKey=None, optionalName="Trade_Statistics", choices=choices)
+    return tradeSummary_df
+
+def runMorningAnalysisReplay(userArgs=None):
+    global tasks_queue, results_queue, consumers, logging_queue, menuChoiceHierarchy
+    options = userArgs.options
+    if options is None or not options.upper().startswith("C:") or "|" in options:
+        OutputControls().printOutput(f"{colorText.FAIL}  [+] Please pass the intraday analysis options to replay as C:<index>:<scanner>... For example: -o \"C:12:9:2.5\"{colorText.END}")
+        return None
+    numSessions = max(1, userArgs.replaysessions)
+    runOptionName = options.replace(":D","").replace(":","_")
+    replaySummaries = []
+    choices = None
+    try:
+        sessionNumber = 1
+        for sessionDate, updatedCandleData, sessionDailyCandles, sessionIntradayCandles in PKMarketOpenCloseAnalyser.getSessionsForReplay(numSessions=numSessions):
+            PKMarketOpenCloseAnalyser.setReplaySession(sessionDate, updatedCandleData, sessionDailyCandles, sessionIntradayCandles)
+            userArgs.options = options
+            userArgs.progressstatus = f"  [+] {runOptionName} => Replaying the session of {sessionDate.strftime('%Y-%m-%d')}: {sessionNumber} of {numSessions}..."
+            main(userArgs=userArgs)
+            choices = PKScanRunner.getFormattedChoices(userArgs, selectedChoice) if choices is None else choices
+            # The workers load the (replayed) stock data only when they start
+            closeWorkersAndExit()
+            tasks_queue, results_queue, consumers, logging_queue = None, None, None, None
+            resetUserMenuChoiceOptions()
+            if keyboardInterruptEventFired:
+                break
+            sessionNumber += 1
+    finally:
+        replaySummaries = PKMarketOpenCloseAnalyser.endReplay()
+        userArgs.options = options
+    replay_df = PKMarketOpenCloseAnalyser.replaySummary(replaySummaries)
+    if len(replay_df) == 0:
+        OutputControls().printOutput("Finished replaying with no sessions to show! Please check that the 1m candles of the past sessions are available.")
+        return replay_df
+    menuChoiceHierarchy = f"Intraday Analysis > Morning alerts vs EoD over {len(replay_df) - 1} sessions ({runOptionName})"
+    showBacktestResults(replay_df, sortKey=None, optionalName="Morning_Replay", choices=choices)
+    if defaultAnswer is None:
+        OutputControls().takeUserInput("Press <Enter> to continue...")
+    return replay_df
 
 def saveDownloadedData(downloadOnly, testing, stockDictPrimary, configManager, loadCount):
     global userPassedArgs, keyboardInterruptEventFired, download_trials
@@ -61,6 +61,7 @@ from PKDevTools.classes.PKDateUtilities import PKDateUtilities
 from pkscreener.Imports import Imports
 from PKDevTools.classes.OutputControls import OutputControls
 from pkscreener.classes.MarketMonitor import MarketMonitor
+from pkscreener.classes.PKScanExpression import PKScanExpression
 import pkscreener.classes.ConfigManager as ConfigManager
 
 if __name__ == '__main__':
@@ -128,6 +129,13 @@ argParser.add_argument(
     help="Run scanner for -b days ago from today.",
     required=False,
 )
+argParser.add_argument(
+    "--backteststrategies",
+    type=str,
+    help="Backtest several strategies together, in one pass over the stock data, and compare them. "
+    + "Pass the backtest options of each strategy separated by ;. For example: \"B:30:12:9:2.5;B:30:12:10;B:30:12:7:4\"",
+    required=False,
+)
 argParser.add_argument(
     "--barometer",
     action="store_true",
@@ -219,17 +227,38 @@ argParser.add_argument(
     help="Run in production-build mode",
     required=False,
 )
+argParser.add_argument(
+    "--profilescan",
+    action="store_true",
+    help="Profile where the scan time goes (data fetch, each filter, serialization, queue wait) and save it as JSON/CSV",
+    required=False,
+)
 argParser.add_argument(
     "--progressstatus",
     help="Pass default progress status that you'd like to get displayed when running the scans",
     required=False,
 )
+argParser.add_argument(
+    "--replaysessions",
+    type=int,
+    help="Replay the morning vs EoD analysis (menu C) for these many past sessions from the saved 1m candles. "
+    + "For example: -o \"C:12:9:2.5\" --replaysessions 20",
+    required=False,
+)
 argParser.add_argument(
     "--runintradayanalysis",
     action="store_true",
     help="Run analysis for morning vs EoD LTP values",
     required=False,
 )
+argParser.add_argument(
+    "--scanexpression",
+    type=str,
+    help="Custom scan expression for menu option 44. For example, "
+    + "\"rsi(14) between 55,68 and close > sma(50) and volume > 2.5*sma(volume,20)\". "
+    + "It can also be passed in the options, e.g. -o \"X:12:44:close > sma(50)\"",
+    required=False,
+)
 argParser.add_argument(
     "--simulate",
     type=json.loads, # '{"isTrading":true,"currentDateTime":"2024-04-29 09:35:38"}'
@@ -254,6 +283,16 @@ argParser.add_argument(
     help="Comma separated list of stocks passed from previous scan results",
     required=False,
 )
+argParser.add_argument(
+    "--simulatetrades",
+    type=str,
+    nargs="?",
+    const="",
+    help="Simulate trading the backtest signals (or the results of a scan run with --backtestdaysago): entry at the next open, "
+    + "exit at the stop-loss, target or end of the holding period, with slippage and brokerage. "
+    + "Optionally pass stoploss%%:target%%:holdingcandles:slippage%%:brokerage%%. For example: -o \"B:30:12:9:2.5\" --simulatetrades 5:10:10:0.1:0.05",
+    required=False,
+)
 argParser.add_argument(
     "--systemlaunched",
     action="store_true",
@@ -509,7 +548,12 @@ def runApplication():
             args.runintradayanalysis = True
         args,choices = updateProgressStatus(args)
         
-    if args.runintradayanalysis:
+    if args.replaysessions is not None:
+        from pkscreener.globals import runMorningAnalysisReplay
+        runMorningAnalysisReplay(userArgs=args)
+        closeWorkersAndExit()
+        sys.exit(0)
+    elif args.runintradayanalysis:
         generateIntradayAnalysisReports(args)
     else:
         if args.testalloptions:
@@ -519,6 +563,12 @@ def runApplication():
                  _, _ = main(userArgs=args)
             sys.exit(0)
 
+        if args.backteststrategies:
+            from pkscreener.globals import runMultiStrategyBacktest
+            runMultiStrategyBacktest(userArgs=args)
+            closeWorkersAndExit()
+            sys.exit(0)
+
         if args.barometer:
             sendGlobalMarketBarometer(userArgs=args)
             sys.exit(0)
@@ -557,7 +607,7 @@ def runApplication():
                             savedStocks = MarketMonitor().monitorResultStocks[str(srcIndex)]
                             innerPipes = monitorOption.split("|")
                             nextPipe = innerPipes[0]
-                            nextMonitor = nextPipe.split(">")[0]
+                            nextMonitor = PKScanExpression.splitPipedOptions(nextPipe)[0]
                             innerPipes[0] = f"{nextMonitor}:{savedStocks}"
                             monitorOption = ":>|".join(innerPipes)
                             monitorOption = monitorOption.replace("::",":").replace(":>:>",":>")
@@ -825,7 +875,7 @@ def checkIntradayComponent(args, monitorOption):
 def updateConfigDurations(args):
     if args is None or args.options is None:
         return
-    nextOnes = args.options.split(">")
+    nextOnes = PKScanExpression.splitPipedOptions(args.options)
     if len(nextOnes) > 1:
         monitorOption = nextOnes[0]
         if len(monitorOption) == 0:
@@ -848,7 +898,7 @@ def pipeResults(prevOutput,args):
     if args is None or args.options is None:
         return False
     hasFoundStocks = False
-    nextOnes = args.options.split(">")
+    nextOnes = PKScanExpression.splitPipedOptions(args.options)
     if len(nextOnes) > 1:
         monitorOption = nextOnes[1]
         if len(monitorOption) == 0:
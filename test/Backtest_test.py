@@ -0,0 +1,92 @@
+"""
+    The MIT License (MIT)
+
+    Copyright (c) 2023 pkjmesra
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import loadRecordedDailyCandles
+from pkscreener.classes.Backtest import backtest, backtestDataFrame, forwardReturnsForPeriods
+from pkscreener.classes.PKResultAccumulator import PKResultAccumulator
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+# The backtest dataframe (in the pandas "split" format, with its dtypes) of
+# the signals below, as built by concatenating one row after the other,
+# before the forward returns were computed at once
+BACKTEST_GOLDEN = "backtest_golden.json"
+PERIODS = [1, 2, 3, 4, 5, 10, 15, 22, 30]
+
+with open(os.path.join(FIXTURES_DIR, BACKTEST_GOLDEN)) as f:
+    backtestGolden = json.load(f)
+
+def recordedSignals():
+    # (stock, data from the signal day on, saveDict, screenedDict, sellSignal)
+    # every 13 candles of the recorded candles. Some of them have a missing
+    # close, some of them the portfolio columns, the last ones fewer candles
+    # than the longest period.
+    df = loadRecordedDailyCandles().drop(columns=["Adj Close"])
+    for n, start in enumerate(range(300, len(df), 13)):
+        data = df.iloc[start:start + 31].copy()
+        if n % 5 == 1:
+            data.iloc[3, data.columns.get_loc("Close")] = np.nan
+        close = float(data["Close"].iloc[0])
+        screenedDict = {"Consol.": f"Range:{n % 7}.5%", "Breakout": f"BO: {round(close * 1.02, 2)} R: {round(close * 1.05, 2)}",
+                        "MA-Signal": ["Bullish", "Bearish", "Neutral"][n % 3], "Volume": round(1 + n / 10, 2),
+                        "LTP": round(close, 2), "52Wk-H": round(close * 1.1, 2), "52Wk-L": round(close * 0.8, 2),
+                        "RSI": 30 + n % 40, "Trend": ["Strong Up", "Sideways", "Weak Down"][n % 3],
+                        "Pattern": "" if n % 4 else "Doji", "CCI": -100 + 7 * n}
+        saveDict = {"Date": data.index[0].strftime("%Y-%m-%d") if hasattr(data.index[0], "strftime") else str(data.index[0])}
+        if n % 6 == 0:
+            for prd in PERIODS:
+                saveDict[f"LTP{prd}"] = round(close + prd, 2)
+                saveDict[f"Growth{prd}"] = round(prd / 10, 2)
+        yield f"G{start}", data, saveDict, screenedDict, n % 9 == 4
+
+def test_backtest_dataframe_matches_the_golden_dataframe():
+    backTestedData = None
+    for stock, data, saveDict, screenedDict, sellSignal in recordedSignals():
+        backTestedData = backtest(stock, data, saveDict, screenedDict, 30, 30, backTestedData, sellSignal)
+    assert isinstance(backTestedData, PKResultAccumulator)
+    df = backtestDataFrame(backTestedData)
+    expected = pd.DataFrame(backtestGolden["data"], index=backtestGolden["index"], columns=backtestGolden["columns"])
+    expected = expected.astype(backtestGolden["dtypes"])
+    # The numeric returns (for the backtest statistics) are the only new columns
+    returnColumns = [f"Return{prd}" for prd in PERIODS]
+    pd.testing.assert_frame_equal(df.drop(columns=returnColumns), expected)
+    for prd in PERIODS:
+        formatted = df[f"{prd}-Pd"].str.extract(r"(-?\d+\.\d+)%", expand=False).astype(float)
+        assert np.allclose(df[f"Return{prd}"].round(2), formatted, equal_nan=True)
+
+def test_forward_returns_match_pct_change(recordedDailyCandles):
+    for start in range(300, len(recordedDailyCandles), 29):
+        data = recordedDailyCandles.iloc[start:start + 31].copy()
+        data.iloc[2, data.columns.get_loc("Close")] = np.nan
+        returns = forwardReturnsForPeriods(data, PERIODS)
+        assert sorted(returns.keys()) == [prd for prd in PERIODS if prd < len(data)]
+        for prd, value in returns.items():
+            expected = (data["Close"].ffill().pct_change(periods=prd) * 100).iloc[prd]
+            assert value == pytest.approx(expected, rel=1e-12)
@@ -0,0 +1,65 @@
+"""
+    The MIT License (MIT)
+
+    Copyright (c) 2023 pkjmesra
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+
+"""
+import os
+from argparse import Namespace
+
+import pytest
+
+from pkscreener.classes.ConfigManager import tools, parser
+from pkscreener.classes.PKBacktestJournal import PKBacktestJournal
+
+@pytest.fixture
+def journal(tmp_path, monkeypatch):
+    journal = PKBacktestJournal()
+    monkeypatch.setattr(journal, "journalDir", str(tmp_path))
+    yield journal
+    journal.end()
+
+def journalKey(configManager):
+    userArgs = Namespace(intraday=None, scanexpression=None)
+    return PKBacktestJournal.journalKey(userArgs, {"0": "B", "1": "30", "2": "12", "3": "1"}, configManager, 30)
+
+def test_journal_key_changes_with_the_config_that_changes_the_results(monkeypatch):
+    configManager = tools()
+    configManager.getConfig(parser)
+    key = journalKey(configManager)
+    assert journalKey(configManager) == key
+    monkeypatch.setattr(configManager, "useEMA", not configManager.useEMA)
+    assert journalKey(configManager) != key
+    monkeypatch.undo()
+    monkeypatch.setattr(configManager, "periods", [period for period in configManager.periods if period != 4])
+    assert journalKey(configManager) != key
+
+def test_completed_backtest_removes_its_journals(journal):
+    journal.begin("k1")
+    journal.record("SBIN", 3, [["SBIN", 1.0]])
+    journal.end()
+    journal.begin("k1")
+    assert journal.finishedUnits == {("SBIN", 3): [["SBIN", 1.0]]}
+    assert journal.pendingItems([tuple(["x"] * 13 + ["SBIN"] + ["x"] * 5 + [3])]) == []
+    journal.end(completed=True)
+    assert os.listdir(journal.journalDir) == []
+    journal.begin("k1")
+    assert journal.finishedUnits == {}
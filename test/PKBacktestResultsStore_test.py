@@ -0,0 +1,128 @@
+"""
+    The MIT License (MIT)
+
+    Copyright (c) 2023 pkjmesra
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+
+"""
+import datetime
+import os
+
+import pandas as pd
+import pytest
+
+from PKDevTools.classes.PKDateUtilities import PKDateUtilities
+
+from conftest import XRAY_PERIODS
+from pkscreener.classes import PKBacktestResultsStore as resultsStore
+from pkscreener.classes.PKBacktestResultsStore import PKBacktestResultsStore
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+# An insights report (as published, with its [SUM] rows) of 8 backtest dates
+# of the recorded X-Ray results, as written before the results store
+BACKTEST_INSIGHTS_REPORT = "backtest_insights_report.html"
+REPORT_NAME = "PKScreener_B_30_12_1_Insights_DateSorted.html"
+
+def readReport():
+    pytest.importorskip("lxml")
+    return pd.read_html(os.path.join(FIXTURES_DIR, BACKTEST_INSIGHTS_REPORT), encoding="UTF-8", attrs={"id": "resultsTable"})[0]
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = PKBacktestResultsStore()
+    monkeypatch.setattr(store, "storeDir", str(tmp_path))
+    monkeypatch.setattr(store, "scanners", {})
+    monkeypatch.setattr(store, "summaries", {})
+    return store
+
+@pytest.fixture
+def publishedReport(monkeypatch):
+    # The published report is read from the fixture, and counted
+    report = readReport()
+    reads = []
+    def readHtml(url, **kwargs):
+        reads.append(url)
+        return [report.copy()]
+    monkeypatch.setattr(resultsStore.pd, "read_html", readHtml)
+    return reads
+
+def setToday(monkeypatch, day):
+    monkeypatch.setattr(PKDateUtilities, "currentDateTime", lambda: datetime.datetime(2024, 5, day, 10, 0))
+
+def test_summary_matches_the_published_summary(store):
+    report = readReport()
+    store.addRows(PKBacktestResultsStore.scannerForReport(REPORT_NAME), PKBacktestResultsStore.insightRows(report, XRAY_PERIODS))
+    summary = store.summary(REPORT_NAME, XRAY_PERIODS).set_index("ScanType")
+    published = report[report["ScanType"].str.startswith("[SUM]")].set_index("ScanType")
+    assert sorted(summary.index) == sorted(published.index)
+    assert summary["Date"].isna().all()
+    for period in XRAY_PERIODS:
+        # The ranking always read returns that are not positive as 0
+        returns = PKBacktestResultsStore.insightValues(published[f"{period}Pd-%"]).clip(lower=0).fillna(0.0)
+        growth10k = PKBacktestResultsStore.insightValues(published[f"{period}Pd-10k"])
+        pd.testing.assert_series_equal(summary[f"{period}Pd-%"], returns.reindex(summary.index), check_names=False)
+        pd.testing.assert_series_equal(summary[f"{period}Pd-10k"], growth10k.reindex(summary.index), check_names=False)
+    # Parsing the report replaced anything with a "-" by NaN, which lost
+    # these strategies. The store keeps them.
+    assert {"[SUM][CCI]-100<C<0 (8)", "[SUM][CCI]<=-100 (8)"} <= set(summary.index)
+
+def test_published_report_is_read_once_a_day(store, publishedReport, monkeypatch):
+    setToday(monkeypatch, 6)
+    store.refreshFromPublishedReport(REPORT_NAME, XRAY_PERIODS)
+    store.refreshFromPublishedReport(REPORT_NAME, XRAY_PERIODS)
+    assert len(publishedReport) == 1
+    assert publishedReport[0].endswith("PKScreener_B_30_12_1_Insights_DateSorted.html")
+    assert len(store.summary(REPORT_NAME, XRAY_PERIODS)) == 39
+    # Also after a restart, from the saved store
+    monkeypatch.setattr(store, "scanners", {})
+    monkeypatch.setattr(store, "summaries", {})
+    store.refreshFromPublishedReport(REPORT_NAME, XRAY_PERIODS)
+    assert len(publishedReport) == 1
+    setToday(monkeypatch, 7)
+    store.refreshFromPublishedReport(REPORT_NAME, XRAY_PERIODS)
+    assert len(publishedReport) == 2
+
+def test_local_runs_win_over_the_published_report(store, publishedReport, monkeypatch):
+    setToday(monkeypatch, 6)
+    report = readReport()
+    local = report[~report["ScanType"].str.startswith("[SUM]")].head(1).copy()
+    local["1Pd-%"] = "12.5 %"
+    local["1Pd-10k"] = "11250.0"
+    store.addInsights(REPORT_NAME, local, XRAY_PERIODS)
+    store.refreshFromPublishedReport(REPORT_NAME, XRAY_PERIODS)
+    rows = store.scannerResults(PKBacktestResultsStore.scannerForReport(REPORT_NAME))["rows"]
+    row = rows[(rows["ScanType"] == local["ScanType"].iloc[0]) & (rows["Date"] == local["Date"].iloc[0]) & (rows["Period"] == 1)]
+    assert row[["Pd-%", "Pd-10k"]].values.tolist() == [[12.5, 11250.0]]
+
+def test_missing_or_corrupt_store_starts_empty(store, publishedReport, monkeypatch):
+    setToday(monkeypatch, 6)
+    scanner = PKBacktestResultsStore.scannerForReport(REPORT_NAME)
+    assert store.summary(REPORT_NAME, XRAY_PERIODS) is None
+    with open(store.scannerFilePath(scanner), "wb") as f:
+        f.write(b"not a pickle")
+    monkeypatch.setattr(store, "scanners", {})
+    assert len(store.scannerResults(scanner)["rows"]) == 0
+    assert store.scannerResults(scanner)["refreshedOn"] is None
+    # It is then refreshed and saved again
+    store.refreshFromPublishedReport(REPORT_NAME, XRAY_PERIODS)
+    assert len(publishedReport) == 1
+    monkeypatch.setattr(store, "scanners", {})
+    monkeypatch.setattr(store, "summaries", {})
+    assert len(store.summary(REPORT_NAME, XRAY_PERIODS)) == 39
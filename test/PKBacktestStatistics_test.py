@@ -0,0 +1,64 @@
+"""
+    The MIT License (MIT)
+
+    Copyright (c) 2023 pkjmesra
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from pkscreener.classes.Backtest import backtest, backtestDataFrame
+from pkscreener.classes.PKBacktestStatistics import PKBacktestStatistics
+
+PERIODS = [1, 2, 3, 4, 5, 10, 15, 22, 30]
+
+def screenedDict():
+    return {column: "" for column in ["Consol.", "Breakout", "MA-Signal", "Volume", "LTP", "52Wk-H", "52Wk-L", "RSI", "Trend", "Pattern", "CCI"]}
+
+def test_statistics_use_the_numeric_returns_of_the_backtest(recordedDailyCandles):
+    backTestedData = None
+    for start in range(500, 520):
+        data = recordedDailyCandles.iloc[start:start + 40]
+        backTestedData = backtest("GOOG", data, saveDict={"Date": data.index[0].strftime("%Y-%m-%d")}, screenedDict=screenedDict(), backTestedData=backTestedData)
+    backtest_df = backtestDataFrame(backTestedData)
+    closes = recordedDailyCandles["Close"].to_numpy()
+    expected = np.array([[(closes[start + prd] / closes[start] - 1) * 100 for prd in PERIODS] for start in range(500, 520)])
+    np.testing.assert_allclose(PKBacktestStatistics.returnsArray(backtest_df, PERIODS), expected)
+    statistics = PKBacktestStatistics.forBacktest(backtest_df, PERIODS, samples=50).set_index("Statistic")
+    np.testing.assert_allclose(statistics.loc["Hit%"].to_numpy(dtype=float), np.round((expected >= 0).mean(axis=0) * 100, 2))
+    np.testing.assert_allclose(statistics.loc["Avg.Ret%"].to_numpy(dtype=float), np.round(expected.mean(axis=0), 2))
+
+def test_flat_returns_are_hits_only_for_buy_signals():
+    returns = np.array([[0.0], [1.0], [-1.0]])
+    assert PKBacktestStatistics.summary(returns, samples=10).loc["Hit%", 0] == pytest.approx(66.67)
+    assert PKBacktestStatistics.summary(returns, sellSignal=True, samples=10).loc["Hit%", 0] == pytest.approx(33.33)
+
+def test_drawdowns_compound_only_non_overlapping_returns():
+    # A signal on each of 20 consecutive trading days, losing 1% over 1 day
+    # and 5% over 5 days
+    dates = pd.bdate_range("2024-01-01", periods=20).to_numpy()
+    returns = np.tile([-1.0, -5.0], (20, 1))
+    statistics = PKBacktestStatistics.summary(returns, dates=dates, samples=10, periods=[1, 5])
+    assert statistics.loc["MaxDD%", 0] == pytest.approx(round((0.99 ** 20 - 1) * 100, 2))
+    # Only every fifth day's 5-day return is compounded
+    assert statistics.loc["MaxDD%", 1] == pytest.approx(round((0.95 ** 4 - 1) * 100, 2))
+    np.testing.assert_array_equal(PKBacktestStatistics.nonOverlappingDays(np.array([0, 1, 2, 5, 6, 9, 10]), 3), [0, 3, 5])
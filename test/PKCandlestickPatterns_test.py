@@ -0,0 +1,71 @@
+"""
+    The MIT License (MIT)
+
+    Copyright (c) 2023 pkjmesra
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+
+"""
+import numpy as np
+import pytest
+
+from pkscreener.classes.PKCandlestickPatterns import PKCandlestickPatterns
+
+talib = pytest.importorskip("talib")
+
+# The TA-Lib function of each pattern bit, with the labels (or bit positions,
+# where both variants share a label) reported for its bullish and bearish
+# results. Patterns with one variant report any non-zero result.
+TALIB_PATTERNS = [
+    ("CDLDOJI", "Doji", None),
+    ("CDLMORNINGSTAR", "Morning Star", None),
+    ("CDLMORNINGDOJISTAR", "Morning Doji Star", None),
+    ("CDLEVENINGSTAR", None, "Evening Star"),
+    ("CDLEVENINGDOJISTAR", None, "Evening Doji Star"),
+    ("CDLLADDERBOTTOM", "Bullish Ladder Bottom", None),
+    ("CDL3LINESTRIKE", 7, 8),
+    ("CDL3BLACKCROWS", None, "3 Black Crows"),
+    ("CDL3INSIDE", "3 Inside Up", "3 Inside Down"),
+    ("CDL3OUTSIDE", "3 Outside Up", "3 Outside Down"),
+    ("CDL3WHITESOLDIERS", "3 White Soldiers", None),
+    ("CDLHARAMI", "Bullish Harami", "Bearish Harami"),
+    ("CDLHARAMICROSS", "Bullish Harami Cross", "Bearish Harami Cross"),
+    ("CDLMARUBOZU", "Bullish Marubozu", "Bearish Marubozu"),
+    ("CDLHANGINGMAN", None, "Hanging Man"),
+    ("CDLHAMMER", "Hammer", None),
+    ("CDLINVERTEDHAMMER", "Inverted Hammer", None),
+    ("CDLSHOOTINGSTAR", None, "Shooting Star"),
+    ("CDLDRAGONFLYDOJI", "Dragonfly Doji", None),
+    ("CDLGRAVESTONEDOJI", None, "Gravestone Doji"),
+    ("CDLENGULFING", "Bullish Engulfing", "Bearish Engulfing"),
+]
+
+@pytest.fixture(scope="module")
+def recordedMasks(recordedDailyCandles):
+    ohlc = [recordedDailyCandles[column].to_numpy(dtype=float) for column in ["Open", "High", "Low", "Close"]]
+    return ohlc, PKCandlestickPatterns(*ohlc).patternMasks()[0]
+
+@pytest.mark.parametrize("talibName,bullishPattern,bearishPattern", TALIB_PATTERNS, ids=[pattern[0] for pattern in TALIB_PATTERNS])
+def test_pattern_bits_match_talib_on_recorded_candles(recordedMasks, talibName, bullishPattern, bearishPattern):
+    ohlc, masks = recordedMasks
+    expected = getattr(talib, talibName)(*ohlc)
+    for pattern, found in [(bullishPattern, expected > 0 if bearishPattern is not None else expected != 0),
+                           (bearishPattern, expected < 0 if bullishPattern is not None else expected != 0)]:
+        if pattern is not None:
+            np.testing.assert_array_equal((masks & PKCandlestickPatterns.bit(pattern)) != 0, found)
@@ -0,0 +1,71 @@
+"""
+    The MIT License (MIT)
+
+    Copyright (c) 2023 pkjmesra
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from PKDevTools.classes.log import default_logger
+
+from pkscreener.classes.ConfigManager import tools
+from pkscreener.classes.PKIndicatorPlan import BASE_INDICATORS, INDICATORS, RESULT_INDICATORS, SCAN_INDICATORS, PKIndicatorPlan
+from pkscreener.classes.ScreeningStatistics import ScreeningStatistics
+
+RECORDED_CANDLES = 400
+DAYS_TO_LOOKBACK = 22
+
+@pytest.fixture(scope="module")
+def screener():
+    return ScreeningStatistics(tools(), default_logger())
+
+def scanOptions(scan):
+    return scan if isinstance(scan, tuple) else (scan, None)
+
+@pytest.mark.parametrize("scan", list(SCAN_INDICATORS.keys()), ids=str)
+def test_completed_indicators_equal_the_full_preprocessing(recordedDailyCandles, screener, scan):
+    data = recordedDailyCandles.drop(columns=["Adj Close"]).tail(RECORDED_CANDLES).copy()
+    indicators = PKIndicatorPlan.indicatorsForScan(*scanOptions(scan))
+    fullData, processedData = screener.preprocessData(data, daysToLookback=DAYS_TO_LOOKBACK, indicators=indicators)
+    screener.completeIndicators(fullData, processedData)
+    expectedFullData, expectedProcessedData = screener.preprocessData(data, daysToLookback=DAYS_TO_LOOKBACK)
+    # Every column that the scan or the results read is there, with the values
+    # of the full preprocessing, in both frames
+    for column in sorted(BASE_INDICATORS | SCAN_INDICATORS[scan] | RESULT_INDICATORS):
+        pd.testing.assert_series_equal(fullData[column], expectedFullData[column])
+        pd.testing.assert_series_equal(processedData[column], expectedProcessedData[column])
+    assert len(processedData) == DAYS_TO_LOOKBACK
+
+def test_scans_without_a_plan_get_all_indicators():
+    assert PKIndicatorPlan.indicatorsForScan(7, 1) == frozenset(INDICATORS)
+    assert PKIndicatorPlan.indicatorsForScan(11) == frozenset(INDICATORS)
+    assert PKIndicatorPlan.indicatorsForScan(6, 4) == frozenset(INDICATORS)
+
+def test_complete_indicators_keeps_the_columns_that_are_there(recordedDailyCandles, screener):
+    data = recordedDailyCandles.drop(columns=["Adj Close"]).tail(RECORDED_CANDLES).copy()
+    fullData, processedData = screener.preprocessData(data, daysToLookback=DAYS_TO_LOOKBACK)
+    fullData["RSI"] = np.arange(len(fullData))
+    columns = list(fullData.columns)
+    screener.completeIndicators(fullData, processedData)
+    assert list(fullData.columns) == columns
+    assert (fullData["RSI"] == np.arange(len(fullData))).all()
@@ -0,0 +1,85 @@
+"""
+    The MIT License (MIT)
+
+    Copyright (c) 2023 pkjmesra
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+
+"""
+import sys
+
+import numpy as np
+import pytest
+
+from pkscreener.classes.PKLorentzianClassifier import PKLorentzianClassifier
+from pkscreener.classes.Pktalib import pktalib
+
+advanced_ta = pytest.importorskip("advanced_ta") if sys.version_info >= (3, 11) else None
+pytestmark = pytest.mark.skipif(advanced_ta is None, reason="advanced_ta needs python 3.11+")
+
+RECORDED_WINDOW = 300
+
+def lorentzianClassification(data, maxBarsBack):
+    # With the settings the Lorentzian scans used with advanced_ta
+    ata = advanced_ta
+    return ata.LorentzianClassification(data=data,
+        features=[
+            ata.LorentzianClassification.Feature("RSI", 14, 2),
+            ata.LorentzianClassification.Feature("WT", 10, 11),
+            ata.LorentzianClassification.Feature("CCI", 20, 2),
+            ata.LorentzianClassification.Feature("ADX", 20, 2),
+            ata.LorentzianClassification.Feature("RSI", 9, 2),
+            pktalib.MFI(data['high'], data['low'], data['close'], data['volume'], 14)
+        ],
+        settings=ata.LorentzianClassification.Settings(
+            source=data['close'],
+            neighborsCount=8,
+            maxBarsBack=maxBarsBack,
+            useDynamicExits=False
+        ),
+        filterSettings=ata.LorentzianClassification.FilterSettings(
+            useVolatilityFilter=True,
+            useRegimeFilter=True,
+            useAdxFilter=False,
+            regimeThreshold=-0.1,
+            adxThreshold=20,
+            kernelFilter=ata.LorentzianClassification.KernelFilter(
+                useKernelSmoothing=False,
+                lookbackWindow=8,
+                relativeWeight=8.0,
+                regressionLevel=25,
+                crossoverLag=2,
+            )
+        ))
+
+# Windows of the recorded candles, once with fewer bars than maxBarsBack and
+# once with more (only the last maxBarsBack bars are classified then)
+@pytest.mark.parametrize("windowEnd,maxBarsBack", [(300, 2000), (700, 2000), (1047, 2000), (600, 200)])
+def test_classifier_matches_advanced_ta_on_recorded_candles(recordedDailyCandles, windowEnd, maxBarsBack):
+    data = recordedDailyCandles.iloc[windowEnd - RECORDED_WINDOW:windowEnd].drop(columns=["Adj Close"])
+    data = data.rename(columns={"Open": "open", "Close": "close", "High": "high", "Low": "low", "Volume": "volume"})
+    expected = lorentzianClassification(data.copy(), maxBarsBack).df
+    classifier = PKLorentzianClassifier(neighborsCount=8, maxBarsBack=maxBarsBack)
+    predictions, _ = classifier.predict(data)
+    isNewBuySignal, isNewSellSignal = classifier.classify(data)
+    np.testing.assert_array_equal(predictions, expected["prediction"].to_numpy(dtype=np.int64))
+    np.testing.assert_array_equal(isNewBuySignal, expected["isNewBuySignal"].to_numpy(dtype=bool))
+    np.testing.assert_array_equal(isNewSellSignal, expected["isNewSellSignal"].to_numpy(dtype=bool))
+    # The window is not a degenerate one where nothing gets classified
+    assert (predictions != 0).any()
@@ -0,0 +1,42 @@
+"""
+    The MIT License (MIT)
+
+    Copyright (c) 2023 pkjmesra
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+
+"""
+import pandas as pd
+
+from pkscreener.classes.PKMarketOpenCloseAnalyser import PKMarketOpenCloseAnalyser
+
+def test_market_timestamps_are_in_the_exchange_time():
+    utc = PKMarketOpenCloseAnalyser.marketTimestamps(["2024-06-03 03:45:00"])
+    local = PKMarketOpenCloseAnalyser.marketTimestamps(pd.DatetimeIndex(["2024-06-03 09:15:00"]).tz_localize("Asia/Kolkata"))
+    assert list(utc) == list(local) == [pd.Timestamp("2024-06-03 09:15:00")]
+
+def test_each_replay_collects_only_its_own_session_summaries():
+    PKMarketOpenCloseAnalyser.replaySummaries = [{"Date": "stale"}]
+    for replay in ["first", "second"]:
+        for session in range(2):
+            PKMarketOpenCloseAnalyser.setReplaySession(pd.Timestamp("2024-06-03"), {}, {}, {})
+            PKMarketOpenCloseAnalyser.replaySummaries.append({"Date": f"{replay}{session}"})
+        assert PKMarketOpenCloseAnalyser.endReplay() == [{"Date": f"{replay}0"}, {"Date": f"{replay}1"}]
+        assert PKMarketOpenCloseAnalyser.replaySummaries == []
+        assert not PKMarketOpenCloseAnalyser.replaying
@@ -0,0 +1,87 @@
+"""
+    The MIT License (MIT)
+
+    Copyright (c) 2023 pkjmesra
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+
+"""
+import pandas as pd
+import pytest
+
+from conftest import loadRecordedDailyCandles, recordedStockDict, screenerHostRef
+from pkscreener.classes.Backtest import backtest, backtestDataFrame
+from pkscreener.classes.ConfigManager import tools, parser
+from pkscreener.classes.PKBacktestStatistics import PKBacktestStatistics
+from pkscreener.classes.PKMultiStrategyBacktest import PKMultiStrategyBacktest
+from pkscreener.classes.StockScreener import StockScreener
+
+PERIODS = [1, 2, 3, 4, 5, 10, 15, 22, 30]
+# (strategy, execute option, sell signal) of the two strategies
+STRATEGIES = [("B:30:12:3", 3, False), ("B:30:12:5", 5, True)]
+
+@pytest.fixture
+def multiStrategyBacktest():
+    multiStrategyBacktest = PKMultiStrategyBacktest()
+    multiStrategyBacktest.begin()
+    for strategy, executeOption, sellSignal in STRATEGIES:
+        multiStrategyBacktest.addStrategy([[f"{strategy}:D:D:D"]], executeOption, 30, sellSignal, strategy.replace(":", "_"), strategy)
+    multiStrategyBacktest.collecting = False
+    yield multiStrategyBacktest
+    multiStrategyBacktest.end()
+
+def recordedStrategyResults():
+    # The (strategy, stock, candles after the signal, saveDict, screenedDict)
+    # of both strategies on the recorded stocks, stock after stock
+    configManager = tools()
+    configManager.getConfig(parser)
+    df = loadRecordedDailyCandles()
+    stockDict = recordedStockDict(df, step=10)
+    hostRef = screenerHostRef(configManager, stockDict)
+    screener = StockScreener()
+    screener.configManager = configManager
+    results = []
+    for stock in stockDict.keys():
+        end = int(stock[1:])
+        for strategy, executeOption, _ in STRATEGIES:
+            result = screener.screenStocks(f"X:12:{executeOption}", "X", "INDIA", executeOption, None, None, None, 30, 70, None, None,
+                                           len(stockDict), True, stock, False, False, 2.5, hostRef=hostRef)
+            if result is not None:
+                saveDict = result[1] | {"Date": df.index[end - 1].strftime("%Y-%m-%d")}
+                results.append((strategy, stock, df.iloc[end - 1:end + 30], saveDict, result[0]))
+    return results
+
+def test_each_strategy_reports_its_own_rows_and_statistics(multiStrategyBacktest):
+    results = recordedStrategyResults()
+    sellSignals = {strategy: sellSignal for strategy, _, sellSignal in STRATEGIES}
+    backTestedData = None
+    singleStrategyData = {}
+    for strategy, stock, data, saveDict, screenedDict in results:
+        backTestedData = backtest(stock, data, saveDict, screenedDict, 30, 30, backTestedData, sellSignals[strategy], strategy=strategy)
+        singleStrategyData[strategy] = backtest(stock, data, saveDict, screenedDict, 30, 30, singleStrategyData.get(strategy), sellSignals[strategy])
+    reports = list(multiStrategyBacktest.reportsByStrategy(backtestDataFrame(backTestedData), PERIODS))
+    assert [strategy for strategy, _, _ in reports] == [strategy for strategy, _, _ in STRATEGIES]
+    returnColumns = PKBacktestStatistics.returnColumns(PERIODS)
+    for strategy, strategy_df, statistics_df in reports:
+        # The same rows and statistics as backtesting the strategy on its own
+        expected = backtestDataFrame(singleStrategyData[strategy])
+        assert len(expected) > 10
+        assert not any(column in strategy_df.columns for column in returnColumns + ["Strategy"])
+        pd.testing.assert_frame_equal(strategy_df, expected.drop(columns=returnColumns))
+        pd.testing.assert_frame_equal(statistics_df, PKBacktestStatistics.forBacktest(expected, PERIODS, sellSignal=sellSignals[strategy]))
@@ -0,0 +1,50 @@
+"""
+    The MIT License (MIT)
+
+    Copyright (c) 2023 pkjmesra
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+
+"""
+import numpy as np
+import pandas as pd
+
+from conftest import recordedStockDict
+from pkscreener.classes.PKRelativeStrength import PKRelativeStrength
+from pkscreener.classes.ScreeningStatistics import ScreeningStatistics
+
+
+def screenedFrame(stockData, tz="Asia/Kolkata"):
+    # The newest-first frame the workers screen, with a tz-aware index
+    df = pd.DataFrame(stockData["data"], columns=stockData["columns"], index=pd.DatetimeIndex(stockData["index"]).tz_localize(tz))
+    return df[::-1]
+
+def test_ratings_match_calc_relative_strength_and_lookup_normalizes_dates(recordedDailyCandles):
+    # Like the cached data, without Adj Close and with the dates as strings
+    candles = recordedDailyCandles.drop(columns=["Adj Close"])
+    candles.index = candles.index.strftime("%Y-%m-%d")
+    stockDict = recordedStockDict(candles, step=50)
+    ratings = PKRelativeStrength().ratings(stockDict, list(stockDict.keys()), 1.0)
+    screener = ScreeningStatistics.__new__(ScreeningStatistics)
+    for stock, stockData in stockDict.items():
+        df = screenedFrame(stockData)
+        rsValue, _ = PKRelativeStrength.lookup(ratings, stock, df)
+        assert np.isclose(rsValue, screener.calc_relative_strength(df[::-1]))
+        # Not for the candles of another day (e.g. in backtests)
+        assert PKRelativeStrength.lookup(ratings, stock, df.iloc[1:]) is None
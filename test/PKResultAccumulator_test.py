@@ -0,0 +1,66 @@
+"""
+    The MIT License (MIT)
+
+    Copyright (c) 2023 pkjmesra
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from pkscreener.classes.PKResultAccumulator import PKResultAccumulator
+
+
+def resultRows(numRows=300):
+    rows = []
+    for index in range(numRows):
+        row = {"Stock": f"S{index}", "LTP": index * 1.5, "RSI": index % 100, "Volume": "3.2x" if index % 7 == 0 else 1.5, "Breakout": index % 2 == 0}
+        if index % 5 == 0:
+            row["Validator"] = index
+        if index % 11 == 0:
+            del row["RSI"]
+        rows.append(row)
+    return rows
+
+@pytest.mark.parametrize("schema", [None, ["Stock", "LTP", "RSI"], {"Stock": "", "LTP": 0.0, "RSI": 0, "Volume": ""}], ids=["none", "names", "defaults"])
+def test_dataframe_is_the_same_as_from_a_list_of_dicts(schema):
+    rows = resultRows()
+    results = PKResultAccumulator(schema=schema)
+    for index, row in enumerate(rows):
+        results.append(row)
+        if index in [0, 10, 100]:
+            # Live displays take snapshots while the results come in
+            pd.testing.assert_frame_equal(results.snapshot(), pd.DataFrame(rows[:index + 1])[results.snapshot().columns])
+    df = results.toDataFrame()
+    pd.testing.assert_frame_equal(df, pd.DataFrame(rows)[df.columns])
+    assert df["LTP"].dtype == np.float64 and df["RSI"].dtype == np.float64 and df["Validator"].dtype == np.float64
+    assert df["Volume"].dtype == object and df["Breakout"].dtype == bool
+
+def test_rows_come_back_as_appended():
+    rows = resultRows(20)
+    results = PKResultAccumulator()
+    for row in rows[:15]:
+        results.append(row)
+    results.snapshot()
+    for row in rows[15:]:
+        results.append(row)
+    for restored, row in zip(results.rows(10), rows[10:]):
+        assert {column: value for column, value in restored.items() if column in row} == row
@@ -0,0 +1,65 @@
+"""
+    The MIT License (MIT)
+
+    Copyright (c) 2023 pkjmesra
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+
+"""
+import numpy as np
+import pytest
+
+from pkscreener.classes import PKRollingExtrema as rollingExtrema
+from pkscreener.classes.PKRollingExtrema import PKRollingExtrema, PKRollingExtremaCache
+
+@pytest.fixture
+def newestFirst(recordedDailyCandles):
+    return recordedDailyCandles.iloc[:400][::-1]
+
+@pytest.mark.parametrize("head,tail", [(251, None), (251, 250), (231, 200), (10, 9), (5, None)])
+def test_extrema_match_the_frame_windows(newestFirst, head, tail):
+    extrema = PKRollingExtrema(newestFirst)
+    window = newestFirst.head(head) if tail is None else newestFirst.head(head).tail(tail)
+    assert extrema.highestHigh(head, tail) == window["High"].max()
+    assert extrema.lowestLow(head, tail) == window["Low"].min()
+    assert extrema.highestClose(head, tail) == window["Close"].max()
+
+def test_updating_with_a_new_candle_matches_a_fresh_index(recordedDailyCandles):
+    extrema = PKRollingExtrema()
+    for end in range(300, 320):
+        newestFirst = recordedDailyCandles.iloc[:end][::-1]
+        extrema.update(newestFirst, window=256)
+        fresh = PKRollingExtrema(newestFirst, window=256)
+        for head, tail in [(251, None), (231, 200), (10, 9)]:
+            assert extrema.highestHigh(head, tail) == fresh.highestHigh(head, tail)
+            assert extrema.lowestLow(head, tail) == fresh.lowestLow(head, tail)
+
+def test_cache_keeps_only_the_most_recently_screened_stocks(newestFirst, monkeypatch):
+    monkeypatch.setattr(rollingExtrema, "EXTREMA_CACHE_SIZE", 3)
+    cache = PKRollingExtremaCache()
+    monkeypatch.setattr(cache, "stocks", type(cache.stocks)())
+    for stock in ["A", "B", "C"]:
+        cache.forStock(stock, newestFirst)
+    extremaOfA = cache.stocks["A"]
+    # Screening A again keeps its index, and D then drops B, the least recent one
+    assert cache.forStock("A", newestFirst) is extremaOfA
+    cache.forStock("D", newestFirst)
+    assert list(cache.stocks.keys()) == ["C", "A", "D"]
+    assert not np.isnan(cache.forStock("B", newestFirst).highestHigh(251))
+    assert len(cache.stocks) == 3
@@ -0,0 +1,63 @@
+"""
+    The MIT License (MIT)
+
+    Copyright (c) 2023 pkjmesra
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+
+"""
+import pytest
+
+from pkscreener.classes.PKScanExpression import PKScanExpression
+from pkscreener.classes.PKScanRunner import PKScanRunner
+
+
+@pytest.mark.parametrize("expression", [
+    "rsi(14) between 55,68 and close > sma(50) and volume > 2.5*sma(volume,20)",
+    "not (close < ema(20)) or highest(high,20) <= prev(close,1) * 1.05",
+    "abs(close - open) / open > 0.02",
+])
+def test_valid_expressions(expression):
+    assert PKScanExpression.isValid(expression)
+
+@pytest.mark.parametrize("expression", [
+    # The scan itself, and/or/not need conditions
+    "close + 1",
+    "close > 5 and volume",
+    "sma(50) or close > open",
+    "not close",
+    # Comparisons, between, arithmetic and functions need numbers
+    "(close > open) > 1",
+    "close between (open > 1),5",
+    "(close > open) + 1 > 0",
+    "-(close > open) < 0",
+    "sma(close > open, 10) > 0",
+    "abs(close > open) > 0",
+])
+def test_expressions_with_wrong_operand_types_are_invalid(expression):
+    assert not PKScanExpression.isValid(expression)
+
+def test_scan_expression_is_not_part_of_the_formatted_choices():
+    class userArgs:
+        intraday = None
+        runintradayanalysis = False
+        scanexpression = "close > sma(50)"
+    selectedChoice = {"0": "X", "1": "12", "2": "44", "3": userArgs.scanexpression, "4": ""}
+    assert PKScanRunner.getFormattedChoices(userArgs, selectedChoice).startswith("X_12_44")
+    assert userArgs.scanexpression not in PKScanRunner.getFormattedChoices(userArgs, selectedChoice)
@@ -0,0 +1,58 @@
+"""
+    The MIT License (MIT)
+
+    Copyright (c) 2023 pkjmesra
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+
+"""
+import glob
+import json
+import os
+import queue
+from types import SimpleNamespace
+
+from pkscreener.classes.PKScanProfiler import PKScanProfiler, STAGE_TASK
+
+
+def screenStocks(hostRef=None, userArgs=None, stock=None):
+    return stock
+
+def test_every_worker_writes_its_profile_after_each_task(tmp_path):
+    profiler = PKScanProfiler()
+    profiler.profileDir = str(tmp_path)
+    userArgs = SimpleNamespace(profilescan=True, profilescanid="1")
+    tasks = queue.Queue()
+    hostRef = SimpleNamespace(screener=None, candlePatterns=None, task_queue=tasks)
+    for stock in ["A", "B", "C"]:
+        tasks.put(stock)
+    calls = 0
+    while not tasks.empty():
+        stock = tasks.get()
+        assert profiler.profileTask(screenStocks, None, hostRef, userArgs, stock=stock) == stock
+        calls += 1
+        # Another worker may take the remaining tasks, so nothing is held back
+        assert profiler.summary(userArgs).set_index("Stage").loc[STAGE_TASK, "Calls"] == calls
+    assert len(glob.glob(os.path.join(str(tmp_path), "1_*.json"))) == 1
+    # A second worker process adds its own profile to the scan's summary
+    with open(os.path.join(str(tmp_path), "1_0.json"), "w") as f:
+        json.dump({STAGE_TASK: [2, 0.5, 0.3]}, f)
+    summary = profiler.summary(userArgs)
+    assert summary.set_index("Stage").loc[STAGE_TASK, "Calls"] == 5
+    assert summary.attrs["workers"] == 2
@@ -0,0 +1,81 @@
+"""
+    The MIT License (MIT)
+
+    Copyright (c) 2023 pkjmesra
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+
+"""
+from argparse import Namespace
+
+import pandas as pd
+import pytest
+
+from pkscreener.classes.ConfigManager import tools, parser
+from pkscreener.classes.PKScanResultCache import PKScanResultCache
+
+STOCK_CODES = ["SBIN", "TCS"]
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = PKScanResultCache()
+    monkeypatch.setattr(cache, "cacheDir", str(tmp_path))
+    monkeypatch.setattr(cache, "memoryCache", {})
+    cache.updateSnapshot({stock: {"index": ["2024-06-03"], "data": [[100, 101, 99, 100, 1000]]} for stock in STOCK_CODES})
+    return cache
+
+@pytest.fixture
+def configManager():
+    configManager = tools()
+    configManager.getConfig(parser)
+    return configManager
+
+def cacheKey(cache, configManager, choices=("X", "12", "9", "2.5"), expression=None):
+    userArgs = Namespace(intraday=None, scanexpression=expression)
+    return cache.cacheKey(userArgs, dict(zip(["0", "1", "2", "3"], choices)), configManager, STOCK_CODES)
+
+def test_cache_key_is_stable_for_the_same_scan(cache, configManager):
+    assert cacheKey(cache, configManager) == cacheKey(cache, configManager)
+    assert cacheKey(cache, configManager) != cacheKey(cache, configManager, choices=("X", "12", "9", "3"))
+    assert cacheKey(cache, configManager, choices=("X", "12", "44"), expression="close > sma(50)") != \
+        cacheKey(cache, configManager, choices=("X", "12", "44"), expression="close > sma(20)")
+
+@pytest.mark.parametrize("field,value", [("minLTP", 123.0), ("maxLTP", 1234.0), ("volumeRatio", 3.5),
+                                         ("consolidationPercentage", 7), ("stageTwo", None), ("minVolume", 1),
+                                         ("vcpVolumeContractionRatio", 0.9)])
+def test_cache_key_changes_with_the_config_that_changes_the_results(cache, configManager, monkeypatch, field, value):
+    key = cacheKey(cache, configManager)
+    monkeypatch.setattr(configManager, field, (not getattr(configManager, field)) if value is None else value)
+    assert cacheKey(cache, configManager) != key
+
+def test_cache_key_changes_with_the_data_snapshot(cache, configManager):
+    key = cacheKey(cache, configManager)
+    cache.updateSnapshot({stock: {"index": ["2024-06-03"], "data": [[100, 102, 99, 101, 1500]]} for stock in STOCK_CODES})
+    assert cacheKey(cache, configManager) != key
+
+def test_cached_results_are_served_until_invalidated(cache, configManager, monkeypatch):
+    monkeypatch.setattr(cache, "candleAlignedExpiry", lambda configManager: float("inf"))
+    key = cacheKey(cache, configManager)
+    results = pd.DataFrame({"Stock": STOCK_CODES, "LTP": [100.0, 200.0]})
+    cache.set(key, results, results, configManager)
+    cache.memoryCache.clear()
+    screenResults, saveResults, _ = cache.get(key)
+    pd.testing.assert_frame_equal(screenResults, results)
+    cache.invalidate(key)
+    assert cache.get(key) is None
@@ -0,0 +1,88 @@
+"""
+    The MIT License (MIT)
+
+    Copyright (c) 2023 pkjmesra
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from pkscreener.classes.PKTradeSimulator import PKTradeSimulator
+
+# No slippage/brokerage, so that the fills can be read off the candles
+SETTINGS = PKTradeSimulator.settingsFromOptions("5:10:3:0:0")
+
+def stockData(candles, start="2024-01-01"):
+    # {"data", "columns", "index"} of (Open, High, Low, Close) candles on consecutive weekdays
+    return {"data": [list(candle) + [1000] for candle in candles],
+            "columns": ["Open", "High", "Low", "Close", "Volume"],
+            "index": list(pd.bdate_range(start, periods=len(candles)))}
+
+def signals(*stockDates):
+    return pd.DataFrame({"Stock": [stock for stock, _ in stockDates], "Date": pd.to_datetime([date for _, date in stockDates])})
+
+def simulate(stockDict, *stockDates, **kwargs):
+    return PKTradeSimulator.simulate(signals(*stockDates), stockDict, SETTINGS, **kwargs)
+
+def test_exits_when_the_open_gaps_past_the_stop_or_the_target():
+    stockDict = {
+        # Entry at 100, opens past the target (110) and then falls below the stop (95)
+        "A": stockData([(99, 99, 99, 99), (100, 101, 99, 100), (112, 113, 90, 91), (91, 91, 91, 91), (91, 91, 91, 91)]),
+        # Entry at 100, opens between the stop and the target and hits both
+        "B": stockData([(99, 99, 99, 99), (100, 101, 99, 100), (100, 111, 94, 100), (100, 100, 100, 100), (100, 100, 100, 100)]),
+        # Entry at 100, gaps below the stop
+        "C": stockData([(99, 99, 99, 99), (100, 101, 99, 100), (90, 92, 89, 91), (91, 91, 91, 91), (91, 91, 91, 91)]),
+    }
+    trades, _, skipped = simulate(stockDict, ("A", "2024-01-01"), ("B", "2024-01-01"), ("C", "2024-01-01"))
+    assert skipped == 0
+    assert trades["Exit Reason"].tolist() == ["Target", "Stop-Loss", "Stop-Loss"]
+    assert trades["Exit"].tolist() == [110.0, 95.0, 90.0]
+
+def test_trades_past_the_saved_candles_are_open():
+    stockDict = {
+        # The 3-candle holding period needs a candle after the last one saved
+        "A": stockData([(99, 99, 99, 99), (100, 101, 99, 100), (100, 104, 99, 103)]),
+        # Held for all 3 candles, but the close of the last one is missing
+        "B": stockData([(99, 99, 99, 99), (100, 101, 99, 100), (100, 104, 99, 102), (np.nan,) * 4, (102, 102, 102, 102)]),
+    }
+    trades, curve, _ = simulate(stockDict, ("A", "2024-01-01"), ("B", "2024-01-01"))
+    assert trades["Exit Reason"].tolist() == ["Open", "Time"]
+    assert trades["Exit"].tolist() == [103.0, 102.0]
+    assert trades["Exit Date"].tolist() == ["2024-01-03", "2024-01-03"]
+    summary = PKTradeSimulator.summary(trades, curve).set_index("Statistic")["Value"]
+    assert summary["Trades"] == 1 and summary["Open Trades"] == 1
+    assert summary["Net P&L"] == pytest.approx(200) and summary["Open P&L"] == pytest.approx(300)
+    # The open trade is in the equity, at its last close
+    assert summary["Final Equity"] == pytest.approx(100500)
+
+def test_positions_are_limited_by_the_capital_and_marked_to_market():
+    candles = [(99, 99, 99, 99), (100, 101, 99, 100), (100, 101, 96, 98), (98, 104, 97, 103), (103, 103, 103, 103), (103, 103, 103, 103)]
+    stockDict = {stock: stockData(candles) for stock in ["A", "B", "C"]}
+    trades, curve, skipped = simulate(stockDict, ("A", "2024-01-01"), ("B", "2024-01-01"), ("C", "2024-01-04"), capital=20000)
+    # C comes in after A and B have exited
+    assert skipped == 0 and len(trades) == 3
+    trades, curve, skipped = simulate(stockDict, ("A", "2024-01-01"), ("B", "2024-01-01"), ("C", "2024-01-01"), capital=20000)
+    assert skipped == 1 and trades["Stock"].tolist() == ["A", "B"]
+    # Both held at the closes of 98 and 103, and exited (Time) at 103
+    assert curve["Positions"].tolist() == [2, 2, 2]
+    assert curve["Equity"].tolist() == [20000.0, 19600.0, 20600.0]
+    assert curve["Drawdown%"].tolist() == [0.0, -2.0, 0.0]
@@ -0,0 +1,104 @@
+"""
+    The MIT License (MIT)
+
+    Copyright (c) 2023 pkjmesra
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+
+"""
+import json
+import os
+
+import numpy as np
+import pytest
+
+from conftest import FIXTURES_DIR, recordedStockDict, screenerHostRef
+from pkscreener.classes.ConfigManager import tools
+from pkscreener.classes.PKUniverseData import PKUniverseData
+from pkscreener.classes.PKVectorScanEngine import PKVectorScanEngine
+from pkscreener.classes.StockScreener import StockScreener
+
+# The stocks of the recorded golden set that each scan selected (with and
+# without the stage two check), as screened by StockScreener.screenStocks
+GOLDEN_RESULTS = "vector_scan_golden.json"
+VOLUME_RATIO = 1.5
+MIN_RSI = 30
+MAX_RSI = 70
+EXECUTE_OPTIONS = [2, 5, 9, 14, 15, 16, 17]
+
+@pytest.fixture(scope="module")
+def goldenSet():
+    stockDict = recordedStockDict()
+    with open(os.path.join(FIXTURES_DIR, GOLDEN_RESULTS)) as f:
+        golden = json.load(f)
+    return stockDict, PKUniverseData.fromStockDict(stockDict), golden
+
+@pytest.fixture(params=[True, False], ids=["stageTwo", "anyStage"])
+def configManager(request):
+    configManager = tools()
+    stageTwo = configManager.stageTwo
+    configManager.stageTwo = request.param
+    yield configManager
+    configManager.stageTwo = stageTwo
+
+def goldenKey(configManager, executeOption):
+    return f"{'stageTwo' if configManager.stageTwo else 'anyStage'}:{executeOption}"
+
+def screenedByStockScreener(executeOption, configManager, stockDict):
+    hostRef = screenerHostRef(configManager, stockDict)
+    screener = StockScreener()
+    screener.configManager = configManager
+    matches = []
+    for stock in stockDict.keys():
+        result = screener.screenStocks(f"X:12:{executeOption}", "X", "INDIA", executeOption, None, None, None, MIN_RSI, MAX_RSI, None, None,
+                                       len(stockDict), True, stock, False, False, VOLUME_RATIO, hostRef=hostRef)
+        if result is not None:
+            matches.append(stock)
+    return sorted(matches)
+
+@pytest.mark.parametrize("executeOption", EXECUTE_OPTIONS)
+def test_vector_scan_matches_stock_screener_on_golden_set(goldenSet, configManager, executeOption):
+    stockDict, universe, golden = goldenSet
+    mask = PKVectorScanEngine(configManager).screen(universe, executeOption, volumeRatio=VOLUME_RATIO, minRSI=MIN_RSI, maxRSI=MAX_RSI)
+    assert screenedByStockScreener(executeOption, configManager, stockDict) == golden[goldenKey(configManager, executeOption)]
+    assert sorted(np.asarray(universe.symbols)[mask]) == golden[goldenKey(configManager, executeOption)]
+
+def test_filter_items_keeps_only_the_stocks_that_can_match(goldenSet, configManager):
+    stockDict, _, golden = goldenSet
+    # Task tuples have the stock code at position 13
+    items = [tuple([None] * 13 + [stock]) for stock in stockDict.keys()]
+    filtered = PKVectorScanEngine(configManager).filterItems(items, stockDict, 5, volumeRatio=VOLUME_RATIO, minRSI=MIN_RSI, maxRSI=MAX_RSI)
+    assert sorted(item[13] for item in filtered) == golden[goldenKey(configManager, 5)]
+
+@pytest.mark.parametrize("additional,additionalEMA", [(False, False), (True, False), (True, True), (False, True)])
+def test_vcp_prefilter_keeps_every_golden_vcp(goldenSet, monkeypatch, additional, additionalEMA):
+    _, universe, _ = goldenSet
+    with open(os.path.join(FIXTURES_DIR, "vcp_golden.json")) as f:
+        vcpGolden = json.load(f)["vcp"]
+    configManager = tools()
+    monkeypatch.setattr(configManager, "enableAdditionalVCPFilters", additional)
+    monkeypatch.setattr(configManager, "enableAdditionalVCPEMAFilters", additionalEMA)
+    prefix = f"{'y' if additional else 'n'}_{'y' if additionalEMA else 'n'}_"
+    # The VCP golden windows are the stocks of the recorded golden set
+    found = {f"G{key.split('_')[-1]}" for key, value in vcpGolden.items() if key.startswith(prefix) and value["found"]}
+    assert len(found) > 0
+    kept = set(np.asarray(universe.symbols)[PKVectorScanEngine(configManager).mayFormVCP(universe)])
+    assert found <= kept
+    if additional or additionalEMA:
+        assert len(kept) < universe.numSymbols
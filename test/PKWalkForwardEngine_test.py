@@ -0,0 +1,63 @@
+"""
+    The MIT License (MIT)
+
+    Copyright (c) 2023 pkjmesra
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+
+"""
+import pandas as pd
+import pytest
+
+from PKDevTools.classes.log import default_logger
+
+from pkscreener.classes.ConfigManager import tools
+from pkscreener.classes.PKIndicatorPlan import RESULT_INDICATORS
+from pkscreener.classes.PKWalkForwardEngine import PKWalkForwardEngine
+from pkscreener.classes.ScreeningStatistics import ScreeningStatistics
+
+RECORDED_CANDLES = 400
+DAYS_TO_LOOKBACK = 22
+
+@pytest.fixture(scope="module")
+def screener():
+    return ScreeningStatistics(tools(), default_logger())
+
+@pytest.mark.parametrize("useEMA", [False, True], ids=["sma", "ema"])
+def test_sliced_passes_equal_preprocessing_each_day(recordedDailyCandles, screener, useEMA):
+    configManager = screener.configManager
+    previousUseEMA = configManager.useEMA
+    configManager.useEMA = useEMA
+    try:
+        data = recordedDailyCandles.drop(columns=["Adj Close"]).tail(RECORDED_CANDLES).copy()
+        # A candle without any data is dropped by preprocessData
+        data.iloc[-7] = float("nan")
+        for backtestDuration in [0, 1, 2, 6, 7, 8, 20, 60]:
+            fullData, processedData = PKWalkForwardEngine().preprocessedDataForDay(
+                f"G{useEMA}", screener, data, backtestDuration, DAYS_TO_LOOKBACK)
+            expectedFullData, expectedProcessedData = screener.preprocessData(
+                data.head(len(data) - backtestDuration), daysToLookback=DAYS_TO_LOOKBACK, indicators=RESULT_INDICATORS | PKWalkForwardEngine().passes[f"G{useEMA}"][1].indicators)
+            pd.testing.assert_frame_equal(fullData, expectedFullData)
+            pd.testing.assert_frame_equal(processedData, expectedProcessedData)
+    finally:
+        configManager.useEMA = previousUseEMA
+
+def test_order_by_stock_keeps_the_order_of_stocks_and_days():
+    items = [(day, stock) for day in range(3) for stock in ["B", "A", "C"]]
+    assert PKWalkForwardEngine.orderByStock(items, stockIndex=1) == [(day, stock) for stock in ["B", "A", "C"] for day in range(3)]
@@ -0,0 +1,75 @@
+"""
+    The MIT License (MIT)
+
+    Copyright (c) 2023 pkjmesra
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+
+"""
+import json
+import os
+from argparse import Namespace
+
+import pandas as pd
+import pytest
+
+from conftest import XRAY_PERIODS, recordedXRayResults
+from pkscreener.classes import PortfolioXRay
+from pkscreener.classes.ConfigManager import tools, parser
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+# The insights of the X-Ray categories for the rows below, as computed with
+# the per-category filters before the insights were built from a
+# membership matrix.
+XRAY_INSIGHTS_GOLDEN = "xray_insights_golden.json"
+@pytest.fixture
+def configManager(monkeypatch):
+    configManager = tools()
+    configManager.getConfig(parser)
+    monkeypatch.setattr(configManager, "daysToLookback", 22)
+    monkeypatch.setattr(configManager, "enablePortfolioCalculations", False)
+    monkeypatch.setattr(PortfolioXRay, "configManager", configManager)
+    return configManager
+
+def test_insights_match_the_per_category_filters_on_recorded_candles(recordedDailyCandles, configManager):
+    saveResults = recordedXRayResults(recordedDailyCandles)
+    with open(os.path.join(FIXTURES_DIR, XRAY_INSIGHTS_GOLDEN)) as f:
+        golden = json.load(f)
+    insights = PortfolioXRay.statScanCalculations(Namespace(options="X:12:1"), saveResults, XRAY_PERIODS)
+    assert [row["ScanType"] for row in insights] == [row["ScanType"] for row in golden]
+    for row, expected in zip(insights, golden):
+        assert row == pytest.approx(expected), row["ScanType"]
+
+def test_strategy_filters_pick_the_insight_rows(recordedDailyCandles, configManager):
+    saveResults = recordedXRayResults(recordedDailyCandles)
+    bins, skippedGroups = PortfolioXRay.statScanBins(saveResults)
+    assert skippedGroups == {}
+    assert set(PortfolioXRay.strategyNames()) - {"[P]"} <= set(key for _, key, _ in bins)
+    for _, key, mask in bins:
+        filtered = PortfolioXRay.strategyForKey(key)(saveResults)
+        stocks = [] if filtered is None else filtered["Stock"].tolist()
+        assert stocks == saveResults["Stock"][mask].tolist(), key
+
+def test_groups_with_missing_columns_are_reported(recordedDailyCandles, configManager, capsys):
+    saveResults = recordedXRayResults(recordedDailyCandles).drop(columns=["CCI"])
+    insights = PortfolioXRay.statScanCalculations(Namespace(options="X:12:1"), saveResults, XRAY_PERIODS)
+    scanTypes = [row["ScanType"] for row in insights]
+    assert not any(scanType.startswith("[CCI]") for scanType in scanTypes)
+    assert "[RSI]>=50" in scanTypes and "NoFilter" in scanTypes
+    assert "X-Ray insights for CCI were skipped" in capsys.readouterr().out
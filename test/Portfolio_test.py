@@ -0,0 +1,103 @@
+"""
+    The MIT License (MIT)
+
+    Copyright (c) 2023 pkjmesra
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+
+"""
+import datetime
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from PKDevTools.classes.PKDateUtilities import PKDateUtilities
+
+from conftest import XRAY_FIRST_END, XRAY_PERIODS, XRAY_STEP, recordedXRayResults
+from pkscreener.classes.PKTask import PKTask
+from pkscreener.classes.Portfolio import Portfolio, PortfolioTradingCalendar
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+# The ledgers (as descriptionAsDataframe, with its dtypes), current values and
+# profits of the portfolios of the X-Ray frames below, as simulated stock by
+# stock with PKDateUtilities.nextTradingDate, before the arrays and the
+# trading calendar table. The holidays are the ones below.
+PORTFOLIO_LEDGER_GOLDEN = "portfolio_ledger_golden.json"
+HOLIDAYS = {"2005-01-26", "2005-08-15", "2005-11-03", "2006-01-26", "2006-10-02", "2006-12-25",
+            "2007-03-02", "2007-08-15", "2007-11-09", "2008-03-21", "2008-08-15", "2008-10-02"}
+
+with open(os.path.join(FIXTURES_DIR, PORTFOLIO_LEDGER_GOLDEN)) as f:
+    portfolioLedgerGolden = json.load(f)
+
+@pytest.fixture
+def tradingCalendar(monkeypatch):
+    # A fixed holiday list (instead of the published one) and a calendar
+    # without anything looked up by earlier tests
+    def isHoliday(d1=None):
+        d1 = PKDateUtilities.dateFromYmdString(d1) if isinstance(d1, str) else d1
+        return d1.strftime("%Y-%m-%d") in HOLIDAYS, None
+    monkeypatch.setattr(PKDateUtilities, "isHoliday", isHoliday)
+    monkeypatch.setattr(PKDateUtilities, "isTradingWeekday", lambda checkDate=None: checkDate.weekday() <= 4)
+    calendar = PortfolioTradingCalendar()
+    monkeypatch.setattr(calendar, "nextTradingDates", {})
+    monkeypatch.setattr(calendar, "offsets", {})
+    return calendar
+
+def recordedXRayFrames(df):
+    # Every other X-Ray row of the recorded candles, and all of them with the
+    # stock names repeated (only the first row of a stock is traded) and
+    # some prices missing
+    frame = recordedXRayResults(df)
+    frame.insert(1, "Date", df.index[XRAY_FIRST_END:len(df) - max(XRAY_PERIODS):XRAY_STEP].strftime("%Y-%m-%d"))
+    repeated = frame.copy()
+    repeated["Stock"] = [f"G{n % 40}" for n in range(len(repeated))]
+    repeated.loc[::7, "LTP5"] = np.nan
+    repeated.loc[3, "LTP"] = np.nan
+    return {"every other": frame.iloc[::2], "repeated": repeated}
+
+def test_ledgers_match_the_golden_ledgers(recordedDailyCandles, tradingCalendar):
+    for name, frame in recordedXRayFrames(recordedDailyCandles).items():
+        portfolio = Portfolio(name)
+        portfolio.updatePortfolioFromXRayDataFrame(frame, XRAY_PERIODS, PKTask(name, long_running_fn=print))
+        golden = portfolioLedgerGolden[name]
+        expected = pd.DataFrame(golden["description"]["data"], index=golden["description"]["index"],
+                                columns=golden["description"]["columns"]).astype(golden["dtypes"])
+        pd.testing.assert_frame_equal(portfolio.descriptionAsDataframe, expected)
+        assert portfolio.currentValue == pytest.approx(golden["currentValue"])
+        assert portfolio.profit == pytest.approx(golden["profit"])
+        for date, ledgerEntries in portfolio.ledger.items():
+            assert all(entry["Date"] == date for entry in ledgerEntries)
+
+def test_calendar_matches_next_trading_date_over_holidays_and_weekends(tradingCalendar):
+    day = datetime.date(2005, 1, 20)
+    while day < datetime.date(2005, 2, 10):
+        for days in [1, 2, 3, 4, 5, 10, 22]:
+            expected = PKDateUtilities.nextTradingDate(day.strftime("%Y-%m-%d"), days=days).strftime("%Y-%m-%d")
+            assert tradingCalendar.nextTradingDate(day.strftime("%Y-%m-%d"), days=days) == expected
+            assert tradingCalendar.nextTradingDate(day, days=days) == expected
+        day += datetime.timedelta(days=1)
+    # Over the weekend and the holiday on Wednesday, 26 January 2005
+    assert tradingCalendar.nextTradingDate("2005-01-21") == "2005-01-24"
+    assert tradingCalendar.nextTradingDate("2005-01-25") == "2005-01-27"
+    assert tradingCalendar.nextTradingDate("2005-01-25", days=4) == "2005-02-01"
+    with pytest.raises(ValueError):
+        tradingCalendar.nextTradingDate("2005-01-25", days=0)
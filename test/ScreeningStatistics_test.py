@@ -0,0 +1,147 @@
+"""
+    The MIT License (MIT)
+
+    Copyright (c) 2023 pkjmesra
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from PKDevTools.classes.log import default_logger
+from pkscreener.classes.ConfigManager import tools, parser
+from pkscreener.classes.Pktalib import pktalib
+from pkscreener.classes.ScreeningStatistics import ScreeningStatistics
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+# The (found, points) of the cup and handle pattern in 120-candle windows of
+# the recorded candles (keyed by the window's end), as found by the loops
+# the vectorized search replaced
+CUP_AND_HANDLE_GOLDEN = "cup_and_handle_golden.json"
+CUP_AND_HANDLE_CANDLES = 120
+
+# The ATR trailing stop and the Buy/Sell candles (keyed by
+# <sensitivity>_<ATR period>_<window end>) in 260-candle windows, as found by
+# the cell-by-cell loop and vectorbt's crossovers that the kernel replaced
+ATR_TRAILING_STOP_GOLDEN = "atr_trailing_stop_golden.json"
+ATR_TRAILING_STOP_CANDLES = 260
+
+# The super-confluence result and the saved columns (keyed by <review days>_
+# <enforce 200 SMA>_<percentage>_<window end>) for 400-candle windows, as
+# found by the per-review-day loop that findSuperConfluenceDays replaced
+SUPER_CONFLUENCE_GOLDEN = "super_confluence_golden.json"
+SUPER_CONFLUENCE_CANDLES = 400
+
+# The VCP result and saved columns (keyed by <additional filters>_<EMA filters>
+# _<legs>_<percentage from top>_<window end>) and the consolidation legs
+# (keyed by <additional filters>_<legs>_<window end>) for 400-candle windows, as found with the
+# frames of tops and bottoms that the arrays replaced
+VCP_GOLDEN = "vcp_golden.json"
+VCP_CANDLES = 400
+
+with open(os.path.join(FIXTURES_DIR, CUP_AND_HANDLE_GOLDEN)) as f:
+    cupAndHandleGolden = json.load(f)
+with open(os.path.join(FIXTURES_DIR, ATR_TRAILING_STOP_GOLDEN)) as f:
+    atrTrailingStopGolden = json.load(f)
+with open(os.path.join(FIXTURES_DIR, SUPER_CONFLUENCE_GOLDEN)) as f:
+    superConfluenceGolden = json.load(f)
+with open(os.path.join(FIXTURES_DIR, VCP_GOLDEN)) as f:
+    vcpGolden = json.load(f)
+
+@pytest.fixture(scope="module")
+def screener():
+    configManager = tools()
+    configManager.getConfig(parser)
+    return ScreeningStatistics(configManager, default_logger())
+
+@pytest.mark.parametrize("windowEnd", sorted(cupAndHandleGolden.keys(), key=int))
+def test_cup_and_handle_matches_the_golden_points(recordedDailyCandles, screener, windowEnd):
+    end = int(windowEnd)
+    expected = cupAndHandleGolden[windowEnd]
+    # Newest candle first, like the screeners get the stock data
+    data = recordedDailyCandles.iloc[end - CUP_AND_HANDLE_CANDLES:end][::-1]
+    found, points = screener.findCupAndHandlePattern(data, f"G{end}")
+    points = points.values.tolist()
+    assert bool(found) == expected["found"]
+    assert [point[:-1] for point in points] == [point[:-1] for point in expected["points"]]
+    np.testing.assert_allclose([point[-1] for point in points], [point[-1] for point in expected["points"]])
+
+@pytest.mark.parametrize("goldenKey", sorted(atrTrailingStopGolden.keys()))
+def test_atr_trailing_stops_match_the_golden_signals(recordedDailyCandles, screener, goldenKey):
+    sensitivity, atrPeriod, end = [int(value) for value in goldenKey.split("_")]
+    expected = atrTrailingStopGolden[goldenKey]
+    data = recordedDailyCandles.iloc[end - ATR_TRAILING_STOP_CANDLES:end]
+    nLoss = sensitivity * pktalib.ATR(data["High"], data["Low"], data["Close"], timeperiod=atrPeriod)
+    valid = ~np.isnan(np.asarray(nLoss, dtype=float))
+    df = pd.DataFrame({"Close": data["Close"].values[valid]})
+    df["ATRTrailingStop"] = pktalib.ATRTrailingStop(df["Close"], np.asarray(nLoss, dtype=float)[valid], initialStop=0.0)
+    assert df["ATRTrailingStop"].tolist() == expected["stop"]
+    df = screener.computeBuySellSignals(df)
+    assert df.index[df["Buy"]].tolist() == expected["buy"]
+    assert df.index[df["Sell"]].tolist() == expected["sell"]
+    # The scan itself reads the latest candle
+    for buySellAll, signals in [(1, expected["buy"]), (2, expected["sell"])]:
+        saveDict, screenDict = {}, {}
+        found = screener.findATRTrailingStops(data[::-1], sensitivity=sensitivity, atr_period=atrPeriod, buySellAll=buySellAll, saveDict=saveDict, screenDict=screenDict)
+        assert bool(found) == ((len(df) - 1) in signals)
+
+@pytest.mark.parametrize("goldenKey", sorted(superConfluenceGolden.keys()))
+def test_super_confluence_matches_the_golden_signals(recordedDailyCandles, screener, monkeypatch, goldenKey):
+    reviewDays, enforce200SMA, percentage, end = goldenKey.split("_")
+    expected = superConfluenceGolden[goldenKey]
+    monkeypatch.setattr(screener.configManager, "superConfluenceMaxReviewDays", int(reviewDays))
+    monkeypatch.setattr(screener.configManager, "superConfluenceEnforce200SMA", enforce200SMA == "y")
+    monkeypatch.setattr(screener.configManager, "superConfluenceEMAPeriods", "8,21,55")
+    end = int(end)
+    fullData, processedData = screener.preprocessData(recordedDailyCandles.iloc[max(0, end - SUPER_CONFLUENCE_CANDLES):end])
+    screenDict, saveDict = {}, {}
+    found = screener.validateConfluence(f"G{end}", processedData, fullData, screenDict, saveDict, percentage=float(percentage), confFilter=4)
+    assert bool(found) == expected["found"]
+    assert saveDict == expected["saveDict"]
+
+@pytest.mark.parametrize("goldenKey", sorted(vcpGolden["vcp"].keys()))
+def test_vcp_matches_the_golden_patterns(recordedDailyCandles, screener, monkeypatch, goldenKey):
+    additional, additionalEMA, legs, percentageFromTop, end = goldenKey.split("_")
+    expected = vcpGolden["vcp"][goldenKey]
+    monkeypatch.setattr(screener.configManager, "enableAdditionalVCPFilters", additional == "y")
+    monkeypatch.setattr(screener.configManager, "enableAdditionalVCPEMAFilters", additionalEMA == "y")
+    monkeypatch.setattr(screener.configManager, "vcpLegsToCheckForConsolidation", int(legs))
+    end = int(end)
+    data = recordedDailyCandles.iloc[max(0, end - VCP_CANDLES):end][::-1]
+    screenDict, saveDict = {}, {}
+    found = screener.validateVCP(data, screenDict, saveDict, stockName=f"G{end}", percentageFromTop=int(percentageFromTop))
+    assert bool(found) == expected["found"]
+    assert saveDict == expected["saveDict"]
+
+@pytest.mark.parametrize("goldenKey", sorted(vcpGolden["contraction"].keys()))
+def test_consolidation_contraction_matches_the_golden_legs(recordedDailyCandles, screener, monkeypatch, goldenKey):
+    additional, legs, end = goldenKey.split("_")
+    isTightening, consolidations, deviationScore = vcpGolden["contraction"][goldenKey]
+    monkeypatch.setattr(screener.configManager, "enableAdditionalVCPFilters", additional == "y")
+    legs, end = int(legs), int(end)
+    data = recordedDailyCandles.iloc[max(0, end - VCP_CANDLES):end][::-1]
+    result = screener.validateConsolidationContraction(data.copy(), legsToCheck=legs, stockName=f"G{end}")
+    assert bool(result[0]) == isTightening
+    assert list(result[1]) == consolidations
+    assert result[2] == deviationScore
@@ -0,0 +1,86 @@
+"""
+    The MIT License (MIT)
+
+    Copyright (c) 2023 pkjmesra
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+
+"""
+import json
+import math
+import os
+
+import pytest
+
+from conftest import recordedStockDict, screenerHostRef
+from pkscreener.classes.ConfigManager import tools, parser
+from pkscreener.classes.StockScreener import StockScreener
+
+# The stocks of the recorded golden set that X:12:6:5 (volume spread analysis
+# reversals) selected before the candlestick patterns were vectorized
+VSA_REVERSAL_STOCKS = ["G440", "G575", "G635", "G710", "G750", "G820", "G825", "G840", "G935"]
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+# The saved results (keyed by <execute option>:<reversal option>:<MA length>:
+# <days for lowest volume>:<min RSI>:<max RSI>:<chart pattern>:<inside bar
+# lookback>) of X:12 scans of some stocks of the recorded golden set, as
+# found before the extrema index, the array views and the indicator plan.
+# Time is left out, and so is Pattern (with the candlestick reversal scans
+# 6:1 and 6:2) because the baseline found candlestick patterns only with TA-Lib.
+SCAN_RESULTS_GOLDEN = "scan_results_golden.json"
+with open(os.path.join(FIXTURES_DIR, SCAN_RESULTS_GOLDEN)) as f:
+    scanResultsGolden = json.load(f)
+
+@pytest.fixture(scope="module")
+def configManager():
+    configManager = tools()
+    configManager.getConfig(parser)
+    return configManager
+
+def test_vsa_reversals_match_even_with_more_candle_patterns(configManager):
+    stockDict = recordedStockDict()
+    hostRef = screenerHostRef(configManager, stockDict)
+    screener = StockScreener()
+    screener.configManager = configManager
+    patterns = {}
+    for stock in stockDict.keys():
+        result = screener.screenStocks("X:12:6:5", "X", "INDIA", 6, 5, None, None, 30, 70, None, None,
+                                       len(stockDict), True, stock, False, False, 2.5, hostRef=hostRef)
+        if result is not None:
+            patterns[stock] = result[1]["Pattern"]
+    assert sorted(patterns.keys()) == VSA_REVERSAL_STOCKS
+    # The VSA pattern comes first, followed by the candlestick patterns of the latest candle
+    assert patterns["G825"].startswith("Demand Rise, Doji")
+    assert patterns["G840"].startswith("Demand Rise, Doji")
+
+@pytest.mark.parametrize("scan", sorted(scanResultsGolden["scans"].keys()))
+def test_scan_results_match_the_golden_results(configManager, scan):
+    stockDict = recordedStockDict()
+    hostRef = screenerHostRef(configManager, stockDict)
+    screener = StockScreener()
+    screener.configManager = configManager
+    executeOption, reversalOption, maLength, daysForLowestVolume, minRSI, maxRSI, respChartPattern, insideBarToLookback = scanResultsGolden["scans"][scan]["options"]
+    results = {}
+    for stock in scanResultsGolden["stocks"]:
+        result = screener.screenStocks(f"X:12:{executeOption}", "X", "INDIA", executeOption, reversalOption, maLength,
+                                       daysForLowestVolume, minRSI, maxRSI, respChartPattern, insideBarToLookback,
+                                       len(stockDict), True, stock, False, False, 2.5, hostRef=hostRef)
+        if result is not None:
+            results[stock] = {column: (None if isinstance(value, float) and math.isnan(value) else value)
+                              for column, value in result[1].items() if column not in ["Time", "Pattern"]}
+    assert results == scanResultsGolden["scans"][scan]["results"]
@@ -0,0 +1,138 @@
+"""
+    The MIT License (MIT)
+
+    Copyright (c) 2023 pkjmesra
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+
+"""
+import multiprocessing
+import os
+import socket
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from PKDevTools.classes.log import default_logger
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+# Recorded GOOG daily candles (2004-08-19 to 2008-10-14, from Yahoo Finance,
+# as shipped with matplotlib's sample data).
+RECORDED_DAILY_CANDLES = "GOOG_daily.csv"
+# The recorded history is cut at these many points, and each cut is screened
+# as a stock of its own, so the golden set has stocks that are at highs, lows,
+# breakouts, consolidations etc. on their last candle.
+RECORDED_STOCK_CANDLES = 400
+RECORDED_STOCK_FIRST_END = 260
+RECORDED_STOCK_STEP = 5
+# The X-Ray results cut the recorded candles at every XRAY_STEP-th candle from
+# XRAY_FIRST_END on, and look XRAY_PERIODS ahead of each cut
+XRAY_PERIODS = [1, 2, 3, 4, 5, 10, 15, 22, 30]
+XRAY_FIRST_END = 260
+XRAY_STEP = 3
+
+def loadRecordedDailyCandles():
+    df = pd.read_csv(os.path.join(FIXTURES_DIR, RECORDED_DAILY_CANDLES), index_col="Date", parse_dates=True)
+    df["Volume"] = df["Volume"].astype(float)
+    return df
+
+def recordedStockDict(df=None, candles=RECORDED_STOCK_CANDLES, firstEnd=RECORDED_STOCK_FIRST_END, step=RECORDED_STOCK_STEP):
+    # {"G<end>": candles up to (excluding) <end>, in the pandas "split" format}
+    df = loadRecordedDailyCandles() if df is None else df
+    return {f"G{end}": df.iloc[max(0, end - candles):end].to_dict("split") for end in range(firstEnd, len(df), step)}
+
+def recordedXRayResults(df, periods=XRAY_PERIODS, firstEnd=XRAY_FIRST_END, step=XRAY_STEP):
+    """
+    Cleaned up backtest results (as cleanupData leaves them), one row for
+    each cut of the recorded candles, with the scan columns computed from
+    the candles up to the cut and LTP{period}/Growth{period} from the
+    candles after it.
+    """
+    close, high, low, volume = df["Close"], df["High"], df["Low"], df["Volume"]
+    delta = close.diff()
+    rsi = 100 - 100 / (1 + delta.clip(lower=0).rolling(14).mean() / (-delta.clip(upper=0)).rolling(14).mean())
+    typicalPrice = (high + low + close) / 3
+    cci = (typicalPrice - typicalPrice.rolling(20).mean()) / (0.015 * typicalPrice.rolling(20).std(ddof=0))
+    sma50, sma200 = close.rolling(50).mean(), close.rolling(200).mean()
+    maSignal = np.select(
+        [(sma50 > sma200) & (sma50.shift() <= sma200.shift()),
+         (sma50 < sma200) & (sma50.shift() >= sma200.shift()),
+         (close > sma50) & (low <= sma50), (close < sma50) & (high >= sma50),
+         sma50 > sma200, sma50 < sma200],
+        ["BullCross-50", "BearCross-50", "50MA-Support", "50MA-Resist", "Bullish", "Bearish"], "Neutral")
+    slope = 100 * (close / close.shift(22) - 1)
+    trend = np.select([slope > 10, slope > 2, slope < -10, slope < -2],
+                      ["Strong Up", "Weak Up", "Strong Down", "Weak Down"], "Sideways")
+    patterns = np.select([close > close.shift(1), close < close.shift(1)], ["Bullish Engulfing", ""], "Doji")
+    results = pd.DataFrame({
+        "Stock": [f"G{end}" for end in range(len(df))],
+        "LTP": close.round(2),
+        "RSI": rsi.round(1),
+        "Volume": (volume / volume.rolling(20).mean()).round(2),
+        "Consol.": (100 * (high.rolling(22).max() / low.rolling(22).min() - 1)).round(1),
+        "Breakout": high.rolling(22).max().round(2),
+        "Resistance": close.rolling(22).max().round(2),
+        "52Wk-H": high.rolling(252).max().round(2),
+        "52Wk-L": low.rolling(252).min().round(2),
+        "CCI": cci.round(0),
+        "MA-Signal": maSignal,
+        "Trend(22Prds)": trend,
+        "Pattern": patterns,
+    })
+    for period in periods:
+        results[f"LTP{period}"] = close.shift(-period).round(2)
+        results[f"Growth{period}"] = (results[f"LTP{period}"] - results["LTP"]).round(2)
+    return results.iloc[firstEnd:len(df) - max(periods):step].reset_index(drop=True)
+
+def screenerHostRef(configManager, stockDict):
+    # What StockScreener.screenStocks needs from the PKMultiProcessorClient
+    from pkscreener.classes.CandlePatterns import CandlePatterns
+    from pkscreener.classes.ScreeningStatistics import ScreeningStatistics
+    return SimpleNamespace(
+        configManager=configManager,
+        fetcher=None,
+        screener=ScreeningStatistics(configManager, default_logger()),
+        candlePatterns=CandlePatterns(),
+        processingCounter=multiprocessing.Value("i", 0),
+        processingResultsCounter=multiprocessing.Value("i", 0),
+        objectDictionaryPrimary=stockDict,
+        objectDictionarySecondary={},
+        default_logger=default_logger(),
+        rs_strange_index=0,
+        intradayNSEFetcher=None,
+        proxyServer=None,
+    )
+
+@pytest.fixture(scope="session")
+def recordedDailyCandles():
+    return loadRecordedDailyCandles()
+
+@pytest.fixture(scope="session", autouse=True)
+def offline():
+    # The screeners look up holidays, mutual fund/FII holdings etc. over the
+    # network and carry on without them when that fails. The tests run
+    # offline, so they don't wait on the network and don't depend on it.
+    def noNetwork(*args, **kwargs):
+        raise socket.gaierror(socket.EAI_NONAME, "The tests run offline")
+    getaddrinfo = socket.getaddrinfo
+    socket.getaddrinfo = noNetwork
+    yield
+    socket.getaddrinfo = getaddrinfo
@@ -0,0 +1,61 @@
+"""
+    The MIT License (MIT)
+
+    Copyright (c) 2023 pkjmesra
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+
+"""
+import pandas as pd
+import pytest
+
+from pkscreener import pkscreenercli
+from pkscreener.classes.MenuOptions import menus
+
+EXPRESSION = "close > sma(50) and volume >= 2*sma(volume,20)"
+
+
+def parseArgs(options, monkeypatch):
+    monkeypatch.setattr(pkscreenercli.configManager, "toggleConfig", lambda *args, **kwargs: None)
+    return pkscreenercli.argParser.parse_known_args(args=["-a", "y", "-o", options])[0]
+
+def test_expression_is_not_split_as_a_piped_scan(monkeypatch):
+    args = parseArgs(f"X:12:44:{EXPRESSION}", monkeypatch)
+    pkscreenercli.updateConfigDurations(args)
+    assert args.intraday is None
+    assert not pkscreenercli.pipeResults(pd.DataFrame({"Stock": ["SBIN"]}), args)
+    assert args.options == f"X:12:44:{EXPRESSION}"
+
+def test_expression_results_are_piped_into_the_next_scan(monkeypatch):
+    args = parseArgs(f"X:12:44:{EXPRESSION}:>|X:0:31:>|X:0:27:", monkeypatch)
+    pkscreenercli.updateConfigDurations(args)
+    assert pkscreenercli.pipeResults(pd.DataFrame({"Stock": ["SBIN", "TCS"]}), args)
+    assert args.options == "X:0:31:SBIN,TCS:D:>|X:0:27:"
+
+def test_expression_is_not_taken_as_a_stock_list(monkeypatch):
+    globals = pytest.importorskip("pkscreener.globals")
+    monkeypatch.setattr(globals, "listStockCodes", None)
+    assert globals.handleRequestForSpecificStocks(f"X:0:44:{EXPRESSION}:SBIN,TCS:>|X:0:31:", 0) == ["SBIN", "TCS"]
+    monkeypatch.setattr(globals, "listStockCodes", None)
+    assert globals.handleRequestForSpecificStocks(f"X:0:44:{EXPRESSION}".split(":"), 0) == []
+
+def test_all_menus_skip_the_expression_scan():
+    runOptions, _ = menus.allMenus(topLevel="X", index=12)
+    assert len(runOptions) > 0
+    assert not any(option.startswith("X:12:44:") for option in runOptions)